@@ -0,0 +1,411 @@
+"""
+In-process inverted index over the aac_images collection.
+
+Symbol lookups (board generation, batch search, button search) used to fan out
+into many Firestore queries per request. This module keeps a compact,
+memory-resident copy of the searchable fields of every aac_images document and
+answers term lookups from posting lists instead.
+
+The index is populated and kept fresh by a Firestore snapshot listener: the
+first snapshot delivers every document, later snapshots deliver only
+ADDED/MODIFIED/REMOVED changes. If the listener cannot be started, a periodic
+full reload keeps the index usable.
+"""
+
+import logging
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+AAC_IMAGES_COLLECTION = "aac_images"
+
+# Fields copied into each compact record. Anything else on the document (prompts,
+# generation metadata, timestamps) is dropped to keep memory bounded.
+RECORD_FIELDS = (
+    "image_url",
+    "source",
+    "concept",
+    "subconcept",
+    "tags",
+    "aliases",
+    "search_terms",
+    "localized_tags",
+    "localized_labels",
+    "mascot",
+    "categories",
+    "category",
+    "subcategory",
+    "difficulty",
+    "difficulty_level",
+    "age_group",
+    "age_groups",
+    "storage_path",
+    # Text fields used only by the /api/symbols/search engine (aac_symbol_search.py).
+    "name",
+    "description",
+    "filename_tags",
+    "alt_text",
+)
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+_QUOTE_TRANSLATION = str.maketrans({"‘": "'", "’": "'", "`": "'", "“": '"', "”": '"'})
+
+
+def to_index_version(timestamp: Any) -> int:
+    """Converts a Firestore update/read time into an integer version (microseconds since epoch)."""
+    if timestamp is None:
+        return 0
+    try:
+        return int(timestamp.timestamp() * 1_000_000)
+    except Exception:
+        return 0
+
+
+def normalize_index_term(value: Any) -> str:
+    """Canonical term form used for both indexing and lookups: lowercase, punctuation-insensitive."""
+    text = str(value or "").strip().lower().translate(_QUOTE_TRANSLATION)
+    if not text:
+        return ""
+    return " ".join(_NON_ALNUM_RE.sub(" ", text).split())
+
+
+class IndexedImage:
+    """Compact, pre-normalized view of one aac_images document."""
+
+    __slots__ = ("id", "url", "source", "sub", "con", "tags", "search_terms", "mascot", "all_terms", "localized", "data", "version")
+
+    def __init__(self, doc_id: str, data: Dict[str, Any], version: int = 0):
+        self.id = doc_id
+        self.version = version
+        self.data = {k: data[k] for k in RECORD_FIELDS if k in data}
+        self.url = data.get("image_url")
+        self.source = data.get("source")
+        self.sub = normalize_index_term(data.get("subconcept"))
+        self.con = normalize_index_term(data.get("concept"))
+        raw_tags = data.get("tags") if isinstance(data.get("tags"), list) else []
+        raw_terms = data.get("search_terms") if isinstance(data.get("search_terms"), list) else []
+        self.tags = tuple(t for t in (normalize_index_term(tag) for tag in raw_tags) if t)
+        self.search_terms = tuple(t for t in (normalize_index_term(term) for term in raw_terms) if t)
+        self.mascot = str(data.get("mascot") or "").strip().lower()
+        self.all_terms = frozenset((*self.tags, *self.search_terms, self.sub, self.con)) - {""}
+
+        # locale key (lowercased, as stored) -> normalized localized tags + label
+        localized: Dict[str, Set[str]] = {}
+        localized_tags = data.get("localized_tags")
+        if isinstance(localized_tags, dict):
+            for locale_key, locale_tags in localized_tags.items():
+                if isinstance(locale_tags, list):
+                    bucket = localized.setdefault(str(locale_key).strip().lower(), set())
+                    bucket.update(t for t in (normalize_index_term(tag) for tag in locale_tags) if t)
+        localized_labels = data.get("localized_labels")
+        if isinstance(localized_labels, dict):
+            for locale_key, label in localized_labels.items():
+                label_norm = normalize_index_term(label)
+                if label_norm:
+                    localized.setdefault(str(locale_key).strip().lower(), set()).add(label_norm)
+        self.localized = {k: frozenset(v) for k, v in localized.items()}
+
+    def postings(self) -> Iterable[tuple]:
+        """Yields (field, term) pairs this record should be reachable from."""
+        if self.sub:
+            yield "subconcept", self.sub
+        if self.con:
+            yield "concept", self.con
+        for tag in self.tags:
+            yield "tags", tag
+        for term in self.search_terms:
+            yield "search_terms", term
+        localized_tags = self.data.get("localized_tags")
+        if isinstance(localized_tags, dict):
+            for locale_key, locale_tags in localized_tags.items():
+                if isinstance(locale_tags, list):
+                    field = f"localized_tags.{str(locale_key).strip().lower()}"
+                    for tag in locale_tags:
+                        tag_norm = normalize_index_term(tag)
+                        if tag_norm:
+                            yield field, tag_norm
+        localized_labels = self.data.get("localized_labels")
+        if isinstance(localized_labels, dict):
+            for locale_key, label in localized_labels.items():
+                label_norm = normalize_index_term(label)
+                if label_norm:
+                    yield f"localized_labels.{str(locale_key).strip().lower()}", label_norm
+
+    def to_image_dict(self) -> Dict[str, Any]:
+        """Returns a copy of the indexed document fields plus its id, like doc.to_dict() callers expect."""
+        image = dict(self.data)
+        image["id"] = self.id
+        return image
+
+
+class AacImageIndex:
+    """Thread-safe inverted index: field -> normalized term -> set of image ids."""
+
+    # Fields searched when a caller does not restrict the lookup.
+    DEFAULT_FIELDS = ("subconcept", "concept", "tags", "search_terms")
+
+    def __init__(self, collection_name: str = AAC_IMAGES_COLLECTION, refresh_interval_seconds: int = 900):
+        self.collection_name = collection_name
+        self.refresh_interval_seconds = refresh_interval_seconds
+        self._lock = threading.RLock()
+        # Serializes mutations with their subscriber notifications, so subscribers see changes
+        # in order. Notifications run outside _lock, so a slow subscriber does not block lookups.
+        self._notify_lock = threading.RLock()
+        self._records: Dict[str, IndexedImage] = {}
+        self._postings: Dict[str, Dict[str, Set[str]]] = {}
+        self._ready = threading.Event()
+        self._watch = None
+        self._db = None
+        self._loaded_at: Optional[float] = None
+        self._changes_applied = 0
+        # Deletions are only observable while the listener runs, so `since=` deltas can
+        # report removals only for versions at or after the point tracking started.
+        self._tombstones: Dict[str, int] = {}
+        self._tombstone_floor = 0
+        self._subscribers: List[Callable[[str, Any], None]] = []
+
+    # --- lifecycle -----------------------------------------------------
+
+    @property
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+
+    @property
+    def is_listening(self) -> bool:
+        return self._watch is not None
+
+    def start(self, db) -> bool:
+        """
+        Attaches a snapshot listener to the collection. Returns False if the listener
+        could not be started (callers should then rely on run_refresh_loop()).
+        """
+        self._db = db
+        try:
+            self._watch = db.collection(self.collection_name).on_snapshot(self._on_snapshot)
+            logging.info(f"🗂️ aac_images index: snapshot listener attached to '{self.collection_name}'")
+            return True
+        except Exception as e:
+            self._watch = None
+            logging.warning(f"aac_images index: snapshot listener unavailable ({e}); falling back to periodic reloads")
+            return False
+
+    def subscribe(self, callback: Callable[[str, Any], None]) -> None:
+        """
+        Registers callback(event, payload) for derived indexes. Events: "upsert"
+        (IndexedImage), "remove" (doc id), "reset" (list of all records, after a full
+        reload and once the initial snapshot is applied) and "ready" (right after
+        that first "reset"). Callbacks see changes in order and may read the index,
+        but must not modify it. They run outside the lock lookups take, so a slow one
+        (a full rebuild) delays later changes but not queries.
+        """
+        with self._notify_lock:
+            self._subscribers.append(callback)
+            if self.is_ready:
+                with self._lock:
+                    records = list(self._records.values())
+                callback("reset", records)
+
+    def _notify(self, event: str, payload: Any) -> None:
+        for callback in self._subscribers:
+            try:
+                callback(event, payload)
+            except Exception as e:
+                logging.error(f"aac_images index: subscriber failed on '{event}': {e}", exc_info=True)
+
+    def stop(self) -> None:
+        watch, self._watch = self._watch, None
+        if watch is not None:
+            try:
+                watch.unsubscribe()
+            except Exception as e:
+                logging.debug(f"aac_images index: error unsubscribing listener: {e}")
+
+    def reload(self) -> int:
+        """Blocking full reload from Firestore. Run it via asyncio.to_thread."""
+        if self._db is None:
+            return 0
+        records: Dict[str, IndexedImage] = {}
+        for doc in self._db.collection(self.collection_name).stream():
+            data = doc.to_dict() or {}
+            records[doc.id] = IndexedImage(doc.id, data, to_index_version(getattr(doc, "update_time", None)))
+        postings: Dict[str, Dict[str, Set[str]]] = {}
+        for record in records.values():
+            for field, term in record.postings():
+                postings.setdefault(field, {}).setdefault(term, set()).add(record.id)
+        with self._notify_lock:
+            with self._lock:
+                self._records = records
+                self._postings = postings
+                self._loaded_at = time.time()
+                # A full reload cannot see what was deleted before it, so restart tombstone tracking.
+                self._tombstones = {}
+                self._tombstone_floor = max((r.version for r in records.values()), default=0)
+            self._notify("reset", list(records.values()))
+        self._ready.set()
+        logging.info(f"🗂️ aac_images index: reloaded {len(records)} images")
+        return len(records)
+
+    async def run_refresh_loop(self) -> None:
+        """Background task: periodic full reloads whenever the snapshot listener is not running."""
+        import asyncio
+        while True:
+            try:
+                if not self.is_listening:
+                    await asyncio.to_thread(self.reload)
+                await asyncio.sleep(self.refresh_interval_seconds)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logging.error(f"aac_images index refresh failed: {e}", exc_info=True)
+                await asyncio.sleep(60)
+
+    def _on_snapshot(self, _col_snapshot, changes, read_time) -> None:
+        # Runs on the Firestore watch thread.
+        try:
+            read_version = to_index_version(read_time)
+            for change in changes:
+                doc = change.document
+                if change.type.name == "REMOVED":
+                    self.remove(doc.id, read_version)
+                else:
+                    self.upsert(doc.id, doc.to_dict() or {}, to_index_version(getattr(doc, "update_time", None)))
+            if not self._ready.is_set():
+                self._loaded_at = time.time()
+                self._tombstone_floor = read_version
+                with self._notify_lock:
+                    with self._lock:
+                        records = list(self._records.values())
+                    # Derived indexes that normalize over the whole corpus rebuild from this
+                    self._notify("reset", records)
+                    self._notify("ready", None)
+                self._ready.set()
+                logging.info(f"🗂️ aac_images index: initial snapshot loaded ({len(self._records)} images)")
+        except Exception as e:
+            logging.error(f"aac_images index: failed to apply snapshot changes: {e}", exc_info=True)
+
+    # --- mutation ------------------------------------------------------
+
+    def upsert(self, doc_id: str, data: Dict[str, Any], version: int = 0) -> None:
+        record = IndexedImage(doc_id, data, version)
+        with self._notify_lock:
+            with self._lock:
+                self._unlink(doc_id)
+                self._tombstones.pop(doc_id, None)
+                self._records[doc_id] = record
+                for field, term in record.postings():
+                    self._postings.setdefault(field, {}).setdefault(term, set()).add(doc_id)
+                self._changes_applied += 1
+            self._notify("upsert", record)
+
+    def remove(self, doc_id: str, version: int = 0) -> None:
+        with self._notify_lock:
+            with self._lock:
+                removed = self._unlink(doc_id) is not None
+                if removed and self.is_ready:
+                    self._tombstones[doc_id] = version
+                self._changes_applied += 1
+            if removed:
+                self._notify("remove", doc_id)
+
+    def _unlink(self, doc_id: str) -> Optional[IndexedImage]:
+        old = self._records.pop(doc_id, None)
+        if old is None:
+            return None
+        for field, term in old.postings():
+            ids = self._postings.get(field, {}).get(term)
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del self._postings[field][term]
+        return old
+
+    # --- queries -------------------------------------------------------
+
+    def lookup(
+        self,
+        terms: Iterable[Any],
+        fields: Optional[Iterable[str]] = None,
+        sources: Optional[Iterable[str]] = None,
+        require_url: bool = True,
+    ) -> List[IndexedImage]:
+        """
+        Returns every record reachable from any of `terms` through any of `fields`.
+        Field names match Firestore paths, including "localized_tags.<locale>" and
+        "localized_labels.<locale>".
+        """
+        normalized_terms = {normalize_index_term(t) for t in terms}
+        normalized_terms.discard("")
+        if not normalized_terms:
+            return []
+        source_filter = set(sources) if sources is not None else None
+        with self._lock:
+            ids: Set[str] = set()
+            for field in (fields or self.DEFAULT_FIELDS):
+                field_postings = self._postings.get(field)
+                if not field_postings:
+                    continue
+                for term in normalized_terms:
+                    posting = field_postings.get(term)
+                    if posting:
+                        ids.update(posting)
+            results = []
+            for doc_id in ids:
+                record = self._records.get(doc_id)
+                if record is None:
+                    continue
+                if require_url and not record.url:
+                    continue
+                if source_filter is not None and record.source not in source_filter:
+                    continue
+                results.append(record)
+        return results
+
+    def get(self, doc_id: str) -> Optional[IndexedImage]:
+        with self._lock:
+            return self._records.get(doc_id)
+
+    def records(self, sources: Optional[Iterable[str]] = None, since_version: int = 0) -> List[IndexedImage]:
+        """All records (optionally filtered by source) changed strictly after `since_version`."""
+        source_filter = set(sources) if sources is not None else None
+        with self._lock:
+            return [
+                r for r in self._records.values()
+                if (source_filter is None or r.source in source_filter) and r.version > since_version
+            ]
+
+    def library_version(self, sources: Optional[Iterable[str]] = None) -> int:
+        """Highest change version across the (filtered) library, including deletions."""
+        source_filter = set(sources) if sources is not None else None
+        with self._lock:
+            latest = max(
+                (r.version for r in self._records.values() if source_filter is None or r.source in source_filter),
+                default=0,
+            )
+            return max(latest, max(self._tombstones.values(), default=0))
+
+    def deleted_since(self, since_version: int) -> Optional[List[str]]:
+        """
+        Ids removed after `since_version`, or None when that version predates tombstone
+        tracking (the caller must then fall back to a full download).
+        """
+        with self._lock:
+            if since_version < self._tombstone_floor:
+                return None
+            return [doc_id for doc_id, version in self._tombstones.items() if version > since_version]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self.is_ready,
+                "listening": self.is_listening,
+                "images": len(self._records),
+                "fields": {field: len(terms) for field, terms in self._postings.items() if not field.startswith("localized_")},
+                "localized_fields": sum(1 for field in self._postings if field.startswith("localized_")),
+                "changes_applied": self._changes_applied,
+                "loaded_at": self._loaded_at,
+            }
+
+
+# Global singleton instance
+aac_image_index = AacImageIndex()
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 
+import asyncio
 import json
 import os
 import re
@@ -8,6 +9,8 @@ from typing import Any, Dict, List, Optional, Set
 import google.genai as genai
 import google.genai.types as genai_types
 
+from translation_memory import normalize_text, translation_memory
+
 STANDARD_LOCALES: List[str] = [
     "es",
     "fr",
@@ -203,7 +206,7 @@ def _extract_json_object(raw_text: str) -> Dict[str, Any]:
 
 
 class AacGeminiTranslator:
-    def __init__(self, model_name: str = None):
+    def __init__(self, model_name: str = None, memory_db=None):
         api_key = (
             os.getenv("GEMINI_API_KEY")
             or os.getenv("GOOGLE_API_KEY")
@@ -213,6 +216,8 @@ class AacGeminiTranslator:
             raise RuntimeError("Set GEMINI_API_KEY or GOOGLE_API_KEY before running translation scripts.")
         self._client = genai.Client(api_key=api_key)
         self._model_name = model_name or os.getenv("GEMINI_PRIMARY_MODEL") or "gemini-2.5-flash-lite"
+        # Firestore client for the shared translation memory (same entries the server uses); None disables it.
+        self._memory_db = memory_db
 
     def translate_lines(
         self,
@@ -223,7 +228,49 @@ class AacGeminiTranslator:
         clean_lines = [sanitize_translated_text(line) for line in lines]
         if not any(clean_lines):
             return clean_lines
+        if self._memory_db is None:
+            return self._translate_with_model(clean_lines, target_locale, source_locale)
+
+        keys = [normalize_text(line) for line in clean_lines]
+        originals: Dict[str, str] = {}
+        for key, line in zip(keys, clean_lines):
+            if key and key not in originals:
+                originals[key] = line
+        known = translation_memory.lookup(self._memory_db, source_locale, target_locale, originals)
+        misses = [key for key in originals if key not in known]
+        if misses:
+            translated = self._translate_with_model([originals[key] for key in misses], target_locale, source_locale)
+            fresh = dict(zip(misses, translated))
+            translation_memory.store(self._memory_db, source_locale, target_locale, fresh, model=self._model_name)
+            known.update(fresh)
+        return [(known.get(key) or line) if key else line for key, line in zip(keys, clean_lines)]
+
+    async def translate_many(
+        self,
+        lines: List[str],
+        target_locale: str,
+        source_locale: str = "en-US",
+        max_concurrency: int = 4,
+    ) -> List[str]:
+        """
+        translate_lines for large inputs (e.g. the tags of a whole page of documents):
+        only strings the translation memory doesn't know go to the model, in 60-line
+        batches with up to max_concurrency requests in flight.
+        """
+        clean_lines = [sanitize_translated_text(line) for line in lines]
+        if not any(clean_lines):
+            return clean_lines
+        return await translation_memory.translate(
+            self._memory_db,
+            clean_lines,
+            source_locale,
+            target_locale,
+            lambda batch: asyncio.to_thread(self._translate_with_model, batch, target_locale, source_locale),
+            max_concurrency=max_concurrency,
+            model=self._model_name,
+        )
 
+    def _translate_with_model(self, clean_lines: List[str], target_locale: str, source_locale: str) -> List[str]:
         source_instruction = LOCALE_LABELS.get(source_locale, source_locale)
         target_instruction = LOCALE_LABELS.get(target_locale, target_locale)
 
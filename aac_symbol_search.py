@@ -0,0 +1,372 @@
+"""
+Full-text search over AAC symbols for /api/symbols/search.
+
+Replaces the old "stream the whole aac_images collection and substring-match in
+Python" path with an in-memory engine:
+
+- Tokenized inverted index with prefix expansion (sorted vocabulary + bisect),
+  so "choc" finds "chocolate".
+- BM25F-style scoring: per-field term frequencies are length-normalized and
+  weighted (subconcept > tags > concept > categories) before saturation. The
+  saturated value is precomputed per posting, so a query only multiplies by idf.
+- Filter bitsets (Python ints, one bit per document ordinal) for category,
+  difficulty and age_group.
+- Stable ordering (score desc, id asc) with opaque cursors for pagination; pages
+  are cut with a bounded heap rather than sorting every match.
+
+The engine is fed by the aac_images index (aac_image_index.py) through its
+change subscription, so it never queries Firestore itself.
+"""
+
+import base64
+import bisect
+import heapq
+import json
+import math
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from aac_image_index import normalize_index_term
+
+# Field weights for BM25F. Order matters: exact subconcept hits must beat tag hits,
+# which must beat concept/category hits.
+FIELD_WEIGHTS: Dict[str, float] = {
+    "subconcept": 4.0,
+    "name": 3.5,
+    "tags": 3.0,
+    "filename_tags": 2.0,
+    "concept": 2.0,
+    "categories": 1.2,
+    "description": 1.0,
+    "alt_text": 0.5,
+}
+
+# Filter name -> document fields that feed it (Firestore docs use the plural forms).
+FILTER_SOURCE_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "category": ("categories", "category"),
+    "difficulty": ("difficulty_level", "difficulty"),
+    "age_group": ("age_groups", "age_group"),
+}
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+PREFIX_MATCH_FACTOR = 0.5  # a prefix expansion counts half as much as the exact token
+MIN_PREFIX_LENGTH = 2
+MAX_PREFIX_EXPANSIONS = 50
+EXACT_SUBCONCEPT_BONUS = 10.0
+EXACT_TAG_BONUS = 5.0
+SCORE_PRECISION = 6
+
+
+def _tokenize(value: Any) -> List[str]:
+    return normalize_index_term(value).split()
+
+
+def _field_values(data: Dict[str, Any], field: str) -> List[str]:
+    value = data.get(field)
+    if isinstance(value, list):
+        return [str(v) for v in value if v is not None]
+    if value is None:
+        return []
+    return [str(value)]
+
+
+def encode_cursor(score: float, doc_id: str) -> str:
+    raw = json.dumps([score, doc_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[float, str]]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        score, doc_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return float(score), str(doc_id)
+    except Exception:
+        return None
+
+
+class _ParsedSymbol:
+    """Tokenized view of one document, computed before taking the engine lock."""
+
+    __slots__ = ("doc_id", "fields", "exact", "filters")
+
+    def __init__(self, doc_id: str, data: Dict[str, Any]):
+        self.doc_id = doc_id
+        self.fields: Dict[str, List[str]] = {}
+        for field in FIELD_WEIGHTS:
+            tokens = [t for value in _field_values(data, field) for t in _tokenize(value)]
+            if tokens:
+                self.fields[field] = tokens
+        self.exact = (
+            normalize_index_term(data.get("subconcept") or data.get("name")),
+            frozenset(normalize_index_term(t) for t in _field_values(data, "tags")),
+        )
+        filters = set()
+        for name, source_fields in FILTER_SOURCE_FIELDS.items():
+            for field in source_fields:
+                for value in _field_values(data, field):
+                    value = normalize_index_term(value)
+                    if value:
+                        filters.add((name, value))
+        self.filters = frozenset(filters)
+
+
+class SymbolSearchEngine:
+    """Thread-safe BM25F symbol search with prefix matching and filter bitsets."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.ready = False
+        self._reset_locked()
+
+    def _reset_locked(self) -> None:
+        self._ordinals: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._free_ordinals: List[int] = []
+        # token -> {ordinal: saturated BM25F term frequency}
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._doc_tokens: Dict[int, Tuple[str, ...]] = {}
+        self._field_lengths: Dict[int, Dict[str, int]] = {}
+        self._field_length_totals: Dict[str, int] = {f: 0 for f in FIELD_WEIGHTS}
+        self._exact: Dict[int, Tuple[str, frozenset]] = {}
+        self._vocabulary: List[str] = []
+        self._vocabulary_dirty = False
+        self._all_bits = 0
+        # filter name -> normalized value -> bitset
+        self._filters: Dict[str, Dict[str, int]] = {name: {} for name in FILTER_SOURCE_FIELDS}
+        self._doc_filters: Dict[int, frozenset] = {}
+
+    # --- feeding -------------------------------------------------------
+
+    def handle_index_event(self, event: str, payload: Any) -> None:
+        """Subscription callback for AacImageIndex.subscribe()."""
+        if event in ("upsert", "remove") and not self.ready:
+            return  # initial snapshot: the "reset" that follows it rebuilds in one pass
+        if event == "upsert":
+            self.add(payload.id, payload.data)
+        elif event == "remove":
+            self.remove(payload)
+        elif event == "reset":
+            self.rebuild((rec.id, rec.data) for rec in payload)
+        elif event == "ready":
+            self.ready = True
+
+    def rebuild(self, documents: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+        # Built on a private engine and swapped in, so searches keep answering from the
+        # old state until the new one is complete.
+        staged = SymbolSearchEngine()
+        staged._build_locked([_ParsedSymbol(doc_id, data) for doc_id, data in documents])
+        state = {name: value for name, value in vars(staged).items() if name not in ("_lock", "ready")}
+        with self._lock:
+            self.__dict__.update(state)
+            self.ready = True
+
+    def _build_locked(self, parsed: List[_ParsedSymbol]) -> None:
+        # Length statistics first, so every posting is normalized against the final averages.
+        for doc in parsed:
+            for field, tokens in doc.fields.items():
+                self._field_length_totals[field] += len(tokens)
+        n_docs = len(parsed)
+        for doc in parsed:
+            self._add_locked(doc, n_docs=n_docs, update_bitsets=False)
+        # Build the bitsets in one pass each; OR-ing bit by bit would copy the int n times.
+        members: Dict[Tuple[str, str], bytearray] = {}
+        size = (len(self._ids) + 7) // 8
+        all_members = bytearray(size)
+        for ordinal, filters in self._doc_filters.items():
+            all_members[ordinal >> 3] |= 1 << (ordinal & 7)
+            for key in filters:
+                if key not in members:
+                    members[key] = bytearray(size)
+                members[key][ordinal >> 3] |= 1 << (ordinal & 7)
+        self._all_bits = int.from_bytes(all_members, "little")
+        for (name, value), raw in members.items():
+            self._filters[name][value] = int.from_bytes(raw, "little")
+
+    def add(self, doc_id: str, data: Dict[str, Any]) -> None:
+        doc = _ParsedSymbol(doc_id, data)
+        with self._lock:
+            self._remove_locked(doc_id)
+            for field, tokens in doc.fields.items():
+                self._field_length_totals[field] += len(tokens)
+            # Incremental adds normalize against the averages at the time they arrive.
+            # Only rebuild() (initial snapshot, or a full reload when the listener is
+            # not running) normalizes the whole corpus; the drift from later changes
+            # is small while they are a small share of the corpus.
+            self._add_locked(doc, n_docs=len(self._ordinals) + 1)
+
+    def remove(self, doc_id: str) -> None:
+        with self._lock:
+            self._remove_locked(doc_id)
+
+    def _add_locked(self, doc: _ParsedSymbol, n_docs: int, update_bitsets: bool = True) -> None:
+        if self._free_ordinals:
+            ordinal = self._free_ordinals.pop()
+            self._ids[ordinal] = doc.doc_id
+        else:
+            ordinal = len(self._ids)
+            self._ids.append(doc.doc_id)
+        self._ordinals[doc.doc_id] = ordinal
+
+        n_docs = max(1, n_docs)
+        weighted: Dict[str, float] = {}
+        for field, tokens in doc.fields.items():
+            avg_length = (self._field_length_totals[field] / n_docs) or 1.0
+            norm = 1 - BM25_B + BM25_B * (len(tokens) / avg_length)
+            weight = FIELD_WEIGHTS[field] / norm
+            for token in tokens:
+                weighted[token] = weighted.get(token, 0.0) + weight
+        for token, wtf in weighted.items():
+            posting = self._postings.get(token)
+            if posting is None:
+                posting = self._postings[token] = {}
+                self._vocabulary_dirty = True
+            posting[ordinal] = wtf * (BM25_K1 + 1) / (wtf + BM25_K1)
+        self._doc_tokens[ordinal] = tuple(weighted)
+        self._field_lengths[ordinal] = {field: len(tokens) for field, tokens in doc.fields.items()}
+        self._exact[ordinal] = doc.exact
+        self._doc_filters[ordinal] = doc.filters
+
+        if update_bitsets:
+            bit = 1 << ordinal
+            self._all_bits |= bit
+            for name, value in doc.filters:
+                self._filters[name][value] = self._filters[name].get(value, 0) | bit
+
+    def _remove_locked(self, doc_id: str) -> None:
+        ordinal = self._ordinals.pop(doc_id, None)
+        if ordinal is None:
+            return
+        bit = 1 << ordinal
+        self._all_bits &= ~bit
+        for token in self._doc_tokens.pop(ordinal, ()):
+            posting = self._postings.get(token)
+            if posting is not None:
+                posting.pop(ordinal, None)
+                if not posting:
+                    del self._postings[token]
+                    self._vocabulary_dirty = True
+        for field, length in self._field_lengths.pop(ordinal, {}).items():
+            self._field_length_totals[field] -= length
+        for name, value in self._doc_filters.pop(ordinal, ()):
+            bits = self._filters[name].get(value, 0) & ~bit
+            if bits:
+                self._filters[name][value] = bits
+            else:
+                self._filters[name].pop(value, None)
+        self._exact.pop(ordinal, None)
+        self._ids[ordinal] = None
+        self._free_ordinals.append(ordinal)
+
+    # --- querying ------------------------------------------------------
+
+    def _expand_token(self, token: str) -> List[Tuple[str, float]]:
+        expansions = []
+        if token in self._postings:
+            expansions.append((token, 1.0))
+        if len(token) >= MIN_PREFIX_LENGTH:
+            if self._vocabulary_dirty:
+                self._vocabulary = sorted(self._postings)
+                self._vocabulary_dirty = False
+            start = bisect.bisect_left(self._vocabulary, token)
+            for candidate in self._vocabulary[start:start + MAX_PREFIX_EXPANSIONS + 1]:
+                if not candidate.startswith(token):
+                    break
+                if candidate != token:
+                    expansions.append((candidate, PREFIX_MATCH_FACTOR))
+        return expansions
+
+    def _score_locked(self, query_tokens: List[str], required: frozenset) -> Dict[int, float]:
+        n_docs = max(1, len(self._ordinals))
+        doc_filters = self._doc_filters
+        scores: Dict[int, float] = {}
+        for token in query_tokens:
+            for term, factor in self._expand_token(token):
+                posting = self._postings[term]
+                df = len(posting)
+                weight = factor * math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                get = scores.get
+                if required:
+                    # Per-document filter check stays O(1); testing a bit of a 100k-bit
+                    # mask would copy the whole int for every posting.
+                    for ordinal, sat in posting.items():
+                        if required <= doc_filters[ordinal]:
+                            scores[ordinal] = get(ordinal, 0.0) + weight * sat
+                else:
+                    for ordinal, sat in posting.items():
+                        scores[ordinal] = get(ordinal, 0.0) + weight * sat
+
+        phrase = " ".join(query_tokens)
+        for ordinal in scores:
+            exact_sub, exact_tags = self._exact[ordinal]
+            if phrase == exact_sub:
+                scores[ordinal] += EXACT_SUBCONCEPT_BONUS
+            elif phrase in exact_tags:
+                scores[ordinal] += EXACT_TAG_BONUS
+        return scores
+
+    def search(
+        self,
+        query: str = "",
+        category: Optional[str] = None,
+        difficulty: Optional[str] = None,
+        age_group: Optional[str] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Returns {"hits": [(doc_id, score), ...], "total": int, "next_cursor": str|None}.
+        Without a query, filtered documents are returned in stable id order (score 0).
+        """
+        limit = max(1, int(limit or 20))
+        required = frozenset(
+            (name, normalize_index_term(value))
+            for name, value in (("category", category), ("difficulty", difficulty), ("age_group", age_group))
+            if value
+        )
+        query_tokens = list(dict.fromkeys(_tokenize(query)))
+
+        with self._lock:
+            if query_tokens:
+                scores = self._score_locked(query_tokens, required)
+                candidates = ((self._ids[o], round(s, SCORE_PRECISION)) for o, s in scores.items())
+                total = len(scores)
+            else:
+                bits = self._all_bits
+                for name, value in required:
+                    bits &= self._filters[name].get(value, 0)
+                ordinals = _iter_bits(bits)
+                candidates = ((self._ids[o], 0.0) for o in ordinals)
+                total = len(ordinals)
+
+            decoded = decode_cursor(cursor) if cursor else None
+            if decoded is not None:
+                after_key = (-decoded[0], decoded[1])
+                candidates = (c for c in candidates if (-c[1], c[0]) > after_key)
+            # One extra hit tells us whether another page exists.
+            page = heapq.nsmallest(limit + 1, candidates, key=lambda c: (-c[1], c[0]))
+
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            last_id, last_score = page[-1]
+            next_cursor = encode_cursor(last_score, last_id)
+        return {"hits": page, "total": total, "next_cursor": next_cursor}
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "documents": len(self._ordinals),
+                "vocabulary": len(self._postings),
+                "categories": len(self._filters["category"]),
+            }
+
+
+def _iter_bits(bits: int) -> List[int]:
+    # One pass over the binary string; peeling bits off a big int one at a time is quadratic.
+    return [i for i, c in enumerate(reversed(bin(bits)[2:])) if c == "1"]
+
+
+# Global singleton instance
+symbol_search_engine = SymbolSearchEngine()
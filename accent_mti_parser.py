@@ -8,15 +8,129 @@ MTI files contain compressed button configurations with:
 - Navigation targets and functions
 
 Based on extract_mti_to_json.py implementation.
+
+The scanning core below is shared with extract_mti_to_json.py. Record markers are
+found with re.finditer over a memoryview of the decompressed buffer (no per-byte
+slices), fixed-layout header fields are decoded with precompiled struct.Struct
+objects, and a record's button is only decoded when it is used.
 """
 
+import importlib.util
+import re
 import struct
+import sys
 import zlib
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+MTI_RECORD_MARKER = b'm\x00\x04\xfd'
+_MTI_RECORD_MARKER_RE = re.compile(re.escape(MTI_RECORD_MARKER))
+# Bytes 4-13 after a marker: page id (stored byte-swapped, so read big-endian),
+# sequence, 2 unknown, format byte (byte 9), 3 unknown, name length for formats 3/5 (byte 13)
+MTI_RECORD_HEADER = struct.Struct('>HB2xB3xB')
+# Records this close to the end of the buffer are ignored (as they always were)
+MTI_RECORD_TAIL = 20
+_U16_LE = struct.Struct('<H')
+
+
+class MTIRecord(NamedTuple):
+    offset: int
+    page_id: str
+    sequence: int
+    format_byte: int
+
+
+def read_mti_data(file_path: str) -> bytes:
+    """Decompressed payload of an .mti file."""
+    # MTI files have format: v500 header line, 4 mystery bytes, CRLF, then zlib compressed data
+    with open(file_path, 'rb') as f:
+        f.readline()  # Skip "v500 1 NUVOICE\r\n" line
+        f.read(4)     # Skip 4 mystery bytes
+        f.read(2)     # Skip CRLF
+        compressed_data = f.read()
+    logger.info(f"Compressed data size: {len(compressed_data)} bytes")
+    data = zlib.decompress(compressed_data)
+    logger.info(f"Decompressed {len(data)} bytes")
+    return data
+
+
+def iter_record_offsets(data: bytes, start: int = 0) -> Iterator[int]:
+    """Offsets of every m-record marker (markers never overlap, so every hit is a record)."""
+    limit = len(data) - MTI_RECORD_TAIL
+    for match in _MTI_RECORD_MARKER_RE.finditer(memoryview(data), start):
+        offset = match.start()
+        if offset >= limit:
+            return
+        yield offset
+
+
+def scan_records(data: bytes) -> Iterator[MTIRecord]:
+    """Record headers in file order; the button payloads are left undecoded."""
+    unpack_header = MTI_RECORD_HEADER.unpack_from
+    for offset in iter_record_offsets(data):
+        page_id, sequence, format_byte, _ = unpack_header(data, offset + 4)
+        yield MTIRecord(offset, f"{page_id:04x}", sequence, format_byte)
+
+
+def find_first(data: bytes, start: int, end: int, *needles: bytes) -> int:
+    """
+    Index of the first needle starting in [start, end), else max(start, end) - the
+    position a `while pos < end: if data[pos:...] == needle: break; pos += 1` loop
+    stops at.
+    """
+    found = max(start, end)
+    for needle in needles:
+        idx = data.find(needle, start, min(len(data), end + len(needle) - 1))
+        if idx != -1 and idx < found:
+            found = idx
+    return found
+
+
+def page_name_finder(page_name_to_id: Dict[str, str]):
+    """
+    find_page_id(name) for navigation resolution: exact name, then "0 " + name, then the
+    first page whose stripped/lowercased name matches either. The fuzzy pass is indexed
+    once here instead of scanning every page on every lookup.
+    """
+    normalized: Dict[str, Tuple[int, str]] = {}
+    for index, (page_name, page_id) in enumerate(page_name_to_id.items()):
+        normalized.setdefault(page_name.strip().lower(), (index, page_id))
+
+    def find_page_id(name: str) -> Optional[str]:
+        name_lower = name.strip().lower()
+        # Try exact match
+        if name_lower in page_name_to_id:
+            return page_name_to_id[name_lower]
+        # Try with "0 " prefix
+        with_prefix = f"0 {name_lower}"
+        if with_prefix in page_name_to_id:
+            return page_name_to_id[with_prefix]
+        # Try fuzzy match (ignore trailing spaces/punctuation): earliest page matching either form
+        hits = [normalized[key] for key in (name_lower, with_prefix.strip()) if key in normalized]
+        return min(hits)[1] if hits else None
+
+    return find_page_id
+
+
+def parse_mti_path(file_path: str, extractor_path: Optional[str] = None) -> Optional[Dict]:
+    """
+    Parse an .mti file with extract_mti_to_json.extract_mti_file when extractor_path
+    is given, else with AccentMTIParser. Module-level so it can run in a worker process.
+    """
+    if not extractor_path:
+        return AccentMTIParser().parse_file(file_path)
+    # Load the extractor fresh from its path, like the upload endpoint always has
+    module_name = "extract_mti_to_json_runtime"
+    sys.modules.pop(module_name, None)
+    spec = importlib.util.spec_from_file_location(module_name, extractor_path)
+    if spec is None or spec.loader is None:
+        raise ImportError(f"Failed to load MTI extractor from {extractor_path}")
+    extractor = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(extractor)
+    return extractor.extract_mti_file(file_path)
+
 
 class AccentMTIParser:
     """Parser for Accent MTI configuration files."""
@@ -306,22 +420,7 @@ class AccentMTIParser:
             }
         """
         try:
-            # Read and decompress the MTI file
-            # MTI files have format: v500 header line, 4 mystery bytes, CRLF, then zlib compressed data
-            with open(file_path, 'rb') as f:
-                # Skip the header
-                f.readline()  # Skip "v500 1 NUVOICE\r\n" line
-                f.read(4)     # Skip 4 mystery bytes
-                f.read(2)     # Skip CRLF
-                
-                # Rest is zlib compressed data
-                compressed_data = f.read()
-            
-            logger.info(f"Compressed data size: {len(compressed_data)} bytes")
-            
-            # Decompress
-            decompressed = zlib.decompress(compressed_data)
-            logger.info(f"Decompressed {len(decompressed)} bytes")
+            decompressed = read_mti_data(file_path)
             
             # Extract pages and buttons
             self._extract_pages(decompressed)
@@ -363,62 +462,37 @@ class AccentMTIParser:
     
     def _extract_pages(self, data: bytes):
         """Extract all pages and buttons from decompressed MTI data."""
-        # Look for m-records (button definitions)
-        # Format: m\x00\x04\xfd followed by button data
-        
-        pos = 0
+        # m-records (button definitions): m\x00\x04\xfd followed by button data
         button_count = 0
         
-        while pos < len(data) - 20:
-            # Find m-record marker
-            if data[pos:pos+4] != b'm\x00\x04\xfd':
-                pos += 1
-                continue
+        for record in scan_records(data):
+            page_id_str = record.page_id
+            sequence = record.sequence
             
-            try:
-                # Extract page ID (2 bytes after marker) and SWAP BYTES
-                # MTI stores as 0x0004 but we display as 0x0400
-                page_id_bytes = data[pos+4:pos+6]
-                page_id_raw = struct.unpack('<H', page_id_bytes)[0]
-                
-                # Byte-swap the page ID: swap high and low bytes
-                page_id_swapped = ((page_id_raw & 0xFF) << 8) | ((page_id_raw >> 8) & 0xFF)
-                page_id_str = f"{page_id_swapped:04x}"
-                
-                # Extract sequence (button position, 1 byte)
-                sequence = data[pos+6]
-                
-                # Calculate grid position
-                row = sequence // self.ACCENT_GRID_COLS
-                col = sequence % self.ACCENT_GRID_COLS
-                
-                # Parse button based on format
-                button = self._parse_button(data, pos, page_id_str, sequence, row, col)
-                
-                if button:
-                    # Add to pages dict
-                    if page_id_str not in self.pages:
-                        self.pages[page_id_str] = {
-                            'page_id': page_id_str,
-                            'inferred_name': f'Page_{page_id_str}',
-                            'button_count': 0,
-                            'buttons': []
-                        }
-                    
-                    self.pages[page_id_str]['buttons'].append(button)
-                    self.pages[page_id_str]['button_count'] += 1
-                    button_count += 1
-                    
-                    # Store 40XX metadata for page naming
-                    if page_id_str.startswith('40') and button['name']:
-                        self.page_names[(page_id_str, sequence)] = button['name']
+            # Calculate grid position
+            row = sequence // self.ACCENT_GRID_COLS
+            col = sequence % self.ACCENT_GRID_COLS
+            
+            # Parse button based on format
+            button = self._parse_button(data, record.offset, page_id_str, sequence, row, col)
+            
+            if button:
+                # Add to pages dict
+                if page_id_str not in self.pages:
+                    self.pages[page_id_str] = {
+                        'page_id': page_id_str,
+                        'inferred_name': f'Page_{page_id_str}',
+                        'button_count': 0,
+                        'buttons': []
+                    }
                 
-                # Move past the marker to continue searching
-                pos += 4
+                self.pages[page_id_str]['buttons'].append(button)
+                self.pages[page_id_str]['button_count'] += 1
+                button_count += 1
                 
-            except Exception as e:
-                pos += 1
-                continue
+                # Store 40XX metadata for page naming
+                if page_id_str.startswith('40') and button['name']:
+                    self.page_names[(page_id_str, sequence)] = button['name']
         
         logger.info(f"Extracted {button_count} buttons from {len(self.pages)} pages")
     
@@ -553,11 +627,7 @@ class AccentMTIParser:
                             
                             if func_type == 0x3a:  # Speech
                                 # Find end of speech (next 0xA4 or CRLF)
-                                speech_end = pos_cursor
-                                while speech_end < len(data) - 2:
-                                    if data[speech_end] == 0xa4 or data[speech_end:speech_end+2] == b'\r\n':
-                                        break
-                                    speech_end += 1
+                                speech_end = find_first(data, pos_cursor, len(data) - 2, b'\xa4', b'\r\n')
                                 speech_bytes = data[pos_cursor:speech_end]
                                 # Remove null bytes
                                 speech_bytes = speech_bytes.replace(b'\x00', b'')
@@ -571,11 +641,9 @@ class AccentMTIParser:
                             elif func_type == 0x06:  # RANDOM-CHOICE
                                 # Extract page reference (in parentheses)
                                 ref_start = pos_cursor
-                                while ref_start < len(data) and data[ref_start] != 0x28:  # '('
-                                    ref_start += 1
+                                ref_start = find_first(data, ref_start, len(data), b'(')
                                 ref_end = ref_start + 1
-                                while ref_end < len(data) and data[ref_end] != 0x29:  # ')'
-                                    ref_end += 1
+                                ref_end = find_first(data, ref_end, len(data), b')')
                                 if ref_start < ref_end:
                                     ref_page = data[ref_start+1:ref_end].decode('ascii', errors='ignore')
                                     functions.append(f'RANDOM-CHOICE({ref_page})')
@@ -599,12 +667,10 @@ class AccentMTIParser:
                                 
                                 # Try to extract target in parentheses (if present)
                                 target_start = pos_cursor
-                                while target_start < len(data) and target_start < pos_cursor + 20 and data[target_start] != 0x28:
-                                    target_start += 1
+                                target_start = find_first(data, pos_cursor, min(len(data), pos_cursor + 20), b'(')
                                 if target_start < len(data) and data[target_start] == 0x28:
                                     target_end = target_start + 1
-                                    while target_end < len(data) and target_end < target_start + 20 and data[target_end] != 0x29:
-                                        target_end += 1
+                                    target_end = find_first(data, target_end, min(len(data), target_start + 20), b')')
                                     if target_end < len(data) and data[target_end] == 0x29:
                                         pos_cursor = target_end + 1
                                     else:
@@ -618,11 +684,9 @@ class AccentMTIParser:
                                     nav_type = 'PERMANENT' if func_type == 0x8c else 'TEMPORARY'
                                     # Extract target (in parentheses)
                                     target_start = pos_cursor
-                                    while target_start < len(data) and data[target_start] != 0x28:
-                                        target_start += 1
+                                    target_start = find_first(data, target_start, len(data), b'(')
                                     target_end = target_start + 1
-                                    while target_end < len(data) and data[target_end] != 0x29:
-                                        target_end += 1
+                                    target_end = find_first(data, target_end, len(data), b')')
                                     if target_start < target_end:
                                         navigation_target = data[target_start+1:target_end].decode('ascii', errors='ignore')
                                         navigation_type = nav_type
@@ -630,11 +694,9 @@ class AccentMTIParser:
                                 else:
                                     # Skip past the navigation marker but don't process it
                                     target_start = pos_cursor
-                                    while target_start < len(data) and data[target_start] != 0x28:
-                                        target_start += 1
+                                    target_start = find_first(data, target_start, len(data), b'(')
                                     target_end = target_start + 1
-                                    while target_end < len(data) and data[target_end] != 0x29:
-                                        target_end += 1
+                                    target_end = find_first(data, target_end, len(data), b')')
                                     pos_cursor = target_end + 1
                         
                         # If no speech was found via markers, fallback to button name
@@ -656,16 +718,14 @@ class AccentMTIParser:
                 
                 # Read full text until CRLF
                 text_start = pos_cursor
-                while pos_cursor < len(data) - 2:
-                    if data[pos_cursor:pos_cursor+2] == b'\r\n':
-                        # Check if this is a merged button (next byte is \x01, indicating another button follows)
-                        if pos_cursor + 2 < len(data) and data[pos_cursor + 2] == 0x01:
-                            # This is a merged button - keep reading past the CRLF
-                            pos_cursor += 2  # Skip the CRLF
-                        else:
-                            # Regular end of button data
-                            break
-                    pos_cursor += 1
+                text_limit = len(data) - 2
+                while True:
+                    pos_cursor = find_first(data, pos_cursor, text_limit, b'\r\n')
+                    # Regular end of button data, unless the next byte is \x01 (a merged button follows)
+                    if pos_cursor >= text_limit or data[pos_cursor + 2] != 0x01:
+                        break
+                    # This is a merged button - keep reading past the CRLF and the \x01
+                    pos_cursor += 3
                 
                 # Decode the text
                 full_text = data[text_start:pos_cursor].decode('ascii', errors='ignore')
@@ -704,12 +764,10 @@ class AccentMTIParser:
                 crlf_found_at = -1
                 marker_before_crlf = -1
                 
-                while temp_cursor < len(data) - 2:
-                    if data[temp_cursor:temp_cursor+2] == b'\r\n':
-                        crlf_found_at = temp_cursor
-                        marker_before_crlf = data[temp_cursor-1] if temp_cursor > 0 else -1
-                        break
-                    temp_cursor += 1
+                temp_cursor = find_first(data, temp_cursor, len(data) - 2, b'\r\n')
+                if temp_cursor < len(data) - 2:
+                    crlf_found_at = temp_cursor
+                    marker_before_crlf = data[temp_cursor-1] if temp_cursor > 0 else -1
                 
                 # DEBUG
                 if page_id == 1317 and "go back" in button_name:
@@ -745,12 +803,8 @@ class AccentMTIParser:
                         # Merged data ends at next CRLF or record boundary
                         if check_pos < len(data):
                             # Find the END of merged button data
-                            search_end = check_pos
-                            while search_end < len(data) - 2:
-                                # Look for the next CRLF or end pattern
-                                if data[search_end:search_end+2] == b'\r\n' or data[search_end] == 0x25:  # Page marker
-                                    break
-                                search_end += 1
+                            # Look for the next CRLF or end pattern (0x25 page marker)
+                            search_end = find_first(data, check_pos, len(data) - 2, b'\r\n', b'%')
                             
                             # Include all merged button data
                             merged_all = data[pos+10:search_end]
@@ -788,11 +842,7 @@ class AccentMTIParser:
                     
                     if func_type == 0x3a:  # Speech marker
                         # Find end of speech (next 0xA4 or 0xA0 or CRLF)
-                        speech_end = pos_cursor
-                        while speech_end < len(data) - 2:
-                            if data[speech_end] == 0xa4 or data[speech_end] == 0xa0 or data[speech_end:speech_end+2] == b'\r\n':
-                                break
-                            speech_end += 1
+                        speech_end = find_first(data, pos_cursor, len(data) - 2, b'\xa4', b'\xa0', b'\r\n')
                         speech_bytes = data[pos_cursor:speech_end]
                         # Remove null bytes
                         speech_bytes = speech_bytes.replace(b'\x00', b'')
@@ -809,11 +859,9 @@ class AccentMTIParser:
                     elif func_type == 0x06:  # RANDOM-CHOICE
                         # Extract page reference (in parentheses)
                         ref_start = pos_cursor
-                        while ref_start < len(data) and data[ref_start] != 0x28:  # '('
-                            ref_start += 1
+                        ref_start = find_first(data, ref_start, len(data), b'(')
                         ref_end = ref_start + 1
-                        while ref_end < len(data) and data[ref_end] != 0x29:  # ')'
-                            ref_end += 1
+                        ref_end = find_first(data, ref_end, len(data), b')')
                         if ref_start < ref_end:
                             ref_page = data[ref_start+1:ref_end].decode('ascii', errors='ignore')
                             functions.append(f'RANDOM-CHOICE({ref_page})')
@@ -823,11 +871,9 @@ class AccentMTIParser:
                         nav_type = 'PERMANENT' if func_type == 0x8c else 'TEMPORARY'
                         # Extract target (in parentheses)
                         target_start = pos_cursor
-                        while target_start < len(data) and data[target_start] != 0x28:
-                            target_start += 1
+                        target_start = find_first(data, target_start, len(data), b'(')
                         target_end = target_start + 1
-                        while target_end < len(data) and data[target_end] != 0x29:
-                            target_end += 1
+                        target_end = find_first(data, target_end, len(data), b')')
                         if target_start < target_end:
                             navigation_target = data[target_start+1:target_end].decode('ascii', errors='ignore')
                             navigation_type = nav_type
@@ -849,10 +895,7 @@ class AccentMTIParser:
                     # Extract speech - direct ASCII text until CRLF (0x0d 0x0a)
                     if pos_cursor < len(data):
                         speech_start = pos_cursor
-                        while pos_cursor < len(data) - 2:
-                            if data[pos_cursor:pos_cursor+2] == b'\r\n':
-                                break
-                            pos_cursor += 1
+                        pos_cursor = find_first(data, pos_cursor, len(data) - 2, b'\r\n')
                         
                         speech_bytes = data[speech_start:pos_cursor]
                         # Remove trailing control characters before CRLF
@@ -897,13 +940,7 @@ class AccentMTIParser:
                     speech_start = caret_pos + 1
                 
                 # Find end of speech (next CRLF or m-record)
-                speech_end = speech_start
-                while speech_end < len(data) - 2:
-                    if data[speech_end:speech_end+2] == b'\r\n':
-                        break
-                    if data[speech_end:speech_end+4] == b'm\x00\x04\xfd':  # Next button marker
-                        break
-                    speech_end += 1
+                speech_end = find_first(data, speech_start, len(data) - 2, b'\r\n', MTI_RECORD_MARKER)
                 
                 speech = data[speech_start:speech_end].decode('ascii', errors='ignore').strip()
                 
@@ -930,7 +967,7 @@ class AccentMTIParser:
                 
                 # Extract speech (2-byte length)
                 if pos_cursor + 2 < len(data):
-                    speech_len = struct.unpack('<H', data[pos_cursor:pos_cursor+2])[0]
+                    speech_len = _U16_LE.unpack_from(data, pos_cursor)[0]
                     pos_cursor += 2
                     if 0 < speech_len < 500:
                         speech = data[pos_cursor:pos_cursor+speech_len].decode('ascii', errors='ignore')
@@ -944,8 +981,7 @@ class AccentMTIParser:
                         pos_cursor += 1
                         # Find null terminator for target
                         target_start = pos_cursor
-                        while pos_cursor < len(data) and data[pos_cursor] != 0:
-                            pos_cursor += 1
+                        pos_cursor = find_first(data, pos_cursor, len(data), b'\x00')
                         navigation_target = data[target_start:pos_cursor].decode('ascii', errors='ignore')
                 
                 if not speech:
@@ -1032,6 +1068,7 @@ class AccentMTIParser:
         # Build page name to ID map
         page_name_to_id = {page_data['inferred_name'].lower().strip(): page_id 
                           for page_id, page_data in self.pages.items()}
+        find_page_id = page_name_finder(page_name_to_id)
         
         for page_id, page_data in self.pages.items():
             for btn in page_data['buttons']:
@@ -1076,24 +1113,6 @@ class AccentMTIParser:
                     nav_target = None
                     clean_speech = speech
                     
-                    # Helper function to find page by name (with normalization)
-                    def find_page_id(name):
-                        name_lower = name.strip().lower()
-                        # Try exact match
-                        if name_lower in page_name_to_id:
-                            return page_name_to_id[name_lower]
-                        # Try with "0 " prefix
-                        with_prefix = f"0 {name_lower}"
-                        if with_prefix in page_name_to_id:
-                            return page_name_to_id[with_prefix]
-                        # Try fuzzy match (ignore trailing spaces/punctuation)
-                        for page_name, page_id_item in page_name_to_id.items():
-                            if page_name.strip().lower() == name_lower:
-                                return page_id_item
-                            if page_name.strip().lower() == with_prefix.strip():
-                                return page_id_item
-                        return None
-                    
                     # Pattern 1a: (page_name) or (page_name at the end
                     match = re.search(r'\(([^)]+)\)\s*[A-Z+\-,;:/]*\s*$', speech)
                     if not match:
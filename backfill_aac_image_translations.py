@@ -3,7 +3,7 @@
 import argparse
 import asyncio
 from datetime import datetime, timezone
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 from google.cloud import firestore
 
@@ -18,6 +18,7 @@ from aac_image_translation_utils import (
     sanitize_translated_text,
 )
 from config import CONFIG
+from migration_runner import MigrationHandler, MigrationRunner, add_runner_arguments
 
 
 def parse_args() -> argparse.Namespace:
@@ -44,6 +45,13 @@ def parse_args() -> argparse.Namespace:
         default="es",
         help="Comma-separated locales/language codes where inflection expansion is enabled.",
     )
+    parser.add_argument(
+        "--translation-concurrency",
+        type=int,
+        default=4,
+        help="Translation requests in flight per locale while preparing a page",
+    )
+    add_runner_arguments(parser)
     return parser.parse_args()
 
 
@@ -56,43 +64,32 @@ def parse_locales(raw: str) -> List[str]:
     return locales or STANDARD_LOCALES
 
 
-def translate_for_locale(
-    translator: AacGeminiTranslator,
-    english_tags: List[str],
-    english_label: str,
-    locale: str,
-) -> Dict[str, Any]:
-    lines = [*english_tags, english_label]
-    translated_lines = translator.translate_lines(lines=lines, source_locale="en-US", target_locale=locale)
-    translated_tags = dedupe_preserve_order(translated_lines[:-1])
-    translated_label = sanitize_translated_text(translated_lines[-1]) if translated_lines else ""
-    return {
-        "tags": translated_tags,
-        "label": translated_label,
-    }
-
-
-async def run_backfill(args: argparse.Namespace) -> None:
-    firestore_db = firestore.Client(project=CONFIG["gcp_project_id"])
-    translator = AacGeminiTranslator()
-    target_locales = parse_locales(args.locales)
-    inflection_locale_bases = locale_bases_set(parse_locale_list(args.inflection_locales))
-
-    query = firestore_db.collection("aac_images")
-    if args.source:
-        query = query.where("source", "==", args.source)
-    docs = await asyncio.to_thread(query.get)
-
-    processed = 0
-    updated = 0
-    skipped = 0
-
-    for doc in docs:
-        if args.limit and processed >= args.limit:
-            break
-        processed += 1
-
-        data = doc.to_dict() or {}
+class TranslationBackfill(MigrationHandler):
+    """
+    Fills localized_tags/localized_labels. prepare_page() translates every string the
+    page needs for a locale in one memory-first, batched pass, so a page of documents
+    costs a few translation requests instead of one per document per locale.
+    """
+
+    def __init__(
+        self,
+        translator: AacGeminiTranslator,
+        target_locales: List[str],
+        overwrite: bool,
+        expand_inflections: bool,
+        inflection_locale_bases: Set[str],
+        translation_concurrency: int,
+    ):
+        self.translator = translator
+        self.target_locales = target_locales
+        self.overwrite = overwrite
+        self.expand_inflections = expand_inflections
+        self.inflection_locale_bases = inflection_locale_bases
+        self.translation_concurrency = translation_concurrency
+        self._translations: Dict[str, Dict[str, str]] = {}
+
+    @staticmethod
+    def _source_text(data: Dict[str, Any]) -> Tuple[List[str], str]:
         concept = sanitize_translated_text(data.get("concept", ""))
         subconcept = sanitize_translated_text(data.get("subconcept", ""))
         english_label = subconcept or concept
@@ -103,77 +100,116 @@ async def run_backfill(args: argparse.Namespace) -> None:
             english_tags = dedupe_preserve_order([str(tag) for tag in tags_raw])
         if not english_tags:
             english_tags = dedupe_preserve_order([concept, subconcept])
+        return english_tags, english_label
+
+    def _locales_missing(self, data: Dict[str, Any]) -> List[str]:
+        if self.overwrite:
+            return list(self.target_locales)
+        existing_lt = data.get("localized_tags") if isinstance(data.get("localized_tags"), dict) else {}
+        existing_ll = data.get("localized_labels") if isinstance(data.get("localized_labels"), dict) else {}
+        missing = []
+        for locale in self.target_locales:
+            has_tags = isinstance(existing_lt.get(locale), list) and len(existing_lt.get(locale) or []) > 0
+            has_label = isinstance(existing_ll.get(locale), str) and bool(existing_ll.get(locale).strip())
+            if not (has_tags and has_label):
+                missing.append(locale)
+        return missing
+
+    async def prepare_page(self, docs: List[Any]) -> None:
+        needed: Dict[str, Dict[str, None]] = {locale: {} for locale in self.target_locales}
+        for doc in docs:
+            data = doc.to_dict() or {}
+            english_tags, english_label = self._source_text(data)
+            for locale in self._locales_missing(data):
+                needed[locale].update(dict.fromkeys(line for line in [*english_tags, english_label] if line))
+
+        self._translations = {}
+        for locale, lines in needed.items():
+            if not lines:
+                continue
+            source_lines = list(lines)
+            translated = await self.translator.translate_many(
+                source_lines,
+                target_locale=locale,
+                source_locale="en-US",
+                max_concurrency=self.translation_concurrency,
+            )
+            self._translations[locale] = dict(zip(source_lines, translated))
 
+    def _expand(self, locale: str, tags: List[str]) -> List[str]:
+        return expand_locale_tags_with_inflections(
+            translator=self.translator,
+            locale=locale,
+            tags=tags,
+            enabled_locale_bases=self.inflection_locale_bases,
+        )
+
+    async def process(self, doc) -> Optional[Dict[str, Any]]:
+        data = doc.to_dict() or {}
+        english_tags, english_label = self._source_text(data)
         if not english_label and not english_tags:
-            skipped += 1
             print(f"SKIP {doc.id}: no source text")
-            continue
+            return None
 
         existing_lt = data.get("localized_tags") if isinstance(data.get("localized_tags"), dict) else {}
         existing_ll = data.get("localized_labels") if isinstance(data.get("localized_labels"), dict) else {}
-
         next_lt: Dict[str, List[str]] = dict(existing_lt)
         next_ll: Dict[str, str] = dict(existing_ll)
 
         changed = False
-        for locale in target_locales:
-            has_tags = isinstance(next_lt.get(locale), list) and len(next_lt.get(locale) or []) > 0
-            has_label = isinstance(next_ll.get(locale), str) and bool(next_ll.get(locale).strip())
-            if not args.overwrite and has_tags and has_label:
-                locale_tags = dedupe_preserve_order([str(tag) for tag in (next_lt.get(locale) or [])])
-                if args.expand_inflections:
-                    expanded_tags = expand_locale_tags_with_inflections(
-                        translator=translator,
-                        locale=locale,
-                        tags=locale_tags,
-                        enabled_locale_bases=inflection_locale_bases,
-                    )
+        missing = set(self._locales_missing(data))
+        for locale in self.target_locales:
+            if locale not in missing:
+                if self.expand_inflections:
+                    locale_tags = dedupe_preserve_order([str(tag) for tag in (next_lt.get(locale) or [])])
+                    expanded_tags = await asyncio.to_thread(self._expand, locale, locale_tags)
                     if expanded_tags != locale_tags:
                         next_lt[locale] = expanded_tags
                         changed = True
                 continue
 
-            translated = translate_for_locale(
-                translator=translator,
-                english_tags=english_tags,
-                english_label=english_label,
-                locale=locale,
-            )
-
-            translated_tags = translated["tags"]
-            if args.expand_inflections:
-                translated_tags = expand_locale_tags_with_inflections(
-                    translator=translator,
-                    locale=locale,
-                    tags=translated_tags,
-                    enabled_locale_bases=inflection_locale_bases,
-                )
+            translations = self._translations.get(locale, {})
+            translated_tags = dedupe_preserve_order([translations.get(tag, tag) for tag in english_tags])
+            translated_label = sanitize_translated_text(translations.get(english_label, english_label)) if english_label else ""
+            if self.expand_inflections:
+                translated_tags = await asyncio.to_thread(self._expand, locale, translated_tags)
 
             next_lt[locale] = translated_tags
-            next_ll[locale] = translated["label"]
+            next_ll[locale] = translated_label
             changed = True
 
         if not changed:
-            skipped += 1
-            continue
-
-        update_data = {
+            return None
+        return {
             "localized_tags": next_lt,
             "localized_labels": next_ll,
             "updated_at": datetime.now(timezone.utc),
         }
 
-        if args.dry_run:
-            print(f"DRY-RUN UPDATE {doc.id}: locales={target_locales}")
-        else:
-            await asyncio.to_thread(doc.reference.update, update_data)
-            print(f"UPDATED {doc.id}: locales={target_locales}")
-        updated += 1
-
-    print("\nBackfill complete")
-    print(f"Processed: {processed}")
-    print(f"Updated:   {updated}")
-    print(f"Skipped:   {skipped}")
+    def describe(self, doc, update: Dict[str, Any]) -> str:
+        return f"locales={self.target_locales}"
+
+
+async def run_backfill(args: argparse.Namespace) -> None:
+    firestore_db = firestore.Client(project=CONFIG["gcp_project_id"])
+    handler = TranslationBackfill(
+        translator=AacGeminiTranslator(memory_db=firestore_db),
+        target_locales=parse_locales(args.locales),
+        overwrite=args.overwrite,
+        expand_inflections=args.expand_inflections,
+        inflection_locale_bases=locale_bases_set(parse_locale_list(args.inflection_locales)),
+        translation_concurrency=args.translation_concurrency,
+    )
+    runner = MigrationRunner.from_args(
+        firestore_db,
+        "backfill_aac_image_translations",
+        handler,
+        args,
+        filters=[("source", "==", args.source)] if args.source else [],
+        limit=args.limit,
+        dry_run=args.dry_run,
+    )
+    await runner.run()
 
 
 def main() -> None:
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Benchmark: MTI parsing (accent_mti_parser.py and extract_mti_to_json.py) against the
+byte-by-byte scanners they replaced.
+
+Parses each fixture with the current modules and with the reference versions read
+from git (REFERENCE_REV, the last revision that scanned byte by byte), asserts the
+results are identical (json.dumps with sorted keys) and reports timings.
+
+Without .mti paths, deterministic synthetic fixtures are generated at real-file
+size: every button format (1-5, including merged buttons and function markers),
+40XX page-name records, filler between records and navigation overlays in the
+900000-1000000 metadata window.
+
+Usage:
+  python3 benchmark_mti_parser.py                            # synthetic 1.5 MB and 3 MB fixtures
+  python3 benchmark_mti_parser.py path/to/board.mti ...      # real files
+  python3 benchmark_mti_parser.py --reference-dir /tmp/old   # reference modules from a directory
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import random
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+
+import accent_mti_parser
+import extract_mti_to_json
+
+REFERENCE_REV = "6e61fb5"
+MODULE_FILES = ("accent_mti_parser.py", "extract_mti_to_json.py")
+MARKER = b"m\x00\x04\xfd"
+WORDS = [
+    "I", "want", "more", "eat", "drink", "go", "stop", "help", "play", "yes", "no", "home",
+    "school", "mom", "dad", "happy", "sad", "tired", "outside", "music", "book", "toilet",
+    "water", "juice", "snack", "friend", "teacher", "car", "bus", "park", "hello", "bye",
+]
+ICONS = ["", "HOME", "EAT", "DRINK", "PLAY", "GO", "STOP", "HELP", "BOOK"]
+PAGE_NAMES = ["FOOD", "DRINKS", "PEOPLE", "PLACES", "FEELINGS", "ACTIONS", "CORE", "MORE WORDS"]
+
+
+def _text(rng: random.Random, max_words: int = 3) -> bytes:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, max_words))).encode("ascii")
+
+
+def _header(page_id: int, sequence: int, byte_9: int, byte_13: int = 0) -> bytes:
+    return MARKER + struct.pack(">HB2xB3xB", page_id, sequence, byte_9, byte_13)
+
+
+def _functions(rng: random.Random) -> bytes:
+    out = b""
+    for _ in range(rng.randint(0, 2)):
+        kind = rng.random()
+        if kind < 0.45:
+            out += b"\xa4\x3a" + _text(rng) + rng.choice([b"", b"$", b" |", b"\x00"])
+        elif kind < 0.75:
+            out += rng.choice([b"\xa4\x8c", b"\xa4\x8d"]) + b"(" + rng.choice(PAGE_NAMES).encode() + b")"
+        elif kind < 0.85:
+            out += b"\xa4\x06(" + rng.choice(PAGE_NAMES).encode() + b")"
+        elif kind < 0.93:
+            out += b"\xa4\x8b" + rng.choice([b"", b"(HOME)"])
+        else:
+            out += b"\xa4\x85"
+    return out
+
+
+def _record(rng: random.Random, page_id: int, sequence: int) -> bytes:
+    kind = rng.random()
+    name = _text(rng)
+    icon = rng.choice(ICONS).encode()
+    if kind < 0.35:  # Format 1
+        body = name + bytes([len(icon)]) + icon + b"\x00" + _functions(rng)
+        if rng.random() < 0.2:
+            body += rng.choice([b"\xa0", b""]) + _text(rng)
+        if rng.random() < 0.08:  # merged button
+            body = name + b"\x01\r\n\x02\x03" + _text(rng) + b"%"
+        return _header(page_id, sequence, len(name)) + body + b"\r\n"
+    if kind < 0.50:  # Format 2
+        body = b"\x00" * rng.randint(0, 3) + name
+        if rng.random() < 0.15:
+            body += b"\r\n\x01" + _text(rng)
+        return _header(page_id, sequence, 0) + body + rng.choice([b"", b"$", b"\x05"]) + b"\r\n"
+    if kind < 0.60:  # Format 3
+        speech = _text(rng, 5)
+        body = name + bytes([len(icon)]) + icon + struct.pack("<H", len(speech)) + speech
+        if rng.random() < 0.5:
+            body += rng.choice([b"\x8c", b"\x8d"]) + rng.choice(PAGE_NAMES).encode() + b"\x00"
+        return _header(page_id, sequence, rng.randint(101, 134), len(name)) + body + b"\r\n"
+    if kind < 0.70:  # Format 4
+        name_len = rng.randint(50, 100)
+        body = name + b"\r\n" + rng.choice([b"", b"\x00^"]) + _text(rng, 6)
+        return _header(page_id, sequence, name_len) + body + b"\r\n"
+    # Format 5
+    body = name + b"\x00" + bytes([len(icon)]) + icon
+    extra = rng.random()
+    if extra < 0.1:
+        body += b"\xff\x81\x05\xfe"
+    elif extra < 0.2:
+        body += b"\xff\x80\x85\xfe"
+    elif extra < 0.35:
+        body += b"\xff\x80\x3a\xfe\xff\x80\x8c" + rng.choice(PAGE_NAMES).encode() + b"\xfe"
+    else:
+        body += _functions(rng)
+    return _header(page_id, sequence, rng.choice([0x87, 0xAF, 0xCC, 0xFF]), len(name)) + body + b"\r\n"
+
+
+def _overlay(rng: random.Random) -> bytes:
+    name = _text(rng)
+    target = b"0 " + rng.choice(PAGE_NAMES).encode()
+    return MARKER + b"\x25\x16" + bytes(rng.randrange(256) for _ in range(2)) + b"\x00" * 4 + b"\x01" + bytes(
+        [len(name)]) + name + b"\x00\xff\x80\x8c" + target + b"\xfe\r\n"
+
+
+def synthetic_mti(size: int, seed: int) -> bytes:
+    """Decompressed MTI payload of roughly `size` bytes."""
+    rng = random.Random(seed)
+    out = bytearray()
+    page_ids = [0x0400, 0x0500, 0x0301] + [rng.randrange(0x0100, 0x3FFF) for _ in range(max(1, size // 6000))]
+    while len(out) < size:
+        if 900_000 <= len(out) < 1_000_000 and rng.random() < 0.3:
+            out += _overlay(rng)
+        elif rng.random() < 0.03:  # page-name metadata record
+            page = rng.choice(page_ids)
+            out += _header(0x4000 | (page & 0xFF), rng.randrange(48), 0) + rng.choice(PAGE_NAMES).encode() + b"\r\n"
+        else:
+            out += _record(rng, rng.choice(page_ids), rng.randrange(96))
+        # filler between records, occasionally containing marker-like bytes
+        out += bytes(rng.randrange(256) for _ in range(rng.randint(0, 24)))
+        if rng.random() < 0.02:
+            out += b"m\x00\x04"
+    return bytes(out) + b"\x00" * 32
+
+
+def write_mti(path: str, payload: bytes) -> None:
+    with open(path, "wb") as f:
+        f.write(b"v500 1 NUVOICE\r\n\x00\x00\x00\x00\r\n")
+        f.write(zlib.compress(payload))
+
+
+def load_module(name: str, path: str):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_reference(reference_dir: str, rev: str):
+    if reference_dir is None:
+        reference_dir = tempfile.mkdtemp(prefix="mti_reference_")
+        repo = os.path.dirname(os.path.abspath(__file__))
+        for filename in MODULE_FILES:
+            source = subprocess.run(
+                ["git", "-C", repo, "show", f"{rev}:{filename}"], check=True, capture_output=True
+            ).stdout
+            with open(os.path.join(reference_dir, filename), "wb") as f:
+                f.write(source)
+    return (
+        load_module("reference_accent_mti_parser", os.path.join(reference_dir, MODULE_FILES[0])),
+        load_module("reference_extract_mti_to_json", os.path.join(reference_dir, MODULE_FILES[1])),
+    )
+
+
+def timed(fn, path: str, repeat: int):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            result = fn(path)
+            best = min(best, time.perf_counter() - started)
+    return best, json.dumps(result, sort_keys=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MTI parsing against the byte-by-byte reference")
+    parser.add_argument("files", nargs="*", help=".mti files (default: synthetic fixtures)")
+    parser.add_argument("--sizes", default="1500000,3000000", help="Synthetic decompressed sizes in bytes")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--reference-rev", default=REFERENCE_REV)
+    parser.add_argument("--reference-dir", default=None, help="Directory holding the reference module files")
+    args = parser.parse_args()
+
+    reference_parser, reference_extractor = load_reference(args.reference_dir, args.reference_rev)
+    files = list(args.files)
+    tmp_dir = tempfile.mkdtemp(prefix="mti_fixtures_")
+    for i, size in enumerate(int(s) for s in args.sizes.split(",") if not args.files):
+        path = os.path.join(tmp_dir, f"synthetic_{size}.mti")
+        write_mti(path, synthetic_mti(size, args.seed + i))
+        files.append(path)
+
+    implementations = [
+        ("AccentMTIParser", lambda path: reference_parser.AccentMTIParser().parse_file(path),
+         lambda path: accent_mti_parser.AccentMTIParser().parse_file(path)),
+        ("extract_mti_file", reference_extractor.extract_mti_file, extract_mti_to_json.extract_mti_file),
+    ]
+    failures = 0
+    for path in files:
+        print(f"{os.path.basename(path)} ({os.path.getsize(path)} bytes compressed)")
+        for label, reference, current in implementations:
+            ref_seconds, ref_json = timed(reference, path, args.repeat)
+            cur_seconds, cur_json = timed(current, path, args.repeat)
+            identical = ref_json == cur_json
+            failures += not identical
+            buttons = sum(len(page.get("buttons", [])) for page in (json.loads(cur_json) or {}).get("pages", {}).values())
+            print(
+                f"  {label:<17} {buttons:>6} buttons | reference {ref_seconds * 1000:8.1f} ms"
+                f" | current {cur_seconds * 1000:8.1f} ms | {ref_seconds / cur_seconds:5.1f}x"
+                f" | {'identical' if identical else 'DIFFERENT OUTPUT'}"
+            )
+    if failures:
+        sys.exit(f"{failures} result(s) differ from the reference")
+
+
+if __name__ == "__main__":
+    main()
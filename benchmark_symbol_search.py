@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /api/symbols/search engine (aac_symbol_search.py) on a synthetic library.
+
+Builds a synthetic aac_images library (no Firestore needed; the 70-word vocabulary is
+deliberately dense, so every term matches a large share of the library), then replays a mix of
+exact, prefix, multi-word and filtered queries and reports p50/p99 latency.
+
+Usage:
+  python3 benchmark_symbol_search.py                         # 100k symbols, 2000 queries
+  python3 benchmark_symbol_search.py --symbols 20000 --queries 500
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from aac_symbol_search import SymbolSearchEngine
+
+WORDS = [
+    "apple", "banana", "bread", "ball", "bath", "bed", "bike", "book", "bus", "cake",
+    "car", "cat", "chair", "cheese", "chocolate", "cookie", "cup", "dog", "door", "drink",
+    "eat", "egg", "fish", "friend", "game", "go", "happy", "hat", "help", "home",
+    "hot", "hungry", "juice", "jump", "kitchen", "milk", "more", "music", "outside", "park",
+    "pizza", "play", "rain", "read", "run", "sad", "school", "shoe", "sleep", "snack",
+    "sock", "stop", "sun", "swim", "table", "teacher", "thirsty", "toilet", "toy", "train",
+    "tree", "tired", "walk", "want", "wash", "water", "window", "yes", "no", "zoo",
+]
+CATEGORIES = ["food", "animals", "actions", "feelings", "places", "people", "things", "school", "home", "outside"]
+DIFFICULTIES = ["beginner", "intermediate", "advanced"]
+AGE_GROUPS = ["toddler", "child", "teen", "adult"]
+
+
+def synthetic_symbol(rng: random.Random, i: int) -> dict:
+    base = rng.choice(WORDS)
+    sub = f"{base} {rng.choice(WORDS)}" if rng.random() < 0.3 else base
+    return {
+        "subconcept": sub,
+        "concept": rng.choice(WORDS),
+        "name": sub,
+        "description": " ".join(rng.choices(WORDS, k=8)),
+        "tags": rng.sample(WORDS, 4) + [f"{base}{i % 97}"],
+        "categories": rng.sample(CATEGORIES, 2),
+        "difficulty_level": rng.choice(DIFFICULTIES),
+        "age_groups": rng.sample(AGE_GROUPS, 2),
+        "source": "bravo_images",
+        "image_url": f"https://example.invalid/{i}.png",
+    }
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the symbol search engine")
+    parser.add_argument("--symbols", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    engine = SymbolSearchEngine()
+    t0 = time.perf_counter()
+    engine.rebuild((f"img{i}", synthetic_symbol(rng, i)) for i in range(args.symbols))
+    build_s = time.perf_counter() - t0
+    print(f"Indexed {args.symbols} symbols in {build_s:.2f}s ({engine.get_stats()['vocabulary']} terms)")
+
+    query_kinds = {
+        "exact": lambda: {"query": rng.choice(WORDS)},
+        "prefix": lambda: {"query": rng.choice(WORDS)[:3]},
+        "multi": lambda: {"query": f"{rng.choice(WORDS)} {rng.choice(WORDS)}"},
+        "filtered": lambda: {"query": rng.choice(WORDS), "category": rng.choice(CATEGORIES),
+                             "difficulty": rng.choice(DIFFICULTIES)},
+        "browse": lambda: {"category": rng.choice(CATEGORIES), "age_group": rng.choice(AGE_GROUPS)},
+    }
+    all_samples = []
+    for kind, make in query_kinds.items():
+        samples = []
+        for _ in range(max(1, args.queries // len(query_kinds))):
+            kwargs = make()
+            start = time.perf_counter()
+            page = engine.search(limit=20, **kwargs)
+            if page["next_cursor"]:
+                engine.search(limit=20, cursor=page["next_cursor"], **kwargs)
+            samples.append((time.perf_counter() - start) * 1000)
+        all_samples.extend(samples)
+        print(f"  {kind:<9} p50={percentile(samples, 50):7.2f}ms  p99={percentile(samples, 99):7.2f}ms  "
+              f"mean={statistics.mean(samples):7.2f}ms")
+    print(f"Overall (first page + next page): p50={percentile(all_samples, 50):.2f}ms  "
+          f"p99={percentile(all_samples, 99):.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Benchmark: freestyle word prediction (word_predictor.py) replayed keystroke by keystroke.
+
+The corpus is split in two. The first part trains the per-user model, as chat history
+and button presses would. The rest is "typed": for every word, letters are entered one
+at a time, and as soon as the word shows up in the visible predictions it is selected
+(one keystroke). Reports keystroke savings and per-keystroke latency.
+
+With --llm-samples N (needs GOOGLE_API_KEY and google-generativeai), N of those
+keystrokes are also sent through the previous LLM-only prompt. Its latency and hit
+rate are printed next to the local predictor's results on the same keystrokes.
+
+Usage:
+  python3 benchmark_word_prediction.py                          # synthetic corpus from CATEGORY_STATIC_POOLS
+  python3 benchmark_word_prediction.py --corpus my_utterances.txt --visible 6
+  GOOGLE_API_KEY=... python3 benchmark_word_prediction.py --llm-samples 30 --llm-model gemini-2.5-flash
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+from scratch_pools import CATEGORY_STATIC_POOLS, WORD_VARIANTS
+from word_predictor import WordPredictor, tokenize
+
+USER_KEY = ("benchmark", "user")
+
+TEMPLATES = [
+    "I want {a}", "I need {a} please", "can I have {a}", "I like {a} and {b}", "where is {a}",
+    "I feel {a}", "let's go to {a}", "my {a} is {b}", "I don't want {a}", "thank you for {a}",
+]
+
+
+def synthetic_corpus(rng: random.Random, size: int) -> list:
+    vocab = sorted({p for pool in CATEGORY_STATIC_POOLS.values() for p in pool if isinstance(p, str) and p.strip()})
+    return [rng.choice(TEMPLATES).format(a=rng.choice(vocab), b=rng.choice(vocab)) for _ in range(size)]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def legacy_prompt(context_text: str, partial_word: str, max_predictions: int) -> str:
+    # Same wording as the pre-local endpoint (without the user narrative).
+    if context_text:
+        return (f"Given the user context: '' and the existing text: '{context_text}', provide up to {max_predictions} complete words "
+                f"that start with '{partial_word}'. If '{partial_word}' is already a complete, common word that an AAC user might intend "
+                f"to say, include that exact word as the first line. Then include other longer completions that start with '{partial_word}'. "
+                f"Return only the words, one per line.")
+    return (f"Given the user context: '', provide up to {max_predictions} complete words that start with '{partial_word}'. "
+            f"If '{partial_word}' is already a complete, common word that an AAC user might intend to say, include that exact word as the "
+            f"first line. Then include other longer completions that start with '{partial_word}'. Return only the words, one per line.")
+
+
+def replay(predictor: WordPredictor, utterances: list, visible: int):
+    letters = keystrokes = 0
+    latencies_ms = []
+    keystroke_log = []  # (context, partial, target, local_hit)
+    for utterance in utterances:
+        words = tokenize(utterance)
+        for index, word in enumerate(words):
+            context = " ".join(words[:index])
+            target = word.lower()
+            letters += len(word)
+            used = len(word)
+            for typed in range(1, len(word) + 1):
+                partial = word[:typed]
+                start = time.perf_counter()
+                predictions = predictor.predict(partial, context, user_key=USER_KEY, limit=visible)
+                latencies_ms.append((time.perf_counter() - start) * 1000)
+                hit = target in (p.lower() for p in predictions)
+                keystroke_log.append((context, partial, target, hit))
+                if hit:
+                    used = typed + 1  # letters typed plus selecting the prediction
+                    break
+            keystrokes += min(used, len(word))
+        predictor.observe(USER_KEY, utterance)
+    return letters, keystrokes, latencies_ms, keystroke_log
+
+
+def run_llm_samples(samples: list, model_name: str, visible: int):
+    import google.generativeai as genai
+
+    genai.configure(api_key=os.environ["GOOGLE_API_KEY"])
+    model = genai.GenerativeModel(model_name)
+    latencies_ms, hits = [], 0
+    for context, partial, target, _ in samples:
+        start = time.perf_counter()
+        try:
+            text = model.generate_content(legacy_prompt(context, partial, visible)).text or ""
+        except Exception as e:
+            print(f"  LLM call failed: {e}")
+            continue
+        latencies_ms.append((time.perf_counter() - start) * 1000)
+        words = [line.strip().lower() for line in text.split("\n") if line.strip()][:visible]
+        hits += target in words
+    return latencies_ms, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay benchmark for local word prediction")
+    parser.add_argument("--corpus", help="text file, one utterance per line (default: synthetic)")
+    parser.add_argument("--utterances", type=int, default=3000, help="synthetic corpus size")
+    parser.add_argument("--train-fraction", type=float, default=0.7)
+    parser.add_argument("--visible", type=int, default=8, help="predictions shown to the user")
+    parser.add_argument("--llm-samples", type=int, default=0)
+    parser.add_argument("--llm-model", default=os.environ.get("GEMINI_PRIMARY_MODEL") or "gemini-2.5-flash")
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    if args.corpus:
+        with open(args.corpus, encoding="utf-8") as f:
+            utterances = [line.strip() for line in f if line.strip()]
+    else:
+        utterances = synthetic_corpus(rng, args.utterances)
+    split = int(len(utterances) * args.train_fraction)
+    train, test = utterances[:split], utterances[split:]
+
+    predictor = WordPredictor()
+    start = time.perf_counter()
+    predictor.load_lexicon(CATEGORY_STATIC_POOLS, WORD_VARIANTS)
+    print(f"Lexicon: {predictor.get_stats()['lexicon_words']} words in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    async def loader():
+        return train, args.visible
+
+    async def build():
+        await predictor.ensure_user_model(USER_KEY, loader)
+
+    asyncio.run(build())
+    print(f"User model trained on {len(train)} utterances; replaying {len(test)}")
+
+    letters, keystrokes, latencies_ms, keystroke_log = replay(predictor, test, args.visible)
+    saved = letters - keystrokes
+    print(f"Keystrokes: {keystrokes} for {letters} letters -> {saved} saved ({100 * saved / max(1, letters):.1f}%)")
+    print(f"Local latency over {len(latencies_ms)} keystrokes: p50={percentile(latencies_ms, 50):.3f}ms "
+          f"p99={percentile(latencies_ms, 99):.3f}ms mean={statistics.mean(latencies_ms):.3f}ms")
+
+    if args.llm_samples:
+        if not os.environ.get("GOOGLE_API_KEY"):
+            print("Skipping LLM comparison: GOOGLE_API_KEY is not set")
+            return
+        samples = rng.sample(keystroke_log, min(args.llm_samples, len(keystroke_log)))
+        llm_latencies, llm_hits = run_llm_samples(samples, args.llm_model, args.visible)
+        local_hits = sum(1 for *_, hit in samples if hit)
+        if llm_latencies:
+            print(f"LLM path ({args.llm_model}) on {len(samples)} keystrokes: p50={percentile(llm_latencies, 50):.0f}ms "
+                  f"p99={percentile(llm_latencies, 99):.0f}ms, target in top {args.visible}: {llm_hits}/{len(samples)}")
+        print(f"Local on the same keystrokes: target in top {args.visible}: {local_hits}/{len(samples)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Load test: request throughput of the multi-worker mode (gunicorn.conf.py) by worker count.
+
+For every worker count the server is started with
+`python -m gunicorn -c gunicorn.conf.py server:app` and WEB_CONCURRENCY=N, left to
+pass its readiness check, then driven by a fixed number of concurrent keep-alive
+clients for a fixed time. Reports requests/s, latency percentiles, errors and the
+speed-up over the first worker count. /health only measures framework overhead;
+point --path at a CPU-heavy endpoint (with --header for its auth) to see what the
+extra workers buy for real requests.
+
+--state instead measures the shared state backend itself: N processes doing a
+get/set mix against one SQLite file (or Redis, with REDIS_HOST set), the traffic the
+workers add on top of their requests.
+
+Usage:
+  python3 benchmark_workers.py                                   # 1, 2 and 4 workers, GET /health
+  python3 benchmark_workers.py --workers 1,2,4,8 --concurrency 128 --duration 30
+  python3 benchmark_workers.py --path /api/some/endpoint --header "Authorization: Bearer ..."
+  python3 benchmark_workers.py --url http://localhost:8080       # an already running server
+  python3 benchmark_workers.py --state --workers 1,2,4           # state backend only
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+
+import aiohttp
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def wait_ready(base_url: str, path: str, timeout: float, process=None) -> None:
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            if process is not None and process.poll() is not None:
+                raise RuntimeError(f"server exited with code {process.returncode} before becoming ready")
+            try:
+                async with session.get(base_url + path, timeout=aiohttp.ClientTimeout(total=5)) as response:
+                    if response.status < 500:
+                        return
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                pass
+            await asyncio.sleep(0.5)
+    raise RuntimeError(f"server not ready after {timeout:.0f}s")
+
+
+async def run_load(base_url: str, args) -> dict:
+    headers = dict(h.split(":", 1) for h in args.header)
+    headers = {k.strip(): v.strip() for k, v in headers.items()}
+    latencies, errors = [], 0
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(connector=connector, headers=headers) as session:
+        async def client(index: int, stop_at: float, record: bool) -> None:
+            nonlocal errors
+            i = index
+            while time.monotonic() < stop_at:
+                path = args.path[i % len(args.path)]
+                i += 1
+                started = time.perf_counter()
+                try:
+                    async with session.request(args.method, base_url + path, data=args.body) as response:
+                        await response.read()
+                        ok = response.status < 400
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    ok = False
+                if record:
+                    if ok:
+                        latencies.append(time.perf_counter() - started)
+                    else:
+                        errors += 1
+
+        if args.warmup:
+            stop_at = time.monotonic() + args.warmup
+            await asyncio.gather(*(client(i, stop_at, False) for i in range(args.concurrency)))
+        started = time.monotonic()
+        await asyncio.gather(*(client(i, started + args.duration, True) for i in range(args.concurrency)))
+        elapsed = time.monotonic() - started
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": percentile(latencies, 0.50) * 1000,
+        "p95": percentile(latencies, 0.95) * 1000,
+        "p99": percentile(latencies, 0.99) * 1000,
+        "errors": errors,
+    }
+
+
+def start_server(workers: int, args) -> subprocess.Popen:
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), PORT=str(args.port))
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", os.path.join(REPO_DIR, "gunicorn.conf.py"), args.app],
+        cwd=REPO_DIR, env=env, stdout=subprocess.DEVNULL, stderr=None if args.server_logs else subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    if process.poll() is None:
+        os.killpg(process.pid, signal.SIGTERM)
+        try:
+            process.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.wait()
+
+
+async def benchmark_http(args) -> list:
+    results = []
+    if args.url:
+        await wait_ready(args.url, args.ready_path, args.ready_timeout)
+        return [("server", await run_load(args.url, args))]
+    base_url = f"http://127.0.0.1:{args.port}"
+    for workers in args.workers:
+        process = start_server(workers, args)
+        try:
+            await wait_ready(base_url, args.ready_path, args.ready_timeout, process)
+            results.append((workers, await run_load(base_url, args)))
+        finally:
+            stop_server(process)
+    return results
+
+
+def _state_worker(kind: str, path: str, ops: int, value_size: int, results) -> None:
+    os.environ["STATE_SQLITE_PATH"] = path
+    import state_backend
+
+    async def main():
+        backend = state_backend.create_state_backend(kind)
+        value = {"payload": "x" * value_size, "timestamp": time.time()}
+        keys = [uuid.uuid4().hex for _ in range(64)]
+        latencies = []
+        started_at = time.monotonic()
+        for i in range(ops):
+            started = time.perf_counter()
+            key = keys[i % len(keys)]
+            if i % 4 == 0:
+                await backend.set("benchmark", key, value, ttl=60)
+            else:
+                await backend.get("benchmark", key)
+            latencies.append(time.perf_counter() - started)
+        elapsed = time.monotonic() - started_at
+        await backend.close()
+        return latencies, elapsed
+
+    results.put(asyncio.run(main()))
+
+
+def benchmark_state(args) -> list:
+    kind = "redis" if os.getenv("REDIS_HOST") else "sqlite"
+    path = os.path.join(REPO_DIR, f".benchmark_state_{os.getpid()}.sqlite3")
+    context = multiprocessing.get_context("spawn")
+    results = []
+    try:
+        for workers in args.workers:
+            queue = context.Queue()
+            processes = [
+                context.Process(target=_state_worker, args=(kind, path, args.state_ops, args.value_size, queue))
+                for _ in range(workers)
+            ]
+            for process in processes:
+                process.start()
+            # Time spent in the operations themselves, not in process start-up
+            runs = [queue.get() for _ in processes]
+            for process in processes:
+                process.join()
+            latencies = [latency for run_latencies, _ in runs for latency in run_latencies]
+            elapsed = max(run_elapsed for _, run_elapsed in runs)
+            results.append((workers, {
+                "rps": len(latencies) / elapsed,
+                "p50": statistics.median(latencies) * 1000,
+                "p95": percentile(latencies, 0.95) * 1000,
+                "p99": percentile(latencies, 0.99) * 1000,
+                "errors": 0,
+            }))
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    print(f"state backend: {kind}, {args.state_ops} ops per process (25% set, {args.value_size}-byte values)")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput by server worker count")
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts")
+    parser.add_argument("--app", default="server:app")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--url", default=None, help="Benchmark an already running server instead")
+    parser.add_argument("--path", action="append", default=None, help="Request path (repeat to rotate paths)")
+    parser.add_argument("--method", default="GET")
+    parser.add_argument("--body", default=None)
+    parser.add_argument("--header", action="append", default=[], help='"Name: value" (repeatable)')
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--ready-path", default="/health")
+    parser.add_argument("--ready-timeout", type=float, default=180.0)
+    parser.add_argument("--server-logs", action="store_true", help="Show gunicorn/server stderr")
+    parser.add_argument("--state", action="store_true", help="Benchmark the shared state backend only")
+    parser.add_argument("--state-ops", type=int, default=20000)
+    parser.add_argument("--value-size", type=int, default=2048)
+    args = parser.parse_args()
+    args.workers = [int(w) for w in args.workers.split(",")]
+    args.path = args.path or ["/health"]
+
+    if args.state:
+        results = benchmark_state(args)
+    else:
+        results = asyncio.run(benchmark_http(args))
+        print(f"{args.method} {', '.join(args.path)} | concurrency {args.concurrency} | {args.duration:.0f}s per run")
+
+    baseline = results[0][1]["rps"] if results else 0
+    unit = "ops/s" if args.state else "req/s"
+    print(f"{'workers':>8} {unit:>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'speed-up':>9}")
+    for workers, r in results:
+        speedup = r["rps"] / baseline if baseline else 0
+        print(f"{workers!s:>8} {r['rps']:>10.1f} {r['p50']:>8.2f} {r['p95']:>8.2f} {r['p99']:>8.2f} {r['errors']:>7} {speedup:>8.2f}x")
+    print(f"({os.cpu_count()} CPUs on this machine)")
+
+
+if __name__ == "__main__":
+    main()
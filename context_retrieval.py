@@ -0,0 +1,337 @@
+"""
+Relevance-bounded retrieval over a user's diary entries and chat turns for the
+LLM DELTA context.
+
+Each user gets two in-memory BM25 indexes (diary, chat). They are built on first
+use from Firestore and kept current on this instance's own writes
+(save_diary_entries, append_chat_history_entry). Anything written by another
+instance shows up within RELOAD_TTL_SECONDS, when the user's data is reloaded.
+Reloads only re-tokenize documents whose text changed.
+
+select_within_budget() picks the items worth sending: a few "pinned" items
+(most recent/soonest) always make it, the rest by BM25 score for the request,
+until a character budget is used up. Output keeps the caller's original order.
+"""
+
+import asyncio
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_MAX_USERS = 512
+RELOAD_TTL_SECONDS = float(os.getenv("CONTEXT_RETRIEVAL_RELOAD_SECONDS", "300"))
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from had has have he her his i if in into is it its me my of on or our "
+    "she so that the their them then there they this to was we were what when where which who will with you your".split()
+)
+
+# Size of the last DELTA context built in this request's context, for the /llm timing logs:
+# {"chars": <sent>, "unfiltered_chars": <with every diary/chat candidate rendered>}
+delta_context_report: ContextVar[Optional[Dict[str, int]]] = ContextVar("delta_context_report", default=None)
+
+UserKey = Tuple[str, str]
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in _TOKEN_RE.findall((text or "").lower()):
+        if len(token) < 2 or token in _STOPWORDS:
+            continue
+        # Light plural folding so "dogs" matches "dog"; good enough for short AAC text.
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    """Incrementally updatable BM25 over short documents keyed by id."""
+
+    def __init__(self):
+        self._docs: Dict[str, Tuple[str, Counter, int]] = {}  # id -> (text, term counts, length)
+        self._postings: Dict[str, Dict[str, int]] = {}  # term -> {id: count}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._docs
+
+    def upsert(self, doc_id: str, text: str) -> bool:
+        """Index (or re-index) a document. Returns False if its text is unchanged."""
+        existing = self._docs.get(doc_id)
+        if existing is not None:
+            if existing[0] == text:
+                return False
+            self.remove(doc_id)
+        counts = Counter(tokenize(text))
+        length = sum(counts.values())
+        self._docs[doc_id] = (text, counts, length)
+        self._total_length += length
+        for term, count in counts.items():
+            self._postings.setdefault(term, {})[doc_id] = count
+        return True
+
+    def remove(self, doc_id: str) -> None:
+        existing = self._docs.pop(doc_id, None)
+        if existing is None:
+            return
+        _, counts, length = existing
+        self._total_length -= length
+        for term in counts:
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self._postings[term]
+
+    def retain(self, doc_ids: Iterable[str]) -> int:
+        keep = set(doc_ids)
+        gone = [doc_id for doc_id in self._docs if doc_id not in keep]
+        for doc_id in gone:
+            self.remove(doc_id)
+        return len(gone)
+
+    def scores(self, query: str) -> Dict[str, float]:
+        terms = set(tokenize(query))
+        if not terms or not self._docs:
+            return {}
+        n_docs = len(self._docs)
+        avg_length = self._total_length / n_docs or 1.0
+        scores: Dict[str, float] = {}
+        for term in terms:
+            posting = self._postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc_id, count in posting.items():
+                length = self._docs[doc_id][2]
+                norm = count * (BM25_K1 + 1) / (count + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length))
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * norm
+        return scores
+
+
+def diary_text(entry: Dict[str, Any]) -> str:
+    return str(entry.get("entry") or "")
+
+
+def chat_text(message: Dict[str, Any]) -> str:
+    return f"{message.get('question') or ''} {message.get('response') or ''}"
+
+
+class _UserContext:
+    __slots__ = ("diary", "chat", "diary_index", "chat_index", "diary_loaded_at", "chat_loaded_at", "chat_since")
+
+    def __init__(self):
+        self.diary: List[Dict[str, Any]] = []
+        self.chat: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.diary_index = BM25Index()
+        self.chat_index = BM25Index()
+        self.diary_loaded_at: Optional[float] = None
+        self.chat_loaded_at: Optional[float] = None
+        self.chat_since = ""
+
+
+class ContextRetriever:
+    def __init__(self, max_users: int = DEFAULT_MAX_USERS, reload_ttl_seconds: float = RELOAD_TTL_SECONDS):
+        self.max_users = max_users
+        self.reload_ttl_seconds = reload_ttl_seconds
+        self._users: "OrderedDict[UserKey, _UserContext]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[Tuple[UserKey, str], asyncio.Future] = {}
+        self.counters: Dict[str, int] = {
+            "diary_loads": 0,
+            "chat_loads": 0,
+            "served_from_memory": 0,
+            "documents_indexed": 0,
+        }
+
+    def _user(self, user_key: UserKey) -> _UserContext:
+        with self._lock:
+            entry = self._users.get(user_key)
+            if entry is None:
+                entry = self._users[user_key] = _UserContext()
+                while len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+            else:
+                self._users.move_to_end(user_key)
+            return entry
+
+    def _fresh(self, loaded_at: Optional[float]) -> bool:
+        return loaded_at is not None and (time.monotonic() - loaded_at) < self.reload_ttl_seconds
+
+    async def _coalesced(self, key: Tuple[UserKey, str], load: Callable[[], Awaitable[Any]]) -> Any:
+        existing = self._inflight.get(key)
+        if existing is not None:
+            return await asyncio.shield(existing)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await load()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    # --- diary ---------------------------------------------------------
+
+    async def get_diary(self, user_key: UserKey, loader: Callable[[], Awaitable[List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+        """The user's diary entries, from memory when this instance's copy is recent enough."""
+        entry = self._user(user_key)
+        if self._fresh(entry.diary_loaded_at):
+            self.counters["served_from_memory"] += 1
+            return entry.diary
+
+        async def load():
+            entries = await loader()
+            self.counters["diary_loads"] += 1
+            self.sync_diary(user_key, entries)
+            return entries
+
+        return await self._coalesced((user_key, "diary"), load)
+
+    def sync_diary(self, user_key: UserKey, entries: List[Dict[str, Any]]) -> None:
+        """Replace the cached diary with `entries`; only changed entries are re-indexed."""
+        entry = self._user(user_key)
+        valid = [e for e in entries or [] if isinstance(e, dict) and e.get("id")]
+        for item in valid:
+            self.counters["documents_indexed"] += entry.diary_index.upsert(str(item["id"]), diary_text(item))
+        entry.diary_index.retain(str(item["id"]) for item in valid)
+        entry.diary = valid
+        entry.diary_loaded_at = time.monotonic()
+
+    def rank_diary(self, user_key: UserKey, query: str) -> Dict[str, float]:
+        return self._user(user_key).diary_index.scores(query)
+
+    # --- chat ----------------------------------------------------------
+
+    async def get_recent_chat(
+        self, user_key: UserKey, since_iso: str, loader: Callable[[], Awaitable[List[Dict[str, Any]]]]
+    ) -> List[Dict[str, Any]]:
+        """Chat messages with timestamp >= since_iso, oldest first. `loader` must cover that window."""
+        entry = self._user(user_key)
+        if not (self._fresh(entry.chat_loaded_at) and entry.chat_since <= since_iso):
+
+            async def load():
+                messages = await loader()
+                self.counters["chat_loads"] += 1
+                self.sync_chat(user_key, messages, since_iso)
+                return messages
+
+            await self._coalesced((user_key, "chat"), load)
+        else:
+            self.counters["served_from_memory"] += 1
+        return [m for m in entry.chat.values() if str(m.get("timestamp") or "") >= since_iso]
+
+    def sync_chat(self, user_key: UserKey, messages: List[Dict[str, Any]], since_iso: str) -> None:
+        entry = self._user(user_key)
+        fresh: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        for message in messages or []:
+            if isinstance(message, dict) and message.get("id"):
+                fresh[str(message["id"])] = message
+                self.counters["documents_indexed"] += entry.chat_index.upsert(str(message["id"]), chat_text(message))
+        entry.chat_index.retain(fresh.keys())
+        entry.chat = fresh
+        entry.chat_since = since_iso
+        entry.chat_loaded_at = time.monotonic()
+
+    def add_chat(self, user_key: UserKey, message: Dict[str, Any], max_entries: int) -> None:
+        """Record a message this instance just stored. No-op until the user's chat is loaded."""
+        with self._lock:
+            entry = self._users.get(user_key)
+        if entry is None or entry.chat_loaded_at is None or not message.get("id"):
+            return
+        message_id = str(message["id"])
+        entry.chat[message_id] = message
+        self.counters["documents_indexed"] += entry.chat_index.upsert(message_id, chat_text(message))
+        while len(entry.chat) > max_entries:
+            old_id, _ = entry.chat.popitem(last=False)
+            entry.chat_index.remove(old_id)
+
+    def rank_chat(self, user_key: UserKey, query: str) -> Dict[str, float]:
+        return self._user(user_key).chat_index.scores(query)
+
+    def invalidate(self, user_key: UserKey) -> None:
+        with self._lock:
+            self._users.pop(user_key, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            users = list(self._users.values())
+        return {
+            "cached_users": len(users),
+            "diary_documents": sum(len(u.diary_index) for u in users),
+            "chat_documents": sum(len(u.chat_index) for u in users),
+            **self.counters,
+        }
+
+
+def select_within_budget(
+    items: Sequence[Dict[str, Any]],
+    render: Callable[[Dict[str, Any]], str],
+    scores: Dict[str, float],
+    budget_chars: int,
+    pinned: int = 0,
+) -> List[str]:
+    """
+    Rendered lines for the items to send, in the original order of `items`. The
+    first `pinned` items go first, then the rest by score (ties keep original
+    order, so unmatched items fill remaining space by recency). Items that would
+    overflow budget_chars are skipped.
+    """
+    order = list(range(len(items)))
+    rest = sorted(order[pinned:], key=lambda i: -scores.get(str(items[i].get("id")), 0.0))
+    chosen: Dict[int, str] = {}
+    used = 0
+    for i in order[:pinned] + rest:
+        if budget_chars - used < 64:
+            break
+        line = render(items[i])
+        if used + len(line) + 1 > budget_chars:
+            continue
+        chosen[i] = line
+        used += len(line) + 1
+    return [chosen[i] for i in sorted(chosen)]
+
+
+def rendered_chars(items: Iterable[Dict[str, Any]], render: Callable[[Dict[str, Any]], str]) -> int:
+    """Characters the items would take as rendered lines, i.e. with no selection."""
+    return sum(len(render(item)) + 1 for item in items)
+
+
+def _clip(text: Any, limit: int) -> str:
+    text = " ".join(str(text or "").split())
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+def render_diary_line(entry: Dict[str, Any]) -> str:
+    return f"- {entry.get('date', '')}: {_clip(entry.get('entry'), 400)}"
+
+
+def render_chat_line(message: Dict[str, Any]) -> str:
+    timestamp = str(message.get("timestamp") or "")[:16].replace("T", " ")
+    parts = [f"- {timestamp}"]
+    if message.get("question"):
+        parts.append(f"Q: {_clip(message.get('question'), 160)}")
+    if message.get("response"):
+        parts.append(f"A: {_clip(message.get('response'), 240)}")
+    return " | ".join(parts)
+
+
+# Global singleton instance
+context_retriever = ContextRetriever()
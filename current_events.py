@@ -0,0 +1,431 @@
+"""
+Shared ingestion for current-events / favorite-topic sources.
+
+/get-current-events used to scrape every configured source on every request (a new
+ClientSession per source, BeautifulSoup on the event loop, no conditional requests)
+and then made one LLM call per article. Here:
+
+- one pooled aiohttp session serves all fetches. Each host gets a small concurrency
+  limit and a minimum spacing between requests, so many users on the same site
+  don't hammer it;
+- each source (URL + selectors) is cached across users. A source fetched within
+  SOURCE_TTL is served from memory. After that it is revalidated with
+  If-None-Match / If-Modified-Since; a 304 or an identical body reuses the parsed
+  articles;
+- HTML is parsed in a small process pool (process_pools), off the event loop;
+- sources requested recently are refreshed by a background loop, so requests
+  usually find them warm. New headlines from those refreshes are summarized ahead
+  of time for the topics that asked for them;
+- summarize() turns headlines into {"option", "summary"} pairs. Pairs are cached
+  per (topic, article URL), and every headline without a cached pair goes to the
+  model in a single batched call. Concurrent requests for the same headline wait
+  for the call already in flight.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import urljoin, urlsplit
+
+import aiohttp
+from bs4 import BeautifulSoup
+
+from process_pools import run_in_process
+
+SOURCE_TTL_SECONDS = int(os.getenv("CURRENT_EVENTS_SOURCE_TTL_SECONDS", "600"))
+SUMMARY_TTL_SECONDS = int(os.getenv("CURRENT_EVENTS_SUMMARY_TTL_SECONDS", "21600"))
+REFRESH_INTERVAL_SECONDS = int(os.getenv("CURRENT_EVENTS_REFRESH_INTERVAL_SECONDS", "300"))
+ACTIVE_WINDOW_SECONDS = 60 * 60
+HOST_MIN_INTERVAL_SECONDS = int(os.getenv("CURRENT_EVENTS_HOST_MIN_INTERVAL_MS", "1000")) / 1000
+HOST_CONCURRENCY = 2
+PARSE_WORKERS = int(os.getenv("CURRENT_EVENTS_PARSE_WORKERS", "2"))
+PREFETCH_SUMMARIES = int(os.getenv("CURRENT_EVENTS_PREFETCH_SUMMARIES", "10"))
+MAX_SOURCES = 500
+MAX_SUMMARIES = 5000
+FETCH_TIMEOUT_SECONDS = 15
+USER_AGENT = "Mozilla/5.0 (compatible; BravoAAC/1.0; +current-events)"
+
+SourceKey = Tuple[str, str, str, str, str]
+SummaryKey = Tuple[str, str]
+GenerateFn = Callable[[str], Awaitable[str]]
+
+BATCH_PROMPT_TEMPLATE = """
+Below are {count} {event_type} story titles with their URLs, numbered.
+
+{stories}
+
+For EACH story, based *only* on its Title and URL:
+1. Generate a natural-sounding, expressive, and engaging conversational starter sentence or two about the story, suitable for initiating a discussion with someone nearby (e.g., "Did you hear about...", "I just saw..."). Do not use something obvious like "Did you see the article...". Keep it brief, energetic and focus on the main point indicated by the title. Add a question or prompt to encourage conversation.
+2. Generate a very short (3-5 word) phrase that captures the absolute key message or topic (suitable for displaying on a button).
+
+Format your response STRICTLY as a JSON array with one object per story, each with three keys:
+- "id": the story's number.
+- "option": the conversational starter sentence(s) (from task 1).
+- "summary": the very short 3-5 word phrase (from task 2).
+
+Example JSON format:
+[{{ "id": 1, "option": "Did you hear about the new library opening downtown? They say it has some great features.", "summary": "New library opens" }}]
+
+JSON response:
+"""
+
+
+def parse_articles(
+    html: str, base_url: str, headline_selector: str, url_selector: str, url_attribute: str, url_prefix: str
+) -> List[Dict[str, str]]:
+    """Headline/URL pairs from a page (runs in the parse pool, so it must stay a module-level function)."""
+    soup = BeautifulSoup(html, "html.parser")
+    headline_elements = soup.select(headline_selector)
+    url_elements = soup.select(url_selector)
+    articles = []
+    for i in range(min(len(headline_elements), len(url_elements))):
+        headline = headline_elements[i].get_text(strip=True)
+        article_url = url_elements[i].get(url_attribute)
+        if article_url:
+            articles.append({"title": headline, "url": urljoin(base_url, url_prefix + article_url)})
+    return articles
+
+
+def source_key(config: Dict[str, Any]) -> Optional[SourceKey]:
+    url = config.get("url")
+    headline_selector = config.get("headline_selector")
+    url_selector = config.get("url_selector")
+    if not url or not headline_selector or not url_selector:
+        return None
+    return (url, headline_selector, url_selector, config.get("url_attribute") or "href", config.get("url_prefix") or "")
+
+
+def _summary_key(topic: Optional[str], article: Dict[str, Any]) -> SummaryKey:
+    return (str(topic or "").strip().lower(), str(article.get("url") or article.get("title") or ""))
+
+
+class _Source:
+    __slots__ = ("articles", "fetched_at", "etag", "last_modified", "body_hash", "last_requested", "topics")
+
+    def __init__(self):
+        self.articles: List[Dict[str, str]] = []
+        self.fetched_at = 0.0
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.body_hash: Optional[str] = None
+        self.last_requested = 0.0
+        self.topics: Set[str] = set()
+
+
+class _HostLimiter:
+    def __init__(self):
+        self.semaphore = asyncio.Semaphore(HOST_CONCURRENCY)
+        self.next_allowed = 0.0
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        wait = self.next_allowed - time.monotonic()
+        self.next_allowed = max(self.next_allowed, time.monotonic()) + HOST_MIN_INTERVAL_SECONDS
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.semaphore.release()
+
+
+class CurrentEventsService:
+    def __init__(self):
+        self._sources: "OrderedDict[SourceKey, _Source]" = OrderedDict()
+        self._fetching: Dict[SourceKey, asyncio.Future] = {}
+        self._summaries: "OrderedDict[SummaryKey, Tuple[float, Dict[str, str]]]" = OrderedDict()
+        self._summarizing: Dict[SummaryKey, asyncio.Future] = {}
+        self._hosts: Dict[str, _HostLimiter] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._generate: Optional[GenerateFn] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.counters: Dict[str, int] = {
+            "source_requests": 0,
+            "source_cache_hits": 0,
+            "fetches": 0,
+            "not_modified": 0,
+            "unchanged_bodies": 0,
+            "parses": 0,
+            "fetch_errors": 0,
+            "summary_cache_hits": 0,
+            "summary_batches": 0,
+            "summaries_generated": 0,
+            "summary_failures": 0,
+            "background_refreshes": 0,
+        }
+
+    # --- lifecycle -----------------------------------------------------
+
+    def start(self, generate: GenerateFn, background_refresh: bool = True) -> None:
+        """background_refresh=False serves requests without the refresh/prefetch loop (other workers run it)."""
+        self._generate = generate
+        if background_refresh and self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+            logging.info(f"✅ Current-events ingestion started (refresh every {REFRESH_INTERVAL_SECONDS}s)")
+
+    async def stop(self) -> None:
+        task, self._refresh_task = self._refresh_task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=64, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=FETCH_TIMEOUT_SECONDS),
+                headers={"User-Agent": USER_AGENT},
+            )
+        return self._session
+
+    async def _parse(self, html: str, key: SourceKey) -> List[Dict[str, str]]:
+        self.counters["parses"] += 1
+        return await run_in_process("current_events", parse_articles, html, *key, max_workers=PARSE_WORKERS)
+
+    # --- sources -------------------------------------------------------
+
+    def _source(self, key: SourceKey) -> _Source:
+        source = self._sources.get(key)
+        if source is None:
+            source = self._sources[key] = _Source()
+            while len(self._sources) > MAX_SOURCES:
+                self._sources.popitem(last=False)
+        else:
+            self._sources.move_to_end(key)
+        return source
+
+    async def fetch_articles(self, config: Dict[str, Any], topic: Optional[str] = None, force_refresh: bool = False) -> List[Dict[str, str]]:
+        """
+        Articles for a scraping config. Served from the shared cache while fresh;
+        otherwise revalidated. A failed fetch returns the last known articles (or []).
+        `topic` registers the source for background refresh and summary prefetch.
+        """
+        key = source_key(config)
+        if key is None:
+            logging.warning(f"Incomplete scraping config for {config.get('url')}")
+            return []
+        self.counters["source_requests"] += 1
+        source = self._source(key)
+        source.last_requested = time.time()
+        if topic:
+            source.topics.add(str(topic).strip().lower())
+        if not force_refresh and source.fetched_at and time.time() - source.fetched_at < SOURCE_TTL_SECONDS:
+            self.counters["source_cache_hits"] += 1
+            return [dict(a) for a in source.articles]
+        await self._refresh_source(key, source)
+        return [dict(a) for a in source.articles]
+
+    async def _refresh_source(self, key: SourceKey, source: _Source) -> bool:
+        """Fetch a source once even if many callers ask at the same time. Returns True if its articles changed."""
+        pending = self._fetching.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        future = asyncio.get_running_loop().create_future()
+        self._fetching[key] = future
+        changed = False
+        try:
+            changed = await self._fetch(key, source)
+        finally:
+            self._fetching.pop(key, None)
+            future.set_result(changed)
+        return changed
+
+    async def _fetch(self, key: SourceKey, source: _Source) -> bool:
+        url = key[0]
+        headers = {}
+        if source.etag:
+            headers["If-None-Match"] = source.etag
+        if source.last_modified:
+            headers["If-Modified-Since"] = source.last_modified
+        host = urlsplit(url).netloc.lower()
+        limiter = self._hosts.get(host)
+        if limiter is None:
+            limiter = self._hosts[host] = _HostLimiter()
+        try:
+            async with limiter:
+                self.counters["fetches"] += 1
+                async with self._get_session().get(url, headers=headers) as response:
+                    if response.status == 304:
+                        self.counters["not_modified"] += 1
+                        source.fetched_at = time.time()
+                        return False
+                    response.raise_for_status()
+                    html = await response.text()
+                    etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+        except Exception as e:
+            self.counters["fetch_errors"] += 1
+            logging.warning(f"Error scraping {url}: {e}")
+            return False
+
+        body_hash = hashlib.sha1(html.encode("utf-8", "replace")).hexdigest()
+        source.etag, source.last_modified = etag, last_modified
+        if body_hash == source.body_hash and source.fetched_at:
+            self.counters["unchanged_bodies"] += 1
+            source.fetched_at = time.time()
+            return False
+        try:
+            articles = await self._parse(html, key)
+        except Exception as e:
+            self.counters["fetch_errors"] += 1
+            logging.warning(f"Error parsing {url}: {e}")
+            return False
+        source.articles = articles
+        source.body_hash = body_hash
+        source.fetched_at = time.time()
+        return True
+
+    # --- summaries -----------------------------------------------------
+
+    def _cached_summary(self, key: SummaryKey) -> Optional[Dict[str, str]]:
+        entry = self._summaries.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry[0] > SUMMARY_TTL_SECONDS:
+            self._summaries.pop(key, None)
+            return None
+        self._summaries.move_to_end(key)
+        return entry[1]
+
+    def _store_summary(self, key: SummaryKey, pair: Dict[str, str]) -> None:
+        self._summaries[key] = (time.time(), pair)
+        self._summaries.move_to_end(key)
+        while len(self._summaries) > MAX_SUMMARIES:
+            self._summaries.popitem(last=False)
+
+    async def summarize(self, articles: List[Dict[str, Any]], topic: Optional[str]) -> List[Dict[str, str]]:
+        """
+        {"option", "summary"} pairs for `articles`, in order. Articles the model could
+        not summarize are left out. Only headlines without a cached pair reach the
+        model, all in one call.
+        """
+        valid = [a for a in articles if isinstance(a, dict) and a.get("title") and a.get("url")]
+        results: Dict[SummaryKey, Optional[Dict[str, str]]] = {}
+        waiting: Dict[SummaryKey, asyncio.Future] = {}
+        misses: List[Tuple[SummaryKey, Dict[str, Any]]] = []
+        seen: Set[SummaryKey] = set()
+        for article in valid:
+            key = _summary_key(topic, article)
+            if key in seen:
+                continue
+            seen.add(key)
+            cached = self._cached_summary(key)
+            if cached is not None:
+                self.counters["summary_cache_hits"] += 1
+                results[key] = cached
+            elif key in self._summarizing:
+                waiting[key] = self._summarizing[key]
+            else:
+                misses.append((key, article))
+
+        if misses:
+            loop = asyncio.get_running_loop()
+            futures = {key: loop.create_future() for key, _ in misses}
+            self._summarizing.update(futures)
+            try:
+                generated = await self._summarize_batch([a for _, a in misses], topic)
+            except Exception as e:
+                logging.error(f"Batched current-events summary failed ({topic}): {e}")
+                generated = [None] * len(misses)
+            except BaseException:
+                # Cancelled mid-batch: release the requests waiting on these headlines
+                for future in futures.values():
+                    if not future.done():
+                        future.set_result(None)
+                raise
+            finally:
+                for key in futures:
+                    self._summarizing.pop(key, None)
+            for (key, _), pair in zip(misses, generated):
+                if pair is not None:
+                    self._store_summary(key, pair)
+                else:
+                    self.counters["summary_failures"] += 1
+                results[key] = pair
+                futures[key].set_result(pair)
+
+        for key, future in waiting.items():
+            results[key] = await asyncio.shield(future)
+
+        pairs = []
+        for article in valid:
+            pair = results.get(_summary_key(topic, article))
+            if pair is not None:
+                pairs.append(dict(pair))
+        return pairs
+
+    async def _summarize_batch(self, articles: List[Dict[str, Any]], topic: Optional[str]) -> List[Optional[Dict[str, str]]]:
+        if self._generate is None:
+            raise RuntimeError("Current-events service not started")
+        stories = "\n".join(f"{i}. Title: {a['title']}\n   URL: {a['url']}" for i, a in enumerate(articles, 1))
+        prompt = BATCH_PROMPT_TEMPLATE.format(count=len(articles), event_type=topic or "news", stories=stories)
+        self.counters["summary_batches"] += 1
+        response_text = await self._generate(prompt)
+
+        match = re.search(r"(\[.*\])", response_text or "", re.DOTALL)
+        if not match:
+            logging.error(f"Could not find a JSON array in the current-events summary output: {response_text!r}")
+            return [None] * len(articles)
+        parsed = json.loads(match.group(1))
+        by_id: Dict[int, Dict[str, str]] = {}
+        for position, item in enumerate(parsed if isinstance(parsed, list) else [], 1):
+            if not isinstance(item, dict) or not item.get("option") or not item.get("summary"):
+                continue
+            try:
+                story_id = int(item.get("id", position))
+            except (TypeError, ValueError):
+                story_id = position
+            by_id[story_id] = {"option": str(item["option"]), "summary": str(item["summary"])}
+        self.counters["summaries_generated"] += len(by_id)
+        return [by_id.get(i) for i in range(1, len(articles) + 1)]
+
+    # --- background refresh --------------------------------------------
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(REFRESH_INTERVAL_SECONDS)
+            try:
+                await self.refresh_active()
+            except Exception as e:
+                logging.error(f"Current-events refresh failed: {e}", exc_info=True)
+
+    async def refresh_active(self) -> int:
+        """Refresh sources requested within the active window; prefetch summaries for new headlines."""
+        now = time.time()
+        for key in [k for k, s in self._sources.items() if s.last_requested < now - ACTIVE_WINDOW_SECONDS]:
+            self._sources.pop(key, None)
+        # Sources a request just fetched can wait for the next round.
+        active = [(k, s) for k, s in self._sources.items() if now - s.fetched_at >= REFRESH_INTERVAL_SECONDS / 2]
+
+        async def refresh(key: SourceKey, source: _Source) -> None:
+            if not await self._refresh_source(key, source) or self._generate is None:
+                return
+            for topic in list(source.topics):
+                fresh = [a for a in source.articles if self._cached_summary(_summary_key(topic, a)) is None]
+                if fresh:
+                    await self.summarize(fresh[:PREFETCH_SUMMARIES], topic)
+
+        await asyncio.gather(*(refresh(key, source) for key, source in active))
+        self.counters["background_refreshes"] += len(active)
+        return len(active)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "sources": len(self._sources),
+            "hosts": len(self._hosts),
+            "cached_summaries": len(self._summaries),
+            "running": self._refresh_task is not None,
+            **self.counters,
+        }
+
+
+# Global singleton instance
+current_events_service = CurrentEventsService()
@@ -17,6 +17,8 @@ import json
 import re
 from datetime import datetime
 
+from accent_mti_parser import MTI_RECORD_HEADER, MTI_RECORD_MARKER, MTI_RECORD_TAIL, page_name_finder
+
 
 def extract_mti_file(mti_file_path):
     """
@@ -135,35 +137,28 @@ def extract_mti_file(mti_file_path):
     
     print("Phase 2: Parsing button records...")
     
-    while pos < len(data) - 20:
+    record_limit = len(data) - MTI_RECORD_TAIL
+    while pos < record_limit:
+        # Jump to the next m-record marker: m\x00\x04\xfd
+        pos = data.find(MTI_RECORD_MARKER, pos)
+        if pos == -1 or pos >= record_limit:
+            break
+        
         # Progress indicator every 1000 buttons
         if button_count % 1000 == 0:
             print(f"  Processed {button_count} buttons... (pos={pos}/{len(data)})", flush=True)
         
-        # Look for m-record marker: m\x00\x04\xfd
-        if data[pos:pos+4] != b'm\x00\x04\xfd':
-            pos += 1
-            continue
-        
         try:
-            # Extract page ID (2 bytes, little-endian) and SWAP BYTES
-            # MTI stores as 0x0004 but we display as 0x0400
-            page_id_bytes = data[pos+4:pos+6]
-            page_id_raw = struct.unpack('<H', page_id_bytes)[0]
-            
-            # Byte-swap the page ID: swap high and low bytes
-            page_id_swapped = ((page_id_raw & 0xFF) << 8) | ((page_id_raw >> 8) & 0xFF)
+            # Page ID is stored byte-swapped (MTI stores 0x0004, we display 0x0400), so the
+            # header struct reads it big-endian; then sequence (1 byte) and byte 9 (format)
+            page_id_swapped, sequence, byte_9, _ = MTI_RECORD_HEADER.unpack_from(data, pos + 4)
             page_id_str = f"{page_id_swapped:04x}"
             
-            # Extract sequence (1 byte)
-            sequence = data[pos+6]
-            
             # Calculate grid position
             row = sequence // 16
             col = sequence % 16
             
             # Extract button name based on format
-            byte_9 = data[pos+9]
             extra_buttons = []
             
             # DEBUG for page 0301 seq 0
@@ -2653,6 +2648,7 @@ def extract_mti_file(mti_file_path):
     # Build page name to ID map and reverse ID to name map
     page_name_to_id = {page_data['inferred_name'].lower().strip(): page_id 
                        for page_id, page_data in pages.items()}
+    find_page_id = page_name_finder(page_name_to_id)
     page_id_to_name = {page_id: page_data['inferred_name'].lower().strip()
                        for page_id, page_data in pages.items()}
     
@@ -2710,24 +2706,6 @@ def extract_mti_file(mti_file_path):
                 nav_target = None
                 clean_speech = speech
                 
-                # Helper function to find page by name (with normalization)
-                def find_page_id(name):
-                    name_lower = name.strip().lower()
-                    # Try exact match
-                    if name_lower in page_name_to_id:
-                        return page_name_to_id[name_lower]
-                    # Try with "0 " prefix
-                    with_prefix = f"0 {name_lower}"
-                    if with_prefix in page_name_to_id:
-                        return page_name_to_id[with_prefix]
-                    # Try fuzzy match (ignore trailing spaces/punctuation)
-                    for page_name, page_id in page_name_to_id.items():
-                        if page_name.strip().lower() == name_lower:
-                            return page_id
-                        if page_name.strip().lower() == with_prefix.strip():
-                            return page_id
-                    return None
-                
                 # Pattern 1a: (page_name) or (page_name at the end
                 match = re.search(r'\(([^)]+)\)\s*[A-Z+\-,;:/]*\s*$', speech)
                 if not match:
@@ -0,0 +1,244 @@
+"""
+Batched Firestore write pipeline.
+
+Collection-level helpers in server.py used to await one asyncio.to_thread(doc.set)
+or doc.delete per document. The pipeline below queues mutations and commits them as
+WriteBatches of up to 500 operations (the Firestore limit). Independent batches
+commit concurrently under a bounded semaphore. Contention and transient errors are
+retried with exponential backoff.
+
+Usage:
+    pipeline = FirestoreWritePipeline(firestore_db, label="diary_entries")
+    pipeline.set(ref, data)
+    pipeline.delete(other_ref)
+    result = await pipeline.commit()
+
+Batches are atomic individually, not as a group: a failure after retries raises
+FirestoreWriteError with the batches that did commit reported in the result.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import google.api_core.exceptions as gexc
+
+MAX_BATCH_OPS = 500
+DEFAULT_CONCURRENCY = 4
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BASE_BACKOFF_SECONDS = 0.2
+
+RETRYABLE_ERRORS = (
+    gexc.Aborted,
+    gexc.DeadlineExceeded,
+    gexc.ResourceExhausted,
+    gexc.ServiceUnavailable,
+    gexc.InternalServerError,
+)
+
+
+class FirestoreWriteError(Exception):
+    def __init__(self, message: str, result: "WriteResult"):
+        super().__init__(message)
+        self.result = result
+
+
+class WriteResult:
+    __slots__ = ("ops", "batches", "retries", "failed_batches", "elapsed_seconds")
+
+    def __init__(self):
+        self.ops = 0
+        self.batches = 0
+        self.retries = 0
+        self.failed_batches = 0
+        self.elapsed_seconds = 0.0
+
+    @property
+    def ops_per_second(self) -> float:
+        return self.ops / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ops": self.ops,
+            "batches": self.batches,
+            "retries": self.retries,
+            "failed_batches": self.failed_batches,
+            "elapsed_ms": round(self.elapsed_seconds * 1000, 1),
+            "ops_per_second": round(self.ops_per_second, 1),
+        }
+
+
+class _PipelineStats:
+    """Process-wide totals, reported on /api/cache/stats."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.commits = 0
+        self.ops = 0
+        self.batches = 0
+        self.retries = 0
+        self.failed_batches = 0
+        self.last_ops_per_second = 0.0
+        self.peak_ops_per_second = 0.0
+
+    def record(self, result: WriteResult) -> None:
+        with self._lock:
+            self.commits += 1
+            self.ops += result.ops
+            self.batches += result.batches
+            self.retries += result.retries
+            self.failed_batches += result.failed_batches
+            self.last_ops_per_second = result.ops_per_second
+            self.peak_ops_per_second = max(self.peak_ops_per_second, result.ops_per_second)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "commits": self.commits,
+                "ops": self.ops,
+                "batches": self.batches,
+                "retries": self.retries,
+                "failed_batches": self.failed_batches,
+                "last_ops_per_second": round(self.last_ops_per_second, 1),
+                "peak_ops_per_second": round(self.peak_ops_per_second, 1),
+            }
+
+
+pipeline_stats = _PipelineStats()
+
+
+class FirestoreWritePipeline:
+    def __init__(
+        self,
+        db,
+        label: str = "",
+        max_batch_ops: int = MAX_BATCH_OPS,
+        max_concurrency: int = DEFAULT_CONCURRENCY,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        base_backoff_seconds: float = DEFAULT_BASE_BACKOFF_SECONDS,
+    ):
+        self.db = db
+        self.label = label
+        self.max_batch_ops = min(max_batch_ops, MAX_BATCH_OPS)
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.base_backoff_seconds = base_backoff_seconds
+        self._ops: List[Tuple[str, Any, Any, bool]] = []
+
+    def __len__(self) -> int:
+        return len(self._ops)
+
+    def set(self, ref, data: Dict[str, Any], merge: bool = False) -> "FirestoreWritePipeline":
+        self._ops.append(("set", ref, data, merge))
+        return self
+
+    def update(self, ref, data: Dict[str, Any]) -> "FirestoreWritePipeline":
+        self._ops.append(("update", ref, data, False))
+        return self
+
+    def delete(self, ref) -> "FirestoreWritePipeline":
+        self._ops.append(("delete", ref, None, False))
+        return self
+
+    def _commit_chunk_sync(self, chunk: List[Tuple[str, Any, Any, bool]]) -> None:
+        batch = self.db.batch()
+        for kind, ref, data, merge in chunk:
+            if kind == "set":
+                batch.set(ref, data, merge=merge)
+            elif kind == "update":
+                batch.update(ref, data)
+            else:
+                batch.delete(ref)
+        batch.commit()
+
+    async def _commit_chunk(self, chunk, semaphore: asyncio.Semaphore, result: WriteResult) -> Optional[Exception]:
+        async with semaphore:
+            attempt = 0
+            while True:
+                try:
+                    await asyncio.to_thread(self._commit_chunk_sync, chunk)
+                    result.ops += len(chunk)
+                    result.batches += 1
+                    return None
+                except RETRYABLE_ERRORS as e:
+                    if attempt >= self.max_retries:
+                        result.failed_batches += 1
+                        return e
+                    delay = self.base_backoff_seconds * (2 ** attempt) * (0.5 + random.random())
+                    attempt += 1
+                    result.retries += 1
+                    logging.warning(
+                        f"Firestore batch commit contention ({self.label or 'pipeline'}), retry {attempt}/{self.max_retries} "
+                        f"in {delay:.2f}s: {e}"
+                    )
+                    await asyncio.sleep(delay)
+                except Exception as e:
+                    result.failed_batches += 1
+                    return e
+
+    async def commit(self) -> WriteResult:
+        """Commit all queued operations. Raises FirestoreWriteError if any batch failed."""
+        ops, self._ops = self._ops, []
+        result = WriteResult()
+        if not ops:
+            return result
+        chunks = [ops[i:i + self.max_batch_ops] for i in range(0, len(ops), self.max_batch_ops)]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        started = time.perf_counter()
+        errors = await asyncio.gather(*(self._commit_chunk(chunk, semaphore, result) for chunk in chunks))
+        result.elapsed_seconds = time.perf_counter() - started
+        pipeline_stats.record(result)
+
+        failures = [e for e in errors if e is not None]
+        if failures:
+            raise FirestoreWriteError(
+                f"{len(failures)}/{len(chunks)} Firestore batches failed ({self.label or 'pipeline'}): {failures[0]}",
+                result,
+            )
+        logging.debug(
+            f"🧱 Firestore pipeline {self.label or ''}: {result.ops} ops in {result.batches} batches, "
+            f"{result.elapsed_seconds * 1000:.0f}ms ({result.ops_per_second:.0f} ops/s)"
+        )
+        return result
+
+
+def _list_document_refs(coll_ref) -> List[Any]:
+    # list_documents() reads no document data, only ids.
+    return list(coll_ref.list_documents())
+
+
+async def delete_collection(db, coll_ref, label: str = "") -> int:
+    """Delete every document in a collection (not its nested subcollections). Returns the count."""
+    refs = await asyncio.to_thread(_list_document_refs, coll_ref)
+    pipeline = FirestoreWritePipeline(db, label=label or f"delete {coll_ref.id}")
+    for ref in refs:
+        pipeline.delete(ref)
+    await pipeline.commit()
+    return len(refs)
+
+
+async def replace_collection(
+    db, coll_ref, items: Iterable[Tuple[str, Dict[str, Any]]], label: str = "", max_batch_ops: int = MAX_BATCH_OPS
+) -> WriteResult:
+    """
+    Make the collection contain exactly `items` ((doc_id, data) pairs): set every item
+    and delete documents whose ids are no longer present. Lower max_batch_ops for large
+    documents so a commit stays under Firestore's 10 MiB request limit.
+    """
+    items = list(items)
+    existing_refs = await asyncio.to_thread(_list_document_refs, coll_ref)
+    keep_ids = {doc_id for doc_id, _ in items}
+    pipeline = FirestoreWritePipeline(db, label=label or f"replace {coll_ref.id}", max_batch_ops=max_batch_ops)
+    for doc_id, data in items:
+        pipeline.set(coll_ref.document(doc_id), data)
+    for ref in existing_refs:
+        if ref.id not in keep_ids:
+            pipeline.delete(ref)
+    return await pipeline.commit()
+
+
+def get_write_pipeline_stats() -> Dict[str, Any]:
+    return pipeline_stats.to_dict()
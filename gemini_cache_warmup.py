@@ -0,0 +1,242 @@
+"""
+Background scheduler for Gemini context-cache warm-ups.
+
+Building a user's BASE context and calling CachedContent.create takes seconds and
+every duplicate create is a separately billed cache. So warm-ups never run on a
+request path:
+
+- schedule() only enqueues. A user is queued or running at most once per process
+  (singleflight); repeated schedules just raise the queued entry's priority.
+- a fixed pool of workers drains a bounded priority queue: requests that found no
+  cache first, then login warm-ups, then proactive refreshes. Within a tier the
+  most recently active user goes first. When the queue is full the stalest entry
+  is dropped.
+- a refresh loop re-queues recently active users whose cache expires within
+  refresh_margin_seconds, so active users never hit an expired cache.
+
+Cross-instance deduplication (a Firestore lease) lives in the warm-up callable.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+PRIORITY_URGENT = 0  # an LLM request just ran without a cache
+PRIORITY_NORMAL = 1  # user signed in / became active
+PRIORITY_REFRESH = 2  # cache still valid but close to expiry
+
+DEFAULT_WORKERS = int(os.getenv("GEMINI_CACHE_WARMUP_WORKERS", "2"))
+DEFAULT_MAX_QUEUE = int(os.getenv("GEMINI_CACHE_WARMUP_QUEUE_MAX", "500"))
+DEFAULT_REFRESH_MARGIN_SECONDS = 20 * 60
+DEFAULT_ACTIVE_WINDOW_SECONDS = 30 * 60
+DEFAULT_REFRESH_INTERVAL_SECONDS = 60
+DEFAULT_WARM_UP_TIMEOUT_SECONDS = 120
+
+UserKey = Tuple[str, str]
+# (account_id, aac_user_id, refresh_before_seconds) -> cache expiry (epoch seconds) or None
+WarmUpFn = Callable[[str, str, float], Awaitable[Optional[float]]]
+
+
+class CacheWarmupScheduler:
+    def __init__(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        refresh_margin_seconds: float = DEFAULT_REFRESH_MARGIN_SECONDS,
+        active_window_seconds: float = DEFAULT_ACTIVE_WINDOW_SECONDS,
+        refresh_interval_seconds: float = DEFAULT_REFRESH_INTERVAL_SECONDS,
+        warm_up_timeout_seconds: float = DEFAULT_WARM_UP_TIMEOUT_SECONDS,
+    ):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.active_window_seconds = active_window_seconds
+        self.refresh_interval_seconds = refresh_interval_seconds
+        self.warm_up_timeout_seconds = warm_up_timeout_seconds
+        self._warm_up: Optional[WarmUpFn] = None
+        # Heap of (tier, -last_active, seq, key). Entries whose seq no longer matches
+        # _queued[key] were superseded or dropped and are skipped when popped.
+        self._heap: List[Tuple[int, float, int, UserKey]] = []
+        self._queued: Dict[UserKey, Tuple[int, float, int, UserKey]] = {}
+        self._running: Set[UserKey] = set()
+        self._rerun: Set[UserKey] = set()
+        self._last_active: Dict[UserKey, float] = {}
+        self._expires_at: Dict[UserKey, float] = {}
+        self._seq = itertools.count()
+        self._ready: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self.counters: Dict[str, int] = {
+            "scheduled": 0,
+            "coalesced": 0,
+            "skipped_fresh": 0,
+            "dropped": 0,
+            "completed": 0,
+            "errors": 0,
+            "timeouts": 0,
+            "refreshes_scheduled": 0,
+        }
+
+    # --- lifecycle -----------------------------------------------------
+
+    def start(self, warm_up: WarmUpFn) -> None:
+        if self._tasks:
+            return
+        self._warm_up = warm_up
+        self._ready = asyncio.Event()
+        if self._queued:
+            self._ready.set()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._refresh_loop()))
+        logging.info(f"✅ Gemini cache warm-up scheduler started ({self.workers} workers)")
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # --- scheduling ----------------------------------------------------
+
+    def note_activity(self, account_id: str, aac_user_id: str) -> None:
+        self._last_active[(account_id, aac_user_id)] = time.time()
+
+    def schedule(self, account_id: str, aac_user_id: str, priority: int = PRIORITY_NORMAL, force: bool = False) -> bool:
+        """
+        Queue a warm-up without waiting for it. Skipped if one is already queued or
+        running for the user, or if this instance knows the cache is fresh. `force`
+        re-runs after an in-flight warm-up (use when its input went stale).
+        Returns True if a new queue entry was created.
+        """
+        key = (account_id, aac_user_id)
+        now = time.time()
+        self._last_active[key] = now
+        if key in self._running:
+            if force:
+                self._rerun.add(key)
+            self.counters["coalesced"] += 1
+            return False
+        if not force and priority != PRIORITY_REFRESH and key not in self._queued:
+            expires_at = self._expires_at.get(key)
+            if expires_at is not None and expires_at - now > self.refresh_margin_seconds:
+                self.counters["skipped_fresh"] += 1
+                return False
+        return self._push(key, priority, now)
+
+    def forget(self, account_id: str, aac_user_id: str) -> None:
+        """The user's cache was invalidated: drop what we know about its expiry."""
+        key = (account_id, aac_user_id)
+        self._expires_at.pop(key, None)
+        if key in self._running:
+            self._rerun.add(key)
+
+    def _push(self, key: UserKey, priority: int, last_active: float) -> bool:
+        entry = (priority, -last_active, next(self._seq), key)
+        existing = self._queued.get(key)
+        if existing is not None:
+            self.counters["coalesced"] += 1
+            if entry[:2] >= existing[:2]:
+                return False
+        elif len(self._queued) >= self.max_queue:
+            stalest = max(self._queued.values())
+            if entry >= stalest:
+                self.counters["dropped"] += 1
+                return False
+            del self._queued[stalest[3]]
+            self.counters["dropped"] += 1
+        self._queued[key] = entry
+        heapq.heappush(self._heap, entry)
+        if len(self._heap) > 4 * max(self.max_queue, 1):
+            self._heap = list(self._queued.values())
+            heapq.heapify(self._heap)
+        if existing is None:
+            self.counters["scheduled"] += 1
+        if self._ready is not None:
+            self._ready.set()
+        return existing is None
+
+    def _pop(self) -> Optional[Tuple[int, UserKey]]:
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            key = entry[3]
+            if self._queued.get(key) is entry:
+                del self._queued[key]
+                return entry[0], key
+        return None
+
+    # --- workers -------------------------------------------------------
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            item = self._pop()
+            if item is None:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            priority, key = item
+            self._running.add(key)
+            refresh_before = self.refresh_margin_seconds if priority == PRIORITY_REFRESH else 0.0
+            try:
+                expires_at = await asyncio.wait_for(
+                    self._warm_up(key[0], key[1], refresh_before), timeout=self.warm_up_timeout_seconds
+                )
+                if expires_at:
+                    self._expires_at[key] = expires_at
+                self.counters["completed"] += 1
+            except asyncio.CancelledError:
+                raise
+            except asyncio.TimeoutError:
+                self.counters["timeouts"] += 1
+                logging.warning(f"Gemini cache warm-up timed out for {key[0]}/{key[1]}")
+            except Exception as e:
+                self.counters["errors"] += 1
+                logging.error(f"Gemini cache warm-up failed for {key[0]}/{key[1]}: {e}")
+            finally:
+                self._running.discard(key)
+            if key in self._rerun:
+                self._rerun.discard(key)
+                self._expires_at.pop(key, None)
+                self._push(key, PRIORITY_NORMAL, self._last_active.get(key, time.time()))
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval_seconds)
+            try:
+                self.refresh_due()
+            except Exception as e:
+                logging.error(f"Gemini cache refresh scan failed: {e}", exc_info=True)
+
+    def refresh_due(self, now: Optional[float] = None) -> int:
+        """Queue refreshes for active users whose cache is about to expire. Returns how many."""
+        now = now or time.time()
+        active_since = now - self.active_window_seconds
+        for key in [k for k, seen in self._last_active.items() if seen < active_since]:
+            self._last_active.pop(key, None)
+        for key in [k for k, expires in self._expires_at.items() if expires <= now]:
+            self._expires_at.pop(key, None)
+        scheduled = 0
+        for key, expires_at in list(self._expires_at.items()):
+            if key not in self._last_active or key in self._running or key in self._queued:
+                continue
+            if expires_at - now <= self.refresh_margin_seconds:
+                scheduled += self._push(key, PRIORITY_REFRESH, self._last_active[key])
+        self.counters["refreshes_scheduled"] += scheduled
+        return scheduled
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "running": len(self._tasks) > 0,
+            "queued": len(self._queued),
+            "in_progress": len(self._running),
+            "active_users": len(self._last_active),
+            "known_caches": len(self._expires_at),
+            **self.counters,
+        }
+
+
+# Global singleton instance
+cache_warmup_scheduler = CacheWarmupScheduler()
@@ -0,0 +1,54 @@
+"""
+Multi-worker mode: uvicorn workers under a gunicorn master.
+
+  python -m gunicorn -c gunicorn.conf.py server:app
+
+WEB_CONCURRENCY is the worker count: a number, or "auto" for one worker per CPU
+available to the container (cgroup quota aware). The default, 1, behaves like the
+single-process `python -m uvicorn server:app`. With more than one worker, state
+that requests share (mood timestamps, document cache, ...) goes through
+state_backend.py: SQLite on this host, or Redis when REDIS_HOST is set. Migration
+sessions are files in migration_session_store.py's directory (and bucket).
+
+Start it with `python -m gunicorn`, not the gunicorn script, so process_pools can
+use its forkserver (see process_pools.pool_safe_main).
+"""
+
+import multiprocessing
+import os
+
+
+def _available_cpus() -> int:
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        count = multiprocessing.cpu_count()
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            count = min(count, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, count)
+
+
+def _worker_count() -> int:
+    value = os.getenv("WEB_CONCURRENCY", "1").strip().lower()
+    if value == "auto":
+        return _available_cpus()
+    return max(1, int(value))
+
+
+workers = _worker_count()
+# Workers inherit this; state_backend reads it to pick a shared backend.
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+# Async workers heartbeat from the event loop; this only fires for a blocked loop.
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+accesslog = None
@@ -0,0 +1,215 @@
+"""
+Cache for the public BravoImages search (/api/imagecreator/search).
+
+Two tiers:
+- L1: a per-process LocalTTLCache with a short TTL, so repeated searches (the
+  symbol admin searches as the user types) never leave the process.
+- Redis (optional): a redis.asyncio client on a bounded connection pool, shared
+  by every instance. Batch callers (prewarm, missing-image scans) read all their
+  entries with one MGET instead of a GET per term.
+
+Invalidation is O(1). Every entry key embeds a namespace version
+("bravo_images_search:v<version>:..."), and invalidate() INCRs the version key.
+Entries of older versions are never read again and expire on their own TTL, so
+there is no KEYS scan and no bulk delete. Each process re-reads the version at
+most every IMAGE_SEARCH_VERSION_CHECK_SECONDS, which bounds how long another
+instance serves results from before an edit; the editing process drops its L1
+at once. Without Redis the version is per process and the L1 is the only tier.
+
+Writes that reach the aac_images snapshot listener (any writer, any instance)
+invalidate too, via handle_index_event.
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from quick_response_cache import LocalTTLCache
+
+SearchParams = Tuple[str, str, str, int]
+
+
+class ImageSearchCache:
+    """
+    Usage:
+        params = image_search_cache.params(tag, concept, subconcept, limit)
+        result = await image_search_cache.get(params)
+        if result is None:
+            version = image_search_cache.version
+            result = ...search...
+            await image_search_cache.set(params, result, version)
+    """
+
+    def __init__(
+        self,
+        namespace: str = "bravo_images_search",
+        ttl_seconds: float = 3600,
+        l1_ttl_seconds: float = 30,
+        l1_max_entries: int = 2000,
+        version_check_seconds: float = 5,
+    ):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.version_check_seconds = version_check_seconds
+        self._l1 = LocalTTLCache(l1_ttl_seconds, l1_max_entries)
+        self._redis = None
+        self._version = 0
+        self._version_checked_at = float("-inf")
+        # Set from the index listener thread; applied by the next cache call on the event loop.
+        self._index_ready = False
+        self._invalidation_pending = False
+        self.counters: Dict[str, int] = {
+            "l1_hits": 0,
+            "redis_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "stale_writes_dropped": 0,
+            "invalidations": 0,
+            "version_changes_seen": 0,
+            "redis_errors": 0,
+        }
+
+    def configure_redis(self, client) -> None:
+        """Attach (or detach, with None) a redis.asyncio client (decode_responses=True) for the shared tier."""
+        self._redis = client
+        self._version_checked_at = float("-inf")
+
+    @staticmethod
+    def params(tag: str, concept: str, subconcept: str, limit: int) -> SearchParams:
+        return (tag.lower(), concept.lower(), subconcept.lower(), int(limit))
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def _version_key(self) -> str:
+        return f"{self.namespace}:version"
+
+    def _entry_key(self, params: SearchParams) -> str:
+        tag, concept, subconcept, limit = params
+        return f"{self.namespace}:v{self._version}:{tag}:{concept}:{subconcept}:{limit}"
+
+    def _redis_failed(self, action: str, error: Exception) -> None:
+        self.counters["redis_errors"] += 1
+        logging.warning(f"Image search cache: Redis {action} failed: {error}")
+
+    async def _refresh_version(self) -> None:
+        if self._invalidation_pending:
+            self._invalidation_pending = False
+            await self.invalidate()
+            return
+        if self._redis is None:
+            return
+        now = time.monotonic()
+        if now - self._version_checked_at < self.version_check_seconds:
+            return
+        self._version_checked_at = now
+        try:
+            version = int(await self._redis.get(self._version_key) or 0)
+        except Exception as e:
+            self._redis_failed("version read", e)
+            return
+        if version != self._version:
+            self._version = version
+            self._l1.clear()
+            self.counters["version_changes_seen"] += 1
+
+    async def get(self, params: SearchParams) -> Optional[Dict[str, Any]]:
+        """Returns a fresh copy of the cached result, or None on a miss."""
+        return (await self.get_many([params])).get(params)
+
+    async def get_many(self, params_list: Iterable[SearchParams]) -> Dict[SearchParams, Dict[str, Any]]:
+        """Cached results by params for every hit: L1 first, then one MGET for the rest."""
+        await self._refresh_version()
+        found: Dict[SearchParams, Dict[str, Any]] = {}
+        missing = []
+        for params in dict.fromkeys(params_list):
+            raw = self._l1.get(self._entry_key(params))
+            if raw is not None:
+                found[params] = json.loads(raw)
+                self.counters["l1_hits"] += 1
+            else:
+                missing.append(params)
+
+        if missing and self._redis is not None:
+            keys = [self._entry_key(params) for params in missing]
+            try:
+                values = await self._redis.mget(keys)
+            except Exception as e:
+                self._redis_failed("mget", e)
+                values = [None] * len(keys)
+            still_missing = []
+            for params, key, raw in zip(missing, keys, values):
+                if raw is None:
+                    still_missing.append(params)
+                    continue
+                self._l1.set(key, raw)
+                found[params] = json.loads(raw)
+                self.counters["redis_hits"] += 1
+            missing = still_missing
+
+        self.counters["misses"] += len(missing)
+        return found
+
+    async def set(self, params: SearchParams, value: Dict[str, Any], version: Optional[int] = None) -> None:
+        """
+        Cache a result. Pass the version read before computing it: a result computed
+        across an invalidation is dropped instead of being filed under the new version.
+        """
+        if version is not None and version != self._version:
+            self.counters["stale_writes_dropped"] += 1
+            return
+        key = self._entry_key(params)
+        raw = json.dumps(value)
+        self._l1.set(key, raw)
+        self.counters["writes"] += 1
+        if self._redis is not None:
+            try:
+                await self._redis.set(key, raw, ex=int(self.ttl_seconds))
+            except Exception as e:
+                self._redis_failed("set", e)
+
+    async def invalidate(self) -> int:
+        """Drop every cached search by bumping the namespace version. Returns the new version."""
+        self.counters["invalidations"] += 1
+        self._l1.clear()
+        if self._redis is not None:
+            try:
+                self._version = int(await self._redis.incr(self._version_key))
+                self._version_checked_at = time.monotonic()
+                return self._version
+            except Exception as e:
+                self._redis_failed("incr", e)
+        self._version += 1
+        return self._version
+
+    def handle_index_event(self, event: str, payload: Any) -> None:
+        """Subscription callback for AacImageIndex.subscribe(). Runs on the listener thread."""
+        if event == "ready":
+            self._index_ready = True
+        elif event in ("upsert", "remove") and self._index_ready:
+            # Initial-snapshot upserts arrive before "ready" and are not changes.
+            self._invalidation_pending = True
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "namespace": self.namespace,
+            "backend": "local+redis" if self._redis is not None else "local",
+            "version": self._version,
+            "l1_entries": len(self._l1),
+            "ttl_evictions": self._l1.ttl_evictions,
+            "lru_evictions": self._l1.lru_evictions,
+            **self.counters,
+        }
+
+
+# Global singleton instance
+image_search_cache = ImageSearchCache(
+    ttl_seconds=int(os.getenv("IMAGE_SEARCH_CACHE_TTL_SECONDS", "3600")),
+    l1_ttl_seconds=int(os.getenv("IMAGE_SEARCH_L1_TTL_SECONDS", "30")),
+    l1_max_entries=int(os.getenv("IMAGE_SEARCH_L1_MAX_ENTRIES", "2000")),
+    version_check_seconds=int(os.getenv("IMAGE_SEARCH_VERSION_CHECK_SECONDS", "5")),
+)
@@ -0,0 +1,589 @@
+"""
+Background jobs for long board-generation requests (bravo-build, create-next-boards,
+regenerate-board, AI-to-static conversion, AI target boards, assign-all-images).
+
+Those requests chain several LLM calls, image lookups and a full config save, and
+can run past the request timeout. As jobs:
+
+- submit() stores the job and returns its id at once; the work runs on a fixed
+  pool of workers. Users are served round-robin with a per-user concurrency cap,
+  so one user's batch can't starve everyone else;
+- handlers report progress (and partial boards) through report_job_progress().
+  Every event is stored with a sequence number. stream() replays stored events
+  after a given number and then follows live ones, so a client that dropped can
+  resume where it left off. The final result is stored on the job;
+- stores: InMemoryJobStore (tests, single process) and FirestoreJobStore
+  (production). With Firestore, each job carries a lease that its instance
+  renews. A queued job whose instance died is claimed and run by another
+  instance. A running job whose instance died is marked failed, not re-run:
+  its handler may already have saved boards.
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import google.api_core.exceptions as gexc
+
+JOB_COLLECTION = "background_jobs"
+JOB_EVENTS_SUBCOLLECTION = "events"
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+TERMINAL_STATUSES = (STATUS_SUCCEEDED, STATUS_FAILED)
+# Written with a terminal status: a null lease is outside every lease_expires_at range query.
+FINISHED_LEASE = {"lease_owner": None, "lease_expires_at": None}
+
+DEFAULT_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+DEFAULT_PER_USER_CONCURRENCY = int(os.getenv("JOB_PER_USER_CONCURRENCY", "1"))
+DEFAULT_MAX_QUEUED_PER_USER = int(os.getenv("JOB_MAX_QUEUED_PER_USER", "20"))
+DEFAULT_JOB_TIMEOUT_SECONDS = int(os.getenv("JOB_TIMEOUT_SECONDS", "600"))
+DEFAULT_RETENTION_SECONDS = 24 * 60 * 60
+LEASE_SECONDS = 60
+HEARTBEAT_INTERVAL_SECONDS = 20
+STREAM_POLL_SECONDS = 2.0
+
+UserKey = Tuple[str, str]
+JobHandler = Callable[["JobContext"], Awaitable[Any]]
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+def _error_payload(exc: BaseException) -> Dict[str, Any]:
+    # HTTPException-style errors keep their status code and detail
+    status_code = getattr(exc, "status_code", None) or 500
+    detail = getattr(exc, "detail", None) or str(exc) or exc.__class__.__name__
+    return {"status_code": status_code, "detail": detail}
+
+
+def public_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """The job as returned to clients (no payload or lease fields)."""
+    return {
+        key: job.get(key)
+        for key in (
+            "job_id", "kind", "status", "event_count", "result", "error",
+            "created_at", "started_at", "finished_at",
+        )
+    }
+
+
+class JobContext:
+    def __init__(self, engine: "JobEngine", job: Dict[str, Any]):
+        self.engine = engine
+        self.job_id: str = job["job_id"]
+        self.kind: str = job["kind"]
+        self.account_id: str = job["account_id"]
+        self.aac_user_id: str = job["aac_user_id"]
+        self.payload: Dict[str, Any] = job.get("payload") or {}
+
+    async def progress(self, stage: str, message: str = "", **data: Any) -> None:
+        await self.engine.emit(self.job_id, "progress", stage=stage, message=message, data=data or None)
+
+
+current_job: contextvars.ContextVar[Optional[JobContext]] = contextvars.ContextVar("current_job", default=None)
+
+
+async def report_job_progress(stage: str, message: str = "", **data: Any) -> None:
+    """Progress for the job running in this task. A no-op when the code runs inline in a request."""
+    ctx = current_job.get()
+    if ctx is not None:
+        try:
+            await ctx.progress(stage, message, **data)
+        except Exception as e:
+            # Progress is best effort; it must never fail the job itself.
+            logging.warning(f"Could not record progress for job {ctx.job_id}: {e}")
+
+
+# --- stores ------------------------------------------------------------
+
+
+class InMemoryJobStore:
+    name = "memory"
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._events: Dict[str, List[Dict[str, Any]]] = {}
+
+    async def create(self, job: Dict[str, Any]) -> None:
+        self._jobs[job["job_id"]] = dict(job)
+        self._events[job["job_id"]] = []
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        return dict(job) if job is not None else None
+
+    async def update(self, job_id: str, fields: Dict[str, Any]) -> None:
+        if job_id in self._jobs:
+            self._jobs[job_id].update(fields)
+
+    async def append_event(self, job_id: str, event: Dict[str, Any]) -> None:
+        self._events.setdefault(job_id, []).append(event)
+        if job_id in self._jobs:
+            self._jobs[job_id]["event_count"] = event["seq"]
+
+    async def events_after(self, job_id: str, after_seq: int) -> List[Dict[str, Any]]:
+        return [event for event in self._events.get(job_id, []) if event["seq"] > after_seq]
+
+    async def list_for_user(self, account_id: str, aac_user_id: str, limit: int) -> List[Dict[str, Any]]:
+        jobs = [
+            dict(job) for job in self._jobs.values()
+            if job["account_id"] == account_id and job["aac_user_id"] == aac_user_id
+        ]
+        jobs.sort(key=lambda job: job.get("created_at") or 0, reverse=True)
+        return jobs[:limit]
+
+    async def renew_leases(self, job_ids: List[str], owner: str, expires_at: float) -> None:
+        for job_id in job_ids:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update({"lease_owner": owner, "lease_expires_at": expires_at})
+
+    async def expired(self, now: float, limit: int) -> List[Dict[str, Any]]:
+        return [
+            dict(job) for job in self._jobs.values()
+            if job["status"] not in TERMINAL_STATUSES and (job.get("lease_expires_at") or 0) <= now
+        ][:limit]
+
+    async def claim(self, job_id: str, owner: str, expires_at: float, now: float) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        if job is None or job["status"] in TERMINAL_STATUSES or (job.get("lease_expires_at") or 0) > now:
+            return None
+        job.update({"lease_owner": owner, "lease_expires_at": expires_at})
+        return dict(job)
+
+    def purge_before(self, cutoff: float) -> int:
+        stale = [
+            job_id for job_id, job in self._jobs.items()
+            if job["status"] in TERMINAL_STATUSES and (job.get("finished_at") or 0) < cutoff
+        ]
+        for job_id in stale:
+            self._jobs.pop(job_id, None)
+            self._events.pop(job_id, None)
+        return len(stale)
+
+
+class FirestoreJobStore:
+    """Jobs at background_jobs/{job_id}, events at background_jobs/{job_id}/events/{seq}.
+
+    Jobs and events carry an expires_at timestamp for a Firestore TTL policy. Recovery
+    (expired()) filters on lease_expires_at alone, so it runs on the automatic
+    single-field index; finished jobs have their lease cleared so they drop out of it.
+    """
+
+    name = "firestore"
+
+    def __init__(self, db, retention_seconds: float = DEFAULT_RETENTION_SECONDS):
+        self.db = db
+        self.retention_seconds = retention_seconds
+
+    def _expiry(self, created_at: float) -> datetime:
+        return datetime.fromtimestamp(created_at + self.retention_seconds, tz=timezone.utc)
+
+    def _job_ref(self, job_id: str):
+        return self.db.collection(JOB_COLLECTION).document(job_id)
+
+    async def create(self, job: Dict[str, Any]) -> None:
+        doc = {**job, "expires_at": self._expiry(job["created_at"])}
+        await asyncio.to_thread(self._job_ref(job["job_id"]).set, doc)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        snap = await asyncio.to_thread(self._job_ref(job_id).get)
+        return snap.to_dict() if snap.exists else None
+
+    async def update(self, job_id: str, fields: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self._job_ref(job_id).update, fields)
+
+    async def append_event(self, job_id: str, event: Dict[str, Any]) -> None:
+        def _write():
+            job_ref = self._job_ref(job_id)
+            batch = self.db.batch()
+            batch.set(job_ref.collection(JOB_EVENTS_SUBCOLLECTION).document(f"{event['seq']:06d}"), {
+                **event, "expires_at": self._expiry(event["at"]),
+            })
+            batch.update(job_ref, {"event_count": event["seq"]})
+            batch.commit()
+
+        await asyncio.to_thread(_write)
+
+    async def events_after(self, job_id: str, after_seq: int) -> List[Dict[str, Any]]:
+        def _read():
+            query = (
+                self._job_ref(job_id).collection(JOB_EVENTS_SUBCOLLECTION)
+                .where("seq", ">", after_seq).order_by("seq")
+            )
+            events = []
+            for snap in query.stream():
+                event = snap.to_dict() or {}
+                event.pop("expires_at", None)
+                events.append(event)
+            return events
+
+        return await asyncio.to_thread(_read)
+
+    async def list_for_user(self, account_id: str, aac_user_id: str, limit: int) -> List[Dict[str, Any]]:
+        def _read():
+            # Equality filters only, so no composite index is needed; sorted here.
+            query = (
+                self.db.collection(JOB_COLLECTION)
+                .where("account_id", "==", account_id)
+                .where("aac_user_id", "==", aac_user_id)
+            )
+            return [snap.to_dict() or {} for snap in query.stream()]
+
+        jobs = await asyncio.to_thread(_read)
+        jobs.sort(key=lambda job: job.get("created_at") or 0, reverse=True)
+        return jobs[:limit]
+
+    async def renew_leases(self, job_ids: List[str], owner: str, expires_at: float) -> None:
+        def _write():
+            batch = self.db.batch()
+            for job_id in job_ids:
+                batch.update(self._job_ref(job_id), {"lease_owner": owner, "lease_expires_at": expires_at})
+            batch.commit()
+
+        if job_ids:
+            await asyncio.to_thread(_write)
+
+    async def expired(self, now: float, limit: int) -> List[Dict[str, Any]]:
+        def _read():
+            query = self.db.collection(JOB_COLLECTION).where("lease_expires_at", "<=", now).limit(limit)
+            jobs, finished = [], []
+            for snap in query.stream():
+                job = snap.to_dict() or {}
+                if job.get("status") in TERMINAL_STATUSES:
+                    finished.append(snap.reference)
+                else:
+                    jobs.append(job)
+            if finished:
+                # Jobs finished before leases were cleared on completion; clear them once.
+                batch = self.db.batch()
+                for ref in finished:
+                    batch.update(ref, FINISHED_LEASE)
+                batch.commit()
+            return jobs
+
+        return await asyncio.to_thread(_read)
+
+    async def claim(self, job_id: str, owner: str, expires_at: float, now: float) -> Optional[Dict[str, Any]]:
+        """Take over an expired lease, unless another instance changed the job since we read it."""
+        job_ref = self._job_ref(job_id)
+        try:
+            snap = await asyncio.to_thread(job_ref.get)
+            job = snap.to_dict() if snap.exists else None
+            if not job or job.get("status") in TERMINAL_STATUSES or (job.get("lease_expires_at") or 0) > now:
+                return None
+            await asyncio.to_thread(
+                job_ref.update,
+                {"lease_owner": owner, "lease_expires_at": expires_at},
+                option=self.db.write_option(last_update_time=snap.update_time),
+            )
+        except (gexc.FailedPrecondition, gexc.NotFound):
+            return None
+        job.update({"lease_owner": owner, "lease_expires_at": expires_at})
+        return job
+
+
+# --- engine ------------------------------------------------------------
+
+
+class JobEngine:
+    def __init__(
+        self,
+        store=None,
+        workers: int = DEFAULT_WORKERS,
+        per_user_concurrency: int = DEFAULT_PER_USER_CONCURRENCY,
+        max_queued_per_user: int = DEFAULT_MAX_QUEUED_PER_USER,
+        job_timeout_seconds: float = DEFAULT_JOB_TIMEOUT_SECONDS,
+    ):
+        self.store = store or InMemoryJobStore()
+        self.workers = max(1, workers)
+        self.per_user_concurrency = max(1, per_user_concurrency)
+        self.max_queued_per_user = max_queued_per_user
+        self.job_timeout_seconds = job_timeout_seconds
+        self.owner = uuid.uuid4().hex
+        self._handlers: Dict[str, JobHandler] = {}
+        # user -> job ids waiting; users are served in rotation (moved to the end when served)
+        self._queues: "OrderedDict[UserKey, deque[Dict[str, Any]]]" = OrderedDict()
+        self._running: Dict[str, UserKey] = {}
+        self._running_per_user: Dict[UserKey, int] = {}
+        self._event_seq: Dict[str, int] = {}
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._ready: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self.counters: Dict[str, int] = {
+            "submitted": 0,
+            "rejected_queue_full": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "timeouts": 0,
+            "recovered": 0,
+            "interrupted": 0,
+            "events": 0,
+        }
+
+    # --- lifecycle -----------------------------------------------------
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        self._handlers[kind] = handler
+
+    def use_store(self, store) -> None:
+        """Choose the backend; call before start()."""
+        self.store = store
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._ready = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._heartbeat_loop()))
+        logging.info(f"✅ Job engine started ({self.workers} workers, {self.store.name} store)")
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Queued jobs are released so another instance can pick them up right away.
+        queued = [job["job_id"] for queue in self._queues.values() for job in queue]
+        self._queues.clear()
+        if queued:
+            try:
+                await self.store.renew_leases(queued, "", 0)
+            except Exception as e:
+                logging.warning(f"Could not release {len(queued)} queued job(s): {e}")
+
+    # --- submitting and reading ----------------------------------------
+
+    async def submit(self, kind: str, account_id: str, aac_user_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        user_key = (account_id, aac_user_id)
+        if len(self._queues.get(user_key, ())) >= self.max_queued_per_user:
+            self.counters["rejected_queue_full"] += 1
+            raise JobQueueFull(f"Too many queued jobs for this user (max {self.max_queued_per_user})")
+        now = time.time()
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "kind": kind,
+            "account_id": account_id,
+            "aac_user_id": aac_user_id,
+            "payload": payload,
+            "status": STATUS_QUEUED,
+            "event_count": 0,
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "started_at": None,
+            "finished_at": None,
+            "lease_owner": self.owner,
+            "lease_expires_at": now + LEASE_SECONDS,
+        }
+        await self.store.create(job)
+        self._event_seq[job["job_id"]] = 0
+        self.counters["submitted"] += 1
+        self._enqueue(job)
+        return job
+
+    async def get_job(self, job_id: str, account_id: str, aac_user_id: str) -> Optional[Dict[str, Any]]:
+        """The job, if it exists and belongs to this user."""
+        job = await self.store.get(job_id)
+        if not job or job.get("account_id") != account_id or job.get("aac_user_id") != aac_user_id:
+            return None
+        return job
+
+    async def list_jobs(self, account_id: str, aac_user_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+        return await self.store.list_for_user(account_id, aac_user_id, limit)
+
+    async def stream(self, job_id: str, after_seq: int = 0) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Events after after_seq, then live ones until the job finishes. Yields None as a
+        keep-alive when nothing happened for a while. Jobs running on another instance
+        are followed by polling the store.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        try:
+            poll = True
+            while True:
+                if poll:
+                    for event in await self.store.events_after(job_id, after_seq):
+                        yield event
+                        after_seq = event["seq"]
+                    job = await self.store.get(job_id)
+                    if not job or job.get("status") in TERMINAL_STATUSES:
+                        # The final status event is written before the job's status, so it was replayed above.
+                        return
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=STREAM_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    poll = True
+                    yield None
+                    continue
+                poll = False
+                if event["seq"] > after_seq:
+                    yield event
+                    after_seq = event["seq"]
+                if event["type"] == "status" and (event.get("data") or {}).get("status") in TERMINAL_STATUSES:
+                    return
+        finally:
+            subscribers = self._subscribers.get(job_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    self._subscribers.pop(job_id, None)
+
+    async def emit(self, job_id: str, event_type: str, stage: str = "", message: str = "", data: Any = None) -> None:
+        seq = self._event_seq.get(job_id, 0) + 1
+        self._event_seq[job_id] = seq
+        event = {"seq": seq, "type": event_type, "stage": stage, "message": message, "data": data, "at": time.time()}
+        await self.store.append_event(job_id, event)
+        self.counters["events"] += 1
+        for queue in self._subscribers.get(job_id, ()):
+            queue.put_nowait(event)
+
+    # --- scheduling ----------------------------------------------------
+
+    def _enqueue(self, job: Dict[str, Any]) -> None:
+        user_key = (job["account_id"], job["aac_user_id"])
+        self._queues.setdefault(user_key, deque()).append(job)
+        if self._ready is not None:
+            self._ready.set()
+
+    def _pop(self) -> Optional[Dict[str, Any]]:
+        """Next job from the first user (in rotation order) below the per-user cap."""
+        for user_key, queue in self._queues.items():
+            if self._running_per_user.get(user_key, 0) >= self.per_user_concurrency:
+                continue
+            job = queue.popleft()
+            if queue:
+                self._queues.move_to_end(user_key)
+            else:
+                del self._queues[user_key]
+            return job
+        return None
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job = self._pop()
+            if job is None:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            await self._run(job)
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        job_id = job["job_id"]
+        user_key = (job["account_id"], job["aac_user_id"])
+        self._running[job_id] = user_key
+        self._running_per_user[user_key] = self._running_per_user.get(user_key, 0) + 1
+        self._event_seq.setdefault(job_id, job.get("event_count") or 0)
+        ctx = JobContext(self, job)
+        token = current_job.set(ctx)
+        try:
+            await self.store.update(job_id, {"status": STATUS_RUNNING, "started_at": time.time()})
+            await self.emit(job_id, "status", data={"status": STATUS_RUNNING})
+            try:
+                result = await asyncio.wait_for(self._handlers[job["kind"]](ctx), timeout=self.job_timeout_seconds)
+                final = {"status": STATUS_SUCCEEDED, "result": result, "error": None}
+                self.counters["succeeded"] += 1
+            except asyncio.TimeoutError:
+                self.counters["timeouts"] += 1
+                self.counters["failed"] += 1
+                final = {"status": STATUS_FAILED, "result": None,
+                         "error": {"status_code": 504, "detail": f"Job timed out after {self.job_timeout_seconds}s"}}
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.counters["failed"] += 1
+                final = {"status": STATUS_FAILED, "result": None, "error": _error_payload(e)}
+                if final["error"]["status_code"] >= 500:
+                    logging.error(f"Job {job_id} ({job['kind']}) failed: {e}", exc_info=True)
+            await self.emit(job_id, "status", data={"status": final["status"], "error": final["error"]})
+            await self.store.update(job_id, {**final, "finished_at": time.time(), **FINISHED_LEASE})
+        except asyncio.CancelledError:
+            self.counters["interrupted"] += 1
+            raise
+        except Exception as e:
+            # The store failed; the lease runs out and another instance marks the job failed.
+            logging.error(f"Job {job_id} ({job['kind']}) could not record its state: {e}", exc_info=True)
+        finally:
+            current_job.reset(token)
+            self._running.pop(job_id, None)
+            self._event_seq.pop(job_id, None)
+            remaining = self._running_per_user.get(user_key, 1) - 1
+            if remaining > 0:
+                self._running_per_user[user_key] = remaining
+            else:
+                self._running_per_user.pop(user_key, None)
+            if self._ready is not None:
+                self._ready.set()
+
+    # --- leases --------------------------------------------------------
+
+    async def _heartbeat_loop(self) -> None:
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL_SECONDS)
+            try:
+                await self.heartbeat()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning(f"Job heartbeat failed: {e}")
+
+    async def heartbeat(self, now: Optional[float] = None) -> int:
+        """Renew this instance's leases and adopt jobs whose instance died. Returns jobs adopted."""
+        now = now or time.time()
+        mine = list(self._running) + [job["job_id"] for queue in self._queues.values() for job in queue]
+        await self.store.renew_leases(mine, self.owner, now + LEASE_SECONDS)
+        if isinstance(self.store, InMemoryJobStore):
+            self.store.purge_before(now - DEFAULT_RETENTION_SECONDS)
+
+        adopted = 0
+        for job in await self.store.expired(now, limit=20):
+            if job.get("job_id") in mine or job.get("kind") not in self._handlers:
+                continue
+            claimed = await self.store.claim(job["job_id"], self.owner, now + LEASE_SECONDS, now)
+            if claimed is None:
+                continue
+            if claimed["status"] == STATUS_QUEUED:
+                self.counters["recovered"] += 1
+                self._event_seq[claimed["job_id"]] = claimed.get("event_count") or 0
+                self._enqueue(claimed)
+                adopted += 1
+                logging.info(f"♻️ Adopted queued job {claimed['job_id']} ({claimed['kind']})")
+            else:
+                # Never re-run a job that may have partly saved; report it instead.
+                self.counters["interrupted"] += 1
+                self._event_seq[claimed["job_id"]] = claimed.get("event_count") or 0
+                error = {"status_code": 503, "detail": "The server running this job stopped; please try again"}
+                await self.emit(claimed["job_id"], "status", data={"status": STATUS_FAILED, "error": error})
+                self._event_seq.pop(claimed["job_id"], None)
+                await self.store.update(claimed["job_id"], {
+                    "status": STATUS_FAILED, "error": error, "finished_at": now, **FINISHED_LEASE,
+                })
+        return adopted
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "store": self.store.name,
+            "workers": self.workers,
+            "queued": sum(len(queue) for queue in self._queues.values()),
+            "queued_users": len(self._queues),
+            "running": len(self._running),
+            "subscribers": sum(len(s) for s in self._subscribers.values()),
+            **self.counters,
+        }
+
+
+# Global singleton instance
+job_engine = JobEngine()
@@ -0,0 +1,311 @@
+"""
+Execution layer for blocking LLM SDK calls (Gemini, OpenAI).
+
+The SDK calls are synchronous. Running them through asyncio.to_thread put every
+in-flight LLM request on the default executor, which every Firestore call in the
+app shares, so an LLM burst starved unrelated reads. Here:
+
+- calls run on a dedicated, bounded thread pool (LLM_EXECUTOR_MAX_WORKERS);
+- each model has an AIMD concurrency limit: +1/limit per success, halved on a
+  429/quota signal, trimmed when latency climbs well above its running average.
+  Callers over the limit wait in a per-model FIFO queue;
+- each model has a circuit breaker. After CIRCUIT_FAILURE_THRESHOLD consecutive
+  overload/unavailable failures, calls fail at once with CircuitOpenError (a
+  ServiceUnavailable, so existing failover paths treat it as such) until a probe
+  succeeds after the cooldown.
+
+Per-model queue depth, limits, breaker state and latency percentiles are in get_stats().
+"""
+
+import asyncio
+import collections
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional
+
+import google.api_core.exceptions
+
+LLM_EXECUTOR_MAX_WORKERS = int(os.getenv("LLM_EXECUTOR_MAX_WORKERS", "48"))
+DEFAULT_INITIAL_LIMIT = 8
+DEFAULT_MAX_LIMIT = int(os.getenv("LLM_MODEL_MAX_CONCURRENCY", "32"))
+MIN_LIMIT = 1
+DECREASE_FACTOR = 0.5
+LATENCY_DECREASE_FACTOR = 0.9
+LATENCY_TOLERANCE = 2.5  # a call this many times slower than the running average counts as congestion
+LATENCY_EWMA_ALPHA = 0.05
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_COOLDOWN_SECONDS = 30.0
+LATENCY_SAMPLES = 256
+
+_OVERLOAD_TYPES = (google.api_core.exceptions.TooManyRequests, google.api_core.exceptions.ResourceExhausted)
+_UNAVAILABLE_TYPES = (
+    google.api_core.exceptions.ServiceUnavailable,
+    google.api_core.exceptions.InternalServerError,
+    google.api_core.exceptions.DeadlineExceeded,
+    TimeoutError,
+)
+_OVERLOAD_MARKERS = ("429", "too many requests", "resource exhausted", "rate limit", "quota exceeded")
+_UNAVAILABLE_MARKERS = ("503", "service unavailable", "internal server error", "deadline exceeded", "timed out")
+
+
+class CircuitOpenError(google.api_core.exceptions.ServiceUnavailable):
+    """Raised without calling the model while its circuit breaker is open."""
+
+
+def is_overload_error(exc: BaseException) -> bool:
+    if isinstance(exc, _OVERLOAD_TYPES):
+        return True
+    message = str(exc).lower()
+    return any(marker in message for marker in _OVERLOAD_MARKERS)
+
+
+def is_unavailable_error(exc: BaseException) -> bool:
+    if isinstance(exc, CircuitOpenError):
+        return False
+    if isinstance(exc, _UNAVAILABLE_TYPES):
+        return True
+    message = str(exc).lower()
+    return any(marker in message for marker in _UNAVAILABLE_MARKERS)
+
+
+class AIMDLimiter:
+    def __init__(self, initial: int = DEFAULT_INITIAL_LIMIT, max_limit: int = DEFAULT_MAX_LIMIT):
+        self.limit = float(initial)
+        self.max_limit = max_limit
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = collections.deque()
+        self._latency_ewma: Optional[float] = None
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> None:
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed to us just as we were cancelled; pass it on.
+                self.in_flight -= 1
+                self._wake()
+            else:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            raise
+
+    def release(self, latency_seconds: Optional[float] = None, overloaded: bool = False) -> None:
+        self.in_flight -= 1
+        if overloaded:
+            self.limit = max(MIN_LIMIT, self.limit * DECREASE_FACTOR)
+        elif latency_seconds is not None:
+            average = self._latency_ewma
+            if average is not None and latency_seconds > average * LATENCY_TOLERANCE:
+                self.limit = max(MIN_LIMIT, self.limit * LATENCY_DECREASE_FACTOR)
+            else:
+                self.limit = min(self.max_limit, self.limit + 1.0 / max(self.limit, 1.0))
+            self._latency_ewma = latency_seconds if average is None else (
+                average + LATENCY_EWMA_ALPHA * (latency_seconds - average)
+            )
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD, cooldown_seconds: float = CIRCUIT_COOLDOWN_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown_seconds:
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def would_allow(self) -> bool:
+        """allow() without claiming the half-open probe."""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            return time.monotonic() - self.opened_at >= self.cooldown_seconds
+        return not self._probe_in_flight
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self.state = self.CLOSED
+        self._probe_in_flight = False
+
+    def record_failure(self) -> bool:
+        """Returns True if this failure opened the circuit."""
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or (
+            self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold
+        ):
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            return True
+        return False
+
+    def record_neutral(self) -> None:
+        # A non-capacity error (bad request, safety block) says nothing about health.
+        self._probe_in_flight = False
+
+
+class _ModelLane:
+    __slots__ = ("limiter", "breaker", "latencies", "queue_waits", "counters")
+
+    def __init__(self):
+        self.limiter = AIMDLimiter()
+        self.breaker = CircuitBreaker()
+        self.latencies: Deque[float] = collections.deque(maxlen=LATENCY_SAMPLES)
+        self.queue_waits: Deque[float] = collections.deque(maxlen=LATENCY_SAMPLES)
+        self.counters: Dict[str, int] = {
+            "calls": 0,
+            "successes": 0,
+            "overloads": 0,
+            "unavailable": 0,
+            "other_errors": 0,
+            "rejected_open_circuit": 0,
+            "circuit_opens": 0,
+            "cancelled": 0,
+        }
+
+
+def _percentile_ms(samples, pct: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))] * 1000, 1)
+
+
+class LLMExecutionLayer:
+    def __init__(self, max_workers: int = LLM_EXECUTOR_MAX_WORKERS):
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lanes: Dict[str, _ModelLane] = {}
+
+    def _lane(self, model_key: str) -> _ModelLane:
+        lane = self._lanes.get(model_key)
+        if lane is None:
+            lane = self._lanes[model_key] = _ModelLane()
+        return lane
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="llm")
+        return self._executor
+
+    def is_available(self, model_key: str) -> bool:
+        """False while the model's circuit is open (a caller can go straight to a fallback)."""
+        return self._lane(model_key).breaker.would_allow()
+
+    def latency_percentile(self, model_key: str, pct: float, min_samples: int = 1) -> Optional[float]:
+        """Recent successful-call latency (seconds) at `pct`, or None with fewer than min_samples."""
+        lane = self._lanes.get(model_key)
+        if lane is None or len(lane.latencies) < max(1, min_samples):
+            return None
+        ordered = sorted(lane.latencies)
+        return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+    async def run(self, model_key: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Runs a blocking SDK call for `model_key` under its limiter and breaker."""
+        lane = self._lane(model_key)
+        if not lane.breaker.allow():
+            lane.counters["rejected_open_circuit"] += 1
+            raise CircuitOpenError(f"Circuit open for {model_key}; skipping call")
+        queued_at = time.perf_counter()
+        try:
+            await lane.limiter.acquire()
+        except BaseException:
+            lane.breaker.record_neutral()
+            raise
+        started = time.perf_counter()
+        lane.queue_waits.append(started - queued_at)
+        lane.counters["calls"] += 1
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self.executor, lambda: fn(*args, **kwargs))
+        except asyncio.CancelledError:
+            # The caller gave up (e.g. a hedged request lost). The SDK call finishes on its
+            # thread, but the slot goes back now and the outcome says nothing about health.
+            lane.limiter.release(None)
+            lane.breaker.record_neutral()
+            lane.counters["cancelled"] += 1
+            raise
+        except BaseException as exc:
+            overloaded = isinstance(exc, Exception) and is_overload_error(exc)
+            unavailable = isinstance(exc, Exception) and not overloaded and is_unavailable_error(exc)
+            lane.limiter.release(None, overloaded=overloaded)
+            if overloaded or unavailable:
+                lane.counters["overloads" if overloaded else "unavailable"] += 1
+                if lane.breaker.record_failure():
+                    lane.counters["circuit_opens"] += 1
+                    logging.warning(
+                        f"⚡ Circuit opened for {model_key} after {lane.breaker.consecutive_failures} failures "
+                        f"(cooldown {lane.breaker.cooldown_seconds:.0f}s)"
+                    )
+            else:
+                lane.counters["other_errors"] += 1
+                lane.breaker.record_neutral()
+            raise
+        latency = time.perf_counter() - started
+        lane.latencies.append(latency)
+        lane.limiter.release(latency)
+        lane.breaker.record_success()
+        lane.counters["successes"] += 1
+        return result
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        models = {}
+        for model_key, lane in self._lanes.items():
+            models[model_key] = {
+                "limit": round(lane.limiter.limit, 2),
+                "in_flight": lane.limiter.in_flight,
+                "queued": lane.limiter.queued,
+                "circuit": lane.breaker.state,
+                "latency_p50_ms": _percentile_ms(lane.latencies, 50),
+                "latency_p95_ms": _percentile_ms(lane.latencies, 95),
+                "latency_p99_ms": _percentile_ms(lane.latencies, 99),
+                "queue_wait_p95_ms": _percentile_ms(lane.queue_waits, 95),
+                **lane.counters,
+            }
+        return {"executor_max_workers": self.max_workers, "models": models}
+
+
+# Global singleton instance
+llm_execution = LLMExecutionLayer()
@@ -0,0 +1,182 @@
+"""
+Hedged LLM requests for /llm tail latency (opt-in: LLM_HEDGING_ENABLED=true).
+
+Most slow /llm responses are a primary model call that eventually succeeds, and
+the fallback chain only starts after the primary fails. With hedging on:
+
+- the primary call starts as usual. If it hasn't finished after the hedge delay,
+  the same prompt goes to a secondary model as well;
+- the hedge delay is a percentile of the primary model's recent latency (from
+  llm_execution), clamped to the profile's [min_delay, max_delay];
+- the first response that passes the caller's validation (parses and keeps at
+  least one option after enforce_ai_option_overrides) wins. The other call is
+  cancelled;
+- each profile (FAST / RICH) has a hedge budget. Every request earns `budget`
+  tokens (up to `burst`) and a hedge costs one, so at most that fraction of
+  requests send a second call.
+
+Hedges fired, won by each side, skipped for lack of budget and wasted (both
+sides failed) are counted per profile in get_stats().
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from llm_execution import llm_execution
+
+LLM_HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "false").lower() == "true"
+MIN_LATENCY_SAMPLES = 20
+
+PROFILE_FAST = "FAST"
+PROFILE_RICH = "RICH"
+
+
+class HedgePolicy:
+    def __init__(self, percentile: float, min_delay_seconds: float, max_delay_seconds: float, budget: float, burst: float = 10.0):
+        self.percentile = percentile
+        self.min_delay_seconds = min_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.budget = budget
+        self.burst = burst
+        self.tokens = burst
+
+    @classmethod
+    def from_env(cls, profile: str, percentile: str, min_delay_ms: str, max_delay_ms: str, budget: str) -> "HedgePolicy":
+        return cls(
+            percentile=float(os.getenv(f"LLM_HEDGE_{profile}_PERCENTILE", percentile)),
+            min_delay_seconds=int(os.getenv(f"LLM_HEDGE_{profile}_MIN_DELAY_MS", min_delay_ms)) / 1000,
+            max_delay_seconds=int(os.getenv(f"LLM_HEDGE_{profile}_MAX_DELAY_MS", max_delay_ms)) / 1000,
+            budget=float(os.getenv(f"LLM_HEDGE_{profile}_BUDGET", budget)),
+        )
+
+    def delay_for(self, model_key: str) -> float:
+        observed = llm_execution.latency_percentile(model_key, self.percentile, MIN_LATENCY_SAMPLES)
+        if observed is None:
+            return self.max_delay_seconds
+        return min(self.max_delay_seconds, max(self.min_delay_seconds, observed))
+
+    def earn(self) -> None:
+        self.tokens = min(self.burst, self.tokens + self.budget)
+
+    def spend(self) -> bool:
+        if self.tokens < 1.0:
+            return False
+        self.tokens -= 1.0
+        return True
+
+
+class LLMHedger:
+    def __init__(self, enabled: bool = LLM_HEDGING_ENABLED, policies: Optional[Dict[str, HedgePolicy]] = None):
+        self.enabled = enabled
+        self.policies = policies or {
+            # Button taps: hedge early, but on at most ~10% of requests.
+            PROFILE_FAST: HedgePolicy.from_env(PROFILE_FAST, "90", "400", "3000", "0.10"),
+            # Rich prompts are long and costly; hedge later and more rarely.
+            PROFILE_RICH: HedgePolicy.from_env(PROFILE_RICH, "95", "1500", "8000", "0.05"),
+        }
+        self.counters: Dict[str, Dict[str, int]] = {
+            profile: {
+                "requests": 0,
+                "hedges_fired": 0,
+                "won_primary": 0,
+                "won_secondary": 0,
+                "skipped_budget": 0,
+                "skipped_unavailable": 0,
+                "wasted": 0,
+            }
+            for profile in self.policies
+        }
+
+    async def run(
+        self,
+        profile: str,
+        primary_key: str,
+        primary: Callable[[], Awaitable[str]],
+        secondary_key: Optional[str],
+        secondary: Optional[Callable[[], Awaitable[str]]],
+        validate: Callable[[str], bool],
+    ) -> str:
+        """
+        Returns the first valid response text. Without hedging (disabled, no secondary,
+        or the primary answers within the delay) this is just `await primary()`. If
+        neither side produces a valid response, the primary's outcome (text or
+        exception) is returned/raised so callers handle it exactly as before.
+        """
+        policy = self.policies.get(profile)
+        if not self.enabled or policy is None or secondary is None:
+            return await primary()
+        counters = self.counters[profile]
+        counters["requests"] += 1
+        policy.earn()
+
+        delay = policy.delay_for(primary_key)
+        primary_task = asyncio.ensure_future(primary())
+        try:
+            done, _ = await asyncio.wait({primary_task}, timeout=delay)
+            if done:
+                return primary_task.result()
+            if secondary_key is not None and not llm_execution.is_available(secondary_key):
+                counters["skipped_unavailable"] += 1
+                return await primary_task
+            if not policy.spend():
+                counters["skipped_budget"] += 1
+                return await primary_task
+
+            counters["hedges_fired"] += 1
+            hedge_started = time.perf_counter()
+            logging.info(f"🪁 Hedging {profile} request: {primary_key} silent for {delay * 1000:.0f}ms, firing {secondary_key}")
+            secondary_task = asyncio.ensure_future(secondary())
+            try:
+                return await self._first_valid(profile, primary_task, secondary_task, validate, hedge_started)
+            finally:
+                if not secondary_task.done():
+                    secondary_task.cancel()
+        finally:
+            if not primary_task.done():
+                primary_task.cancel()
+
+    async def _first_valid(self, profile, primary_task, secondary_task, validate, hedge_started) -> str:
+        counters = self.counters[profile]
+        pending = {primary_task, secondary_task}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    continue
+                text = task.result()
+                try:
+                    valid = validate(text)
+                except Exception as e:
+                    logging.warning(f"Hedge validation error ({profile}): {e}")
+                    valid = False
+                if valid:
+                    won = "won_primary" if task is primary_task else "won_secondary"
+                    counters[won] += 1
+                    logging.info(
+                        f"🪁 Hedged {profile} request {won.replace('_', ' by ')} "
+                        f"{(time.perf_counter() - hedge_started) * 1000:.0f}ms after the hedge fired"
+                    )
+                    return text
+        counters["wasted"] += 1
+        logging.warning(f"🪁 Hedged {profile} request: neither response was usable")
+        return primary_task.result()
+
+    def get_stats(self) -> Dict[str, Any]:
+        profiles = {}
+        for profile, policy in self.policies.items():
+            profiles[profile] = {
+                "percentile": policy.percentile,
+                "min_delay_ms": round(policy.min_delay_seconds * 1000),
+                "max_delay_ms": round(policy.max_delay_seconds * 1000),
+                "budget": policy.budget,
+                "budget_tokens": round(policy.tokens, 2),
+                **self.counters[profile],
+            }
+        return {"enabled": self.enabled, "profiles": profiles}
+
+
+# Global singleton instance
+llm_hedger = LLMHedger()
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Shared runner for one-off migrations/backfills over a Firestore collection
+(aac_images scripts: backfill_aac_image_translations.py,
+normalize_tags_to_base_forms.py, update_image_tags.py).
+
+- documents are read in pages (ordered by document id, cursor = last id), and the
+  next page is fetched while the current one is processed. The collection is
+  never held in memory;
+- a handler's prepare_page() sees the whole page first. That lets a migration
+  batch work across documents, e.g. one translation request for many docs' tags;
+- process() runs for each document with at most `workers` in flight and returns
+  the update for that document (or None);
+- updates go through a BulkWriter, which batches, rate-limits and retries writes;
+- after each page's writes are flushed, the last document id is saved to a JSON
+  checkpoint. A rerun with the same name and filters resumes after it
+  (--restart ignores it). Documents whose process() raised or whose write failed
+  are recorded in the checkpoint, and it never advances past the first of them,
+  so a rerun retries them. A completed checkpoint is not rerun without --restart.
+  Dry runs never write a checkpoint;
+- a progress line with throughput is printed after every page.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_PAGE_SIZE = 300
+DEFAULT_WORKERS = 8
+DEFAULT_CHECKPOINT_DIR = ".migration_checkpoints"
+DOCUMENT_ID_FIELD = "__name__"
+
+Filter = Tuple[str, str, Any]
+
+
+def add_runner_arguments(parser: argparse.ArgumentParser) -> None:
+    """Flags shared by every script built on MigrationRunner."""
+    group = parser.add_argument_group("runner")
+    group.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE, help="Documents fetched per page")
+    group.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Documents processed concurrently")
+    group.add_argument("--checkpoint", default=None, help="Checkpoint file (default: .migration_checkpoints/<name>.json)")
+    group.add_argument("--restart", action="store_true", help="Ignore any saved checkpoint and start from the beginning")
+
+
+class MigrationHandler:
+    """Override process(); prepare_page() and describe() are optional."""
+
+    async def prepare_page(self, docs: List[Any]) -> None:
+        return None
+
+    async def process(self, doc) -> Optional[Dict[str, Any]]:
+        """Update for this document, or None to leave it unchanged."""
+        raise NotImplementedError
+
+    def describe(self, doc, update: Dict[str, Any]) -> str:
+        return ""
+
+
+class MigrationStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.pages = 0
+        self.processed = 0
+        self.updated = 0
+        self.skipped = 0
+        self.errors = 0
+        self.write_failures = 0
+        self.last_doc_id: Optional[str] = None
+        self.failed_doc_ids: List[str] = []
+
+    @property
+    def elapsed_seconds(self) -> float:
+        return time.perf_counter() - self.started
+
+    def rate(self, count: int) -> float:
+        elapsed = self.elapsed_seconds
+        return count / elapsed if elapsed > 0 else 0.0
+
+    def progress_line(self) -> str:
+        return (
+            f"page {self.pages}: {self.processed} processed, {self.updated} updated, {self.skipped} skipped, "
+            f"{self.errors} errors | {self.rate(self.processed):.1f} docs/s, {self.rate(self.updated):.1f} writes/s "
+            f"| {self.elapsed_seconds:.0f}s"
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "pages": self.pages,
+            "processed": self.processed,
+            "updated": self.updated,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "write_failures": self.write_failures,
+        }
+
+
+class MigrationRunner:
+    def __init__(
+        self,
+        db,
+        name: str,
+        handler: MigrationHandler,
+        collection: str = "aac_images",
+        filters: Sequence[Filter] = (),
+        page_size: int = DEFAULT_PAGE_SIZE,
+        workers: int = DEFAULT_WORKERS,
+        limit: int = 0,
+        dry_run: bool = False,
+        checkpoint_path: Optional[str] = None,
+        restart: bool = False,
+        verbose: bool = True,
+    ):
+        self.db = db
+        self.name = name
+        self.handler = handler
+        self.collection = collection
+        self.filters = list(filters)
+        self.page_size = max(1, page_size)
+        self.workers = max(1, workers)
+        self.limit = limit or 0
+        self.dry_run = dry_run
+        self.checkpoint_path = checkpoint_path or os.path.join(DEFAULT_CHECKPOINT_DIR, f"{name}.json")
+        self.restart = restart
+        self.verbose = verbose
+        self.stats = MigrationStats()
+        self._params = {"collection": collection, "filters": [list(map(str, f)) for f in self.filters]}
+        self._already_completed = False
+        # Set once a document fails; the checkpoint then stays before that document.
+        self._checkpoint_held = False
+
+    @classmethod
+    def from_args(cls, db, name: str, handler: MigrationHandler, args: argparse.Namespace, **kwargs) -> "MigrationRunner":
+        return cls(
+            db,
+            name,
+            handler,
+            page_size=args.page_size,
+            workers=args.workers,
+            checkpoint_path=args.checkpoint,
+            restart=args.restart,
+            **kwargs,
+        )
+
+    # --- checkpoint ----------------------------------------------------
+
+    def _load_checkpoint(self) -> Optional[str]:
+        if self.restart or not os.path.exists(self.checkpoint_path):
+            return None
+        try:
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Unreadable checkpoint {self.checkpoint_path} ({e}); starting from the beginning")
+            return None
+        if checkpoint.get("params") != self._params:
+            print(f"⚠️  Checkpoint {self.checkpoint_path} was written with different filters; starting from the beginning")
+            return None
+        if checkpoint.get("completed"):
+            print(f"ℹ️  Checkpoint says {self.name} already completed; use --restart to run it again")
+            self._already_completed = True
+            return None
+        print(f"↩️  Resuming {self.name} after document {checkpoint.get('last_doc_id')}")
+        return checkpoint.get("last_doc_id")
+
+    def _save_checkpoint(self, completed: bool = False) -> None:
+        if self.dry_run:
+            return
+        directory = os.path.dirname(self.checkpoint_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        payload = {
+            "name": self.name,
+            "params": self._params,
+            "last_doc_id": self.stats.last_doc_id,
+            "completed": completed,
+            "failed_doc_ids": self.stats.failed_doc_ids,
+            "stats": self.stats.to_dict(),
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    # --- reading -------------------------------------------------------
+
+    def _fetch_page_sync(self, after_id: Optional[str], page_size: int) -> List[Any]:
+        collection_ref = self.db.collection(self.collection)
+        query = collection_ref
+        for field, op, value in self.filters:
+            query = query.where(field, op, value)
+        query = query.order_by(DOCUMENT_ID_FIELD)
+        if after_id:
+            query = query.start_after({DOCUMENT_ID_FIELD: collection_ref.document(after_id)})
+        return list(query.limit(page_size).get())
+
+    def _next_page_size(self, fetched: int) -> int:
+        if not self.limit:
+            return self.page_size
+        return max(0, min(self.page_size, self.limit - fetched))
+
+    # --- writing -------------------------------------------------------
+
+    def _open_writer(self):
+        if self.dry_run:
+            return None
+        writer = self.db.bulk_writer()
+
+        def on_error(failure, _writer) -> bool:
+            retry = failure.attempts < 5
+            if not retry:
+                self.stats.write_failures += 1
+                self.stats.failed_doc_ids.append(failure.operation.reference.id)
+                print(f"✗ Write failed for {failure.operation.reference.id}: {failure.message}")
+            return retry
+
+        writer.on_write_error(on_error)
+        return writer
+
+    def _advance_checkpoint(self, docs: List[Any]) -> None:
+        """Move last_doc_id to the end of this page, or to just before its first failed document."""
+        if self._checkpoint_held:
+            return
+        failed = set(self.stats.failed_doc_ids)
+        for index, doc in enumerate(docs):
+            if doc.id in failed:
+                self._checkpoint_held = True
+                if index > 0:
+                    self.stats.last_doc_id = docs[index - 1].id
+                print(f"⚠️  {doc.id} failed; the checkpoint stays at {self.stats.last_doc_id} so a rerun retries it")
+                return
+        self.stats.last_doc_id = docs[-1].id
+
+    # --- run -----------------------------------------------------------
+
+    async def _process_doc(self, doc, semaphore: asyncio.Semaphore, writer) -> None:
+        async with semaphore:
+            try:
+                update = await self.handler.process(doc)
+            except Exception as e:
+                self.stats.errors += 1
+                self.stats.failed_doc_ids.append(doc.id)
+                print(f"✗ {doc.id}: {e}")
+                return
+        if not update:
+            self.stats.skipped += 1
+            return
+        self.stats.updated += 1
+        if self.verbose:
+            detail = self.handler.describe(doc, update)
+            prefix = "DRY-RUN UPDATE" if self.dry_run else "UPDATED"
+            print(f"{prefix} {doc.id}{': ' + detail if detail else ''}")
+        if writer is not None:
+            writer.update(doc.reference, update)
+
+    async def run(self) -> MigrationStats:
+        stats = self.stats
+        after_id = self._load_checkpoint()
+        if self._already_completed:
+            return stats
+        stats.last_doc_id = after_id
+        mode = "DRY RUN" if self.dry_run else "WRITE"
+        print(
+            f"▶️  {self.name} [{mode}] on {self.collection} {self.filters or ''} "
+            f"(page size {self.page_size}, {self.workers} workers)"
+        )
+
+        writer = self._open_writer()
+        semaphore = asyncio.Semaphore(self.workers)
+        fetched = 0
+        next_page = asyncio.create_task(asyncio.to_thread(self._fetch_page_sync, after_id, self._next_page_size(0)))
+        try:
+            while True:
+                docs = await next_page
+                if not docs:
+                    break
+                fetched += len(docs)
+                page_size = self._next_page_size(fetched)
+                # Read ahead while this page is processed.
+                next_page = (
+                    asyncio.create_task(asyncio.to_thread(self._fetch_page_sync, docs[-1].id, page_size))
+                    if len(docs) == self.page_size and page_size > 0 else None
+                )
+
+                try:
+                    await self.handler.prepare_page(docs)
+                except Exception as e:
+                    # Without the page-level work every doc on the page would be wrong; stop
+                    # here so the checkpoint still points before this page.
+                    print(f"✗ Page preparation failed after {stats.last_doc_id}: {e}")
+                    raise
+                await asyncio.gather(*(self._process_doc(doc, semaphore, writer) for doc in docs))
+                if writer is not None:
+                    await asyncio.to_thread(writer.flush)
+
+                stats.pages += 1
+                stats.processed += len(docs)
+                self._advance_checkpoint(docs)
+                self._save_checkpoint()
+                print(f"   {stats.progress_line()}")
+                if next_page is None:
+                    break
+            # With failures the run is not complete: a rerun resumes before the first one.
+            self._save_checkpoint(completed=not stats.failed_doc_ids)
+        finally:
+            if next_page is not None and not next_page.done():
+                next_page.cancel()
+            if writer is not None:
+                await asyncio.to_thread(writer.close)
+
+        print()
+        print("=" * 60)
+        print(f"📊 {self.name} summary{' (DRY RUN)' if self.dry_run else ''}:")
+        print(f"   Processed: {stats.processed}")
+        print(f"   Updated:   {stats.updated}")
+        print(f"   Skipped:   {stats.skipped}")
+        print(f"   Errors:    {stats.errors + stats.write_failures}")
+        if stats.failed_doc_ids:
+            print(f"   Failed:    {', '.join(stats.failed_doc_ids[:20])}{' ...' if len(stats.failed_doc_ids) > 20 else ''}")
+        print(f"   Throughput: {stats.rate(stats.processed):.1f} docs/s over {stats.elapsed_seconds:.1f}s")
+        print("=" * 60)
+        return stats
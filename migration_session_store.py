@@ -0,0 +1,507 @@
+"""
+Durable store for board-migration sessions (Accent MTI and TouchChat uploads).
+
+A parsed vocabulary can be hundreds of MB as Python dicts. The upload request
+parses it once, and the follow-up page/import requests may land on another
+worker or instance. So each session is written once to a compact file and
+read back lazily:
+
+- one SQLite file per session. Every page/board is its own row, msgpack-encoded
+  and zstd-compressed (zlib when zstandard isn't installed; the codec is
+  recorded in the file). An index of small per-item fields (page names, rids)
+  answers lookups without decoding any pages;
+- attachments (the TouchChat symbol database) are copied next to it, so the
+  extracted upload directory can be deleted straight after parsing;
+- MIGRATION_SESSION_DIR holds the files. It is shared by the workers on a host.
+  With configure_bucket() they are also uploaded to GCS, and another instance
+  downloads them on first access;
+- a small LRU of hot sessions keeps an open read-only connection and the items
+  decoded so far. Everything else stays on disk, so memory stays bounded;
+- sessions expire MIGRATION_SESSION_TTL_SECONDS after creation. Expired
+  sessions are removed on access and by a periodic sweep of disk and bucket.
+  A deleted session leaves a tombstone in the shared state backend, so copies
+  other workers/instances already downloaded are not served either.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from state_backend import state_store
+
+try:
+    import msgpack
+except ImportError:  # JSON is bulkier and slower but reads back the same data
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MIGRATION_SESSION_DIR = os.getenv("MIGRATION_SESSION_DIR") or os.path.join(tempfile.gettempdir(), "bravo_migration_sessions")
+MIGRATION_SESSION_TTL_SECONDS = int(os.getenv("MIGRATION_SESSION_TTL_SECONDS", "3600"))
+MIGRATION_SESSION_HOT_LIMIT = int(os.getenv("MIGRATION_SESSION_HOT_LIMIT", "4"))
+CLEANUP_INTERVAL_SECONDS = 600
+GCS_PREFIX = "migration-sessions/"
+SESSION_FILE = "session.sqlite3"
+
+
+def default_codec() -> str:
+    return f"{'msgpack' if msgpack is not None else 'json'}+{'zstd' if zstandard is not None else 'zlib'}"
+
+
+def _encoder(codec: str):
+    serializer, _, compression = codec.partition("+")
+    if (serializer == "msgpack" and msgpack is None) or (compression == "zstd" and zstandard is None):
+        raise RuntimeError(f"codec {codec} needs a library that is not installed")
+    compress = zstandard.ZstdCompressor(level=3).compress if compression == "zstd" else (lambda data: zlib.compress(data, 6))
+
+    def encode(value: Any) -> bytes:
+        if serializer == "msgpack":
+            return compress(msgpack.packb(value, use_bin_type=True))
+        return compress(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+
+    return encode
+
+
+def _decoder(codec: str):
+    serializer, _, compression = codec.partition("+")
+    if (serializer == "msgpack" and msgpack is None) or (compression == "zstd" and zstandard is None):
+        raise RuntimeError(f"codec {codec} needs a library that is not installed")
+    decompress = zstandard.ZstdDecompressor().decompress if compression == "zstd" else zlib.decompress
+
+    def decode(blob: bytes) -> Any:
+        if serializer == "msgpack":
+            return msgpack.unpackb(decompress(blob), raw=False, strict_map_key=False)
+        return json.loads(decompress(blob))
+
+    return decode
+
+
+def _valid_session_id(session_id: str) -> bool:
+    # Session ids become file and object names; only accept the uuid4s we hand out.
+    try:
+        return str(uuid.UUID(str(session_id))) == session_id
+    except ValueError:
+        return False
+
+
+def _write_session_file(path: str, meta: Dict[str, Any], items: Dict[str, Any], index_fields: Iterable[str]) -> int:
+    codec = default_codec()
+    encode = _encoder(codec)
+    index = {
+        str(item_id): {field: item.get(field) for field in index_fields} if isinstance(item, dict) else {}
+        for item_id, item in items.items()
+    }
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value BLOB NOT NULL)")
+        conn.execute("CREATE TABLE items (item_id TEXT PRIMARY KEY, position INTEGER NOT NULL, value BLOB NOT NULL)")
+        conn.execute("INSERT INTO meta VALUES ('codec', ?)", (codec.encode(),))
+        conn.execute("INSERT INTO meta VALUES ('meta', ?)", (encode(meta),))
+        conn.execute("INSERT INTO meta VALUES ('index', ?)", (encode(index),))
+        conn.executemany(
+            "INSERT INTO items VALUES (?, ?, ?)",
+            ((str(item_id), position, encode(item)) for position, (item_id, item) in enumerate(items.items())),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+    return os.path.getsize(path)
+
+
+class MigrationSession:
+    def __init__(self, session_id: str, path: str, meta: Dict[str, Any], index: Dict[str, Dict[str, Any]], codec: str):
+        self.session_id = session_id
+        self.path = path
+        self.meta = meta
+        self.index = index
+        self.codec = codec
+        self._decode = _decoder(codec)
+        self._items: Dict[str, Any] = {}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    kind = property(lambda self: self.meta["kind"])
+    account_id = property(lambda self: self.meta["account_id"])
+    aac_user_id = property(lambda self: self.meta["aac_user_id"])
+    expires_at = property(lambda self: self.meta["expires_at"])
+    collection = property(lambda self: self.meta["collection"])
+
+    def owned_by(self, account_id: str, aac_user_id: str) -> bool:
+        return self.account_id == account_id and self.aac_user_id == aac_user_id
+
+    def expired(self) -> bool:
+        return self.expires_at <= time.time()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        return self._conn
+
+    def get_item_sync(self, item_id: str) -> Optional[Any]:
+        item_id = str(item_id)
+        if item_id not in self.index:
+            return None
+        with self._lock:
+            if item_id not in self._items:
+                row = self._connection().execute("SELECT value FROM items WHERE item_id = ?", (item_id,)).fetchone()
+                if row is None:
+                    return None
+                self._items[item_id] = self._decode(row[0])
+            return self._items[item_id]
+
+    def load_items_sync(self) -> Dict[str, Any]:
+        with self._lock:
+            if len(self._items) < len(self.index):
+                for item_id, blob in self._connection().execute("SELECT item_id, value FROM items ORDER BY position"):
+                    if item_id not in self._items:
+                        self._items[item_id] = self._decode(blob)
+            return {item_id: self._items[item_id] for item_id in self.index if item_id in self._items}
+
+    async def get_item(self, item_id: str) -> Optional[Any]:
+        if str(item_id) in self._items:
+            return self._items[str(item_id)]
+        return await asyncio.to_thread(self.get_item_sync, item_id)
+
+    async def load_items(self) -> Dict[str, Any]:
+        """Every page/board, in upload order."""
+        return await asyncio.to_thread(self.load_items_sync)
+
+    async def parsed_data(self) -> Dict[str, Any]:
+        """The parsed upload as it was stored (top-level fields plus every item)."""
+        return {**self.meta["data"], self.collection: await self.load_items()}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._items.clear()
+
+
+class MigrationSessionStore:
+    def __init__(
+        self,
+        root_dir: str = MIGRATION_SESSION_DIR,
+        ttl_seconds: int = MIGRATION_SESSION_TTL_SECONDS,
+        hot_limit: int = MIGRATION_SESSION_HOT_LIMIT,
+    ):
+        self.root_dir = root_dir
+        self.ttl_seconds = ttl_seconds
+        self.hot_limit = max(1, hot_limit)
+        self._hot: "OrderedDict[str, MigrationSession]" = OrderedDict()
+        self._bucket = None
+        self._tombstones = state_store.namespace("migration_session_tombstones", ttl=ttl_seconds)
+        self._cleanup_task: Optional[asyncio.Task] = None
+        self.counters: Dict[str, int] = {
+            "created": 0,
+            "hot_hits": 0,
+            "disk_loads": 0,
+            "gcs_loads": 0,
+            "misses": 0,
+            "expired": 0,
+            "deleted": 0,
+            "bytes_written": 0,
+            "errors": 0,
+        }
+
+    def configure_bucket(self, bucket) -> None:
+        """Attach a google.cloud.storage Bucket so other instances can load sessions (None to detach)."""
+        self._bucket = bucket
+
+    def _session_dir(self, session_id: str) -> str:
+        return os.path.join(self.root_dir, session_id)
+
+    def _blob(self, session_id: str, name: str):
+        return self._bucket.blob(f"{GCS_PREFIX}{session_id}/{name}")
+
+    # --- hot LRU --------------------------------------------------------
+
+    def _remember(self, session: MigrationSession) -> None:
+        previous = self._hot.pop(session.session_id, None)
+        if previous is not None and previous is not session:
+            previous.close()
+        self._hot[session.session_id] = session
+        while len(self._hot) > self.hot_limit:
+            _, evicted = self._hot.popitem(last=False)
+            evicted.close()
+
+    def _forget(self, session_id: str) -> None:
+        session = self._hot.pop(session_id, None)
+        if session is not None:
+            session.close()
+
+    # --- write ----------------------------------------------------------
+
+    def _create_sync(self, session_id: str, meta: Dict[str, Any], items: Dict[str, Any],
+                     index_fields: Tuple[str, ...], attachments: Dict[str, str]) -> MigrationSession:
+        session_dir = self._session_dir(session_id)
+        os.makedirs(session_dir, exist_ok=True)
+        path = os.path.join(session_dir, SESSION_FILE)
+        self.counters["bytes_written"] += _write_session_file(path, meta, items, index_fields)
+        for name, source in attachments.items():
+            shutil.copyfile(source, os.path.join(session_dir, name))
+        if self._bucket is not None:
+            for name in attachments:
+                self._blob(session_id, name).upload_from_filename(os.path.join(session_dir, name))
+            # Session file last: its presence means the session is complete.
+            self._blob(session_id, SESSION_FILE).upload_from_filename(path)
+        return self._open_sync(session_id, path)
+
+    async def create(
+        self,
+        session_id: str,
+        kind: str,
+        account_id: str,
+        aac_user_id: str,
+        parsed_data: Dict[str, Any],
+        collection: str,
+        index_fields: Tuple[str, ...] = (),
+        attachments: Optional[Dict[str, str]] = None,
+    ) -> MigrationSession:
+        """
+        Stores parsed_data[collection] item by item plus the remaining top-level fields.
+        attachments maps a name to a local file that is copied into the session.
+        """
+        now = time.time()
+        items = parsed_data.get(collection) or {}
+        meta = {
+            "kind": kind,
+            "account_id": account_id,
+            "aac_user_id": aac_user_id,
+            "created_at": now,
+            "expires_at": now + self.ttl_seconds,
+            "collection": collection,
+            "attachments": sorted(attachments or {}),
+            "data": {key: value for key, value in parsed_data.items() if key != collection},
+        }
+        session = await asyncio.to_thread(
+            self._create_sync, session_id, meta, items, tuple(index_fields), dict(attachments or {})
+        )
+        # Seed the hot copy with the data we already hold, so the first page view decodes nothing.
+        session._items.update({str(item_id): item for item_id, item in items.items()})
+        self._remember(session)
+        self.counters["created"] += 1
+        logging.info(f"💾 Stored {kind} migration session {session_id} ({len(items)} {collection})")
+        return session
+
+    async def update_meta(self, session: MigrationSession, **fields: Any) -> None:
+        """Adds small fields to a session's metadata (e.g. pending import state)."""
+        session.meta.update(fields)
+
+        def write():
+            conn = sqlite3.connect(session.path)
+            try:
+                conn.execute("UPDATE meta SET value = ? WHERE key = 'meta'", (_encoder(session.codec)(session.meta),))
+                conn.commit()
+            finally:
+                conn.close()
+            if self._bucket is not None:
+                self._blob(session.session_id, SESSION_FILE).upload_from_filename(session.path)
+
+        try:
+            await asyncio.to_thread(write)
+        except Exception as e:
+            self.counters["errors"] += 1
+            logging.warning(f"Could not update migration session {session.session_id}: {e}")
+
+    # --- read -----------------------------------------------------------
+
+    @staticmethod
+    def _read_meta_sync(path: str, keys: Tuple[str, ...]) -> Tuple[str, Dict[str, Any]]:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            rows = dict(conn.execute(
+                f"SELECT key, value FROM meta WHERE key IN ({','.join('?' * len(keys))})", keys
+            ))
+        finally:
+            conn.close()
+        codec = rows.pop("codec").decode()
+        decode = _decoder(codec)
+        return codec, {key: decode(blob) for key, blob in rows.items()}
+
+    def _open_sync(self, session_id: str, path: str) -> MigrationSession:
+        codec, rows = self._read_meta_sync(path, ("codec", "meta", "index"))
+        return MigrationSession(session_id, path, rows["meta"], rows["index"], codec)
+
+    def _load_sync(self, session_id: str) -> Optional[MigrationSession]:
+        path = os.path.join(self._session_dir(session_id), SESSION_FILE)
+        if os.path.exists(path):
+            self.counters["disk_loads"] += 1
+            return self._open_sync(session_id, path)
+        if self._bucket is None:
+            return None
+        blob = self._blob(session_id, SESSION_FILE)
+        if not blob.exists():
+            return None
+        os.makedirs(self._session_dir(session_id), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        blob.download_to_filename(tmp_path)
+        os.replace(tmp_path, path)
+        self.counters["gcs_loads"] += 1
+        return self._open_sync(session_id, path)
+
+    async def get(self, session_id: str) -> Optional[MigrationSession]:
+        """The session, or None if it doesn't exist, has expired or the id is malformed."""
+        if not _valid_session_id(session_id):
+            self.counters["misses"] += 1
+            return None
+        if await self._tombstones.get(session_id):
+            if self._hot.get(session_id) is not None or os.path.isdir(self._session_dir(session_id)):
+                await self._delete_local(session_id)
+            self.counters["misses"] += 1
+            return None
+        session = self._hot.get(session_id)
+        if session is not None and os.path.exists(session.path):
+            self._hot.move_to_end(session_id)
+            self.counters["hot_hits"] += 1
+        else:
+            try:
+                session = await asyncio.to_thread(self._load_sync, session_id)
+            except Exception as e:
+                self.counters["errors"] += 1
+                logging.error(f"Could not load migration session {session_id}: {e}", exc_info=True)
+                session = None
+            if session is None:
+                self._forget(session_id)
+                self.counters["misses"] += 1
+                return None
+            self._remember(session)
+        if session.expired():
+            self.counters["expired"] += 1
+            await self.delete(session_id)
+            return None
+        return session
+
+    async def attachment_path(self, session: MigrationSession, name: str) -> Optional[str]:
+        """Local path of an attachment, downloading it from the bucket when this host lacks it."""
+        if name not in session.meta.get("attachments", []):
+            return None
+        path = os.path.join(self._session_dir(session.session_id), name)
+        if os.path.exists(path):
+            return path
+        if self._bucket is None:
+            return None
+
+        def download():
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            self._blob(session.session_id, name).download_to_filename(tmp_path)
+            os.replace(tmp_path, path)
+
+        try:
+            await asyncio.to_thread(download)
+            return path
+        except Exception as e:
+            self.counters["errors"] += 1
+            logging.warning(f"Could not download {name} for migration session {session.session_id}: {e}")
+            return None
+
+    # --- delete / expiry ------------------------------------------------
+
+    def _delete_sync(self, session_id: str) -> None:
+        shutil.rmtree(self._session_dir(session_id), ignore_errors=True)
+        if self._bucket is not None:
+            for blob in self._bucket.list_blobs(prefix=f"{GCS_PREFIX}{session_id}/"):
+                blob.delete()
+
+    async def _delete_local(self, session_id: str) -> None:
+        self._forget(session_id)
+        await asyncio.to_thread(shutil.rmtree, self._session_dir(session_id), True)
+
+    async def delete(self, session_id: str) -> None:
+        if not _valid_session_id(session_id):
+            return
+        self._forget(session_id)
+        await self._tombstones.set(session_id, True)
+        try:
+            await asyncio.to_thread(self._delete_sync, session_id)
+            self.counters["deleted"] += 1
+        except Exception as e:
+            self.counters["errors"] += 1
+            logging.warning(f"Could not delete migration session {session_id}: {e}")
+
+    def _expired_session_ids_sync(self) -> List[str]:
+        now = time.time()
+        expired = set()
+        if os.path.isdir(self.root_dir):
+            for session_id in os.listdir(self.root_dir):
+                path = os.path.join(self.root_dir, session_id, SESSION_FILE)
+                try:
+                    _, rows = self._read_meta_sync(path, ("codec", "meta"))
+                    if rows["meta"]["expires_at"] <= now:
+                        expired.add(session_id)
+                except Exception:
+                    # Unreadable or half-written: go by age instead
+                    try:
+                        if os.path.getmtime(os.path.join(self.root_dir, session_id)) + self.ttl_seconds <= now:
+                            expired.add(session_id)
+                    except OSError:
+                        pass
+        if self._bucket is not None:
+            for blob in self._bucket.list_blobs(prefix=GCS_PREFIX):
+                created = blob.time_created.timestamp() if blob.time_created else now
+                if created + self.ttl_seconds <= now:
+                    expired.add(blob.name[len(GCS_PREFIX):].split("/", 1)[0])
+        return sorted(session_id for session_id in expired if _valid_session_id(session_id))
+
+    async def cleanup_expired(self) -> int:
+        session_ids = await asyncio.to_thread(self._expired_session_ids_sync)
+        for session_id in session_ids:
+            await self.delete(session_id)
+        self.counters["expired"] += len(session_ids)
+        if session_ids:
+            logging.info(f"🧹 Removed {len(session_ids)} expired migration sessions")
+        return len(session_ids)
+
+    def start(self, interval_seconds: float = CLEANUP_INTERVAL_SECONDS) -> None:
+        if self._cleanup_task is None or self._cleanup_task.done():
+            self._cleanup_task = asyncio.create_task(self._cleanup_loop(interval_seconds))
+
+    async def _cleanup_loop(self, interval_seconds: float) -> None:
+        while True:
+            try:
+                await self.cleanup_expired()
+            except Exception as e:
+                self.counters["errors"] += 1
+                logging.warning(f"Migration session cleanup failed: {e}")
+            await asyncio.sleep(interval_seconds)
+
+    async def stop(self) -> None:
+        if self._cleanup_task is not None:
+            self._cleanup_task.cancel()
+            try:
+                await self._cleanup_task
+            except asyncio.CancelledError:
+                pass
+            self._cleanup_task = None
+        for session_id in list(self._hot):
+            self._forget(session_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "root_dir": self.root_dir,
+            "codec": default_codec(),
+            "gcs_enabled": self._bucket is not None,
+            "hot_sessions": len(self._hot),
+            "hot_items": sum(len(session._items) for session in self._hot.values()),
+            **self.counters,
+        }
+
+
+# Global singleton instance
+migration_session_store = MigrationSessionStore()
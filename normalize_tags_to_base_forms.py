@@ -12,6 +12,7 @@ Usage:
   python3 normalize_tags_to_base_forms.py --dry-run                    # Test on 10 records
   python3 normalize_tags_to_base_forms.py --limit 50                   # Migrate 50 records
   python3 normalize_tags_to_base_forms.py                              # Migrate all records
+  python3 normalize_tags_to_base_forms.py --restart                    # Ignore the checkpoint of an earlier run
 """
 
 import argparse
@@ -20,6 +21,7 @@ from datetime import datetime, timezone
 from google.cloud import firestore
 from config import CONFIG
 from aac_inflection_utils import get_inflection_lookup
+from migration_runner import MigrationHandler, MigrationRunner, add_runner_arguments
 
 
 def get_available_locales():
@@ -60,64 +62,25 @@ def normalize_tags_for_locale(tags, locale):
     return sorted(list(base_forms))
 
 
-async def run_migration(args):
-    """Main migration logic."""
-    db = firestore.Client(project=CONFIG['gcp_project_id'])
-    
-    # Get query parameters
-    limit = args.limit
-    dry_run = args.dry_run
-    locales = set(args.locales.split(',')) if args.locales else {'es', 'es-US'}
-    available_locales = set(get_available_locales())
-    
-    # Only process locales that have inflection data
-    target_locales = locales & available_locales
-    if not target_locales:
-        print(f"⚠️  No inflection data for locales: {locales}")
-        print(f"   Available: {available_locales}")
-        return
-    
-    print(f"📍 Migration Configuration:")
-    print(f"   Target locales: {sorted(target_locales)}")
-    print(f"   Dry run: {dry_run}")
-    if limit:
-        print(f"   Limit: {limit} records")
-    print()
-    
-    # Build query
-    q = db.collection('aac_images').where('source', '==', 'bravo_images')
-    
-    # Apply limit for testing if specified
-    if limit:
-        q = q.limit(limit)
-    
-    docs = list(q.stream())
-    print(f"📊 Processing {len(docs)} images...")
-    print()
-    
-    processed = 0
-    updated = 0
-    skipped = 0
-    
-    for doc in docs:
-        processed += 1
+class BaseFormNormalization(MigrationHandler):
+    def __init__(self, target_locales):
+        self.target_locales = target_locales
+        self._sample_locale = sorted(target_locales)[0]
+
+    async def process(self, doc):
         data = doc.to_dict() or {}
         localized_tags = data.get('localized_tags')
         
         # Skip if no localized_tags
         if not localized_tags or not isinstance(localized_tags, dict):
-            skipped += 1
-            continue
+            return None
         
         # Normalize tags for each target locale
         normalized_tags = {}
         changed = False
         
-        for locale in target_locales:
-            if locale not in localized_tags:
-                continue
-            
-            tags = localized_tags[locale]
+        for locale in self.target_locales:
+            tags = localized_tags.get(locale)
             if not isinstance(tags, list):
                 continue
             
@@ -131,44 +94,53 @@ async def run_migration(args):
         
         # Skip if no changes
         if not changed:
-            skipped += 1
-            continue
+            return None
         
-        # Prepare update
-        update_data = {
+        return {
             'localized_tags': {**localized_tags, **normalized_tags},
             'updated_at': datetime.now(timezone.utc)
         }
-        
-        if dry_run:
-            old_sample = localized_tags.get(next(iter(target_locales)), [])[:3]
-            new_sample = normalized_tags.get(next(iter(target_locales)), [])[:3]
-            print(f"DRY-RUN UPDATE {doc.id}:")
-            print(f"  Old: {old_sample}")
-            print(f"  New: {new_sample}")
-            updated += 1
-        else:
-            await asyncio.to_thread(doc.reference.update, update_data)
-            old_sample = localized_tags.get(next(iter(target_locales)), [])[:3]
-            new_sample = normalized_tags.get(next(iter(target_locales)), [])[:3]
-            print(f"✅ UPDATED {doc.id}:")
-            print(f"   Old: {old_sample}")
-            print(f"   New: {new_sample}")
-            updated += 1
-        
-        # Progress indicator
-        if processed % 50 == 0:
-            print(f"   ... {processed}/{len(docs)} processed")
+
+    def describe(self, doc, update):
+        old_sample = ((doc.to_dict() or {}).get('localized_tags') or {}).get(self._sample_locale, [])[:3]
+        new_sample = update['localized_tags'].get(self._sample_locale, [])[:3]
+        return f"{old_sample} -> {new_sample}"
+
+
+async def run_migration(args):
+    """Main migration logic."""
+    db = firestore.Client(project=CONFIG['gcp_project_id'])
     
+    # Get query parameters
+    limit = args.limit
+    dry_run = args.dry_run
+    locales = set(args.locales.split(',')) if args.locales else {'es', 'es-US'}
+    available_locales = set(get_available_locales())
+    
+    # Only process locales that have inflection data
+    target_locales = locales & available_locales
+    if not target_locales:
+        print(f"⚠️  No inflection data for locales: {locales}")
+        print(f"   Available: {available_locales}")
+        return
+    
+    print(f"📍 Migration Configuration:")
+    print(f"   Target locales: {sorted(target_locales)}")
+    print(f"   Dry run: {dry_run}")
+    if limit:
+        print(f"   Limit: {limit} records")
     print()
-    print("=" * 60)
-    print("📊 Migration Summary:")
-    print(f"   Processed: {processed}")
-    print(f"   Updated:   {updated}")
-    print(f"   Skipped:   {skipped}")
-    if dry_run:
-        print("   Mode:      DRY RUN (no changes to Firestore)")
-    print("=" * 60)
+    
+    runner = MigrationRunner.from_args(
+        db,
+        'normalize_tags_to_base_forms',
+        BaseFormNormalization(target_locales),
+        args,
+        filters=[('source', '==', 'bravo_images')],
+        limit=limit or 0,
+        dry_run=dry_run,
+    )
+    await runner.run()
 
 
 def main():
@@ -206,6 +178,7 @@ Examples:
         default='es,es-US',
         help='Comma-separated locale codes to normalize (default: es,es-US)'
     )
+    add_runner_arguments(parser)
     
     args = parser.parse_args()
     
@@ -0,0 +1,125 @@
+"""
+Per-page Firestore storage for a user's pages (the /pages editor).
+
+Layout under the AAC user document:
+
+    config/pages_list               index: page_order, page_versions {name: version},
+                                    pages_count, pages_storage="per_page"
+    config/pages_list/pages/{doc}   one document per page: name, page_json, version
+
+Pages used to live in one `pages_json` string on config/pages_list, so every edit
+re-serialized and rewrote all pages. Now creating, editing or deleting a page writes
+that page's document plus its index entry in a single batch; the versioning and
+caching are versioned_item_store.py's.
+
+Each page is still stored as a JSON string: page objects are free-form and may hold
+values Firestore can't nest. The cache keeps that string and parses it per read, so
+callers always get their own copy to mutate.
+
+The legacy `pages_json` layout is still read, and is migrated on its next save.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from versioned_item_store import VersionedItemStore
+
+PER_PAGE_STORAGE = "per_page"
+PAGES_SUBCOLLECTION = "pages"
+DEFAULT_MAX_CACHED_USERS = 512
+# Pages can be large (button grids with long prompts); keep one commit well under 10 MiB.
+PAGE_DOCS_PER_BATCH = 50
+
+
+def page_key(page: Any) -> str:
+    """Pages are identified by their lowercased name ('' if the page has none)."""
+    if not isinstance(page, dict):
+        return ""
+    return str(page.get("name") or "").strip().lower()
+
+
+class PageStore(VersionedItemStore):
+    noun = "page"
+    subcollection = PAGES_SUBCOLLECTION
+    order_field = "page_order"
+    versions_field = "page_versions"
+    count_field = "pages_count"
+    storage_field = "pages_storage"
+    storage_value = PER_PAGE_STORAGE
+    timestamp_field = "last_updated"
+    docs_per_batch = PAGE_DOCS_PER_BATCH
+
+    def __init__(self, max_cached_users: int = DEFAULT_MAX_CACHED_USERS):
+        super().__init__(max_cached_users)
+        self.counters.update({"legacy_loads": 0, "migrations": 0})
+
+    def item_key(self, item: Any) -> str:
+        return page_key(item)
+
+    def cache_form(self, item: Dict[str, Any]) -> str:
+        return json.dumps(item, ensure_ascii=False, default=str)
+
+    def from_cache(self, cached: str) -> Dict[str, Any]:
+        return json.loads(cached)
+
+    def item_payload(self, key: str, cached: str, version: int, timestamp: Any) -> Dict[str, Any]:
+        return {"name": key, "page_json": cached, "version": version, "last_updated": timestamp}
+
+    def read_payload(self, data: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+        name = str(data.get("name") or "")
+        page_json = data.get("page_json")
+        return (name, page_json) if name and isinstance(page_json, str) else None
+
+    def has_per_page_layout(self, user_key: Tuple[str, str]) -> bool:
+        return self.has_per_item_layout(user_key)
+
+    async def load_pages(self, db, index_ref, user_key: Tuple[str, str]) -> Optional[List[Dict[str, Any]]]:
+        """Pages in index order, or None if the user has no pages document yet."""
+        snap = await asyncio.to_thread(index_ref.get)
+        if not snap.exists:
+            self.counters["loads"] += 1
+            return None
+        index = snap.to_dict() or {}
+        if self.is_per_item_manifest(index):
+            return await self.load_items(db, index_ref, index, user_key)
+
+        self.counters["loads"] += 1
+        self.counters["legacy_loads"] += 1
+        self.mark_layout(user_key, per_item=False)
+        if "pages_json" in index:
+            pages = json.loads(index["pages_json"])
+        else:
+            pages = index.get("pages")
+        return pages if isinstance(pages, list) else []
+
+    async def save_page(
+        self, db, index_ref, page: Dict[str, Any], user_key: Tuple[str, str],
+        previous_name: Optional[str] = None, page_order: Optional[List[str]] = None,
+    ) -> int:
+        """
+        Write one page and its index entry atomically. A rename (previous_name differs)
+        deletes the old page document in the same batch; pass page_order to keep the
+        page's position, otherwise a new name is appended. Returns the new version.
+        """
+        return await self.save_item(db, index_ref, page, user_key, previous_key=previous_name, order=page_order)
+
+    async def delete_page(
+        self, db, index_ref, name: str, user_key: Tuple[str, str], page_order: Optional[List[str]] = None,
+    ) -> None:
+        await self.delete_item(db, index_ref, name, user_key, order=page_order)
+
+    async def save_all(self, db, index_ref, pages: List[Dict[str, Any]], user_key: Tuple[str, str]) -> Dict[str, int]:
+        """Make storage match `pages`. Migrates the pages_json layout (the index is rewritten without it)."""
+        previous_snap = await asyncio.to_thread(index_ref.get)
+        previous_index = (previous_snap.to_dict() or {}) if previous_snap.exists else None
+        result = await self.save_all_items(db, index_ref, pages, user_key, previous_index)
+        if previous_index is not None and not self.is_per_item_manifest(previous_index):
+            self.counters["migrations"] += 1
+            logging.info(f"Migrated pages for {user_key[0]}/{user_key[1]} to per-page storage ({len(pages)} pages)")
+        return result
+
+
+# Global singleton instance
+page_store = PageStore()
@@ -0,0 +1,74 @@
+"""
+Named process pools for CPU-bound work that must stay off the event loop
+(current-events HTML parsing, MTI uploads).
+
+- workers come from a forkserver, not fork: the server process has many threads
+  running. The forkserver is shared by every pool and preloads only the modules
+  the pools registered before it started (never __main__, i.e. server.py);
+- pool workers re-run a __main__ started as a script (`python server.py`) before
+  doing any work. `python -m uvicorn server:app` is safe; a script run uses a
+  thread instead;
+- a pool that breaks (a worker killed, e.g. out of memory) is dropped and the
+  call is retried in a thread. The next call starts a fresh pool.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterable, Set
+
+_pools: Dict[str, ProcessPoolExecutor] = {}
+_preload: Set[str] = set()
+counters: Dict[str, int] = {"process_calls": 0, "thread_calls": 0, "broken_pools": 0}
+
+
+def pool_safe_main() -> bool:
+    main = sys.modules.get("__main__")
+    if main is None or not getattr(main, "__file__", None):
+        return True
+    spec_name = getattr(getattr(main, "__spec__", None), "name", None) or ""
+    return spec_name == "__main__" or spec_name.endswith(".__main__")
+
+
+def get_process_pool(name: str, max_workers: int, preload: Iterable[str] = ()) -> ProcessPoolExecutor:
+    pool = _pools.get(name)
+    if pool is None:
+        context = multiprocessing.get_context("forkserver")
+        _preload.update(preload)
+        # Only takes effect if the forkserver hasn't started yet; it's an optimization either way.
+        context.set_forkserver_preload(sorted(_preload))
+        pool = _pools[name] = ProcessPoolExecutor(max_workers=max(1, max_workers), mp_context=context)
+    return pool
+
+
+async def run_in_process(name: str, fn: Callable[..., Any], *args: Any, max_workers: int = 2) -> Any:
+    """Run fn(*args) in the named pool. fn must be a module-level function and args picklable."""
+    if not pool_safe_main():
+        counters["thread_calls"] += 1
+        return await asyncio.to_thread(fn, *args)
+    pool = get_process_pool(name, max_workers, preload=[fn.__module__])
+    loop = asyncio.get_running_loop()
+    try:
+        result = await loop.run_in_executor(pool, fn, *args)
+        counters["process_calls"] += 1
+        return result
+    except BrokenProcessPool:
+        logging.warning(f"⚠️ Process pool '{name}' broke; running {fn.__name__} in a thread")
+        counters["broken_pools"] += 1
+        if _pools.get(name) is pool:
+            del _pools[name]
+        counters["thread_calls"] += 1
+        return await asyncio.to_thread(fn, *args)
+
+
+def shutdown_process_pools() -> None:
+    for pool in _pools.values():
+        pool.shutdown(wait=False, cancel_futures=True)
+    _pools.clear()
+
+
+def get_stats() -> Dict[str, Any]:
+    return {"pools": sorted(_pools), **counters}
@@ -0,0 +1,303 @@
+"""
+Short-lived response caches for the interactive LLM endpoints (/llm and
+/api/freestyle/category-words).
+
+Two tiers:
+- LocalTTLCache: per-process LRU with O(1) TTL expiry. All entries share one TTL,
+  so insertion order is expiry order and expired entries are popped off the front.
+- Redis (optional): shared across Cloud Run instances, so an identical button
+  press that lands on another instance is still a hit.
+
+In-flight coalescing also works across instances. The first local request for a
+key takes a short-lived Redis lock (SET NX PX). Other instances subscribe to the
+key's channel and receive the owner's result when it publishes. If the owner does
+not publish before the lock expires, the waiter computes the result itself.
+Without Redis this degrades to the old per-process future map.
+
+Server workers on one host without Redis can share the value tier through a
+state_backend namespace (configure_shared); coalescing then stays per process.
+"""
+
+import asyncio
+import copy
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Compare-and-delete so an owner never releases a lock that expired and was re-taken.
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+_FAILED_SENTINEL = "__failed__"
+
+
+class LocalTTLCache:
+    """LRU cache with a single TTL. get/set/expiry are all O(1) amortized."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Any]" = OrderedDict()  # LRU order
+        self._expires: "OrderedDict[str, float]" = OrderedDict()  # write order == expiry order
+        self.ttl_evictions = 0
+        self.lru_evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _expire(self, now: float) -> None:
+        while self._expires:
+            key, expires_at = next(iter(self._expires.items()))
+            if expires_at > now:
+                break
+            self._expires.popitem(last=False)
+            self._data.pop(key, None)
+            self.ttl_evictions += 1
+
+    def get(self, key: str) -> Optional[Any]:
+        self._expire(time.monotonic())
+        if key not in self._data:
+            return None
+        self._data.move_to_end(key)
+        return self._data[key]
+
+    def set(self, key: str, value: Any) -> None:
+        now = time.monotonic()
+        self._expire(now)
+        self._data[key] = value
+        self._data.move_to_end(key)
+        self._expires[key] = now + self.ttl_seconds
+        self._expires.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            evicted, _ = self._data.popitem(last=False)
+            self._expires.pop(evicted, None)
+            self.lru_evictions += 1
+
+    def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+        self._expires.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._expires.clear()
+
+
+class QuickResponseCache:
+    """
+    Local + optional Redis response cache with cross-instance in-flight coalescing.
+
+    Typical use:
+        value = await cache.get(key)
+        if value is None:
+            role, value = await cache.claim(key)
+            if role == "owner":
+                try:
+                    value = ...compute...
+                    await cache.resolve(key, value)
+                except Exception as e:
+                    await cache.reject(key, e)
+                    raise
+    """
+
+    def __init__(self, namespace: str, ttl_seconds: float = 180, max_entries: int = 600, lock_ttl_seconds: float = 30):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.lock_ttl_seconds = lock_ttl_seconds
+        self._local = LocalTTLCache(ttl_seconds, max_entries)
+        self._redis = None
+        self._shared = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._owned_locks: Dict[str, str] = {}
+        self._inflight_lock = asyncio.Lock()
+        self.counters: Dict[str, int] = {
+            "local_hits": 0,
+            "redis_hits": 0,
+            "shared_hits": 0,
+            "misses": 0,
+            "coalesced_local": 0,
+            "coalesced_remote": 0,
+            "remote_wait_timeouts": 0,
+            "redis_errors": 0,
+        }
+
+    def configure_redis(self, client) -> None:
+        """Attach (or detach, with None) a redis.asyncio client for the shared tier."""
+        self._redis = client
+
+    def configure_shared(self, namespace) -> None:
+        """Attach (or detach) a state_backend.StateNamespace as the shared tier when there is no Redis."""
+        self._shared = namespace
+
+    def _value_key(self, key: str) -> str:
+        return f"qrc:{self.namespace}:v:{key}"
+
+    def _lock_key(self, key: str) -> str:
+        return f"qrc:{self.namespace}:lock:{key}"
+
+    def _channel(self, key: str) -> str:
+        return f"qrc:{self.namespace}:done:{key}"
+
+    def _redis_failed(self, action: str, error: Exception) -> None:
+        self.counters["redis_errors"] += 1
+        logging.warning(f"Quick-response cache '{self.namespace}': Redis {action} failed: {error}")
+
+    # --- cache tier ----------------------------------------------------
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Returns a deep copy of the cached value, or None on a miss."""
+        value = self._local.get(key)
+        if value is not None:
+            self.counters["local_hits"] += 1
+            return copy.deepcopy(value)
+        if self._redis is not None:
+            try:
+                raw = await self._redis.get(self._value_key(key))
+                if raw is not None:
+                    value = json.loads(raw)
+                    self._local.set(key, value)
+                    self.counters["redis_hits"] += 1
+                    return copy.deepcopy(value)
+            except Exception as e:
+                self._redis_failed("get", e)
+        elif self._shared is not None:
+            value = await self._shared.get(key)
+            if value is not None:
+                self._local.set(key, value)
+                self.counters["shared_hits"] += 1
+                return copy.deepcopy(value)
+        self.counters["misses"] += 1
+        return None
+
+    async def set(self, key: str, value: Any) -> None:
+        value = copy.deepcopy(value)
+        self._local.set(key, value)
+        if self._redis is not None:
+            try:
+                await self._redis.set(self._value_key(key), json.dumps(value), ex=int(self.ttl_seconds))
+            except Exception as e:
+                self._redis_failed("set", e)
+        elif self._shared is not None:
+            await self._shared.set(key, value, ttl=self.ttl_seconds)
+
+    # --- in-flight coalescing ------------------------------------------
+
+    async def claim(self, key: str) -> Tuple[str, Optional[Any]]:
+        """
+        Returns ("owner", None) if the caller must compute the value (and then call
+        resolve()/reject()), or ("coalesced", value) when another request, local or
+        on another instance, produced it. Re-raises the owner's error for local waiters.
+        """
+        async with self._inflight_lock:
+            existing = self._inflight.get(key)
+            if existing is not None and not existing.done():
+                local_future = existing
+                is_local_leader = False
+            else:
+                local_future = asyncio.get_running_loop().create_future()
+                self._inflight[key] = local_future
+                is_local_leader = True
+
+        if not is_local_leader:
+            value = await local_future
+            self.counters["coalesced_local"] += 1
+            return "coalesced", copy.deepcopy(value)
+
+        if self._redis is None:
+            return "owner", None
+
+        try:
+            # A fresh token per claim: a release after this lock expired can't free a later claim's lock.
+            token = uuid.uuid4().hex
+            if await self._redis.set(self._lock_key(key), token, nx=True, px=int(self.lock_ttl_seconds * 1000)):
+                self._owned_locks[key] = token
+                return "owner", None
+            value = await self._wait_for_remote(key)
+        except Exception as e:
+            self._redis_failed("claim", e)
+            return "owner", None
+
+        if value is None:
+            # Remote owner failed or went away; compute it here instead.
+            return "owner", None
+        self._local.set(key, value)
+        self._finish_local(key, result=value)
+        self.counters["coalesced_remote"] += 1
+        return "coalesced", copy.deepcopy(value)
+
+    async def _wait_for_remote(self, key: str) -> Optional[Any]:
+        pubsub = self._redis.pubsub()
+        try:
+            await pubsub.subscribe(self._channel(key))
+            # The owner may have published between our lock attempt and the subscribe.
+            raw = await self._redis.get(self._value_key(key))
+            if raw is not None:
+                return json.loads(raw)
+            deadline = time.monotonic() + self.lock_ttl_seconds
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.counters["remote_wait_timeouts"] += 1
+                    return None
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=min(remaining, 1.0))
+                if message is None:
+                    continue
+                data = message.get("data")
+                if data == _FAILED_SENTINEL:
+                    return None
+                return json.loads(data)
+        finally:
+            try:
+                await pubsub.unsubscribe(self._channel(key))
+                await pubsub.aclose()
+            except Exception:
+                pass
+
+    def _finish_local(self, key: str, result: Any = None, error: Optional[BaseException] = None) -> None:
+        future = self._inflight.pop(key, None)
+        if future is not None and not future.done():
+            if error is not None:
+                future.set_exception(error)
+                # Local waiters re-raise it; make sure nobody is warned about it going unobserved.
+                future.exception()
+            else:
+                future.set_result(copy.deepcopy(result))
+
+    async def _release(self, key: str, published: Optional[str]) -> None:
+        token = self._owned_locks.pop(key, None)
+        if self._redis is None or token is None:
+            return
+        try:
+            if published is not None:
+                await self._redis.publish(self._channel(key), published)
+            await self._redis.eval(_RELEASE_LOCK_SCRIPT, 1, self._lock_key(key), token)
+        except Exception as e:
+            self._redis_failed("release", e)
+
+    async def resolve(self, key: str, value: Any) -> None:
+        """Owner finished: cache the value and hand it to every local and remote waiter."""
+        await self.set(key, value)
+        self._finish_local(key, result=value)
+        await self._release(key, json.dumps(value))
+
+    async def reject(self, key: str, error: BaseException) -> None:
+        """Owner failed: local waiters get the error, remote waiters compute for themselves."""
+        self._finish_local(key, error=error)
+        await self._release(key, _FAILED_SENTINEL)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "namespace": self.namespace,
+            "backend": "local+redis" if self._redis is not None else ("local+shared" if self._shared is not None else "local"),
+            "local_entries": len(self._local),
+            "inflight": len(self._inflight),
+            "ttl_evictions": self._local.ttl_evictions,
+            "lru_evictions": self._local.lru_evictions,
+            **self.counters,
+        }
@@ -107,7 +107,7 @@ except ImportError:
 
 
 from fastapi import FastAPI, Request, HTTPException, Body, Path, Response, Header, Depends, UploadFile, File, Form
-from fastapi.responses import FileResponse, JSONResponse, HTMLResponse, PlainTextResponse, RedirectResponse
+from fastapi.responses import FileResponse, JSONResponse, HTMLResponse, PlainTextResponse, RedirectResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import google.generativeai as genai
@@ -136,7 +136,7 @@ from bs4 import BeautifulSoup
 import random
 import aiohttp
 import asyncio
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urlparse
 from email.utils import parseaddr
 from email.message import EmailMessage
 import uuid
@@ -144,13 +144,14 @@ import io
 import wave
 from pydantic import BaseModel, Field, field_validator, validator, conint # Import field_validator
 from pydantic_core.core_schema import ValidationInfo # For more complex V2 validators if needed
-from typing import List, Optional, Dict, Any, Union, Literal, Annotated, Set, Tuple
+from typing import List, Optional, Dict, Any, Union, Literal, Annotated, Set, Tuple, Callable, Awaitable
 import google.api_core.exceptions # For specific error handling with LLM
 from google.cloud import texttospeech as google_tts # Import Google Cloud Text-to-Speech with an alias
 from contextlib import asynccontextmanager # Import for lifespan
 import re # For regular expressions (used in model filtering)
 from collections import Counter # Add this import at the top with other collections imports
 import redis
+import redis.asyncio as redis_async
 import json
 
 import firebase_admin
@@ -163,6 +164,33 @@ import openai # Add OpenAI import
 from google.cloud.firestore_v1 import Client as FirestoreClient # Alias to avoid conflict if other Client classes are imported
 from routes import router as static_router # Import static pages router
 from jokes_system import jokes_db, JokesDatabase, bulk_import_icanhazdadjoke, cleanup_joke_quotes
+from aac_image_index import aac_image_index
+from aac_symbol_search import symbol_search_engine
+from quick_response_cache import QuickResponseCache
+from image_search_cache import image_search_cache
+from tts_audio_cache import tts_audio_cache, tts_cache_key, wav_sample_rate
+from wav_utils import assemble_wav, extract_pcm, silence_pcm
+from firestore_write_pipeline import FirestoreWritePipeline, delete_collection, replace_collection, get_write_pipeline_stats
+from tap_board_store import PER_BOARD_STORAGE, tap_board_store
+from page_store import page_key, page_store
+from word_predictor import word_predictor
+from gemini_cache_warmup import PRIORITY_NORMAL, PRIORITY_URGENT, cache_warmup_scheduler
+from llm_execution import CircuitOpenError, llm_execution
+from llm_hedging import PROFILE_FAST, PROFILE_RICH, llm_hedger
+from translation_memory import translation_memory
+from current_events import current_events_service
+from process_pools import get_stats as get_process_pool_stats, run_in_process, shutdown_process_pools
+from job_engine import FirestoreJobStore, InMemoryJobStore, JobContext, JobQueueFull, job_engine, public_job, report_job_progress
+from state_backend import claim_host_singleton, create_state_backend, state_store
+from migration_session_store import migration_session_store
+from context_retrieval import (
+    context_retriever,
+    delta_context_report,
+    render_chat_line,
+    render_diary_line,
+    rendered_chars,
+    select_within_budget,
+)
 try:
     from scratch_pools import CATEGORY_STATIC_POOLS, WORD_VARIANTS
 except ImportError:
@@ -171,23 +199,35 @@ except ImportError:
 
 oauth2_scheme = HTTPBearer()
 
-# Mood update tracking to prevent race conditions
-mood_update_timestamps = {}  # Format: {account_id/aac_user_id: timestamp}
+# Mood update tracking to prevent race conditions (shared across workers)
+MOOD_UPDATE_SETTLE_SECONDS = 2.0
+mood_update_timestamps = state_store.namespace("mood_updates", ttl=60)  # {account_id/aac_user_id: timestamp}
 
-# Short-lived in-memory cache for repeated /llm option requests.
-# This smooths interactive UX when users trigger the same button/prompt repeatedly.
+# Short-lived cache for repeated /llm option requests (local LRU + shared Redis tier).
+# This smooths interactive UX when users trigger the same button/prompt repeatedly,
+# and coalesces identical in-flight requests even when they land on different instances.
 LLM_QUICK_RESPONSE_CACHE_TTL_SECONDS = 180
-llm_quick_response_cache: Dict[str, Dict[str, Any]] = {}
-llm_inflight_requests: Dict[str, asyncio.Future] = {}
-llm_inflight_requests_lock = asyncio.Lock()
+llm_quick_response_cache = QuickResponseCache("llm", ttl_seconds=LLM_QUICK_RESPONSE_CACHE_TTL_SECONDS, max_entries=600)
 
-# Short-lived in-memory cache for repeated category-words requests.
+# Short-lived cache for repeated category-words requests.
 CATEGORY_WORDS_QUICK_RESPONSE_CACHE_TTL_SECONDS = 180
-category_words_quick_response_cache: Dict[str, Dict[str, Any]] = {}
+category_words_quick_response_cache = QuickResponseCache(
+    "category_words", ttl_seconds=CATEGORY_WORDS_QUICK_RESPONSE_CACHE_TTL_SECONDS, max_entries=600
+)
 
 # Redis cache client (initialized in lifespan)
 redis_client = None
 
+# Fire-and-forget tasks stay referenced here until they finish (the event loop only keeps weak references)
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def _spawn_background_task(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
 app = FastAPI()
 
 # Include static pages router
@@ -245,6 +285,28 @@ async def get_cache_stats():
             "status": "success",
             "cache_stats": basic_stats,
             "ttl_stats": ttl_stats,
+            "aac_image_index": aac_image_index.get_stats(),
+            "symbol_search": symbol_search_engine.get_stats(),
+            "firestore_write_pipeline": get_write_pipeline_stats(),
+            "tap_board_store": tap_board_store.get_stats(),
+            "page_store": page_store.get_stats(),
+            "word_predictor": word_predictor.get_stats(),
+            "gemini_cache_warmup": cache_warmup_scheduler.get_stats(),
+            "context_retrieval": context_retriever.get_stats(),
+            "llm_execution": llm_execution.get_stats(),
+            "llm_hedging": llm_hedger.get_stats(),
+            "translation_memory": translation_memory.get_stats(),
+            "current_events": current_events_service.get_stats(),
+            "process_pools": get_process_pool_stats(),
+            "background_jobs": job_engine.get_stats(),
+            "state_backend": state_store.get_stats(),
+            "migration_sessions": migration_session_store.get_stats(),
+            "tts_audio_cache": tts_audio_cache.get_stats(),
+            "image_search_cache": image_search_cache.get_stats(),
+            "quick_response_caches": {
+                "llm": llm_quick_response_cache.get_stats(),
+                "category_words": category_words_quick_response_cache.get_stats(),
+            },
             "performance_notes": {
                 "token_reduction": "72.7% token reduction achieved",
                 "cost_optimization": "4-hour TTL policy for Gemini cache cost control",
@@ -429,6 +491,9 @@ template_user_data_paths = {
 ], indent=4),
 }
 
+# Parsed once; use copy.deepcopy(DEFAULT_PAGES_TEMPLATE) for a user's own copy.
+DEFAULT_PAGES_TEMPLATE = json.loads(template_user_data_paths["pages.json"])
+
 
 
 # NEW: Simplified token verification dependency for initial registration
@@ -460,6 +525,76 @@ async def verify_admin_user(token_info: Annotated[Dict[str, str], Depends(verify
     return token_info
 
 
+# Verified-principal cache for get_current_account_and_user_ids.
+# Keyed by sha256(id token) + X-User-ID + X-Admin-Target-Account so a cached
+# principal can never be served for a different token or profile. Entries never
+# outlive the token's own `exp` claim.
+AUTH_SESSION_CACHE_TTL_SECONDS = 300
+AUTH_SESSION_CACHE_MAX_ENTRIES = 5000
+_AUTH_SESSION_CACHE: Dict[str, Dict[str, Any]] = {}
+
+
+def _auth_session_cache_key(id_token: str, x_user_id: str, x_admin_target_account: Optional[str]) -> str:
+    token_hash = hashlib.sha256(id_token.encode("utf-8")).hexdigest()
+    return f"{token_hash}:{x_user_id}:{x_admin_target_account or ''}"
+
+
+def _get_cached_auth_session(cache_key: str) -> Optional[Dict[str, Any]]:
+    entry = _AUTH_SESSION_CACHE.get(cache_key)
+    if not entry:
+        return None
+    if entry["expires_at"] <= time.time():
+        _AUTH_SESSION_CACHE.pop(cache_key, None)
+        return None
+    return dict(entry["principal"])
+
+
+def _store_auth_session(cache_key: str, principal: Dict[str, Any], authenticated_account_id: str, token_exp: Optional[float]) -> None:
+    now = time.time()
+    expires_at = now + AUTH_SESSION_CACHE_TTL_SECONDS
+    if token_exp:
+        expires_at = min(expires_at, float(token_exp))
+    if expires_at <= now:
+        return
+
+    if len(_AUTH_SESSION_CACHE) >= AUTH_SESSION_CACHE_MAX_ENTRIES:
+        for key in [k for k, v in _AUTH_SESSION_CACHE.items() if v["expires_at"] <= now]:
+            _AUTH_SESSION_CACHE.pop(key, None)
+        # Dicts preserve insertion order, so the first keys are the oldest entries.
+        while len(_AUTH_SESSION_CACHE) >= AUTH_SESSION_CACHE_MAX_ENTRIES:
+            _AUTH_SESSION_CACHE.pop(next(iter(_AUTH_SESSION_CACHE)), None)
+
+    _AUTH_SESSION_CACHE[cache_key] = {
+        "principal": dict(principal),
+        "account_ids": {authenticated_account_id, principal["account_id"]},
+        "aac_user_id": principal["aac_user_id"],
+        "expires_at": expires_at,
+    }
+
+
+def invalidate_auth_session_cache(account_id: Optional[str] = None, aac_user_id: Optional[str] = None) -> int:
+    """
+    Drops cached principals touching an account (as caller or admin target) and,
+    optionally, only those for one AAC user. With no arguments the whole cache is cleared.
+    Returns the number of entries removed.
+    """
+    if account_id is None and aac_user_id is None:
+        removed = len(_AUTH_SESSION_CACHE)
+        _AUTH_SESSION_CACHE.clear()
+        return removed
+
+    stale_keys = [
+        key for key, entry in _AUTH_SESSION_CACHE.items()
+        if (account_id is None or account_id in entry["account_ids"])
+        and (aac_user_id is None or entry["aac_user_id"] == aac_user_id)
+    ]
+    for key in stale_keys:
+        _AUTH_SESSION_CACHE.pop(key, None)
+    if stale_keys:
+        logging.info(f"Invalidated {len(stale_keys)} cached auth session(s) for account={account_id} user={aac_user_id}")
+    return len(stale_keys)
+
+
 async def get_current_account_and_user_ids(
     token: Annotated[HTTPAuthorizationCredentials, Depends(oauth2_scheme)],
     x_user_id: str = Header(..., alias="X-User-ID"),
@@ -474,16 +609,37 @@ async def get_current_account_and_user_ids(
         logging.error("Firestore DB client not initialized.")
         raise HTTPException(status_code=503, detail="Database service unavailable.")
 
+    # 0. Serve an already-verified principal for this exact token/profile/target combination.
+    session_cache_key = _auth_session_cache_key(token.credentials, x_user_id, x_admin_target_account)
+    cached_principal = _get_cached_auth_session(session_cache_key)
+    if cached_principal is not None:
+        # Keeps the user's Gemini cache on the proactive refresh list.
+        cache_warmup_scheduler.note_activity(cached_principal["account_id"], cached_principal["aac_user_id"])
+        return cached_principal
+
     try:
         # 1. Verify Firebase ID Token
         decoded_token = await asyncio.to_thread(auth.verify_id_token, token.credentials)
         account_id = decoded_token['uid'] # This is the Firebase UID of the logged-in account
 
-        # 2. Fetch Account details from Firestore
-        account_doc_ref = firestore_db.collection(FIRESTORE_ACCOUNTS_COLLECTION).document(account_id)
-        account_doc = await asyncio.to_thread(account_doc_ref.get)
+        # 2. Fetch the account, optional admin-target account and AAC user docs in a single batched read.
+        #    The target account is known from the header up front, so none of these reads depend on each other.
+        target_account_id = x_admin_target_account or account_id
+        accounts_ref = firestore_db.collection(FIRESTORE_ACCOUNTS_COLLECTION)
+        account_doc_ref = accounts_ref.document(account_id)
+        target_account_doc_ref = accounts_ref.document(target_account_id)
+        aac_user_doc_ref = target_account_doc_ref.collection(FIRESTORE_ACCOUNT_USERS_SUBCOLLECTION).document(x_user_id)
 
-        if not account_doc.exists:
+        doc_refs = [account_doc_ref, aac_user_doc_ref]
+        if target_account_id != account_id:
+            doc_refs.append(target_account_doc_ref)
+        snapshots = await asyncio.to_thread(lambda: list(firestore_db.get_all(doc_refs)))
+        snapshots_by_path = {snap.reference.path: snap for snap in snapshots}
+        account_doc = snapshots_by_path.get(account_doc_ref.path)
+        aac_user_doc = snapshots_by_path.get(aac_user_doc_ref.path)
+        target_account_doc = snapshots_by_path.get(target_account_doc_ref.path)
+
+        if not account_doc or not account_doc.exists:
             logging.warning(f"Account (Firebase UID: {account_id}) not found in Firestore. Possibly deleted or corrupted.")
             raise HTTPException(status_code=401, detail="Account not found.")
 
@@ -495,10 +651,9 @@ async def get_current_account_and_user_ids(
         is_demo_account = user_email in ["demoreadonly@talkwithbravo.com"]
         
         # NEW: Handle admin/therapist context
-        target_account_id = account_id  # Default to the authenticated account
+        target_account_data = account_data  # Default to the authenticated account
         if x_admin_target_account:
             # Admin/therapist is trying to access another account
-            user_email = account_data.get("email", "")
             is_admin = user_email == "admin@talkwithbravo.com"
             is_therapist = account_data.get("is_therapist", False)
             
@@ -507,10 +662,7 @@ async def get_current_account_and_user_ids(
                 raise HTTPException(status_code=403, detail="Access denied: Not an admin or therapist")
             
             # Verify access to target account
-            target_account_doc_ref = firestore_db.collection(FIRESTORE_ACCOUNTS_COLLECTION).document(x_admin_target_account)
-            target_account_doc = await asyncio.to_thread(target_account_doc_ref.get)
-            
-            if not target_account_doc.exists:
+            if not target_account_doc or not target_account_doc.exists:
                 logging.warning(f"Target account {x_admin_target_account} not found")
                 raise HTTPException(status_code=404, detail="Target account not found")
             
@@ -529,29 +681,17 @@ async def get_current_account_and_user_ids(
                 logging.warning(f"Access denied to account {x_admin_target_account} for user {user_email}")
                 raise HTTPException(status_code=403, detail="Access denied to target account")
             
-            target_account_id = x_admin_target_account
             logging.info(f"Admin/therapist {user_email} accessing account {target_account_id}")
 
         # 3. Authorize access to the specific AAC user_id (x_user_id)
         # Check if the requested x_user_id exists under the target account
-        aac_user_doc_ref = firestore_db.collection(FIRESTORE_ACCOUNTS_COLLECTION).document(target_account_id).collection(FIRESTORE_ACCOUNT_USERS_SUBCOLLECTION).document(x_user_id)
-        aac_user_doc = await asyncio.to_thread(aac_user_doc_ref.get)
-
-        if not aac_user_doc.exists:
+        if not aac_user_doc or not aac_user_doc.exists:
             # Check if this is an authorized therapist/admin accessing a *different* account's user
             # This logic needs to be robust. For now, we assume x_user_id belongs to the `target_account_id`.
             logging.warning(f"AAC user_id '{x_user_id}' not found under account '{target_account_id}'.")
             raise HTTPException(status_code=403, detail="Access denied to this user profile.")
 
         # 4. Check Subscription Status (Basic check for POC/Trial) - use target account data
-        target_account_data = account_data  # Default to authenticated account data
-        if target_account_id != account_id:
-            # Get target account data for subscription check
-            target_account_doc_ref = firestore_db.collection(FIRESTORE_ACCOUNTS_COLLECTION).document(target_account_id)
-            target_account_doc = await asyncio.to_thread(target_account_doc_ref.get)
-            if target_account_doc.exists:
-                target_account_data = target_account_doc.to_dict()
-        
         if not target_account_data.get("is_active"):
             if target_account_data.get("promo_status") == "TRIALING":
                 trial_end = dt.fromisoformat(target_account_data["trial_ends_at"])
@@ -567,21 +707,17 @@ async def get_current_account_and_user_ids(
                 logging.warning(f"Account {target_account_id} is not active and not on trial/POC.")
                 raise HTTPException(status_code=403, detail="Target account not active.")
 
-        # Warm user cache if needed.
-        # This will block the first request for a user until the cache is ready.
-        try:
-            await cache_manager.warm_up_user_cache_if_needed(target_account_id, x_user_id)
-        except Exception as e:
-            # Log if cache warming fails, but don't block the user from proceeding.
-            # The request will proceed without a cache, resulting in higher token usage for this call.
-            logging.error(f"Error during cache warming for {target_account_id}/{x_user_id}: {e}")
+        # Warm user cache in the background; requests never block on Gemini cache creation.
+        cache_warmup_scheduler.schedule(target_account_id, x_user_id, priority=PRIORITY_NORMAL)
 
-        return {
+        principal = {
             "account_id": target_account_id, 
             "aac_user_id": x_user_id,
             "is_demo_mode": is_demo_account,  # Optional field for web frontend, Flutter can ignore
             "email": account_data.get("email", "")  # Add email for admin verification
         }
+        _store_auth_session(session_cache_key, principal, account_id, decoded_token.get("exp"))
+        return principal
 
     except auth.ExpiredIdTokenError:
         logging.warning("Expired Firebase ID token received.")
@@ -860,42 +996,92 @@ async def get_aac_user_profiles(account_info: Annotated[Dict[str, str], Depends(
         raise HTTPException(status_code=500, detail=f"Failed to retrieve user profiles: {e}")
 
 
+def _pages_index_ref(account_id: str, aac_user_id: str):
+    return firestore_db.document(
+        f"{FIRESTORE_ACCOUNTS_COLLECTION}/{account_id}/{FIRESTORE_ACCOUNT_USERS_SUBCOLLECTION}/{aac_user_id}/config/pages_list"
+    )
+
+
 # Load pages from pages.json
 async def load_pages_from_file(account_id: str, aac_user_id: str): # ADD user_id
     """
-    Loads the list of pages from Firestore for a specific user.
+    Loads the list of pages from Firestore for a specific user (one document per page;
+    see page_store.py). A user without pages gets the default template, which is saved.
     """
-    default_pages_json_str = template_user_data_paths["pages.json"]
-    default_pages_list = json.loads(default_pages_json_str)
-    # Wrap default_pages_list in a dictionary for load_firestore_document
-    default_document_data = {"pages": default_pages_list} # Prepare default as a dict
-
-    # load_firestore_document will return a dictionary, e.g., {"pages": [...]}
-    loaded_document = await load_firestore_document(
-        account_id=account_id,
-        aac_user_id=aac_user_id,
-        doc_subpath="config/pages_list", # The subpath under the AAC user document
-        default_data=default_document_data # Pass the dictionary as default
-    )
-
-    # Extract the list of pages from the loaded dictionary
-    return loaded_document.get("pages", []) # <--- CRITICAL FIX: Extract the list from the dict
+    if not firestore_db:
+        logging.error(f"Firestore DB client not initialized. Cannot load pages for AAC user {aac_user_id}.")
+        return copy.deepcopy(DEFAULT_PAGES_TEMPLATE)
+    try:
+        pages = await page_store.load_pages(firestore_db, _pages_index_ref(account_id, aac_user_id), (account_id, aac_user_id))
+    except Exception as e:
+        logging.error(f"Error loading pages for account {account_id} and user {aac_user_id}: {e}", exc_info=True)
+        page_store.invalidate((account_id, aac_user_id))
+        return copy.deepcopy(DEFAULT_PAGES_TEMPLATE)
+    if pages is None:
+        logging.warning(f"No pages found for account {account_id} and user {aac_user_id}. Using and saving defaults.")
+        pages = copy.deepcopy(DEFAULT_PAGES_TEMPLATE)
+        await save_pages_to_file(account_id, aac_user_id, pages)
+    return pages
 
 
 # Save pages to pages.json
 async def save_pages_to_file(account_id: str, aac_user_id: str, pages: List[Dict]): # ADD user_id
-  """
-  Saves the list of pages to Firestore for a specific user.
-  """
-  # Firestore documents store key-value pairs (dictionaries).
-  # To store a list, put it as a field within a dictionary.
-  document_data = {"pages": pages} # <--- CRITICAL FIX: Wrap the list in a dictionary
-  return await save_firestore_document(
-    account_id=account_id,
-    aac_user_id=aac_user_id,
-    doc_subpath="config/pages_list", # The subpath under the AAC user document
-    data_to_save=document_data # Now sending a dictionary
-  )
+    """
+    Saves the full list of pages to Firestore for a specific user. Pages that did not
+    change are not rewritten; removed pages are deleted.
+    """
+    if not firestore_db:
+        logging.error(f"Firestore DB client not initialized. Cannot save pages for AAC user {aac_user_id}.")
+        return False
+    try:
+        result = await page_store.save_all(firestore_db, _pages_index_ref(account_id, aac_user_id), pages, (account_id, aac_user_id))
+        logging.info(
+            f"Saved pages for AAC user {aac_user_id}: {result['written']} written, "
+            f"{result['deleted']} deleted, {result['unchanged']} unchanged"
+        )
+        return True
+    except Exception as e:
+        logging.error(f"Error saving pages for account {account_id} and user {aac_user_id}: {e}", exc_info=True)
+        page_store.invalidate((account_id, aac_user_id))
+        return False
+
+
+async def save_page_change(
+    account_id: str,
+    aac_user_id: str,
+    pages: List[Dict],
+    page_name: str,
+    deleted: bool = False,
+    previous_name: Optional[str] = None,
+) -> bool:
+    """
+    Persist a change to one page of `pages` (the full list after the change): only that
+    page's document and its index entry are written. Falls back to save_pages_to_file
+    when the user's pages are not in per-page storage yet.
+    """
+    if not firestore_db:
+        return False
+    user_key = (account_id, aac_user_id)
+    if not page_store.has_per_page_layout(user_key):
+        return await save_pages_to_file(account_id, aac_user_id, pages)
+
+    try:
+        index_ref = _pages_index_ref(account_id, aac_user_id)
+        page_order = list(dict.fromkeys(name for name in (page_key(p) for p in pages) if name))
+        if deleted:
+            await page_store.delete_page(firestore_db, index_ref, page_name, user_key, page_order=page_order)
+        else:
+            page = next((p for p in pages if page_key(p) == page_name), None)
+            if page is None:
+                raise ValueError(f"Page {page_name} not found in pages")
+            await page_store.save_page(
+                firestore_db, index_ref, page, user_key, previous_name=previous_name, page_order=page_order
+            )
+        return True
+    except Exception as e:
+        logging.error(f"Error saving page {page_name} for account {account_id} and user {aac_user_id}: {e}", exc_info=True)
+        page_store.invalidate(user_key)
+        return False
 
 @app.get("/pages")
 async def get_pages(current_ids: Annotated[Dict[str, str], Depends(get_current_account_and_user_ids)]): # ADD user_id
@@ -912,8 +1098,8 @@ async def create_page(page: dict, current_ids: Annotated[Dict[str, str], Depends
         aac_user_id = current_ids["aac_user_id"]
         pages = await load_pages_from_file(account_id, aac_user_id) # Ensure this is 'await'ed
 
-        # Convert incoming page name to lowercase
-        page["name"] = page["name"].lower()
+        # Normalize the incoming page name the way page_store keys pages
+        page["name"] = page_key(page)
 
         if any(p["name"] == page["name"] for p in pages):
             raise HTTPException(status_code=400, detail="Page with this name already exists")
@@ -922,10 +1108,11 @@ async def create_page(page: dict, current_ids: Annotated[Dict[str, str], Depends
         if "buttons" in page and isinstance(page["buttons"], list):
             for button in page["buttons"]:
                 if isinstance(button, dict) and "targetPage" in button and button["targetPage"]:
-                    button["targetPage"] = button["targetPage"].lower()
+                    button["targetPage"] = button["targetPage"].strip().lower()
 
         pages.append(page)
-        await save_pages_to_file(account_id, aac_user_id, pages) # ADD 'await' here
+        if not await save_page_change(account_id, aac_user_id, pages, page["name"]):
+            raise HTTPException(status_code=500, detail="Failed to save page")
         
         # NOTE: No cache invalidation needed - pages are in delta context, not cached
         
@@ -943,11 +1130,11 @@ async def update_page(request: Request, current_ids: Annotated[Dict[str, str], D
         # The 'name' field is used to identify the page.
         # 'originalName' should be the name as it was loaded (which will be lowercase)
         original_page_name_from_client = incoming_payload.pop("originalName", None)
-        current_page_name_to_find = original_page_name_from_client.lower() if original_page_name_from_client else None
+        current_page_name_to_find = original_page_name_from_client.strip().lower() if original_page_name_from_client else None
 
-        # Lowercase the new name if provided
+        # Normalize the new name if provided
         if "name" in incoming_payload and incoming_payload["name"]:
-            incoming_payload["name"] = incoming_payload["name"].lower()
+            incoming_payload["name"] = page_key(incoming_payload)
 
         if not current_page_name_to_find:
             raise HTTPException(status_code=400, detail="originalName is required for updates")
@@ -977,7 +1164,7 @@ async def update_page(request: Request, current_ids: Annotated[Dict[str, str], D
                 if "buttons" in updated_page_data and isinstance(updated_page_data["buttons"], list):
                     for button in updated_page_data["buttons"]:
                         if isinstance(button, dict) and "targetPage" in button and button["targetPage"]:
-                            button["targetPage"] = button["targetPage"].lower()
+                            button["targetPage"] = button["targetPage"].strip().lower()
 
                 all_pages_for_user[i] = updated_page_data # Replace the old page with the merged data
                 found = True
@@ -986,9 +1173,12 @@ async def update_page(request: Request, current_ids: Annotated[Dict[str, str], D
         if not found:
             raise HTTPException(status_code=404, detail=f"Page with name '{current_page_name_to_find}' not found for account {account_id} and user {aac_user_id}.")
 
-        # Save the ENTIRE updated list of pages back to Firestore
-        # The save_pages_to_file wraps this list in a dictionary, which is what Firestore expects.
-        await save_pages_to_file(account_id, aac_user_id, all_pages_for_user)
+        # Only the updated page (and, on a rename, the old page's document) is written.
+        if not await save_page_change(
+            account_id, aac_user_id, all_pages_for_user, updated_page_data["name"],
+            previous_name=current_page_name_to_find,
+        ):
+            raise HTTPException(status_code=500, detail="Failed to save page")
         
         # NOTE: No cache invalidation needed - pages are in delta context, not cached
         
@@ -1002,16 +1192,17 @@ async def update_page(request: Request, current_ids: Annotated[Dict[str, str], D
 async def delete_page(page_name: str, current_ids: Annotated[Dict[str, str], Depends(get_current_account_and_user_ids)]): # ADD user_id
     aac_user_id = current_ids["aac_user_id"]
     account_id = current_ids["account_id"]
-    page_name_lower = page_name.lower() # Convert incoming page_name to lowercase
+    page_name_lower = page_name.strip().lower() # Normalize the way page_store keys pages
     pages_data = await load_pages_from_file(account_id, aac_user_id) # Load for this user
     # Prevent deletion of the 'home' page
     if page_name_lower == "home":
         raise HTTPException(status_code=400, detail="The 'home' page cannot be deleted.")
 
     initial_len = len(pages_data)
-    pages_data = [p for p in pages_data if p["name"].lower() != page_name_lower] # Compare with lowercase
+    pages_data = [p for p in pages_data if page_key(p) != page_name_lower]
     if len(pages_data) < initial_len:
-        await save_pages_to_file(account_id, aac_user_id, pages_data) # Save for this user
+        if not await save_page_change(account_id, aac_user_id, pages_data, page_name_lower, deleted=True):
+            raise HTTPException(status_code=500, detail="Failed to delete page")
         
         # NOTE: No cache invalidation needed - pages are in delta context, not cached
         
@@ -1205,9 +1396,8 @@ async def update_user_current_endpoint(payload: UserCurrentState, current_ids: A
             )
             
             # Track mood update timestamp
-            global mood_update_timestamps
             user_key = f"{account_id}/{aac_user_id}"
-            mood_update_timestamps[user_key] = time.time()
+            await mood_update_timestamps.set(user_key, time.time())
             logging.info(f"✅ Mood updated via current_state endpoint: {mood} for {account_id}/{aac_user_id}")
         except Exception as mood_error:
             logging.error(f"Error saving mood from current_state: {mood_error}")
@@ -1748,6 +1938,13 @@ MAX_CHAT_CONTEXT = 5 # Max number of recent chat turns for LLM
 CHAT_HISTORY_ACTIVE_DAYS = 7  # Messages within this many days are considered "active"
 CHAT_HISTORY_ARCHIVE_DAYS = 30  # Messages older than this are archived
 
+# DELTA context budgets (~4 chars/token). Diary entries and chat turns beyond the pinned
+# most-recent ones are picked by relevance to the request until the budget is used.
+DELTA_DIARY_TOKEN_BUDGET = int(os.getenv("DELTA_DIARY_TOKEN_BUDGET", "600"))
+DELTA_CHAT_TOKEN_BUDGET = int(os.getenv("DELTA_CHAT_TOKEN_BUDGET", "1200"))
+DELTA_PINNED_DIARY_ENTRIES = 5
+DELTA_PINNED_CHAT_TURNS = 6
+
 # Message type classifications for intelligent processing
 MESSAGE_TYPES = [
     "greeting",      # Hello, good morning, hi
@@ -2848,6 +3045,27 @@ def enforce_ai_option_overrides(options: List[Any], overrides: Dict[str, Any], m
 
     return filtered[:max(1, max_options)]
 
+
+def llm_response_has_compliant_options(response_text: str, overrides: Dict[str, Any]) -> bool:
+    """
+    Quick check used to pick between hedged /llm responses: the text holds a JSON
+    list with at least one usable option that enforce_ai_option_overrides keeps.
+    """
+    match = re.search(r'\[.*\]', response_text or "", re.DOTALL)
+    if not match:
+        return False
+    try:
+        parsed = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return False
+    if not isinstance(parsed, list):
+        return False
+    for raw_item in parsed:
+        normalized_item = _normalize_llm_option_item(raw_item)
+        if normalized_item and not _violates_ai_option_overrides(_build_option_search_text(normalized_item), overrides):
+            return True
+    return False
+
 # AI-extracted narrative from chat history
 DEFAULT_CHAT_DERIVED_NARRATIVE = {
     "last_updated": None,
@@ -2884,7 +3102,16 @@ class GeminiCacheManager:
         
         self.ttl_seconds = ttl_hours * 3600
         self.local_validation_ttl_seconds = 60
-        self._validated_cache_refs: Dict[str, Dict[str, Any]] = {}
+        # Shared across workers, so a cache deleted by one worker is never trusted by another.
+        self._validated_cache_refs = state_store.namespace("gemini_cache_refs", ttl=self.local_validation_ttl_seconds)
+        # Bumped by invalidate_cache so a warm-up that started earlier drops its (stale) result.
+        self._generations: Dict[str, int] = {}
+        # Short lease so two instances never create the same user's cache at once.
+        self.WARMUP_LEASE_COLLECTION = "system/cache_manager/warmup_leases"
+        self.warmup_lease_seconds = 180
+        self._lease_owner = uuid.uuid4().hex
+        # Leases this instance created or took over; only these are ever released.
+        self._owned_warmup_leases: Set[str] = set()
         logging.info(f"✅ Cache Manager initialized with Firestore persistence and {ttl_hours}-hour TTL.")
 
     def _get_user_key(self, account_id: str, aac_user_id: str) -> str:
@@ -2892,6 +3119,87 @@ class GeminiCacheManager:
         # Versioned to invalidate stale cached base context after diary context moved to DELTA.
         # v3: model upgraded from gemini-1.5-flash-latest to gemini-2.0-flash (caches are model-specific)
         return f"v3_{account_id}_{aac_user_id}"
+
+    def _cache_expires_at(self, cache_data: Dict) -> float:
+        # expires_at moves forward when a cache's TTL is extended; created_at does not.
+        return cache_data.get('expires_at') or (cache_data.get('created_at', 0) + self.ttl_seconds)
+
+    async def _acquire_warmup_lease(self, user_key: str) -> bool:
+        """Claims the user's warm-up lease. False while another live owner holds it."""
+        lease_ref = self.db.collection(self.WARMUP_LEASE_COLLECTION).document(user_key)
+        now_ts = dt.now().timestamp()
+        lease = {"owner": self._lease_owner, "expires_at": now_ts + self.warmup_lease_seconds}
+        try:
+            await asyncio.to_thread(lease_ref.create, lease)
+            self._owned_warmup_leases.add(user_key)
+            return True
+        except google.api_core.exceptions.AlreadyExists:
+            pass
+        except Exception as e:
+            # Lease storage trouble should not stop warm-ups; the in-process singleflight still applies.
+            # The lease is not ours, so the release after this warm-up leaves it alone.
+            logging.warning(f"Could not create warm-up lease for {user_key}: {e}")
+            return True
+        try:
+            snap = await asyncio.to_thread(lease_ref.get)
+            if not snap.exists:
+                await asyncio.to_thread(lease_ref.create, lease)
+                self._owned_warmup_leases.add(user_key)
+                return True
+            current = snap.to_dict() or {}
+            if current.get("owner") != self._lease_owner and current.get("expires_at", 0) > now_ts:
+                return False
+            # Expired (or ours): take it over only if nobody else did since we read it.
+            await asyncio.to_thread(
+                lease_ref.update, lease, option=self.db.write_option(last_update_time=snap.update_time)
+            )
+            self._owned_warmup_leases.add(user_key)
+            return True
+        except (google.api_core.exceptions.FailedPrecondition, google.api_core.exceptions.AlreadyExists):
+            return False
+        except Exception as e:
+            logging.warning(f"Could not take over warm-up lease for {user_key}: {e}")
+            return True
+
+    async def _release_warmup_lease(self, user_key: str) -> None:
+        """Deletes the user's warm-up lease, but only one this instance owns and still holds."""
+        if user_key not in self._owned_warmup_leases:
+            return
+        self._owned_warmup_leases.discard(user_key)
+        try:
+            lease_ref = self.db.collection(self.WARMUP_LEASE_COLLECTION).document(user_key)
+            snap = await asyncio.to_thread(lease_ref.get)
+            if not snap.exists or (snap.to_dict() or {}).get("owner") != self._lease_owner:
+                # Our lease expired and another instance took it over.
+                return
+            # Delete only if nobody took it over since we read it.
+            await asyncio.to_thread(
+                lease_ref.delete, option=self.db.write_option(last_update_time=snap.update_time)
+            )
+        except google.api_core.exceptions.FailedPrecondition:
+            pass
+        except Exception as e:
+            logging.warning(f"Could not release warm-up lease for {user_key}: {e}")
+
+    async def _extend_cache_ttl(self, user_key: str, cache_name: str) -> Optional[float]:
+        """Pushes an existing cache's expiry out by a full TTL. Returns the new expiry, or None."""
+        try:
+            cached_content = await asyncio.to_thread(caching.CachedContent.get, cache_name)
+            await asyncio.to_thread(cached_content.update, ttl=timedelta(seconds=self.ttl_seconds))
+            now_ts = dt.now().timestamp()
+            expires_at = now_ts + self.ttl_seconds
+            doc_ref = self.db.collection(self.CACHE_COLLECTION).document(user_key)
+            await asyncio.to_thread(doc_ref.update, {"expires_at": expires_at, "refreshed_at": now_ts})
+            await self._validated_cache_refs.set(user_key, {
+                "cache_name": cache_name,
+                "expires_at": expires_at,
+                "validated_at": now_ts,
+            })
+            logging.info(f"⏳ Extended Gemini cache {cache_name} for '{user_key}' by {self.ttl_seconds}s")
+            return expires_at
+        except Exception as e:
+            logging.warning(f"Could not extend Gemini cache {cache_name} for '{user_key}': {e}")
+            return None
     
     async def _load_cache_from_firestore(self, user_key: str) -> Optional[Dict]:
         """Load cache info from Firestore."""
@@ -2935,11 +3243,11 @@ class GeminiCacheManager:
                 f"💾 Saved cache reference to Firestore: {user_key} -> {cache_name} "
                 f"({message_count} messages, chat_history_cached={bool(chat_history_cached)})"
             )
-            self._validated_cache_refs[user_key] = {
+            await self._validated_cache_refs.set(user_key, {
                 "cache_name": cache_name,
                 "expires_at": expires_at,
                 "validated_at": dt.now().timestamp(),
-            }
+            })
         except Exception as e:
             logging.error(f"Error saving cache to Firestore for {user_key}: {e}")
     
@@ -2948,7 +3256,7 @@ class GeminiCacheManager:
         try:
             doc_ref = self.db.collection(self.CACHE_COLLECTION).document(user_key)
             await asyncio.to_thread(doc_ref.delete)
-            self._validated_cache_refs.pop(user_key, None)
+            await self._validated_cache_refs.delete(user_key)
             logging.info(f"Deleted cache reference from Firestore: {user_key}")
         except Exception as e:
             logging.error(f"Error deleting cache from Firestore for {user_key}: {e}")
@@ -2956,7 +3264,7 @@ class GeminiCacheManager:
     async def _is_cache_valid(self, user_key: str) -> bool:
         """Checks if a user's cache exists in Firestore and is within its TTL."""
         now_ts = dt.now().timestamp()
-        local_cache_ref = self._validated_cache_refs.get(user_key)
+        local_cache_ref = await self._validated_cache_refs.get(user_key)
         if local_cache_ref:
             if (
                 local_cache_ref.get('cache_name')
@@ -2965,7 +3273,7 @@ class GeminiCacheManager:
             ):
                 return True
             if local_cache_ref.get('expires_at', 0) <= now_ts:
-                self._validated_cache_refs.pop(user_key, None)
+                await self._validated_cache_refs.delete(user_key)
 
         print(f"DEBUG: _is_cache_valid called for {user_key}", flush=True)
         cache_data = await self._load_cache_from_firestore(user_key)
@@ -2975,8 +3283,7 @@ class GeminiCacheManager:
             print(f"DEBUG: No cache_data, returning False", flush=True)
             return False
         
-        created_at = cache_data.get('created_at', 0)
-        is_expired = (dt.now().timestamp() - created_at) > self.ttl_seconds
+        is_expired = self._cache_expires_at(cache_data) <= dt.now().timestamp()
         
         if is_expired:
             logging.warning(f"Cache for user '{user_key}' has expired. TTL: {self.ttl_seconds}s.")
@@ -2990,11 +3297,11 @@ class GeminiCacheManager:
             try:
                 # Verify the cache still exists in Gemini API
                 await asyncio.to_thread(caching.CachedContent.get, cache_name)
-                self._validated_cache_refs[user_key] = {
+                await self._validated_cache_refs.set(user_key, {
                     "cache_name": cache_name,
-                    "expires_at": cache_data.get('expires_at', now_ts + self.ttl_seconds),
+                    "expires_at": self._cache_expires_at(cache_data),
                     "validated_at": now_ts,
-                }
+                })
                 logging.info(f"Cache for '{user_key}' is valid: {cache_name}")
                 return True
             except Exception as e:
@@ -3168,24 +3475,36 @@ Analyze the provided context to create helpful, personalized suggestions."""
         - Current mood (changes frequently)
         - Current location/people/activity (changes per request)
         - Current date and diary entries (date-sensitive; query-sensitive)
-        - Recent chat history (last 10 turns)
+        - Recent chat history (latest turns plus those relevant to query_hint)
         - User pages (frequently edited)
+
+        Diary and chat come from context_retriever and are bounded by
+        DELTA_DIARY_TOKEN_BUDGET / DELTA_CHAT_TOKEN_BUDGET. Sizes are reported
+        through delta_context_report for the /llm timing logs.
         """
         logging.info(f"⚡ Building DELTA context (dynamic data) for {account_id}/{aac_user_id}...")
         
         query_hint_lower = str(query_hint or "").lower()
+        user_key = (account_id, aac_user_id)
+        # Characters the diary/chat candidates dropped by selection would have added.
+        filtered_out_chars = 0
 
         # Fetch dynamic data
         # NOTE: chat_history uses recent messages (CHAT_HISTORY_ACTIVE_DAYS) to match BASE context
         # NOTE: pages moved to BASE cache (they rarely change, but are huge)
+        chat_since_iso = (dt.now() - timedelta(days=CHAT_HISTORY_ACTIVE_DAYS)).isoformat()
         tasks = {
             "user_current": load_firestore_document(account_id, aac_user_id, "info/current_state", DEFAULT_USER_CURRENT),
-            "chat_history": load_recent_chat_history(account_id, aac_user_id, days=CHAT_HISTORY_ACTIVE_DAYS),
+            "chat_history": context_retriever.get_recent_chat(
+                user_key,
+                chat_since_iso,
+                lambda: load_recent_chat_history(account_id, aac_user_id, days=CHAT_HISTORY_ACTIVE_DAYS),
+            ),
         }
         if include_rich_context:
             tasks["birthdays"] = load_birthdays_from_file(account_id, aac_user_id)
             tasks["friends_family"] = load_friends_family_from_file(account_id, aac_user_id)
-            tasks["diary"] = load_diary_entries(account_id, aac_user_id)
+            tasks["diary"] = context_retriever.get_diary(user_key, lambda: load_diary_entries(account_id, aac_user_id))
         results = await asyncio.gather(*tasks.values())
         context_data = dict(zip(tasks.keys(), results))
         context_data["user_info"] = prefetched_user_info if isinstance(prefetched_user_info, dict) else DEFAULT_USER_INFO
@@ -3357,13 +3676,30 @@ Analyze the provided context to create helpful, personalized suggestions."""
             ]
             use_recent_only = any(keyword in query_hint_lower for keyword in recent_activity_keywords)
 
-            completed_entries_for_context = recent_completed_entries if use_recent_only else [
-                entry for entry, _ in completed_entries[:15]
-            ]
+            # Newest completed first, soonest upcoming first. The pinned head of each list is
+            # always included; the rest competes on relevance to the request.
+            diary_scores = context_retriever.rank_diary(user_key, query_hint)
+            diary_budget_chars = DELTA_DIARY_TOKEN_BUDGET * 4
+            completed_candidates = recent_completed_entries if use_recent_only else [entry for entry, _ in completed_entries]
+            upcoming_candidates = [] if use_recent_only else [entry for entry, _ in reversed(upcoming_entries)]
+            completed_lines = select_within_budget(
+                completed_candidates, render_diary_line, diary_scores,
+                int(diary_budget_chars * (0.85 if use_recent_only else 0.5)), pinned=DELTA_PINNED_DIARY_ENTRIES,
+            )
+            upcoming_lines = select_within_budget(
+                upcoming_candidates, render_diary_line, diary_scores,
+                int(diary_budget_chars * 0.35), pinned=DELTA_PINNED_DIARY_ENTRIES,
+            )
+            undated_lines = select_within_budget(
+                undated_entries, render_diary_line, diary_scores, int(diary_budget_chars * 0.15),
+            )
+            filtered_out_chars += rendered_chars(
+                completed_candidates + upcoming_candidates + undated_entries, render_diary_line
+            ) - sum(len(line) + 1 for line in completed_lines + upcoming_lines + undated_lines)
             completed_heading = (
-                f"Completed Diary Entries Within Last 14 Days Only (date >= {recent_cutoff.strftime('%Y-%m-%d')} and <= {current_date_str}, newest first, max 15):"
+                f"Completed Diary Entries Within Last 14 Days Only (date >= {recent_cutoff.strftime('%Y-%m-%d')} and <= {current_date_str}, newest first):"
                 if use_recent_only
-                else f"Completed / Today Diary Entries (date <= {current_date_str}, newest first, max 15):"
+                else f"Completed / Today Diary Entries (date <= {current_date_str}, newest first; latest plus those relevant to this request):"
             )
             recent_only_rule = (
                 f"- THIS REQUEST is about recent past activity. Use ONLY completed diary entries from the last 14 days ({recent_cutoff.strftime('%Y-%m-%d')} through {current_date_str}).\n"
@@ -3373,13 +3709,10 @@ Analyze the provided context to create helpful, personalized suggestions."""
                 if use_recent_only
                 else ""
             )
-            upcoming_entries_for_context = [] if use_recent_only else [
-                entry for entry, _ in list(reversed(upcoming_entries[-15:]))
-            ]
             upcoming_heading = (
                 "Upcoming Diary Entries (hidden for this recent-activity request; do not use):"
                 if use_recent_only
-                else f"Upcoming Diary Entries (date > {current_date_str}, soonest first, max 15):"
+                else f"Upcoming Diary Entries (date > {current_date_str}, soonest first; nearest plus those relevant to this request):"
             )
 
             diary_context = f"""--- Diary Entries (Dynamic Context) ---
@@ -3395,13 +3728,13 @@ Analyze the provided context to create helpful, personalized suggestions."""
 - NEVER describe Upcoming entries as if they already happened.
 
 {completed_heading}
-{json.dumps(completed_entries_for_context[:15], indent=2)}
+{chr(10).join(completed_lines) or "(none)"}
 
 {upcoming_heading}
-{json.dumps(upcoming_entries_for_context, indent=2)}
+{chr(10).join(upcoming_lines) or "(none)"}
 
-Undated Diary Entries (use cautiously, max 5):
-{json.dumps(undated_entries[:5], indent=2)}
+Undated Diary Entries (use cautiously):
+{chr(10).join(undated_lines) or "(none)"}
 """
             delta_parts.append(diary_context)
 
@@ -3468,6 +3801,7 @@ Undated Diary Entries (use cautiously, max 5):
                     f"{json.dumps(compact_messages, indent=2)}\n"
                 )
                 delta_string = "\n".join(delta_parts)
+                delta_context_report.set({"chars": len(delta_string), "unfiltered_chars": len(delta_string) + filtered_out_chars})
                 logging.warning(
                     f"✅ DELTA context (FAST) for {account_id}/{aac_user_id} is {len(delta_string)} chars "
                     f"(~{len(delta_string)//4} tokens)"
@@ -3494,32 +3828,61 @@ Undated Diary Entries (use cautiously, max 5):
                 joke_warning += "\n🚫 DO NOT generate any of these jokes again. Create COMPLETELY NEW and DIFFERENT jokes.\n"
                 delta_parts.append(f"--- Recently Used Jokes (DO NOT REPEAT) ---\n{joke_warning}\n")
             
-            delta_parts.append(f"\n💬 RECENT CHAT HISTORY (Last {CHAT_HISTORY_ACTIVE_DAYS} days, {len(recent_messages)} messages):\n{json.dumps(recent_messages, indent=2)}\n")
-            logging.warning(f"✅ Including ALL {len(recent_messages)} recent messages in DELTA (not cached)")
-            logging.warning(f"📊 Chat history size: {len(json.dumps(recent_messages))} chars")
+            # Latest turns always (conversation continuity), older ones only when relevant.
+            newest_first = list(reversed(recent_messages))
+            chat_lines = select_within_budget(
+                newest_first,
+                render_chat_line,
+                context_retriever.rank_chat(user_key, query_hint),
+                DELTA_CHAT_TOKEN_BUDGET * 4,
+                pinned=DELTA_PINNED_CHAT_TURNS,
+            )
+            chat_lines.reverse()
+            filtered_out_chars += rendered_chars(newest_first, render_chat_line) - sum(len(line) + 1 for line in chat_lines)
+            delta_parts.append(
+                f"\n💬 RECENT CHAT HISTORY (Last {CHAT_HISTORY_ACTIVE_DAYS} days, {len(chat_lines)} of {len(recent_messages)} messages: "
+                f"latest plus those relevant to this request, oldest first):\n" + "\n".join(chat_lines) + "\n"
+            )
+            logging.info(f"✅ Including {len(chat_lines)}/{len(recent_messages)} recent messages in DELTA (not cached)")
         
         # User-defined pages moved to BASE cache (too large for DELTA)
         
         delta_string = "\n".join(delta_parts)
+        delta_context_report.set({"chars": len(delta_string), "unfiltered_chars": len(delta_string) + filtered_out_chars})
         logging.warning(f"✅ DELTA context for {account_id}/{aac_user_id} is {len(delta_string)} chars (~{len(delta_string)//4} tokens)")
         logging.warning(f"📋 DELTA PREVIEW (first 500 chars): {delta_string[:500]}")
         return delta_string
 
-    async def warm_up_user_cache_if_needed(self, account_id: str, aac_user_id: str) -> None:
+    async def warm_up_user_cache_if_needed(
+        self, account_id: str, aac_user_id: str, refresh_before_seconds: float = 0
+    ) -> Optional[float]:
         """
         Checks if a valid cache exists for the user. If not, it builds the
         combined context and creates a new Gemini CachedContent object.
+        A valid cache expiring within refresh_before_seconds gets its TTL extended.
+        Returns the cache's expiry timestamp, or None if there is no cache.
+
+        Called from cache_warmup_scheduler workers, never from a request path.
         """
-        print(f"DEBUG: warm_up_user_cache_if_needed ENTRY for {account_id}/{aac_user_id}", flush=True)
         logging.warning(f"🔥 WARMUP FUNCTION CALLED for account_id={account_id}, aac_user_id={aac_user_id}")
         user_key = self._get_user_key(account_id, aac_user_id)
-        logging.warning(f"🔑 Generated user_key: {user_key}")
+        generation = self._generations.get(user_key, 0)
         if await self._is_cache_valid(user_key):
-            logging.warning(f"Cache for user '{user_key}' is already warm and valid.")
-            return
+            cache_ref = await self._validated_cache_refs.get(user_key) or {}
+            expires_at = cache_ref.get("expires_at")
+            if not refresh_before_seconds or not expires_at or expires_at - dt.now().timestamp() > refresh_before_seconds:
+                logging.warning(f"Cache for user '{user_key}' is already warm and valid.")
+                return expires_at
+            extended = await self._extend_cache_ttl(user_key, cache_ref["cache_name"])
+            if extended:
+                return extended
+            # Could not extend: build a replacement; the old cache expires on its own shortly.
+
+        if not await self._acquire_warmup_lease(user_key):
+            logging.info(f"Cache warm-up for '{user_key}' is already running on another instance.")
+            return None
 
         logging.warning(f"Cache for user '{user_key}' is cold or invalid. Warming up...")
-        print(f"DEBUG: About to build BASE context", flush=True)
         try:
             # Build BASE context only - stable data for caching
             base_context = await self._build_base_context(account_id, aac_user_id)
@@ -3533,7 +3896,7 @@ Undated Diary Entries (use cautiously, max 5):
             
             if estimated_tokens < min_tokens_required:
                 logging.warning(f"BASE context for user '{user_key}' has {int(estimated_tokens)} tokens < {min_tokens_required} minimum. Skipping cache creation.")
-                return
+                return None
             
             logging.warning(f"🚀 Creating cache for user '{user_key}' with {int(estimated_tokens)} tokens (above {min_tokens_required} minimum)")
 
@@ -3551,6 +3914,12 @@ Undated Diary Entries (use cautiously, max 5):
                 ttl=timedelta(seconds=self.ttl_seconds)
             )
 
+            if self._generations.get(user_key, 0) != generation:
+                # Invalidated while we were building: this content is already stale.
+                logging.warning(f"Cache for '{user_key}' was invalidated during warm-up; discarding {cached_content.name}")
+                await asyncio.to_thread(cached_content.delete)
+                return None
+
             # Save to Firestore (no message count since we don't cache chat anymore)
             await self._save_cache_to_firestore(
                 user_key,
@@ -3560,11 +3929,15 @@ Undated Diary Entries (use cautiously, max 5):
                 chat_history_cached=False,
             )
             logging.warning(f"✅ Successfully warmed up cache for user '{user_key}'. Cache: {cached_content.name} (chat history NOT cached - in DELTA)")
+            return created_at + self.ttl_seconds
 
         except Exception as e:
             logging.error(f"Failed to warm up cache for user '{user_key}': {e}", exc_info=True)
             # Clean up any partial state from Firestore
             await self._delete_cache_from_firestore(user_key)
+            return None
+        finally:
+            await self._release_warmup_lease(user_key)
 
     async def get_cached_content_reference(self, account_id: str, aac_user_id: str) -> Optional[str]:
         """
@@ -3586,6 +3959,8 @@ Undated Diary Entries (use cautiously, max 5):
     async def invalidate_cache(self, account_id: str, aac_user_id: str) -> None:
         """Invalidates and deletes the cache for a specific user from both Firestore and Gemini."""
         user_key = self._get_user_key(account_id, aac_user_id)
+        self._generations[user_key] = self._generations.get(user_key, 0) + 1
+        cache_warmup_scheduler.forget(account_id, aac_user_id)
         
         # Load cache info from Firestore
         cache_data = await self._load_cache_from_firestore(user_key)
@@ -3619,8 +3994,9 @@ Undated Diary Entries (use cautiously, max 5):
         creation_time = cache_data.get('created_at', 0)
         messages_in_cache = cache_data.get('message_count', 0)
 
+        expires_at = self._cache_expires_at(cache_data)
         age_seconds = dt.now().timestamp() - creation_time
-        time_left_seconds = self.ttl_seconds - age_seconds
+        time_left_seconds = expires_at - dt.now().timestamp()
         is_valid = time_left_seconds > 0
         
         # Calculate current drift
@@ -3633,7 +4009,7 @@ Undated Diary Entries (use cautiously, max 5):
             "user_key": user_key,
             "cache_name": cache_name,
             "created_at": dt.fromtimestamp(creation_time).isoformat(),
-            "expires_at": dt.fromtimestamp(creation_time + self.ttl_seconds).isoformat(),
+            "expires_at": dt.fromtimestamp(expires_at).isoformat(),
             "age_minutes": round(age_seconds / 60, 2),
             "time_left_minutes": round(time_left_seconds / 60, 2),
             "is_valid": is_valid,
@@ -3714,11 +4090,10 @@ Undated Diary Entries (use cautiously, max 5):
             
             for doc in docs:
                 data = doc.to_dict()
-                created_at = data.get('created_at', 0)
                 user_key = data.get('user_key')
                 cache_name = data.get('cache_name')
                 
-                if (now - created_at) > self.ttl_seconds:
+                if self._cache_expires_at(data) <= now:
                     # Expired - delete it
                     await self._delete_expired_cache(user_key, cache_name)
                     cleaned += 1
@@ -3943,6 +4318,7 @@ async def add_aac_user_to_account(
             display_name=request_data.display_name
         )
 
+        invalidate_auth_session_cache(account_id=account_id)
         logging.info(f"New AAC user '{new_aac_user_id}' ('{request_data.display_name}') added to account '{account_id}'.")
         return JSONResponse(content={
             "message": "New AAC user added successfully.",
@@ -4044,16 +4420,10 @@ async def delete_user_account(
         if current_user_count <= 1:
             raise HTTPException(status_code=400, detail="Cannot delete the last user account. At least one user must remain.")
 
-        # 3. Delete all data for this AAC user
-        # Delete all subcollections under the AAC user document
-        await asyncio.to_thread(_delete_collection, aac_user_doc_ref.collection('config'))
-        await asyncio.to_thread(_delete_collection, aac_user_doc_ref.collection('info'))
-        await asyncio.to_thread(_delete_collection, aac_user_doc_ref.collection('diary_entries'))
-        await asyncio.to_thread(_delete_collection, aac_user_doc_ref.collection('chat_history'))
-        await asyncio.to_thread(_delete_collection, aac_user_doc_ref.collection('button_activity_log'))
-        
-        # Delete the AAC user document itself
-        await asyncio.to_thread(aac_user_doc_ref.delete)
+        # 3. Delete all data for this AAC user: the user document and every nested
+        # subcollection (pages and tap boards live below config/)
+        await _delete_document_tree(aac_user_doc_ref)
+        invalidate_auth_session_cache(account_id=account_id, aac_user_id=request_data.aac_user_id)
 
         logging.info(f"Deleted AAC user '{request_data.aac_user_id}' and all associated data under account '{account_id}'.")
         
@@ -4425,14 +4795,9 @@ async def delete_aac_user_profile_endpoint(current_ids: Annotated[Dict[str, str]
         # Path for this individual AAC user's data
         user_base_path_ref = firestore_db.collection(FIRESTORE_ACCOUNTS_COLLECTION).document(account_id).collection(FIRESTORE_ACCOUNT_USERS_SUBCOLLECTION).document(aac_user_id)
 
-        # Delete all subcollections under the AAC user document and then the document itself
-        await asyncio.to_thread(_delete_collection, user_base_path_ref.collection('config'))
-        await asyncio.to_thread(_delete_collection, user_base_path_ref.collection('info'))
-        await asyncio.to_thread(_delete_collection, user_base_path_ref.collection('diary_entries'))
-        await asyncio.to_thread(_delete_collection, user_base_path_ref.collection('chat_history'))
-        await asyncio.to_thread(_delete_collection, user_base_path_ref.collection('button_activity_log'))
-        # Delete the AAC user document itself
-        await asyncio.to_thread(user_base_path_ref.delete)
+        # Delete the AAC user document with every nested subcollection (pages and tap boards live below config/)
+        await _delete_document_tree(user_base_path_ref)
+        invalidate_auth_session_cache(account_id=account_id, aac_user_id=aac_user_id)
         logging.info(f"ALL Firestore data for AAC user '{aac_user_id}' under account '{account_id}' deleted successfully.")
 
     except Exception as e:
@@ -4441,17 +4806,9 @@ async def delete_aac_user_profile_endpoint(current_ids: Annotated[Dict[str, str]
 
 
 
-# --- ADD THIS HELPER FUNCTION if you don't have it somewhere ---
-# This is needed for deleting subcollections (Firestore client library doesn't have a direct recursive delete)
-async def _delete_collection(coll_ref, batch_size=50):
-    docs = await asyncio.to_thread(coll_ref.limit(batch_size).stream)
-    deleted = 0
-    for doc in docs:
-        await asyncio.to_thread(doc.reference.delete)
-        deleted = deleted + 1
-    if deleted >= batch_size:
-        # If there are more documents to delete, call the function recursively
-        await _delete_collection(coll_ref, batch_size)
+async def _delete_document_tree(doc_ref) -> int:
+    """Delete a document and all of its subcollections, however deeply nested. Returns the count."""
+    return await asyncio.to_thread(firestore_db.recursive_delete, doc_ref)
 
 
 # --- OpenAI Helper Functions ---
@@ -4508,7 +4865,8 @@ async def _generate_openai_content(prompt_text: str, model: str = None) -> str:
             request_params["max_tokens"] = 2000
             logging.info(f"Using max_tokens for model: {model}")
         
-        response = await asyncio.to_thread(
+        response = await llm_execution.run(
+            f"openai:{model}",
             openai_client.chat.completions.create,
             **request_params
         )
@@ -4578,6 +4936,12 @@ def _is_retryable_gemini_exception(exc: Exception) -> bool:
     return any(marker in message for marker in retryable_markers)
 
 
+def _llm_model_key(model_name: Optional[str]) -> str:
+    """Per-model key for llm_execution limits/breakers ("models/gemini-x" and "gemini-x" are the same lane)."""
+    name = str(model_name or GEMINI_PRIMARY_MODEL)
+    return name[len("models/"):] if name.startswith("models/") else name
+
+
 async def _execute_gemini_call_with_retry(
     call_factory,
     operation_label: str,
@@ -4586,14 +4950,28 @@ async def _execute_gemini_call_with_retry(
     max_attempts: int = 6,
     base_delay_seconds: float = 0.5,
     max_delay_seconds: float = 20.0,
+    model_key: Optional[str] = None,
 ):
+    """
+    Runs call_factory on the LLM executor under the model's concurrency limit and
+    circuit breaker, retrying retryable errors with jittered backoff. Labels of the
+    form "<op>:<model_name>" pick the model lane; otherwise the primary model's.
+    Raises CircuitOpenError (a ServiceUnavailable) as soon as the circuit is open,
+    so callers fail over instead of waiting out the remaining attempts.
+    """
+    if model_key is None:
+        model_key = _llm_model_key(operation_label.split(":", 1)[1] if ":" in operation_label else None)
     attempt = 1
     while attempt <= max_attempts:
         try:
-            return await asyncio.to_thread(call_factory)
+            return await llm_execution.run(model_key, call_factory)
+        except CircuitOpenError:
+            raise
         except Exception as exc:
             is_retryable = _is_retryable_gemini_exception(exc)
             is_last_attempt = attempt >= max_attempts
+            if is_retryable and not is_last_attempt and not llm_execution.is_available(model_key):
+                raise CircuitOpenError(f"Circuit opened for {model_key} during {operation_label}: {exc}") from exc
 
             if (not is_retryable) or is_last_attempt:
                 if is_retryable and is_last_attempt:
@@ -4768,6 +5146,8 @@ async def _generate_gemini_content_with_fallback(prompt_text: str, generation_co
             operation_label=f"gemini_primary_generate:{primary_llm_model_instance.model_name}",
             account_id=account_id,
             aac_user_id=aac_user_id,
+            # With somewhere to fail over to, don't spend ~20s of backoff on the primary.
+            max_attempts=2 if (fallback_llm_model_instance or openai_client) else 6,
         )
         
         # Log response details for debugging
@@ -4796,8 +5176,15 @@ async def _generate_gemini_content_with_fallback(prompt_text: str, generation_co
             raise HTTPException(status_code=500, detail="LLM returned empty response")
         
         return response_text
-    except (google.api_core.exceptions.ResourceExhausted, google.api_core.exceptions.ServiceUnavailable, google.api_core.exceptions.InternalServerError) as e_primary:
+    except HTTPException:
+        raise
+    except Exception as e_primary:
+        # Capacity/availability errors (including an open circuit) fail over; anything else is a real error.
+        if not _is_retryable_gemini_exception(e_primary):
+            logging.error(f"An unexpected error occurred with primary LLM ({primary_llm_model_instance.model_name}): {e_primary}", exc_info=True)
+            raise HTTPException(status_code=500, detail=f"LLM generation failed: {e_primary}")
         logging.warning(f"Primary LLM ({primary_llm_model_instance.model_name}) failed with {type(e_primary).__name__}: {e_primary}. Attempting fallback.")
+        fallback_error: Optional[Exception] = None
         if fallback_llm_model_instance:
             try:
                 logging.info(f"Attempting LLM generation with fallback model: {fallback_llm_model_instance.model_name}")
@@ -4806,6 +5193,7 @@ async def _generate_gemini_content_with_fallback(prompt_text: str, generation_co
                     operation_label=f"gemini_fallback_generate:{fallback_llm_model_instance.model_name}",
                     account_id=account_id,
                     aac_user_id=aac_user_id,
+                    max_attempts=2 if openai_client else 6,
                 )
                 fallback_response_text = (await get_text_from_response(response_fallback)).strip()
                 
@@ -4815,13 +5203,34 @@ async def _generate_gemini_content_with_fallback(prompt_text: str, generation_co
                 return fallback_response_text
             except Exception as e_fallback:
                 logging.error(f"Fallback LLM ({fallback_llm_model_instance.model_name}) also failed: {e_fallback}", exc_info=True)
-                raise HTTPException(status_code=500, detail=f"LLM generation failed with primary and fallback models: {e_fallback}")
-        else:
-            logging.error("Primary LLM failed and no fallback model configured.", exc_info=True)
-            raise HTTPException(status_code=503, detail=f"Primary LLM failed and no fallback available: {e_primary}")
-    except Exception as e_other_primary:
-        logging.error(f"An unexpected error occurred with primary LLM ({primary_llm_model_instance.model_name}): {e_other_primary}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"LLM generation failed: {e_other_primary}")
+                fallback_error = e_fallback
+        if openai_client:
+            # Last resort when both Gemini lanes are failing or their circuits are open.
+            logging.warning("Gemini primary and fallback unavailable; failing over to OpenAI.")
+            try:
+                return (await _generate_openai_content_with_fallback(prompt_text)).strip()
+            except HTTPException:
+                pass
+        if fallback_error is not None:
+            raise HTTPException(status_code=500, detail=f"LLM generation failed with primary and fallback models: {fallback_error}")
+        logging.error("Primary LLM failed and no fallback model configured.", exc_info=True)
+        raise HTTPException(status_code=503, detail=f"Primary LLM failed and no fallback available: {e_primary}")
+
+
+async def _generate_hedge_content(model_instance, prompt_text: str, generation_config: Optional[Dict] = None, account_id: str = "unknown", aac_user_id: str = "unknown") -> str:
+    """Secondary side of a hedged /llm request: one attempt, no failover of its own."""
+    response = await _execute_gemini_call_with_retry(
+        lambda: model_instance.generate_content(prompt_text, generation_config=generation_config),
+        operation_label=f"gemini_hedge_generate:{model_instance.model_name}",
+        account_id=account_id,
+        aac_user_id=aac_user_id,
+        max_attempts=1,
+    )
+    response_text = (response.text or "").strip()
+    if not response_text:
+        raise Exception("Hedge LLM returned empty response")
+    log_token_usage(response, "HEDGE", account_id, aac_user_id)
+    return response_text
 
 
 async def _generate_fast_category_words_content(prompt_text: str, account_id: str = "unknown", aac_user_id: str = "unknown") -> str:
@@ -5117,9 +5526,6 @@ async def get_llm_response_endpoint(
     current_ids: Annotated[Dict[str, str], Depends(get_current_account_and_user_ids)]
 ):
     global cache_manager
-    global llm_quick_response_cache
-    global llm_inflight_requests
-    global llm_inflight_requests_lock
     global fast_words_llm_model_instance
     global primary_llm_model_instance
     account_id = current_ids["account_id"]
@@ -5164,16 +5570,16 @@ async def get_llm_response_endpoint(
     logging.info(f"⏱️ /llm prep stage: {prep_elapsed_ms:.1f}ms [{log_context}]")
 
     # Check if mood was recently updated and add small delay to prevent race conditions
-    global mood_update_timestamps
     user_key = f"{account_id}/{aac_user_id}"
-    if user_key in mood_update_timestamps:
-        time_since_mood_update = time.time() - mood_update_timestamps[user_key]
-        if time_since_mood_update < 2.0:  # Less than 2 seconds ago
-            delay_time = 2.0 - time_since_mood_update
+    mood_updated_at = await mood_update_timestamps.get(user_key)
+    if mood_updated_at is not None:
+        time_since_mood_update = time.time() - mood_updated_at
+        if time_since_mood_update < MOOD_UPDATE_SETTLE_SECONDS:
+            delay_time = MOOD_UPDATE_SETTLE_SECONDS - time_since_mood_update
             logging.info(f"⏱️ Mood recently updated {time_since_mood_update:.1f}s ago, waiting {delay_time:.1f}s for cache consistency")
             await asyncio.sleep(delay_time)
             # Clear the timestamp after delay
-            del mood_update_timestamps[user_key]
+            await mood_update_timestamps.delete(user_key)
 
     # Replace placeholder in the prompt
     if "#LLMOptions" in user_prompt_content:
@@ -5300,17 +5706,8 @@ Return ONLY valid JSON - no other text before or after the JSON array."""
         f"{int(include_rich_delta_context)}|{int(request_data.compose_mode)}|{prompt_hash}|{compose_body_hash}|{mood_slug}"
     )
 
-    now_ts = time.time()
-    if len(llm_quick_response_cache) > 600:
-        llm_quick_response_cache = {
-            key: value
-            for key, value in llm_quick_response_cache.items()
-            if (now_ts - float(value.get("created_at", 0))) < LLM_QUICK_RESPONSE_CACHE_TTL_SECONDS
-        }
-
-    cached_response_entry = llm_quick_response_cache.get(quick_cache_key)
-    if cached_response_entry and (now_ts - float(cached_response_entry.get("created_at", 0))) < LLM_QUICK_RESPONSE_CACHE_TTL_SECONDS:
-        cached_options = copy.deepcopy(cached_response_entry.get("response", []))
+    cached_options = await llm_quick_response_cache.get(quick_cache_key)
+    if cached_options is not None:
         total_elapsed_ms = (time.perf_counter() - request_start_time) * 1000
         logging.info(
             f"⚡ /llm quick-cache HIT [{log_context}] key={quick_cache_key[-24:]} "
@@ -5327,35 +5724,24 @@ Return ONLY valid JSON - no other text before or after the JSON array."""
             },
         )
 
-    is_inflight_owner = False
-    inflight_future: Optional[asyncio.Future] = None
-
-    async with llm_inflight_requests_lock:
-        existing_future = llm_inflight_requests.get(quick_cache_key)
-        if existing_future and not existing_future.done():
-            inflight_future = existing_future
-        else:
-            inflight_future = asyncio.get_running_loop().create_future()
-            llm_inflight_requests[quick_cache_key] = inflight_future
-            is_inflight_owner = True
+    try:
+        inflight_role, coalesced_options = await llm_quick_response_cache.claim(quick_cache_key)
+    except Exception as coalesced_error:
+        logging.error(
+            f"⚠️ /llm coalesced wait failed [{log_context}] key={quick_cache_key[-24:]}: {coalesced_error}",
+            exc_info=True,
+        )
+        raise HTTPException(status_code=500, detail="Coalesced /llm request failed")
+    is_inflight_owner = inflight_role == "owner"
 
     if not is_inflight_owner:
-        try:
-            coalesced_options = await inflight_future
-        except Exception as coalesced_error:
-            logging.error(
-                f"⚠️ /llm coalesced wait failed [{log_context}] key={quick_cache_key[-24:]}: {coalesced_error}",
-                exc_info=True,
-            )
-            raise HTTPException(status_code=500, detail="Coalesced /llm request failed")
-
         total_elapsed_ms = (time.perf_counter() - request_start_time) * 1000
         logging.info(
             f"🤝 /llm in-flight coalesced HIT [{log_context}] key={quick_cache_key[-24:]} "
             f"in {total_elapsed_ms:.1f}ms"
         )
         return JSONResponse(
-            content=copy.deepcopy(coalesced_options),
+            content=coalesced_options,
             headers={
                 "X-LLM-Cache": "inflight-hit",
                 "X-LLM-Timing": f"prep={prep_elapsed_ms:.1f};generate=0.0;total={total_elapsed_ms:.1f}",
@@ -5377,6 +5763,24 @@ Return ONLY valid JSON - no other text before or after the JSON array."""
     llm_response_json_str = ""
     llm_generate_start_time = time.perf_counter()
 
+    # Opt-in hedging (LLM_HEDGING_ENABLED): a slow Gemini call is raced against a second
+    # model and the first response that survives the AI option overrides is used.
+    hedge_profile = PROFILE_FAST if use_fast_generation_profile else PROFILE_RICH
+
+    def _is_usable_llm_response(response_text: str) -> bool:
+        return llm_response_has_compliant_options(response_text, ai_option_overrides)
+
+    async def _generate_full_prompt_response(full_prompt: str) -> str:
+        hedge_model = fallback_llm_model_instance
+        return await llm_hedger.run(
+            hedge_profile,
+            _llm_model_key(primary_llm_model_instance.model_name if primary_llm_model_instance else None),
+            lambda: _generate_gemini_content_with_fallback(full_prompt, generation_config, account_id, aac_user_id),
+            _llm_model_key(hedge_model.model_name) if hedge_model else None,
+            (lambda: _generate_hedge_content(hedge_model, full_prompt, generation_config, account_id, aac_user_id)) if hedge_model else None,
+            _is_usable_llm_response,
+        )
+
     # --- Route to appropriate LLM ---
     if llm_provider != "chatgpt" and is_starter_question_prompt:
         # Starter question prompts are dynamic and short-lived. Avoid cache warm-up/drift checks and
@@ -5393,7 +5797,7 @@ Return ONLY valid JSON - no other text before or after the JSON array."""
                 aac_user_id,
             )
         else:
-            try:
+            async def _generate_starter_fast_response() -> str:
                 response = await _execute_gemini_call_with_retry(
                     lambda: fast_model.generate_content(final_user_query, generation_config=generation_config),
                     operation_label=f"gemini_starter_questions_fast:{fast_model.model_name}",
@@ -5403,8 +5807,26 @@ Return ONLY valid JSON - no other text before or after the JSON array."""
                     base_delay_seconds=0.2,
                     max_delay_seconds=1.5,
                 )
+                response_text = (response.text or "").strip()
+                if response_text:
+                    log_token_usage(response, "STARTER_FAST", account_id, aac_user_id)
+                return response_text
 
-                llm_response_json_str = (response.text or "").strip()
+            # Hedge the fast model against the primary (or the fallback when they are the same model).
+            starter_hedge_model = (
+                primary_llm_model_instance if primary_llm_model_instance is not fast_model else fallback_llm_model_instance
+            )
+            try:
+                llm_response_json_str = await llm_hedger.run(
+                    hedge_profile,
+                    _llm_model_key(fast_model.model_name),
+                    _generate_starter_fast_response,
+                    _llm_model_key(starter_hedge_model.model_name) if starter_hedge_model else None,
+                    (lambda: _generate_hedge_content(
+                        starter_hedge_model, final_user_query, generation_config, account_id, aac_user_id
+                    )) if starter_hedge_model else None,
+                    _is_usable_llm_response,
+                )
                 if not llm_response_json_str:
                     logging.warning(f"Starter-question fast path returned empty response; using standard fallback [{log_context}]")
                     llm_response_json_str = await _generate_gemini_content_with_fallback(
@@ -5413,8 +5835,6 @@ Return ONLY valid JSON - no other text before or after the JSON array."""
                         account_id,
                         aac_user_id,
                     )
-                else:
-                    log_token_usage(response, "STARTER_FAST", account_id, aac_user_id)
             except Exception as starter_fast_error:
                 logging.warning(
                     f"Starter-question fast path failed [{log_context}]: {starter_fast_error}. "
@@ -5454,11 +5874,10 @@ Return ONLY valid JSON - no other text before or after the JSON array."""
             if reason == "drift_threshold_exceeded":
                 logging.info(f"♻️ Cache drift ({drift} messages) exceeds threshold. Rebuilding cache to optimize costs.")
                 logging.info(f"   Messages in cache: {drift_check['messages_in_cache']}, Current: {drift_check['current_message_count']}")
+                # Invalidate old cache; the background warm-up below creates a fresh one
+                await cache_manager.invalidate_cache(account_id, aac_user_id)
             elif reason == "no_cache":
-                logging.info(f"📝 No cache exists. Creating initial cache.")
-            
-            # Invalidate old cache and let warmup create a fresh one
-            await cache_manager.invalidate_cache(account_id, aac_user_id)
+                logging.info(f"📝 No cache exists. Scheduling initial cache.")
             cached_content_ref = None
         else:
             # Drift is acceptable, use existing cache
@@ -5489,85 +5908,17 @@ Return ONLY valid JSON - no other text before or after the JSON array."""
                 
                 # Use cached base context + pass delta as standard input
                 model = genai.GenerativeModel.from_cached_content(cached_content_ref)
-                response = await _execute_gemini_call_with_retry(
-                    lambda: model.generate_content(combined_prompt, generation_config=generation_config),
-                    operation_label="gemini_cached_base_plus_delta_generate",
-                    account_id=account_id,
-                    aac_user_id=aac_user_id,
-                )
-                
-                # Log response details for debugging
-                logging.info(f"🤖 RAW LLM RESPONSE LENGTH: {len(response.text) if response.text else 0} chars")
-                logging.info(f"🤖 RAW LLM RESPONSE (first 500 chars): {response.text[:500] if response.text else 'EMPTY'}")
-                
-                # Check for safety blocks or empty responses
-                if not response.text or response.text.strip() == "":
-                    logging.error(f"❌ LLM returned empty response! Candidates: {response.candidates}")
-                    logging.error(f"❌ Prompt feedback: {response.prompt_feedback}")
-                    raise Exception("LLM returned empty response")
-                
-                if response.text.strip() == "[":
-                    logging.error(f"❌ LLM returned ONLY opening bracket! This suggests the response was cut off.")
-                    logging.error(f"❌ Response candidates: {response.candidates}")
-                    logging.error(f"❌ Finish reason: {response.candidates[0].finish_reason if response.candidates else 'No candidates'}")
-                
-                llm_response_json_str = response.text.strip()
-                
-                # Log detailed token usage for cached requests
-                log_token_usage(response, "CACHED+DELTA", account_id, aac_user_id)
-                
-                logging.info(f"✅ Successfully generated content using BASE cache + DELTA context [{log_context}].")
-            except Exception as e:
-                logging.error(f"Error using cached content [{log_context}]: {e}. Falling back.")
-                full_prompt = await build_full_prompt_for_non_cached_llm(
-                    account_id,
-                    aac_user_id,
-                    final_user_query,
-                    compose_mode=request_data.compose_mode,
-                    compose_body=request_data.compose_body,
-                    prefetched_user_info=user_info_doc,
-                    prefetched_settings=user_settings,
-                    include_rich_delta_context=include_rich_delta_context,
-                )
-                llm_response_json_str = await _generate_gemini_content_with_fallback(full_prompt, generation_config, account_id, aac_user_id)
-        else:
-            logging.warning(f"No valid cache found [{log_context}]. Attempting to warm up cache...")
-            
-            # Try to warm up cache before falling back to full prompt
-            try:
-                await cache_manager.warm_up_user_cache_if_needed(account_id, aac_user_id)
-                
-                # Check if cache was created
-                cached_content_ref = await cache_manager.get_cached_content_reference(account_id, aac_user_id)
-                
-                if cached_content_ref:
-                    # Cache was successfully created, use it with delta context
-                    delta_context = await cache_manager._build_delta_context(
-                        account_id,
-                        aac_user_id,
-                        user_prompt_content,
-                        compose_mode=request_data.compose_mode,
-                        compose_body=request_data.compose_body,
-                        prefetched_user_info=user_info_doc,
-                        prefetched_settings=user_settings,
-                        include_rich_context=include_rich_delta_context,
-                    )
-                    combined_prompt = f"{delta_context}\n\n=== USER QUERY ===\n{final_user_query}"
-                    
-                    logging.info(f"🔍 NEW_CACHE COMBINED PROMPT PREVIEW (first 800 chars):\n{combined_prompt[:800]}")
-                    logging.info(f"📊 USER QUERY that triggered LLM (new cache path) [{log_context}]: {user_prompt_content[:500]}")
-                    logging.info(f"⚙️ Generation config: {generation_config}")
-                    
-                    model = genai.GenerativeModel.from_cached_content(cached_content_ref)
+
+                async def _generate_cached_response() -> str:
                     response = await _execute_gemini_call_with_retry(
                         lambda: model.generate_content(combined_prompt, generation_config=generation_config),
-                        operation_label="gemini_new_cached_base_plus_delta_generate",
+                        operation_label="gemini_cached_base_plus_delta_generate",
                         account_id=account_id,
                         aac_user_id=aac_user_id,
                     )
                     
                     # Log response details for debugging
-                    logging.info(f"🤖 RAW LLM RESPONSE LENGTH (new cache): {len(response.text) if response.text else 0} chars")
+                    logging.info(f"🤖 RAW LLM RESPONSE LENGTH: {len(response.text) if response.text else 0} chars")
                     logging.info(f"🤖 RAW LLM RESPONSE (first 500 chars): {response.text[:500] if response.text else 'EMPTY'}")
                     
                     # Check for safety blocks or empty responses
@@ -5581,16 +5932,14 @@ Return ONLY valid JSON - no other text before or after the JSON array."""
                         logging.error(f"❌ Response candidates: {response.candidates}")
                         logging.error(f"❌ Finish reason: {response.candidates[0].finish_reason if response.candidates else 'No candidates'}")
                     
-                    llm_response_json_str = response.text.strip()
-                    
-                    # Log detailed token usage for newly cached requests
-                    log_token_usage(response, "NEW_CACHE+DELTA", account_id, aac_user_id)
-                    
-                    logging.info(f"✅ Successfully generated content using newly created BASE cache + DELTA [{log_context}].")
-                else:
-                    # Cache creation failed, use full prompt fallback
-                    logging.warning(f"Cache creation failed [{log_context}]. Using full prompt fallback.")
-                    full_prompt = await build_full_prompt_for_non_cached_llm(
+                    # Log detailed token usage for cached requests
+                    log_token_usage(response, "CACHED+DELTA", account_id, aac_user_id)
+                    return response.text.strip()
+
+                async def _generate_uncached_hedge_response() -> str:
+                    # The fallback model can't use this cache, so the hedge pays for the full
+                    # prompt; it is only built once the hedge actually fires.
+                    hedge_prompt = await build_full_prompt_for_non_cached_llm(
                         account_id,
                         aac_user_id,
                         final_user_query,
@@ -5600,10 +5949,22 @@ Return ONLY valid JSON - no other text before or after the JSON array."""
                         prefetched_settings=user_settings,
                         include_rich_delta_context=include_rich_delta_context,
                     )
-                    llm_response_json_str = await _generate_gemini_content_with_fallback(full_prompt, generation_config, account_id, aac_user_id)
-                    
-            except Exception as warmup_error:
-                logging.error(f"Cache warmup failed [{log_context}]: {warmup_error}. Using full prompt fallback.")
+                    return await _generate_hedge_content(
+                        fallback_llm_model_instance, hedge_prompt, generation_config, account_id, aac_user_id
+                    )
+
+                llm_response_json_str = await llm_hedger.run(
+                    hedge_profile,
+                    _llm_model_key(None),  # the cached call runs on the primary model lane
+                    _generate_cached_response,
+                    _llm_model_key(fallback_llm_model_instance.model_name) if fallback_llm_model_instance else None,
+                    _generate_uncached_hedge_response if fallback_llm_model_instance else None,
+                    _is_usable_llm_response,
+                )
+                
+                logging.info(f"✅ Successfully generated content using BASE cache + DELTA context [{log_context}].")
+            except Exception as e:
+                logging.error(f"Error using cached content [{log_context}]: {e}. Falling back.")
                 full_prompt = await build_full_prompt_for_non_cached_llm(
                     account_id,
                     aac_user_id,
@@ -5614,10 +5975,30 @@ Return ONLY valid JSON - no other text before or after the JSON array."""
                     prefetched_settings=user_settings,
                     include_rich_delta_context=include_rich_delta_context,
                 )
-                llm_response_json_str = await _generate_gemini_content_with_fallback(full_prompt, generation_config, account_id, aac_user_id)
+                llm_response_json_str = await _generate_full_prompt_response(full_prompt)
+        else:
+            # Never wait for cache creation here: answer with the full prompt now and let
+            # the warm-up workers build the cache for this user's next request.
+            logging.warning(f"No valid cache found [{log_context}]. Scheduling warm-up; using full prompt fallback.")
+            cache_warmup_scheduler.schedule(account_id, aac_user_id, priority=PRIORITY_URGENT)
+            full_prompt = await build_full_prompt_for_non_cached_llm(
+                account_id,
+                aac_user_id,
+                final_user_query,
+                compose_mode=request_data.compose_mode,
+                compose_body=request_data.compose_body,
+                prefetched_user_info=user_info_doc,
+                prefetched_settings=user_settings,
+                include_rich_delta_context=include_rich_delta_context,
+            )
+            llm_response_json_str = await _generate_full_prompt_response(full_prompt)
 
     llm_generate_elapsed_ms = (time.perf_counter() - llm_generate_start_time) * 1000
-    logging.info(f"⏱️ /llm generation stage: {llm_generate_elapsed_ms:.1f}ms [{log_context}]")
+    delta_report = delta_context_report.get()
+    delta_size_note = (
+        f", delta={delta_report['chars']} chars (before retrieval {delta_report['unfiltered_chars']})" if delta_report else ""
+    )
+    logging.info(f"⏱️ /llm generation stage: {llm_generate_elapsed_ms:.1f}ms{delta_size_note} [{log_context}]")
     
     logging.info(f"--- LLM Final JSON Response Text [{log_context}] (Length: {len(llm_response_json_str)}) ---")
 
@@ -5889,20 +6270,13 @@ Return ONLY valid JSON - no other text before or after the JSON array."""
         logging.info(f"📊 4. After apply_inclusion_preference_bias: {len(biased_options)}")
         logging.info(f"📊 5. FINAL OPTIONS BEING RETURNED: {biased_options[:2] if biased_options else 'empty'}")
 
-        llm_quick_response_cache[quick_cache_key] = {
-            "created_at": time.time(),
-            "response": copy.deepcopy(biased_options),
-        }
-
-        if inflight_future and not inflight_future.done():
-            inflight_future.set_result(copy.deepcopy(biased_options))
-        async with llm_inflight_requests_lock:
-            llm_inflight_requests.pop(quick_cache_key, None)
+        # Caches locally and in Redis, and hands the result to every coalesced waiter
+        await llm_quick_response_cache.resolve(quick_cache_key, biased_options)
 
         total_elapsed_ms = (time.perf_counter() - request_start_time) * 1000
         logging.info(
             f"⏱️ /llm total: {total_elapsed_ms:.1f}ms "
-            f"(prep={prep_elapsed_ms:.1f}ms, generate={llm_generate_elapsed_ms:.1f}ms) "
+            f"(prep={prep_elapsed_ms:.1f}ms, generate={llm_generate_elapsed_ms:.1f}ms{delta_size_note}) "
             f"[{log_context}]"
         )
         return JSONResponse(
@@ -5917,19 +6291,15 @@ Return ONLY valid JSON - no other text before or after the JSON array."""
         )
 
     except HTTPException:
-        if is_inflight_owner and inflight_future and not inflight_future.done():
-            inflight_future.set_exception(HTTPException(status_code=500, detail="Owner /llm request failed"))
         if is_inflight_owner:
-            async with llm_inflight_requests_lock:
-                llm_inflight_requests.pop(quick_cache_key, None)
+            await llm_quick_response_cache.reject(
+                quick_cache_key, HTTPException(status_code=500, detail="Owner /llm request failed")
+            )
         # Re-raise HTTP exceptions as-is
         raise
     except Exception as e:
-        if is_inflight_owner and inflight_future and not inflight_future.done():
-            inflight_future.set_exception(e)
         if is_inflight_owner:
-            async with llm_inflight_requests_lock:
-                llm_inflight_requests.pop(quick_cache_key, None)
+            await llm_quick_response_cache.reject(quick_cache_key, e)
         logging.error(f"Error processing LLM response [{log_context}]: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error processing LLM response: {str(e)}")
 
@@ -6055,11 +6425,25 @@ def initialize_backend_services():
             redis_host = os.getenv('REDIS_HOST')
             if redis_host:
                 redis_port = int(os.getenv('REDIS_PORT', 6379))
-                redis_client = redis.Redis(host=redis_host, port=redis_port, db=0, decode_responses=True)
                 
-                # Test connection
-                redis_client.ping()
+                # Test connection (startup only; request paths use the async clients below)
+                ping_client = redis.Redis(host=redis_host, port=redis_port, db=0)
+                try:
+                    ping_client.ping()
+                finally:
+                    ping_client.close()
+                # Image search cache: async client on a bounded pool, callers wait for a free connection
+                redis_client = redis_async.Redis(connection_pool=redis_async.BlockingConnectionPool(
+                    host=redis_host, port=redis_port, db=0, decode_responses=True,
+                    max_connections=int(os.getenv("REDIS_MAX_CONNECTIONS", "32")), timeout=5,
+                ))
+                image_search_cache.configure_redis(redis_client)
                 logging.info("Redis cache initialized successfully.")
+
+                # Shared tier + cross-instance coalescing for the /llm and category-words quick caches
+                quick_cache_redis = redis_async.Redis(host=redis_host, port=redis_port, db=0, decode_responses=True)
+                llm_quick_response_cache.configure_redis(quick_cache_redis)
+                category_words_quick_response_cache.configure_redis(quick_cache_redis)
                 
                 # Prewarm cache with common terms in background (with error handling)
                 async def safe_prewarm():
@@ -6077,6 +6461,26 @@ def initialize_backend_services():
             logging.warning(f"Redis cache initialization failed: {e}. Continuing without cache.")
             redis_client = None
 
+        # --- Shared TTS audio cache tier (optional) ---
+        tts_cache_bucket_name = os.getenv("TTS_CACHE_BUCKET")
+        if tts_cache_bucket_name:
+            try:
+                from google.cloud import storage as gcs_storage
+                tts_audio_cache.configure_bucket(gcs_storage.Client(project=CONFIG['gcp_project_id']).bucket(tts_cache_bucket_name))
+                logging.info(f"TTS audio cache: GCS tier enabled (gs://{tts_cache_bucket_name}/tts-cache/)")
+            except Exception as e:
+                logging.warning(f"TTS audio cache: GCS tier unavailable ({e}); using memory/disk only")
+
+        # --- Migration sessions shared across instances (optional) ---
+        migration_session_bucket_name = os.getenv("MIGRATION_SESSION_BUCKET")
+        if migration_session_bucket_name:
+            try:
+                from google.cloud import storage as gcs_storage
+                migration_session_store.configure_bucket(gcs_storage.Client(project=CONFIG['gcp_project_id']).bucket(migration_session_bucket_name))
+                logging.info(f"Migration sessions: GCS tier enabled (gs://{migration_session_bucket_name}/migration-sessions/)")
+            except Exception as e:
+                logging.warning(f"Migration sessions: GCS tier unavailable ({e}); sessions stay on this instance")
+
         logging.info("All shared backend services initialized successfully.")
 
     except Exception as e:
@@ -6094,12 +6498,13 @@ def initialize_backend_services():
 
 # --- Firestore Helper Functions ---
 
-# Short-lived in-memory cache for frequently-read per-user documents (settings,
+# Short-lived cache for frequently-read per-user documents (settings,
 # user_narrative, current_state).  Documents that users rarely change mid-session
 # (e.g. app_settings) are safe to cache for 60 s; high-churn paths (config/pages_list)
-# are deliberately excluded below.
-_FIRESTORE_DOC_CACHE: dict = {}
+# are deliberately excluded below.  Lives in the shared state backend so a write
+# handled by one worker invalidates the copy every other worker would serve.
 _FIRESTORE_DOC_CACHE_TTL = 60  # seconds
+_FIRESTORE_DOC_CACHE = state_store.namespace("firestore_docs", ttl=_FIRESTORE_DOC_CACHE_TTL, max_entries=1000)
 
 # Paths that must always be read fresh (mutable mid-session data).
 _FIRESTORE_DOC_CACHE_SKIP = {
@@ -6107,10 +6512,10 @@ _FIRESTORE_DOC_CACHE_SKIP = {
     "config/tap_config",
 }
 
-def _invalidate_firestore_doc_cache(account_id: str, aac_user_id: str, doc_subpath: str) -> None:
+async def _invalidate_firestore_doc_cache(account_id: str, aac_user_id: str, doc_subpath: str) -> None:
     """Call this whenever a document is written so the cache stays coherent."""
     key = f"{account_id}/{aac_user_id}/{doc_subpath}"
-    _FIRESTORE_DOC_CACHE.pop(key, None)
+    await _FIRESTORE_DOC_CACHE.delete(key)
 
 async def load_firestore_document(account_id: str, aac_user_id: str, doc_subpath: str, default_data: Any) -> Any:
     """
@@ -6128,9 +6533,9 @@ async def load_firestore_document(account_id: str, aac_user_id: str, doc_subpath
     # Serve from short-TTL cache for high-frequency, low-churn documents.
     if doc_subpath not in _FIRESTORE_DOC_CACHE_SKIP:
         _cache_key = f"{account_id}/{aac_user_id}/{doc_subpath}"
-        _cached = _FIRESTORE_DOC_CACHE.get(_cache_key)
-        if _cached and (time.time() - _cached[1]) < _FIRESTORE_DOC_CACHE_TTL:
-            return copy.deepcopy(_cached[0])
+        _cached = await _FIRESTORE_DOC_CACHE.get(_cache_key)
+        if _cached is not None:
+            return copy.deepcopy(_cached)
 
     doc_ref = firestore_db.document(full_path)
     try:
@@ -6162,12 +6567,7 @@ async def load_firestore_document(account_id: str, aac_user_id: str, doc_subpath
 
             # Store result in cache (skip high-churn paths)
             if doc_subpath not in _FIRESTORE_DOC_CACHE_SKIP:
-                _FIRESTORE_DOC_CACHE[_cache_key] = (copy.deepcopy(result), time.time())
-                # Evict oldest entries if cache grows too large
-                if len(_FIRESTORE_DOC_CACHE) > 1000:
-                    oldest = sorted(_FIRESTORE_DOC_CACHE.items(), key=lambda x: x[1][1])[:200]
-                    for k, _ in oldest:
-                        del _FIRESTORE_DOC_CACHE[k]
+                await _FIRESTORE_DOC_CACHE.set(_cache_key, copy.deepcopy(result))
             return result
         else:
             logging.warning(f"Firestore document at {full_path} not found for AAC user {aac_user_id}. Using and saving defaults.")
@@ -6202,7 +6602,7 @@ async def save_firestore_document(account_id: str, aac_user_id: str, doc_subpath
     doc_subpath example: "settings/app_settings", "info/birthdays"
     """
     # Invalidate the read cache so the next load reflects the new write.
-    _invalidate_firestore_doc_cache(account_id, aac_user_id, doc_subpath)
+    await _invalidate_firestore_doc_cache(account_id, aac_user_id, doc_subpath)
 
     global firestore_db
     if not firestore_db:
@@ -6273,18 +6673,14 @@ async def save_firestore_collection_items(account_id: str, aac_user_id: str, col
     full_path = f"{FIRESTORE_ACCOUNTS_COLLECTION}/{account_id}/{FIRESTORE_ACCOUNT_USERS_SUBCOLLECTION}/{aac_user_id}/{collection_subpath}"
     collection_ref = firestore_db.collection(full_path)
     try:
-        # It's better to delete and re-add for small collections like chat/diary,
-        # or use batch writes for efficiency/atomicity if many updates.
-        # For now, we'll keep the existing delete-all-then-add logic.
-        existing_docs = await asyncio.to_thread(collection_ref.stream)
-        for doc in existing_docs:
-            await asyncio.to_thread(doc.reference.delete)
-
-        for item in items:
-            doc_id = item.get('id') if item.get('id') else str(uuid.uuid4())
-            await asyncio.to_thread(collection_ref.document(doc_id).set, item)
+        # Set every item and delete only the documents that are gone, in batched commits
+        items_with_ids = [(item.get('id') if item.get('id') else str(uuid.uuid4()), item) for item in items]
+        result = await replace_collection(firestore_db, collection_ref, items_with_ids, label=collection_subpath)
 
-        logging.info(f"Saved {len(items)} documents to Firestore collection {full_path} for AAC user {aac_user_id}.")
+        logging.info(
+            f"Saved {len(items)} documents to Firestore collection {full_path} for AAC user {aac_user_id} "
+            f"({result.batches} batches, {result.ops_per_second:.0f} ops/s)."
+        )
         return True
     except Exception as e:
         logging.error(f"Error saving Firestore collection to {full_path} for AAC user {aac_user_id}: {e}", exc_info=True)
@@ -6301,6 +6697,7 @@ class UserCurrentState(BaseModel): location: Optional[str] = ""; people: Optiona
 
 # Background task for periodic cache cleanup
 cleanup_task = None
+aac_image_index_task = None
 
 async def periodic_cache_cleanup():
     """Periodic background task to clean up expired caches every hour."""
@@ -6317,12 +6714,28 @@ async def periodic_cache_cleanup():
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global cleanup_task
+    global cleanup_task, aac_image_index_task
     
     # Code to run on startup
     logging.info("Application startup: Initializing shared backend services...")
     initialize_backend_services() # This now only initializes global, shared items
     _ensure_email_security_configuration()
+
+    # Shared state for what used to be per-process globals (migration sessions, mood
+    # timestamps, document cache, ...), so any worker can serve any request.
+    try:
+        state_store.use_backend(create_state_backend())
+    except Exception as e:
+        logging.error(f"❌ Could not create shared state backend, keeping per-process state: {e}")
+    state_store.start()
+    # Loops that only keep shared things fresh run in one worker per host, not in each.
+    host_primary_worker = claim_host_singleton("background_loops")
+    if not host_primary_worker:
+        logging.info("Another worker on this host runs the current-events refresh and session sweep")
+    if state_store.backend.name == "sqlite" and redis_client is None:
+        # Same-host workers without Redis share quick-response values through SQLite instead
+        llm_quick_response_cache.configure_shared(state_store.namespace("qrc_llm"))
+        category_words_quick_response_cache.configure_shared(state_store.namespace("qrc_category_words"))
     # REMOVE THESE:
     # load_settings_from_file() # Settings loaded per user now
     # load_birthdays_from_file() # Birthdays loaded per user now
@@ -6330,6 +6743,37 @@ async def lifespan(app: FastAPI):
     # Start periodic cache cleanup task
     cleanup_task = asyncio.create_task(periodic_cache_cleanup())
     logging.info("✅ Started periodic cache cleanup task (runs every hour)")
+
+    # Gemini context caches are built and refreshed by background workers only
+    cache_warmup_scheduler.start(cache_manager.warm_up_user_cache_if_needed)
+
+    # Load the in-memory aac_images symbol index (snapshot listener, periodic reload as fallback)
+    if firestore_db:
+        # Subscribe before starting so the text-search engine sees the initial snapshot
+        aac_image_index.subscribe(symbol_search_engine.handle_index_event)
+        aac_image_index.subscribe(image_search_cache.handle_index_event)
+        aac_image_index.start(firestore_db)
+        aac_image_index_task = asyncio.create_task(aac_image_index.run_refresh_loop())
+
+    # Base lexicon for local freestyle word prediction
+    word_predictor.load_lexicon(CATEGORY_STATIC_POOLS, WORD_VARIANTS)
+
+    # Shared current-events sources and headline summaries (background refresh)
+    current_events_service.start(
+        lambda prompt: _generate_gemini_content_with_fallback(prompt, account_id="system", aac_user_id="current_events"),
+        background_refresh=host_primary_worker,
+    )
+
+    # Background board-generation jobs (Firestore-backed so other instances can resume queued jobs)
+    if firestore_db and os.getenv("JOB_QUEUE_BACKEND", "firestore").strip().lower() != "memory":
+        job_engine.use_store(FirestoreJobStore(firestore_db))
+    else:
+        job_engine.use_store(InMemoryJobStore())
+    job_engine.start()
+
+    # Expired migration sessions (disk and bucket); the session directory is shared by the host's workers
+    if host_primary_worker:
+        migration_session_store.start()
     
     logging.info("Startup complete (shared services).")
     yield
@@ -6342,6 +6786,20 @@ async def lifespan(app: FastAPI):
             await cleanup_task
         except asyncio.CancelledError:
             pass
+    await cache_warmup_scheduler.stop()
+    await current_events_service.stop()
+    await job_engine.stop()
+    await migration_session_store.stop()
+    shutdown_process_pools()
+    await state_store.stop()
+    llm_execution.shutdown()
+    aac_image_index.stop()
+    if aac_image_index_task:
+        aac_image_index_task.cancel()
+        try:
+            await aac_image_index_task
+        except asyncio.CancelledError:
+            pass
     logging.info("Application shutdown complete.")
 
 # Assign the lifespan manager to the FastAPI app instance
@@ -7401,8 +7859,8 @@ async def test_scraping_config(test_request: TestScrapingRequest, current_ids: A
         # Convert scraping config to dict format expected by scrape_website
         config_dict = test_request.scraping_config.dict()
         
-        # Test the scraping
-        articles = await scrape_website(config_dict)
+        # Test the scraping (always fetch, the config may have just changed)
+        articles = await scrape_website(config_dict, force_refresh=True)
         
         return JSONResponse(content={
             "success": True,
@@ -7456,7 +7914,7 @@ async def get_topic_content(request: Request, current_ids: Annotated[Dict[str, s
             raise HTTPException(status_code=400, detail="No scraping configuration found for this topic")
         
         # Scrape articles
-        articles = await scrape_website(scraping_config)
+        articles = await scrape_website(scraping_config, topic=topic_text)
         
         if not articles:
             return JSONResponse(content={
@@ -7470,12 +7928,8 @@ async def get_topic_content(request: Request, current_ids: Annotated[Dict[str, s
         num_articles_to_process = 10
         top_articles = articles[:num_articles_to_process]
         
-        # Process articles with LLM
-        llm_tasks = [_process_single_article(item, topic_text) for item in top_articles]
-        llm_results = await asyncio.gather(*llm_tasks)
-        
-        # Filter successful results
-        successful_results = [result for result in llm_results if result is not None]
+        # One batched LLM call for the articles without cached summaries
+        successful_results = await current_events_service.summarize(top_articles, topic_text)
         
         return JSONResponse(content={
             "summaries": successful_results,
@@ -7487,137 +7941,9 @@ async def get_topic_content(request: Request, current_ids: Annotated[Dict[str, s
         raise HTTPException(status_code=500, detail=f"Failed to get content for topic: {e}")
 
 
-async def scrape_website(config):
-    url = config.get("url")
-    headline_selector = config.get("headline_selector")
-    url_selector = config.get("url_selector")
-    url_attribute = config.get("url_attribute", 'href')
-    url_prefix = config.get("url_prefix", "")
-    articles = []
-    try:
-        if not url or not headline_selector or not url_selector:
-            print(f"Incomplete scraping config for {url}")
-            return []
-        # Use aiohttp for asynchronous requests
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                response.raise_for_status()
-                html_content = await response.text()
-                soup = BeautifulSoup(html_content, 'html.parser')
-                headline_elements = soup.select(headline_selector)
-                url_elements = soup.select(url_selector)
-
-                for i in range(min(len(headline_elements), len(url_elements))):
-                    headline = headline_elements[i].get_text(strip=True)
-                    article_url = url_elements[i].get(url_attribute)
-                    if article_url:
-                        full_url = urljoin(url, url_prefix + article_url) # use urljoin
-                        articles.append({"title": headline, "url": full_url})
-        return articles
-    except Exception as e:
-        print(f"Error scraping {url}: {e}")
-        return []
-
-
-
-
-
-# --- Helper function to process ONE article ---
-async def _process_single_article(item: dict, event_type: str):
-    """
-    Calls LLM for a single article, parses the response, and returns 
-    a valid dictionary {'option': ..., 'summary': ...} on success, 
-    or None on failure/error.
-    """
-    if not isinstance(item, dict) or 'title' not in item or 'url' not in item:
-        print(f"Skipping invalid item in _process_single_article: {item!r}")
-        return None 
-
-    # UPDATED prompt instructions and example JSON structure:
-    prompt_template = """
-Given the following {event_type} story title and URL:
-Title: {title}
-URL: {url}
-
-Please perform the following two tasks based *only* on the provided Title and URL:
-1. Generate a natural-sounding, expressive, and engaging conversational starter sentence or two about this news story, suitable for initiating a discussion with someone nearby (e.g., "Did you hear about...", "I just saw..."). Do not use something obvious like "Did you see the article...". Keep it brief, energetic and focus on the main point indicated by the title. Add a question or prompt to encourage conversation.
-2. Generate a very short (3-5 word) phrase that captures the absolute key message or topic (suitable for displaying on a button).
-
-Format your response STRICTLY as a single JSON object with two keys:
-- "option": This key's value should be the conversational starter sentence(s) (from task 1).
-- "summary": This key's value should be the very short 3-5 word phrase (from task 2).
-
-Example JSON format:
-{{ "option": "Did you hear about the new library opening downtown? They say it has some great features.", "summary": "New library opens" }}
-
-JSON response:
-"""
-    
-    prompt_text = None 
-    try:
-        prompt_text = prompt_template.format(
-            event_type=event_type, 
-            title=item['title'], 
-            url=item['url']
-        )
-    except KeyError as e:
-        print(f"ERROR: KeyError during prompt formatting for item {item!r}. Error: {e}")
-        return None 
-    except Exception as e:
-        print(f"ERROR: Unexpected error during prompt formatting for item {item!r}. Error: {e}")
-        return None
-
-    if prompt_text is None:
-         print(f"ERROR: prompt_text was None for item {item!r}, skipping LLM call.")
-         return None
-
-    extracted_json_string = None 
-    
-    try:
-        # --- LLM Call ---
-        # Use the helper function for LLM call with fallback
-        summary_text = await _generate_gemini_content_with_fallback(prompt_text)
-        #print(f"LLM raw output for '{item['title']}': {summary_text}") # Keep logging raw output
-
-        # --- Attempt to Extract JSON OBJECT using Regex ---
-        # ***** CHANGE HERE: Look for '{...}' instead of '[...]' *****
-        match = re.search(r'(\{.*\})', summary_text, re.DOTALL) 
-
-        if match:
-            extracted_json_string = match.group(1)
-            #print(f"Extracted JSON string: {extracted_json_string}")
-
-            # --- Parse the *Extracted* JSON string ---
-            try:
-                # Should parse directly into a dictionary now
-                parsed_data = json.loads(extracted_json_string) 
-
-                # --- Validate the Dictionary ---
-                # ***** CHANGE HERE: Validate dictionary directly *****
-                if isinstance(parsed_data, dict) and "option" in parsed_data and "summary" in parsed_data:
-                     # parsed_data is the dictionary we need
-                     article_data = parsed_data 
-                     print(f"Successfully processed: {item['title']}")
-                     return article_data # Return the valid dictionary
-                else:
-                    # Handle missing keys or if it's not a dict
-                    print(f"Error: Parsed JSON is not a dict or missing keys for '{item['title']}'. Data: {parsed_data}")
-                    return None # Exclude items with wrong structure or missing keys
-            except json.JSONDecodeError as json_e:
-                print(f"Error decoding extracted JSON for '{item['title']}': {json_e}. Extracted: {extracted_json_string}")
-                return None # Exclude items with invalid JSON
-        else:
-            # Handle cases where the regex didn't find the {...} pattern
-            # ***** CHANGE HERE: Update error message *****
-            print(f"Error: Could not find JSON object pattern '{{...}}' in LLM output for '{item['title']}'. Output: {summary_text}") 
-            return None # Exclude items where regex fails
-
-    except Exception as e:
-        # Handle errors during the LLM call itself
-        print(f"Error during LLM content generation for '{item['title']}': {e}")
-        return None 
-
-
+async def scrape_website(config, topic: Optional[str] = None, force_refresh: bool = False):
+    """Articles for a scraping config, from the shared current-events cache (see current_events.py)."""
+    return await current_events_service.fetch_articles(config, topic=topic, force_refresh=force_refresh)
 
 
 # --- Main route handler ---
@@ -7643,7 +7969,7 @@ async def get_current_events(request: Request, current_ids: Annotated[Dict[str,
     # --- Web Scraping (concurrent) ---
     # Ensure scrape_website function can handle the dicts in scraping_configs
     #print(f"Starting web scraping for {len(scraping_configs)} sources...")
-    scrape_tasks = [scrape_website(config) for config in scraping_configs]
+    scrape_tasks = [scrape_website(config, topic=event_type) for config in scraping_configs]
     scrape_results = await asyncio.gather(*scrape_tasks)
     for i, articles in enumerate(scrape_results):
         #print(f"Source {i+1} found {len(articles)} articles.") # Log articles per source
@@ -7657,14 +7983,8 @@ async def get_current_events(request: Request, current_ids: Annotated[Dict[str,
         top_articles = all_articles[:num_articles_to_process] 
         #print(f"Processing {len(top_articles)} articles with LLM for type '{event_type}'...")
 
-        # --- Create concurrent tasks for LLM processing ---
-        llm_tasks = [_process_single_article(item, event_type) for item in top_articles]
-        
-        # --- Run LLM tasks concurrently ---
-        results = await asyncio.gather(*llm_tasks) 
-
-        # --- Filter out None results (errors/excluded items) ---
-        final_summarized_options = [result for result in results if result is not None]
+        # --- One batched LLM call for headlines without cached summaries (errors are left out) ---
+        final_summarized_options = await current_events_service.summarize(top_articles, event_type)
 
         #print(f"Final combined list being returned (excluding errors): {final_summarized_options}")
         return JSONResponse(content=final_summarized_options)
@@ -7679,8 +7999,61 @@ class PlayAudioRequest(BaseModel):
     language_code_override: Optional[str] = None
     use_system_voice: bool = False
     speech_rate_override: Optional[int] = Field(None, gt=49, lt=401)
+    # "json": base64 audio_data + audio_url (legacy clients), "url": audio_url only,
+    # "stream": the WAV itself as the response body.
+    delivery: Literal["json", "url", "stream"] = "json"
+
+
+def _tts_audio_to_wav(audio_bytes: bytes, sample_rate: int) -> bytes:
+    # Both Google LINEAR16 and Azure riff-24khz return WAV bytes with RIFF header.
+    # Pass those through; otherwise wrap raw PCM with headers.
+    if audio_bytes[:4] == b'RIFF':
+        return audio_bytes
+    import wave, io
+    wav_buf = io.BytesIO()
+    with wave.open(wav_buf, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(audio_bytes)
+    return wav_buf.getvalue()
+
+
+async def synthesize_speech_to_wav_cached(text: str, voice_name: str, wpm_rate: int, language_code: Optional[str] = None) -> Tuple[bytes, int, str, str]:
+    """
+    Returns (wav_bytes, sample_rate, cache_key, cache_status). Identical
+    text/voice/rate/language/provider requests are served from tts_audio_cache.
+    """
+    provider = "azure" if voice_name in _AZURE_VOICE_NAMES else "google"
+    cache_key = tts_cache_key(text, voice_name, wpm_rate, language_code, provider)
+
+    async def _synthesize() -> bytes:
+        audio_bytes, sample_rate = await synthesize_speech_to_bytes(
+            text=text, voice_name=voice_name, wpm_rate=wpm_rate, language_code=language_code
+        )
+        return _tts_audio_to_wav(audio_bytes, sample_rate)
+
+    wav_bytes, cache_status = await tts_audio_cache.get_or_synthesize(cache_key, _synthesize)
+    return wav_bytes, wav_sample_rate(wav_bytes), cache_key, cache_status
+
+
+def _resolve_tts_voice_and_rate(user_settings: Dict[str, Any], voice_name_override: Optional[str] = None, use_system_voice: bool = False, speech_rate_override: Optional[int] = None) -> Tuple[str, int]:
+    # Use explicit overrides first. Otherwise, scan/system prompts can opt into the
+    # default system voice while normal announcements continue using the selected TTS voice.
+    if voice_name_override:
+        voice_to_use = voice_name_override
+    elif use_system_voice:
+        voice_to_use = DEFAULT_TTS_VOICE
+    else:
+        voice_to_use = user_settings.get("defaultPartnerVoice") or user_settings.get("selected_tts_voice_name", DEFAULT_TTS_VOICE)
+    rate_to_use = speech_rate_override or user_settings.get("speech_rate", DEFAULT_SPEECH_RATE)
+    return voice_to_use, rate_to_use
 
 
+def _iter_bytes_chunks(data: bytes, chunk_size: int = 64 * 1024):
+    for start in range(0, len(data), chunk_size):
+        yield data[start:start + chunk_size]
+
 
 @app.post("/play-audio")
 async def play_audio(request: PlayAudioRequest, current_ids: Annotated[Dict[str, str], Depends(get_current_account_and_user_ids)]):
@@ -7692,60 +8065,42 @@ async def play_audio(request: PlayAudioRequest, current_ids: Annotated[Dict[str,
     try:
         # NEW: Load user-specific settings for voice and rate
         user_settings = await load_settings_from_file(account_id, aac_user_id) # Load settings
-
-        # Use explicit overrides first. Otherwise, scan/system prompts can opt into the
-        # default system voice while normal announcements continue using the selected TTS voice.
-        if request.voice_name_override:
-            voice_to_use = request.voice_name_override
-        elif request.use_system_voice:
-            voice_to_use = DEFAULT_TTS_VOICE
-        else:
-            voice_to_use = user_settings.get("defaultPartnerVoice") or user_settings.get("selected_tts_voice_name", DEFAULT_TTS_VOICE)
-        rate_to_use = request.speech_rate_override or user_settings.get("speech_rate", DEFAULT_SPEECH_RATE)
+        voice_to_use, rate_to_use = _resolve_tts_voice_and_rate(
+            user_settings, request.voice_name_override, request.use_system_voice, request.speech_rate_override
+        )
         language_code_to_use = _normalize_locale_tag(request.language_code_override)
 
-        logging.info(f"Synthesizing speech for account {account_id} user {aac_user_id} with text: '{request.text[:50]}...' for routing target: {request.routing_target}")
-
-        audio_bytes, sample_rate = await synthesize_speech_to_bytes(
+        wav_bytes, sample_rate, cache_key, cache_status = await synthesize_speech_to_wav_cached(
             text=request.text,
             voice_name=voice_to_use, # Pass the value from settings
             wpm_rate=rate_to_use,      # Pass the value from settings
             language_code=language_code_to_use,
         )
-        import base64, wave, io
-        # Save audio to a unique file in the static directory
-        filename = f"play_audio_{uuid.uuid4().hex}.wav"
-        file_path = os.path.join(static_file_path, filename)
-
-        # Both Google LINEAR16 and Azure riff-24khz return WAV bytes with RIFF header.
-        # Write directly when already WAV; otherwise wrap raw PCM with headers.
-        is_wav = audio_bytes[:4] == b'RIFF'
-        if is_wav:
-            with open(file_path, 'wb') as f:
-                f.write(audio_bytes)
-            wav_bytes_for_response = audio_bytes
-        else:
-            wav_buf = io.BytesIO()
-            with wave.open(wav_buf, 'wb') as wf:
-                wf.setnchannels(1)
-                wf.setsampwidth(2)
-                wf.setframerate(sample_rate)
-                wf.writeframes(audio_bytes)
-            wav_bytes_for_response = wav_buf.getvalue()
-            with open(file_path, 'wb') as f:
-                f.write(wav_bytes_for_response)
-
-        encoded_audio = base64.b64encode(wav_bytes_for_response).decode('utf-8')
+        logging.info(
+            f"🔊 /play-audio {cache_status} for account {account_id} user {aac_user_id} text: '{request.text[:50]}...' "
+            f"routing target: {request.routing_target}"
+        )
 
+        # Keyed by content (HMAC), so the URL is stable and safe to cache forever
+        audio_url = f"https://{DOMAIN}/tts-audio/{cache_key}.wav"
+        audio_headers = {
+            "X-TTS-Cache": cache_status,
+            "X-Sample-Rate": str(sample_rate),
+            "X-Routing-Target": str(effective_routing_target),
+        }
 
-        audio_url = f"https://{DOMAIN}/static/{filename}"
+        if request.delivery == "stream":
+            return StreamingResponse(_iter_bytes_chunks(wav_bytes), media_type="audio/wav", headers=audio_headers)
 
-        return JSONResponse(content={
-            "audio_data": encoded_audio,
+        content = {
             "audio_url": audio_url,
             "sample_rate": sample_rate,
             "routing_target": request.routing_target
-        })
+        }
+        if request.delivery == "json":
+            import base64
+            content["audio_data"] = base64.b64encode(wav_bytes).decode('utf-8')
+        return JSONResponse(content=content, headers=audio_headers)
     
     except Exception as e:
         logging.error(f"Error handling /play-audio request for routing target {effective_routing_target}: {e}", exc_info=True)
@@ -7757,6 +8112,89 @@ async def play_audio(request: PlayAudioRequest, current_ids: Annotated[Dict[str,
 
 
 
+_TTS_CACHE_KEY_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+@app.get("/tts-audio/{cache_key}.wav")
+async def get_cached_tts_audio(cache_key: str):
+    """Serve a synthesized phrase by its keyed hash (audio_url from /play-audio) - PUBLIC ENDPOINT
+
+    Keys are HMACs over a server-side secret (tts_audio_cache.tts_cache_key), so a URL
+    cannot be derived from a guessed phrase and voice.
+    """
+    if not _TTS_CACHE_KEY_RE.match(cache_key):
+        raise HTTPException(status_code=404, detail="Audio not found")
+    cache_headers = {"Cache-Control": "public, max-age=31536000, immutable", "ETag": f'"{cache_key}"'}
+    disk_path = await asyncio.to_thread(tts_audio_cache.disk_path_if_cached, cache_key)
+    if disk_path:
+        return FileResponse(disk_path, media_type="audio/wav", headers=cache_headers)
+    wav_bytes = await tts_audio_cache.get(cache_key)
+    if wav_bytes is None:
+        raise HTTPException(status_code=404, detail="Audio not found")
+    return StreamingResponse(_iter_bytes_chunks(wav_bytes), media_type="audio/wav", headers=cache_headers)
+
+
+class TtsPrewarmRequest(BaseModel):
+    page_name: Optional[str] = None  # a board; omitted = every board
+    texts: List[str] = Field(default_factory=list)  # extra phrases
+    voice_name_override: Optional[str] = None
+    language_code_override: Optional[str] = None
+    max_phrases: int = Field(200, gt=0, le=1000)
+
+
+TTS_PREWARM_CONCURRENCY = 4
+
+
+@app.post("/api/tts/prewarm")
+async def prewarm_tts_audio(request: TtsPrewarmRequest, current_ids: Annotated[Dict[str, str], Depends(get_current_account_and_user_ids)]):
+    """Synthesize a board's button phrases into the TTS cache ahead of time (runs in the background)."""
+    account_id = current_ids["account_id"]
+    aac_user_id = current_ids["aac_user_id"]
+    user_settings = await load_settings_from_file(account_id, aac_user_id)
+    voice_to_use, rate_to_use = _resolve_tts_voice_and_rate(user_settings, request.voice_name_override)
+    language_code_to_use = _normalize_locale_tag(request.language_code_override)
+
+    phrases: List[str] = [t.strip() for t in request.texts if t and t.strip()]
+    pages = await load_pages_from_file(account_id, aac_user_id)
+    for page in pages or []:
+        if request.page_name and page.get("name") != request.page_name:
+            continue
+        for button in page.get("buttons", []) or []:
+            if button.get("hidden") or button.get("customAudioFile"):
+                continue
+            # Buttons speak their speechPhrase when set, otherwise their label
+            phrase = str(button.get("speechPhrase") or button.get("text") or "").strip()
+            if phrase:
+                phrases.append(phrase)
+    phrases = list(dict.fromkeys(phrases))[:request.max_phrases]
+    if request.page_name and not any(page.get("name") == request.page_name for page in pages or []) and not request.texts:
+        raise HTTPException(status_code=404, detail=f"Page '{request.page_name}' not found")
+
+    async def _prewarm():
+        semaphore = asyncio.Semaphore(TTS_PREWARM_CONCURRENCY)
+        results = {"hit": 0, "miss": 0, "coalesced": 0, "failed": 0}
+
+        async def _one(phrase: str):
+            async with semaphore:
+                try:
+                    _, _, _, status = await synthesize_speech_to_wav_cached(phrase, voice_to_use, rate_to_use, language_code_to_use)
+                    results[status] += 1
+                except Exception as e:
+                    results["failed"] += 1
+                    logging.warning(f"TTS prewarm failed for '{phrase[:40]}': {e}")
+
+        await asyncio.gather(*(_one(phrase) for phrase in phrases))
+        logging.info(f"🔥 TTS prewarm for {account_id}/{aac_user_id} ({request.page_name or 'all boards'}): {results}")
+
+    _spawn_background_task(_prewarm())
+    return JSONResponse(status_code=202, content={
+        "status": "queued",
+        "phrases": len(phrases),
+        "voice": voice_to_use,
+        "page_name": request.page_name,
+    })
+
+
 # Ensure this function (synthesize_speech_to_bytes) is in your server.py file,
 # unindented at the global scope, and has this full body.
 def _infer_language_code_from_voice(voice_name: str, fallback_locale: str = "en-US") -> str:
@@ -7770,6 +8208,51 @@ def _infer_language_code_from_voice(voice_name: str, fallback_locale: str = "en-
     return f"{lang}-{region}"
 
 
+TTS_PAUSE_MARKER = "[PAUSE]"
+TTS_PAUSE_SECONDS = 1.0
+# Segments of one utterance synthesized at the same time (per request).
+TTS_SEGMENT_CONCURRENCY = int(os.getenv("TTS_SEGMENT_CONCURRENCY", "4"))
+
+
+async def _synthesize_paused_text(
+    text: str, synthesize_segment: Callable[[str], Awaitable[Tuple[bytes, int]]]
+) -> Tuple[bytes, int]:
+    """
+    Synthesizes each [PAUSE]-separated part concurrently and returns a single WAV
+    (segment PCM with TTS_PAUSE_SECONDS of silence between parts) and its sample rate.
+    """
+    parts = [p.strip() for p in text.split(TTS_PAUSE_MARKER) if p.strip()]
+    if not parts:
+        return b"", 24000
+    if len(parts) == 1:
+        return await synthesize_segment(parts[0])
+
+    semaphore = asyncio.Semaphore(max(1, TTS_SEGMENT_CONCURRENCY))
+
+    async def _bounded(part: str) -> Tuple[bytes, int]:
+        async with semaphore:
+            return await synthesize_segment(part)
+
+    results = await asyncio.gather(*(_bounded(part) for part in parts))
+
+    sample_rate = channels = sampwidth = None
+    pieces = []
+    for idx, (audio_part, part_rate) in enumerate(results):
+        pcm, rate, part_channels, part_sampwidth = extract_pcm(audio_part, default_sample_rate=part_rate)
+        if sample_rate is None:
+            sample_rate, channels, sampwidth = rate, part_channels, part_sampwidth
+        elif (rate, part_channels, part_sampwidth) != (sample_rate, channels, sampwidth):
+            logging.warning(
+                f"Audio format mismatch in split TTS: {rate}Hz/{part_channels}ch/{part_sampwidth * 8}bit "
+                f"vs {sample_rate}Hz/{channels}ch/{sampwidth * 8}bit"
+            )
+        if idx:
+            pieces.append(silence_pcm(sample_rate, TTS_PAUSE_SECONDS, channels, sampwidth))
+        pieces.append(pcm)
+
+    return assemble_wav(pieces, sample_rate, channels, sampwidth), sample_rate
+
+
 async def synthesize_speech_to_bytes(text: str, voice_name: str, wpm_rate: int, language_code: Optional[str] = None) -> tuple[bytes, int]:
     """
     Synthesizes speech using the provided parameters. No DB lookups.
@@ -7824,32 +8307,8 @@ async def synthesize_speech_to_bytes(text: str, voice_name: str, wpm_rate: int,
         return response.audio_content, sample_rate_hertz
 
     # Split on [PAUSE] to mimic joke setup/punchline behavior
-    if "[PAUSE]" in text:
-        parts = [p.strip() for p in text.split("[PAUSE]") if p.strip()]
-        if not parts:
-            return b"", 24000
-
-        audio_chunks = []
-        sample_rate = None
-        pause_seconds = 1.0
-
-        for idx, part in enumerate(parts):
-            audio_part, part_rate = await _synthesize_segment(part)
-            if sample_rate is None:
-                sample_rate = part_rate
-            elif part_rate != sample_rate:
-                logging.warning(f"Sample rate mismatch in split TTS: {part_rate} vs {sample_rate}")
-
-            audio_chunks.append(audio_part)
-
-            if idx < len(parts) - 1:
-                # Generate proper silence (not null bytes) - use struct.pack for signed 16-bit samples
-                import struct
-                num_samples = int(sample_rate * pause_seconds)
-                silence_bytes = struct.pack(f'<{num_samples}h', *([0] * num_samples))
-                audio_chunks.append(silence_bytes)
-
-        return b"".join(audio_chunks), sample_rate
+    if TTS_PAUSE_MARKER in text:
+        return await _synthesize_paused_text(text, _synthesize_segment)
 
     # Single segment
     return await _synthesize_segment(text)
@@ -9571,6 +10030,8 @@ async def update_account_details(
         update_fields["last_updated"] = dt.now().isoformat()
         
         await asyncio.to_thread(account_doc_ref.update, update_fields)
+        # Therapist/admin-access flags feed authorization decisions, so drop cached principals.
+        invalidate_auth_session_cache(account_id=account_id)
         
         return {"message": "Account updated successfully"}
     except Exception as e:
@@ -9831,10 +10292,19 @@ AZURE_CHILD_VOICES = [
 _AZURE_VOICE_NAMES = {v.name for v in AZURE_CHILD_VOICES}
 
 async def _synthesize_azure_speech(text: str, voice_name: str, wpm_rate: int, language_code: Optional[str] = None) -> tuple[bytes, int]:
-    """Synthesize speech via Azure Cognitive Services TTS REST API. Returns raw PCM bytes at 24kHz 16-bit mono."""
+    """Synthesize speech via Azure Cognitive Services TTS REST API. Returns WAV bytes (24kHz 16-bit mono) and the sample rate."""
     if not AZURE_SPEECH_KEY:
         raise Exception("Azure Speech key not configured (AZURE_SPEECH_KEY env var missing).")
 
+    if text and TTS_PAUSE_MARKER in text:
+        return await _synthesize_paused_text(
+            text, lambda part: _synthesize_azure_segment(part, voice_name, wpm_rate, language_code)
+        )
+    return await _synthesize_azure_segment(text, voice_name, wpm_rate, language_code)
+
+
+async def _synthesize_azure_segment(text: str, voice_name: str, wpm_rate: int, language_code: Optional[str] = None) -> tuple[bytes, int]:
+
     region = AZURE_SPEECH_REGION or "westus2"
     endpoint = f"https://{region}.tts.speech.microsoft.com/cognitiveservices/v1"
 
@@ -9987,6 +10457,24 @@ async def _translate_lines_with_models(
     lines: List[str],
     source_locale: Optional[str],
     target_locale: str
+) -> List[str]:
+    """Translate lines through the shared translation memory; only unknown strings reach the model."""
+    if not lines:
+        return []
+    return await translation_memory.translate(
+        firestore_db,
+        lines,
+        source_locale,
+        target_locale,
+        lambda batch: _translate_lines_batch_with_models(batch, source_locale, target_locale),
+        model=primary_llm_model_instance.model_name if primary_llm_model_instance else None,
+    )
+
+
+async def _translate_lines_batch_with_models(
+    lines: List[str],
+    source_locale: Optional[str],
+    target_locale: str
 ) -> List[str]:
     if not lines:
         return []
@@ -10034,7 +10522,8 @@ async def _translate_lines_with_models(
                 temperature=0,
                 response_mime_type="application/json"
             )
-            response = await asyncio.to_thread(
+            response = await llm_execution.run(
+                _llm_model_key(model.model_name),
                 model.generate_content,
                 prompt,
                 generation_config=strict_cfg
@@ -10057,7 +10546,7 @@ async def _translate_lines_with_models(
             last_error = strict_error
 
         try:
-            response = await asyncio.to_thread(model.generate_content, prompt)
+            response = await llm_execution.run(_llm_model_key(model.model_name), model.generate_content, prompt)
             response_text = (getattr(response, "text", "") or "").strip()
             logging.info(
                 "TRANSLATION BATCH RAW RESPONSE LENGTH (retry %s->%s): %s chars",
@@ -10099,7 +10588,8 @@ async def _translate_lines_with_models(
                         temperature=0,
                         response_mime_type="application/json"
                     )
-                    response = await asyncio.to_thread(
+                    response = await llm_execution.run(
+                        _llm_model_key(model.model_name),
                         model.generate_content,
                         single_line_prompt,
                         generation_config=strict_cfg
@@ -10110,7 +10600,7 @@ async def _translate_lines_with_models(
                     break
                 except Exception:
                     try:
-                        response = await asyncio.to_thread(model.generate_content, single_line_prompt)
+                        response = await llm_execution.run(_llm_model_key(model.model_name), model.generate_content, single_line_prompt)
                         response_text = (getattr(response, "text", "") or "").strip()
                         parsed_line = _extract_translated_lines_from_model_text(response_text, 1)
                         translated_line = str(parsed_line[0] or "").strip() or source_line
@@ -10417,21 +10907,15 @@ async def translate_pages_endpoint(
                 unique_prompts.append(key)
             job["unique_index"] = prompt_to_index[key]
 
-        translated_prompts: List[str] = [""] * len(unique_prompts)
-        batch_size = 60
         try:
-            for start_idx in range(0, len(unique_prompts), batch_size):
-                batch = unique_prompts[start_idx:start_idx + batch_size]
-                translated_batch = await _translate_lines_with_models(
-                    lines=batch,
+            translated_prompts = [
+                str(translated_text or "").strip()
+                for translated_text in await _translate_lines_with_models(
+                    lines=unique_prompts,
                     source_locale=source_locale,
                     target_locale=target_locale
                 )
-                if len(translated_batch) != len(batch):
-                    raise ValueError("Tap board prompt translation returned unexpected line count")
-
-                for offset, translated_text in enumerate(translated_batch):
-                    translated_prompts[start_idx + offset] = str(translated_text or "").strip()
+            ]
         except HTTPException:
             raise
         except Exception as e:
@@ -10572,23 +11056,16 @@ async def translate_pages_endpoint(
             unique_texts.append(key)
         job["unique_index"] = text_to_index[key]
 
-    translated_unique: List[str] = [""] * len(unique_texts)
-    batch_size = 60
-
     try:
-        for start_idx in range(0, len(unique_texts), batch_size):
-            batch = unique_texts[start_idx:start_idx + batch_size]
-            translated_batch = await _translate_lines_with_models(
-                lines=batch,
+        # Known strings come from the translation memory; the rest go out as concurrent batches.
+        translated_unique = [
+            str(translated_text or "").strip()
+            for translated_text in await _translate_lines_with_models(
+                lines=unique_texts,
                 source_locale=source_locale,
                 target_locale=target_locale
             )
-
-            if len(translated_batch) != len(batch):
-                raise ValueError("Translation batch returned unexpected line count")
-
-            for offset, translated_text in enumerate(translated_batch):
-                translated_unique[start_idx + offset] = str(translated_text or "").strip()
+        ]
     except HTTPException:
         raise
     except Exception as e:
@@ -10643,19 +11120,14 @@ async def translate_pages_endpoint(
                         unique_prompts.append(key)
                     job["unique_index"] = prompt_to_index[key]
 
-                translated_prompts: List[str] = [""] * len(unique_prompts)
-                for start_idx in range(0, len(unique_prompts), batch_size):
-                    batch = unique_prompts[start_idx:start_idx + batch_size]
-                    translated_batch = await _translate_lines_with_models(
-                        lines=batch,
+                translated_prompts = [
+                    str(translated_text or "").strip()
+                    for translated_text in await _translate_lines_with_models(
+                        lines=unique_prompts,
                         source_locale=source_locale,
                         target_locale=target_locale
                     )
-                    if len(translated_batch) != len(batch):
-                        raise ValueError("Tap board prompt translation returned unexpected line count")
-
-                    for offset, translated_text in enumerate(translated_batch):
-                        translated_prompts[start_idx + offset] = str(translated_text or "").strip()
+                ]
 
                 for job in prompt_jobs:
                     translated_value = _sanitize_translated_text(translated_prompts[job["unique_index"]])
@@ -11263,9 +11735,11 @@ async def save_button_activity_log(account_id: str, aac_user_id: str, log_entrie
         return False
     collection_ref = firestore_db.collection(f"{FIRESTORE_ACCOUNTS_COLLECTION}/{account_id}/{FIRESTORE_ACCOUNT_USERS_SUBCOLLECTION}/{aac_user_id}/button_activity_log") # CORRECTED
     try:
+        pipeline = FirestoreWritePipeline(firestore_db, label="button_activity_log")
         for entry in log_entries:
             doc_id = entry.get('id') if entry.get('id') else str(uuid.uuid4())
-            await asyncio.to_thread(collection_ref.document(doc_id).set, entry)
+            pipeline.set(collection_ref.document(doc_id), entry)
+        await pipeline.commit()
         logging.info(f"Appended {len(log_entries)} items to button activity log for account {account_id} and user {aac_user_id}.") 
         return True
     except Exception as e:
@@ -11319,53 +11793,131 @@ async def save_diary_entries(account_id: str, aac_user_id: str, entries: List[Di
     Saves/overwrites all items in a Firestore subcollection, handling list of dicts.
     """
     sorted_entries = sorted(entries, key=lambda x: x.get('date', '0001-01-01'), reverse=True)
-    return await save_firestore_collection_items(
+    saved = await save_firestore_collection_items(
         account_id=account_id,
         aac_user_id=aac_user_id,
         collection_subpath="diary_entries", # Firestore subcollection path
         items=sorted_entries # Save all items to the subcollection
     )
+    # Keep the DELTA retrieval index current without reloading the diary. Entries that
+    # load_diary_entries would reshape (missing id, date or text) force a reload instead.
+    if saved and all(
+        isinstance(e, dict) and all(isinstance(e.get(field), str) for field in ("id", "date", "entry"))
+        for e in sorted_entries
+    ):
+        context_retriever.sync_diary((account_id, aac_user_id), sorted_entries)
+    else:
+        context_retriever.invalidate((account_id, aac_user_id))
+    return saved
 
 
 # --- Chat History Load/Save ---
-async def load_chat_history(account_id: str, aac_user_id: str) -> List[Dict]:
-    return await load_firestore_collection(
-        account_id=account_id,
-        aac_user_id=aac_user_id,
-        collection_subpath="chat_history", # Firestore subcollection path
+# chat_history is an append-only log: one document per message, keyed by the entry id,
+# with an ISO-8601 "timestamp" field that sorts chronologically as a string.
+def _chat_history_collection(account_id: str, aac_user_id: str):
+    return firestore_db.collection(
+        f"{FIRESTORE_ACCOUNTS_COLLECTION}/{account_id}/{FIRESTORE_ACCOUNT_USERS_SUBCOLLECTION}/{aac_user_id}/chat_history"
     )
 
+def _run_chat_history_query(query) -> List[Dict]:
+    entries = []
+    for doc in query.stream():
+        entry_data = doc.to_dict()
+        if entry_data:
+            entry_data['id'] = doc.id
+            entries.append(entry_data)
+    return entries
+
+async def load_chat_history(account_id: str, aac_user_id: str) -> List[Dict]:
+    """Load chat messages oldest-first (documents without a timestamp, e.g. the placeholder, are skipped)."""
+    if not firestore_db:
+        logging.error(f"Firestore DB client not initialized. Cannot load chat history for AAC user {aac_user_id}.")
+        return []
+    try:
+        query = _chat_history_collection(account_id, aac_user_id).order_by("timestamp")
+        return await asyncio.to_thread(_run_chat_history_query, query)
+    except Exception as e:
+        logging.error(f"Error loading chat history for {account_id}/{aac_user_id}: {e}", exc_info=True)
+        return []
+
 async def load_recent_chat_history(account_id: str, aac_user_id: str, days: int = 7) -> List[Dict]:
     """Load only recent chat messages within the specified number of days"""
-    all_messages = await load_chat_history(account_id, aac_user_id)
-    
-    if not all_messages:
+    if not firestore_db:
+        logging.error(f"Firestore DB client not initialized. Cannot load chat history for AAC user {aac_user_id}.")
         return []
-    
-    from datetime import datetime, timedelta
-    cutoff_date = datetime.now() - timedelta(days=days)
-    
-    recent_messages = []
-    for msg in all_messages:
-        try:
-            msg_date = datetime.fromisoformat(msg.get("timestamp", "2000-01-01T00:00:00"))
-            if msg_date >= cutoff_date:
-                recent_messages.append(msg)
-        except:
-            # If can't parse date, include it to be safe
-            recent_messages.append(msg)
-    
-    logging.info(f"📅 Filtered chat history: {len(recent_messages)}/{len(all_messages)} messages within last {days} days")
+    cutoff_iso = (dt.now() - timedelta(days=days)).isoformat()
+    try:
+        query = (
+            _chat_history_collection(account_id, aac_user_id)
+            .where("timestamp", ">=", cutoff_iso)
+            .order_by("timestamp")
+        )
+        recent_messages = await asyncio.to_thread(_run_chat_history_query, query)
+    except Exception as e:
+        logging.error(f"Error loading recent chat history for {account_id}/{aac_user_id}: {e}", exc_info=True)
+        return []
+    logging.info(f"📅 Loaded {len(recent_messages)} chat messages from the last {days} days")
     return recent_messages
 
+def _append_chat_history_entry_sync(account_id: str, aac_user_id: str, entry: Dict, max_entries: int) -> int:
+    collection_ref = _chat_history_collection(account_id, aac_user_id)
+    collection_ref.document(entry["id"]).set(entry)
+    # A count aggregation (one read per 1000 entries) sizes the overflow, so only the oldest
+    # overflow docs are read and deleted. An offset query would bill every skipped entry.
+    # Ordering by timestamp leaves out the timestamp-less placeholder doc in both queries.
+    count_result = collection_ref.order_by("timestamp").count().get()
+    overflow = int(count_result[0][0].value) - max_entries
+    if overflow <= 0:
+        return 0
+    overflow_query = collection_ref.order_by("timestamp").limit(overflow).select([])
+    overflow_refs = [doc.reference for doc in overflow_query.stream()]
+    for start in range(0, len(overflow_refs), 500):
+        batch = firestore_db.batch()
+        for ref in overflow_refs[start:start + 500]:
+            batch.delete(ref)
+        batch.commit()
+    return len(overflow_refs)
+
+async def append_chat_history_entry(account_id: str, aac_user_id: str, entry: Dict, max_entries: int = MAX_CHAT_HISTORY) -> bool:
+    """Insert one chat message and trim the log to max_entries with a single batched delete."""
+    if not firestore_db:
+        logging.error(f"Firestore DB client not initialized. Cannot append chat history for AAC user {aac_user_id}.")
+        return False
+    try:
+        trimmed = await asyncio.to_thread(_append_chat_history_entry_sync, account_id, aac_user_id, entry, max_entries)
+        context_retriever.add_chat((account_id, aac_user_id), entry, max_entries)
+        if trimmed:
+            logging.info(f"Trimmed {trimmed} old chat history entries for {account_id}/{aac_user_id}")
+        return True
+    except Exception as e:
+        logging.error(f"Error appending chat history for {account_id}/{aac_user_id}: {e}", exc_info=True)
+        return False
+
+async def update_chat_history_metadata(account_id: str, aac_user_id: str, entry_id: str, metadata_updates: Dict) -> bool:
+    """Update metadata fields of one chat message in place."""
+    if not firestore_db:
+        return False
+    try:
+        doc_ref = _chat_history_collection(account_id, aac_user_id).document(entry_id)
+        await asyncio.to_thread(doc_ref.update, {f"metadata.{key}": value for key, value in metadata_updates.items()})
+        return True
+    except google.api_core.exceptions.NotFound:
+        # Trimmed away (or deleted with the user) before the metadata was ready
+        return False
+    except Exception as e:
+        logging.error(f"Error updating chat history metadata for {account_id}/{aac_user_id}/{entry_id}: {e}", exc_info=True)
+        return False
+
 async def save_chat_history(account_id: str, aac_user_id: str, history: List[Dict]):
     # The MAX_CHAT_HISTORY limit check should happen in the calling endpoint (e.g., record_chat_history)
-    return await save_firestore_collection_items(
+    saved = await save_firestore_collection_items(
         account_id=account_id,
         aac_user_id=aac_user_id,
         collection_subpath="chat_history", # Firestore subcollection path
         items=history # Save all items to the subcollection
     )
+    context_retriever.invalidate((account_id, aac_user_id))
+    return saved
 
 # --- Chat-Derived Narrative Load/Save ---
 async def load_chat_derived_narrative(account_id: str, aac_user_id: str) -> Dict:
@@ -11844,9 +12396,8 @@ async def save_user_info_api(request: Dict, current_ids: Annotated[Dict[str, str
         try:
             # Track mood update timestamp if mood was changed
             if current_mood:
-                global mood_update_timestamps
                 user_key = f"{account_id}/{aac_user_id}"
-                mood_update_timestamps[user_key] = time.time()
+                await mood_update_timestamps.set(user_key, time.time())
                 logging.info(f"🕐 Mood update timestamp recorded for {user_key}: {current_mood}")
             
             # NOTE: Mood is in DELTA context, NOT cached. Only invalidate if narrative/name changed.
@@ -12689,53 +13240,45 @@ async def record_chat_history_endpoint(payload: ChatHistoryPayload, current_ids:
             }
         }
         
-        # Load and save immediately
-        history = await load_chat_history(account_id, aac_user_id)
-        history.append(log_entry)
-        if len(history) > MAX_CHAT_HISTORY: 
-            history = history[-MAX_CHAT_HISTORY:]
-        await save_chat_history(account_id, aac_user_id, history)
+        # Single-document insert; only overflow beyond MAX_CHAT_HISTORY is deleted
+        if not await append_chat_history_entry(account_id, aac_user_id, log_entry):
+            raise HTTPException(status_code=500, detail="Failed to save chat history entry.")
         
         logging.info(f"Chat history saved immediately for {account_id}/{aac_user_id}")
+        word_predictor.observe((account_id, aac_user_id), response)
         
         # Now process metadata in background (non-blocking)
         async def process_metadata_async():
             try:
-                # Reload history to get latest
-                history = await load_chat_history(account_id, aac_user_id)
+                # Only the last day matters for repetition checks
+                recent_history = await load_recent_chat_history(account_id, aac_user_id, days=1)
+                previous_entries = [entry for entry in recent_history if entry.get("id") != log_entry["id"]]
                 
-                # Find our entry
-                for entry in reversed(history):
-                    if entry.get("id") == log_entry["id"]:
-                        # Classify the message
-                        message_type = classify_message_type(response)
-                        message_category = classify_message_category(response, message_type)
-                        is_repetition, similar_id = check_message_repetition(response, history[:-1], days=1)  # Exclude current entry
-                        
-                        # Update metadata
-                        entry["metadata"].update({
-                            "type": message_type,
-                            "category": message_category,
-                            "is_repetition": is_repetition,
-                            "similar_to": similar_id
-                        })
-                        
-                        # Update chat-derived narrative for greetings
-                        if message_type == "greeting":
-                            narrative = await load_chat_derived_narrative(account_id, aac_user_id)
-                            if response not in narrative.get("recent_greetings", []):
-                                recent_greetings = narrative.get("recent_greetings", [])
-                                recent_greetings.append(response)
-                                if len(recent_greetings) > 5:
-                                    recent_greetings = recent_greetings[-5:]
-                                narrative["recent_greetings"] = recent_greetings
-                                narrative["last_updated"] = timestamp
-                                await save_chat_derived_narrative(account_id, aac_user_id, narrative)
-                        
-                        break
+                # Classify the message
+                message_type = classify_message_type(response)
+                message_category = classify_message_category(response, message_type)
+                is_repetition, similar_id = check_message_repetition(response, previous_entries, days=1)
+                
+                # Update metadata in place on this entry's document
+                await update_chat_history_metadata(account_id, aac_user_id, log_entry["id"], {
+                    "type": message_type,
+                    "category": message_category,
+                    "is_repetition": is_repetition,
+                    "similar_to": similar_id
+                })
+                
+                # Update chat-derived narrative for greetings
+                if message_type == "greeting":
+                    narrative = await load_chat_derived_narrative(account_id, aac_user_id)
+                    if response not in narrative.get("recent_greetings", []):
+                        recent_greetings = narrative.get("recent_greetings", [])
+                        recent_greetings.append(response)
+                        if len(recent_greetings) > 5:
+                            recent_greetings = recent_greetings[-5:]
+                        narrative["recent_greetings"] = recent_greetings
+                        narrative["last_updated"] = timestamp
+                        await save_chat_derived_narrative(account_id, aac_user_id, narrative)
                 
-                # Save updated history with metadata
-                await save_chat_history(account_id, aac_user_id, history)
                 logging.info(f"Chat history metadata processed for {account_id}/{aac_user_id}")
             except Exception as e:
                 logging.error(f"Error processing chat metadata in background: {e}", exc_info=True)
@@ -12965,6 +13508,7 @@ async def log_button_click_endpoint(click_data: ButtonClickData, current_ids: An
     async def save_click_async():
         try:
             log_entry = click_data.model_dump()
+            word_predictor.observe((account_id, aac_user_id), click_data.button_text)
             activity_log = await load_button_activity_log(account_id, aac_user_id)
             activity_log.append(log_entry)
             print(f"Button click logged for account {account_id} and user {aac_user_id}: {log_entry}")
@@ -13311,7 +13855,7 @@ async def _initialize_new_aac_user_profile(account_id: str, aac_user_id: str, di
     )
 
     # Initial pages (use save_pages_to_file to correctly wrap the list in a dict):
-    initial_pages_list = json.loads(template_user_data_paths["pages.json"])
+    initial_pages_list = copy.deepcopy(DEFAULT_PAGES_TEMPLATE)
     # Ensure all page names and targetPages in the default template are lowercase
     for page in initial_pages_list:
         if "name" in page and page["name"]:
@@ -13341,11 +13885,62 @@ async def _initialize_new_aac_user_profile(account_id: str, aac_user_id: str, di
     logging.info(f"Individual AAC user '{aac_user_id}' initialized with default data in Firestore ")
 
 
-# --- Freestyle Endpoints ---
-class FreestyleWordPredictionRequest(BaseModel):
-    text: str = Field(default="", description="Context text from build space")
-    spelling_word: str = Field(default="", description="Current partial word being spelled")
-    predict_full_words: bool = Field(default=True, description="Whether to predict full words or completions")
+# --- Freestyle Endpoints ---
+class FreestyleWordPredictionRequest(BaseModel):
+    text: str = Field(default="", description="Context text from build space")
+    spelling_word: str = Field(default="", description="Current partial word being spelled")
+    predict_full_words: bool = Field(default=True, description="Whether to predict full words or completions")
+
+# Below this many local candidates the LLM is asked too, in the background.
+WORD_PREDICTION_LLM_MIN_CANDIDATES = int(os.getenv("WORD_PREDICTION_LLM_MIN_CANDIDATES", "5"))
+_word_prediction_llm_inflight: Set[Tuple[str, str, str]] = set()
+
+
+async def _load_word_predictor_user_data(account_id: str, aac_user_id: str) -> Tuple[List[str], int]:
+    """Texts the user has produced (chat responses, button presses) plus their FreestyleOptions."""
+    settings, chat_history, activity_log = await asyncio.gather(
+        load_settings_from_file(account_id, aac_user_id),
+        load_chat_history(account_id, aac_user_id),
+        load_button_activity_log(account_id, aac_user_id),
+    )
+    texts = [str(entry.get("response") or "") for entry in chat_history]
+    texts.extend(str(entry.get("button_text") or "") for entry in activity_log)
+    return [t for t in texts if t.strip()], int(settings.get("FreestyleOptions", 20) or 20)
+
+
+async def _supplement_word_predictions_with_llm(account_id: str, aac_user_id: str, context_text: str, partial_word: str, max_predictions: int):
+    """Background LLM completion for prefixes the local lexicon barely covers."""
+    inflight_key = (account_id, aac_user_id, partial_word.lower())
+    if inflight_key in _word_prediction_llm_inflight:
+        return
+    _word_prediction_llm_inflight.add(inflight_key)
+    try:
+        user_info = await load_firestore_document(
+            account_id=account_id,
+            aac_user_id=aac_user_id,
+            doc_subpath="info/user_narrative",
+            default_data={"narrative": ""}
+        )
+        user_context = user_info.get("narrative", "")
+        if context_text:
+            prompt = f"Given the user context: '{user_context}' and the existing text: '{context_text}', provide up to {max_predictions} complete words that start with '{partial_word}'. If '{partial_word}' is already a complete, common word that an AAC user might intend to say, include that exact word as the first line. Then include other longer completions that start with '{partial_word}'. Return only the words, one per line."
+        else:
+            prompt = f"Given the user context: '{user_context}', provide up to {max_predictions} complete words that start with '{partial_word}'. If '{partial_word}' is already a complete, common word that an AAC user might intend to say, include that exact word as the first line. Then include other longer completions that start with '{partial_word}'. Return only the words, one per line."
+
+        response_text = await _generate_gemini_content_with_fallback(prompt, account_id=account_id, aac_user_id=aac_user_id)
+        partial_key = partial_word.lower()
+        words = [
+            line.strip()
+            for line in response_text.split('\n')
+            if line.strip().lower().startswith(partial_key) and " " not in line.strip()
+        ]
+        word_predictor.add_supplement((account_id, aac_user_id), words[:max_predictions * 2])
+        logging.info(f"LLM word prediction supplement for partial '{partial_word}': {len(words)} words")
+    except Exception as e:
+        logging.warning(f"LLM word prediction supplement failed for {account_id}/{aac_user_id}: {e}")
+    finally:
+        _word_prediction_llm_inflight.discard(inflight_key)
+
 
 @app.post("/api/freestyle/word-prediction")
 async def get_freestyle_word_prediction(
@@ -13353,68 +13948,37 @@ async def get_freestyle_word_prediction(
     current_ids: Annotated[Dict[str, str], Depends(get_current_account_and_user_ids)]
 ):
     """
-    Provides word completion suggestions for freestyle text input
+    Provides word completion suggestions for freestyle text input.
+    Answers from the in-process word predictor; the LLM only backfills sparse prefixes.
     """
     aac_user_id = current_ids["aac_user_id"]
     account_id = current_ids["account_id"]
     
     try:
-        # Load user settings to get FreestyleOptions
-        settings = await load_settings_from_file(account_id, aac_user_id)
-        freestyle_options = settings.get("FreestyleOptions", 20)  # Default to 20 if not set
-        
-        # Load user context for better predictions
-        user_info = await load_firestore_document(
-            account_id=account_id,
-            aac_user_id=aac_user_id,
-            doc_subpath="info/user_narrative",
-            default_data={"narrative": ""}
-        )
-        
-        # Determine what we're predicting
         context_text = request.text.strip() if request.text else ""
         partial_word = request.spelling_word.strip() if request.spelling_word else ""
         
         if not partial_word:
             return JSONResponse(content={"predictions": []})
-        
-        # Create prompt for full word prediction with user context
-        user_context = user_info.get("narrative", "")
-        
-        if context_text:
-            prompt = f"Given the user context: '{user_context}' and the existing text: '{context_text}', provide up to {freestyle_options} complete words that start with '{partial_word}'. If '{partial_word}' is already a complete, common word that an AAC user might intend to say, include that exact word as the first line. Then include other longer completions that start with '{partial_word}'. Return only the words, one per line."
-        else:
-            prompt = f"Given the user context: '{user_context}', provide up to {freestyle_options} complete words that start with '{partial_word}'. If '{partial_word}' is already a complete, common word that an AAC user might intend to say, include that exact word as the first line. Then include other longer completions that start with '{partial_word}'. Return only the words, one per line."
-        
-        # Use LLM to generate predictions
-        response_text = await _generate_gemini_content_with_fallback(prompt)
-        
-        # Parse predictions - ensure they are complete words starting with the partial word
-        raw_predictions = [line.strip() for line in response_text.split('\n') if line.strip()]
-        predictions = []
-        seen_predictions = set()
-        
-        for pred in raw_predictions[:freestyle_options * 2]:  # Get extra to filter
-            normalized_pred = pred.strip()
-            normalized_key = normalized_pred.lower()
-            if not normalized_pred or normalized_key in seen_predictions:
-                continue
-            # Ensure the prediction starts with the partial word and is a complete word
-            if normalized_key == partial_word.lower():
-                predictions.append(normalized_pred)
-                seen_predictions.add(normalized_key)
-            elif normalized_key.startswith(partial_word.lower()) and len(normalized_pred) > len(partial_word):
-                predictions.append(normalized_pred)
-                seen_predictions.add(normalized_key)
-            elif not partial_word and pred:  # If no partial word, just add valid predictions
-                predictions.append(normalized_pred)
-                seen_predictions.add(normalized_key)
-        
-        # Limit to freestyle_options predictions
-        predictions = predictions[:freestyle_options]
-        
-        logging.info(f"Word predictions for partial '{partial_word}' with context '{context_text}': {predictions}")
-        return JSONResponse(content={"predictions": predictions})
+
+        user_key = (account_id, aac_user_id)
+        word_predictor.ensure_user_model(user_key, lambda: _load_word_predictor_user_data(account_id, aac_user_id))
+        user_model = word_predictor.get_user_model(user_key)
+        freestyle_options = user_model.max_predictions if user_model is not None else 20
+
+        predictions = word_predictor.predict(partial_word, context_text, user_key=user_key, limit=freestyle_options)
+
+        # Supplements are stored on the user's model, so only ask the LLM once it is built;
+        # until then the next keystroke after the build will ask instead.
+        llm_pending = False
+        if user_model is not None and len(predictions) < min(WORD_PREDICTION_LLM_MIN_CANDIDATES, freestyle_options):
+            llm_pending = True
+            _spawn_background_task(_supplement_word_predictions_with_llm(
+                account_id, aac_user_id, context_text, partial_word, freestyle_options
+            ))
+
+        logging.debug(f"Word predictions for partial '{partial_word}' with context '{context_text}': {predictions}")
+        return JSONResponse(content={"predictions": predictions, "llm_pending": llm_pending})
         
     except Exception as e:
         logging.error(f"Error generating word predictions for account {account_id}, user {aac_user_id}: {e}", exc_info=True)
@@ -15507,9 +16071,8 @@ async def set_mood(
         if success:
             try:
                 # Track mood update timestamp
-                global mood_update_timestamps
                 user_key = f"{account_id}/{aac_user_id}"
-                mood_update_timestamps[user_key] = time.time()
+                await mood_update_timestamps.set(user_key, time.time())
                 logging.info(f"🕐 Mood update timestamp recorded for {user_key}: {new_mood}")
                 
                 # NOTE: Mood is in DELTA context, NOT cached - no invalidation needed
@@ -17307,21 +17870,13 @@ async def export_story_builder_audio(
             wpm_rate=rate_to_use
         )
 
-        import io
-        import wave
-
-        wav_buffer = io.BytesIO()
-        with wave.open(wav_buffer, 'wb') as wav_file:
-            wav_file.setnchannels(1)
-            wav_file.setsampwidth(2)
-            wav_file.setframerate(sample_rate)
-            wav_file.writeframes(audio_bytes)
+        wav_bytes = _tts_audio_to_wav(audio_bytes, sample_rate)
 
         safe_filename_base = re.sub(r"[^a-zA-Z0-9_-]+", "_", safe_title).strip("_") or "story"
         filename = f"{safe_filename_base}_audio.wav"
 
         return Response(
-            content=wav_buffer.getvalue(),
+            content=wav_bytes,
             media_type="audio/wav",
             headers={
                 "Content-Disposition": f'attachment; filename="{filename}"',
@@ -18017,19 +18572,8 @@ async def generate_category_words(
             f"{hashlib.sha1(json.dumps(cache_payload, sort_keys=True).encode('utf-8')).hexdigest()[:24]}"
         )
 
-        now_ts = time.time()
-        if len(category_words_quick_response_cache) > 600:
-            expired_keys = [
-                key
-                for key, value in category_words_quick_response_cache.items()
-                if (now_ts - float(value.get("created_at", 0))) >= CATEGORY_WORDS_QUICK_RESPONSE_CACHE_TTL_SECONDS
-            ]
-            for key in expired_keys:
-                category_words_quick_response_cache.pop(key, None)
-
-        cached_response_entry = category_words_quick_response_cache.get(quick_cache_key)
-        if cached_response_entry and (now_ts - float(cached_response_entry.get("created_at", 0))) < CATEGORY_WORDS_QUICK_RESPONSE_CACHE_TTL_SECONDS:
-            cached_words = copy.deepcopy(cached_response_entry.get("response", []))
+        cached_words = await category_words_quick_response_cache.get(quick_cache_key)
+        if cached_words is not None:
             total_elapsed_ms = (time.perf_counter() - request_start_time) * 1000
             logging.info(
                 f"⚡ /api/freestyle/category-words quick-cache HIT for {account_id}/{aac_user_id} "
@@ -18204,10 +18748,7 @@ Return only JSON array of objects with text and keywords."""
             )
 
         final_words = normalized_words[:freestyle_options]
-        category_words_quick_response_cache[quick_cache_key] = {
-            "created_at": time.time(),
-            "response": copy.deepcopy(final_words),
-        }
+        await category_words_quick_response_cache.set(quick_cache_key, final_words)
 
         total_elapsed_ms = (time.perf_counter() - request_start_time) * 1000
         logging.info(
@@ -18607,7 +19148,7 @@ async def generate_subconcepts(concept: str, count: int) -> List[str]:
     """
     
     try:
-        response = await asyncio.to_thread(model.generate_content, prompt)
+        response = await llm_execution.run(_llm_model_key(model.model_name), model.generate_content, prompt)
         subconcepts = [line.strip() for line in response.text.strip().split('\n') if line.strip()]
         return subconcepts[:count]  # Ensure we don't exceed requested count
     except Exception as e:
@@ -18889,7 +19430,8 @@ async def generate_image_tags(image_url: str, concept: str, subconcept: str) ->
             # Convert to base64 for Gemini
             image_data = base64.b64encode(response.content).decode()
             
-            response = await asyncio.to_thread(
+            response = await llm_execution.run(
+                _llm_model_key(model.model_name),
                 model.generate_content,
                 [prompt, {"mime_type": "image/png", "data": image_data}]
             )
@@ -19065,21 +19607,16 @@ async def public_bravo_images_search(
     """
     Public search endpoint for BravoImages - accessible without authentication.
     Used by frontend search functionality in symbol_admin and gridpage.
-    Includes Redis caching for improved performance.
+    Results are cached in image_search_cache (in-process L1, then Redis).
     """
     try:
-        # Create cache key with version for tag position prioritization fix
-        cache_key = f"bravo_images_v3:{tag.lower()}:{concept.lower()}:{subconcept.lower()}:{limit}"
-        
-        # Try Redis cache first
-        if redis_client:
-            try:
-                cached_result = redis_client.get(cache_key)
-                if cached_result:
-                    logging.debug(f"Cache HIT for search: {tag or concept or subconcept}")
-                    return json.loads(cached_result)
-            except Exception as redis_error:
-                logging.warning(f"Redis cache read error: {redis_error}")
+        cache_params = image_search_cache.params(tag, concept, subconcept, limit)
+        cached_result = await image_search_cache.get(cache_params)
+        if cached_result is not None:
+            logging.debug(f"Cache HIT for search: {tag or concept or subconcept}")
+            return cached_result
+        # Read after the lookup; an invalidation while searching makes set() drop this result
+        cache_version = image_search_cache.version
         
         logging.debug(f"Cache MISS for search: {tag or concept or subconcept} - querying Firestore")
         
@@ -19308,13 +19845,7 @@ async def public_bravo_images_search(
             except Exception as log_error:
                 logging.error(f"❌ Failed to log missing image '{search_term}': {log_error}")
         
-        # Cache the result for 1 hour (3600 seconds)
-        if redis_client:
-            try:
-                redis_client.setex(cache_key, 3600, json.dumps(result))
-                logging.debug(f"Cached search result for: {tag or concept or subconcept}")
-            except Exception as redis_error:
-                logging.warning(f"Redis cache write error: {redis_error}")
+        await image_search_cache.set(cache_params, result, cache_version)
         
         return result
         
@@ -19414,19 +19945,11 @@ async def log_missing_image(search_term: str, search_context: dict = None):
         # Do not re-raise - missing image logging is non-critical and must not 500 the caller
 
 # Redis cache helper functions
-async def clear_image_cache(pattern: str = "bravo_images:*"):
-    """Clear image search cache by pattern"""
-    if redis_client:
-        try:
-            keys = redis_client.keys(pattern)
-            if keys:
-                redis_client.delete(*keys)
-                logging.info(f"Cleared {len(keys)} cache entries matching pattern: {pattern}")
-            return len(keys)
-        except Exception as e:
-            logging.warning(f"Error clearing cache: {e}")
-            return 0
-    return 0
+async def clear_image_cache() -> int:
+    """Invalidate every cached image search (bumps the cache's namespace version); returns the new version"""
+    version = await image_search_cache.invalidate()
+    logging.info(f"Invalidated image search cache (now version {version})")
+    return version
 
 async def prewarm_common_searches():
     """Prewarm cache with common admin button searches"""
@@ -19442,11 +19965,15 @@ async def prewarm_common_searches():
         "strange", "weird", "odd", "unusual"
     ]
     
+    # One round trip for the terms already cached; only the misses run a search
+    params_by_term = {term: image_search_cache.params(term, "", "", 1) for term in common_terms}
+    cached_results = await image_search_cache.get_many(params_by_term.values())
+
     prewarmed_count = 0
     for term in common_terms:
         try:
             # Call the search to populate cache
-            result = await public_bravo_images_search(tag=term, limit=1)
+            result = cached_results.get(params_by_term[term]) or await public_bravo_images_search(tag=term, limit=1)
             if result.get("images"):
                 prewarmed_count += 1
                 logging.debug(f"Prewarmed cache for: {term}")
@@ -19458,16 +19985,15 @@ async def prewarm_common_searches():
 
 @app.post("/api/admin/cache/clear")
 async def clear_cache_endpoint(
-    token_info: Annotated[Dict[str, str], Depends(verify_admin_user)],
-    pattern: str = "bravo_images:*"
+    token_info: Annotated[Dict[str, str], Depends(verify_admin_user)]
 ):
     """Admin endpoint to clear image search cache"""
     try:
-        cleared_count = await clear_image_cache(pattern)
+        version = await clear_image_cache()
         return {
             "success": True,
-            "message": f"Cleared {cleared_count} cache entries",
-            "pattern": pattern
+            "message": "Cleared image search cache",
+            "cache_version": version
         }
     except Exception as e:
         logging.error(f"Error clearing cache: {e}")
@@ -19606,6 +20132,7 @@ async def api_delete_image(
         
         # Delete from Firestore
         await asyncio.to_thread(doc_ref.delete)
+        await image_search_cache.invalidate()
         
         return {"success": True, "message": "Image deleted successfully"}
         
@@ -19631,6 +20158,7 @@ async def api_update_image_tags(
         
         # Update tags
         await asyncio.to_thread(doc_ref.update, {"tags": tags})
+        await image_search_cache.invalidate()
         
         return {"success": True, "message": "Tags updated successfully"}
         
@@ -19654,6 +20182,7 @@ async def api_update_image_mascot(
             raise HTTPException(status_code=404, detail="Image not found")
         mascot = payload.get("mascot")  # None/null means generic
         await asyncio.to_thread(doc_ref.update, {"mascot": mascot, "updated_at": datetime.now(timezone.utc)})
+        await image_search_cache.invalidate()
         return {"success": True, "mascot": mascot}
     except HTTPException:
         raise
@@ -19716,6 +20245,7 @@ async def api_update_image_multilingual(
             return {"success": True, "message": "No changes provided"}
 
         await asyncio.to_thread(doc_ref.update, update_data)
+        await image_search_cache.invalidate()
         logging.info(f"Updated multilingual metadata for image {image_id}: {list(update_data.keys())}")
 
         return {"success": True, "message": "Multilingual metadata updated successfully"}
@@ -19753,6 +20283,9 @@ async def api_bulk_delete_images(
             except Exception as e:
                 failed_deletions.append({"id": image_id, "reason": str(e)})
         
+        if deleted_count:
+            await image_search_cache.invalidate()
+        
         return {
             "success": True,
             "deleted_count": deleted_count,
@@ -20125,7 +20658,8 @@ The tags should help users find this image when searching. Consider:
 
 Return 8-12 relevant tags as a comma-separated list. Make tags specific and useful for AAC communication."""
 
-                    response = await asyncio.to_thread(
+                    response = await llm_execution.run(
+                        _llm_model_key(primary_llm_model_instance.model_name),
                         primary_llm_model_instance.generate_content, 
                         tag_prompt,
                         generation_config={"temperature": 0.7}
@@ -20598,93 +21132,130 @@ async def import_aac_generated_symbols(
             content={"error": "AAC symbol import failed", "details": str(e)}
         )
 
+def _symbol_from_doc(doc_id: str, symbol: Dict[str, Any]) -> Dict[str, Any]:
+    symbol = dict(symbol or {})
+    symbol['id'] = doc_id
+    # Convert datetime objects to ISO format strings for JSON serialization
+    for field in ('created_at', 'updated_at', 'last_used'):
+        if field in symbol and symbol[field]:
+            symbol[field] = symbol[field].isoformat() if hasattr(symbol[field], 'isoformat') else str(symbol[field])
+    return symbol
+
+
+def _search_symbols_firestore(q: str, category: Optional[str], difficulty: Optional[str], age_group: Optional[str], limit: int) -> List[Dict[str, Any]]:
+    """Legacy full-scan search, used only until the in-memory search engine is ready. Blocking."""
+    symbols_ref = firestore_db.collection("aac_images")
+    
+    # Build query with filters - simplified to avoid ordering issues
+    if category:
+        symbols_ref = symbols_ref.where("categories", "array_contains", category)
+    if difficulty:
+        symbols_ref = symbols_ref.where("difficulty_level", "==", difficulty)
+    if age_group:
+        symbols_ref = symbols_ref.where("age_groups", "array_contains", age_group)
+    
+    # For text search, we need to get ALL symbols to search through them
+    # Only apply limit if no text query (browsing mode)
+    if not q and not category and not difficulty and not age_group:
+        symbols_ref = symbols_ref.limit(limit)
+    
+    results = symbols_ref.stream()
+    symbols = []
+    
+    for doc in results:
+        symbol = _symbol_from_doc(doc.id, doc.to_dict())
+        
+        # Enhanced text matching if query provided
+        if q:
+            query_lower = q.lower()
+            match_score = 0
+            
+            # Exact matches get highest scores
+            if query_lower == symbol.get('name', '').lower():
+                match_score += 20
+            elif query_lower in symbol.get('name', '').lower():
+                match_score += 10
+            
+            if query_lower == symbol.get('description', '').lower():
+                match_score += 15
+            elif query_lower in symbol.get('description', '').lower():
+                match_score += 5
+            
+            # Check all tags for matches
+            for tag in symbol.get('tags', []):
+                if query_lower == tag.lower():
+                    match_score += 12
+                elif query_lower in tag.lower():
+                    match_score += 3
+            
+            # Check filename tags if they exist
+            for tag in symbol.get('filename_tags', []):
+                if query_lower == tag.lower():
+                    match_score += 8
+                elif query_lower in tag.lower():
+                    match_score += 2
+            
+            # Check alt text
+            if query_lower in symbol.get('alt_text', '').lower():
+                match_score += 2
+            
+            if match_score > 0:
+                symbol['match_score'] = match_score
+                symbols.append(symbol)
+        else:
+            symbols.append(symbol)
+    
+    # Sort by match score if query provided
+    if q:
+        symbols.sort(key=lambda x: x.get('match_score', 0), reverse=True)
+    return symbols
+
+
+def _fetch_symbols_by_id(doc_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Batch-reads full symbol documents for one result page. Blocking."""
+    collection = firestore_db.collection("aac_images")
+    snaps = firestore_db.get_all([collection.document(doc_id) for doc_id in doc_ids])
+    return {snap.id: _symbol_from_doc(snap.id, snap.to_dict()) for snap in snaps if snap.exists}
+
+
 @app.get("/api/symbols/search")
 async def search_symbols(
     q: str = "",
     category: str = None,
     difficulty: str = None,
     age_group: str = None,
-    limit: int = 20
+    limit: int = 20,
+    cursor: Optional[str] = None
 ):
-    """Search for AAC symbols - PUBLIC ENDPOINT"""
+    """Search for AAC symbols - PUBLIC ENDPOINT. Pass `next_cursor` back as `cursor` for the next page."""
     try:
-        symbols_ref = firestore_db.collection("aac_images")
-        
-        # Build query with filters - simplified to avoid ordering issues
-        if category:
-            symbols_ref = symbols_ref.where("categories", "array_contains", category)
-        if difficulty:
-            symbols_ref = symbols_ref.where("difficulty_level", "==", difficulty)
-        if age_group:
-            symbols_ref = symbols_ref.where("age_groups", "array_contains", age_group)
-        
-        # For text search, we need to get ALL symbols to search through them
-        # Only apply limit if no text query (browsing mode)
-        if not q and not category and not difficulty and not age_group:
-            symbols_ref = symbols_ref.limit(limit)
-        
-        results = symbols_ref.stream()
-        symbols = []
-        
-        for doc in results:
-            symbol = doc.to_dict()
-            symbol['id'] = doc.id
-            
-            # Convert datetime objects to ISO format strings for JSON serialization
-            if 'created_at' in symbol and symbol['created_at']:
-                symbol['created_at'] = symbol['created_at'].isoformat() if hasattr(symbol['created_at'], 'isoformat') else str(symbol['created_at'])
-            if 'updated_at' in symbol and symbol['updated_at']:
-                symbol['updated_at'] = symbol['updated_at'].isoformat() if hasattr(symbol['updated_at'], 'isoformat') else str(symbol['updated_at'])
-            if 'last_used' in symbol and symbol['last_used']:
-                symbol['last_used'] = symbol['last_used'].isoformat() if hasattr(symbol['last_used'], 'isoformat') else str(symbol['last_used'])
-            
-            # Enhanced text matching if query provided
-            if q:
-                query_lower = q.lower()
-                match_score = 0
-                
-                # Exact matches get highest scores
-                if query_lower == symbol.get('name', '').lower():
-                    match_score += 20
-                elif query_lower in symbol.get('name', '').lower():
-                    match_score += 10
-                
-                if query_lower == symbol.get('description', '').lower():
-                    match_score += 15
-                elif query_lower in symbol.get('description', '').lower():
-                    match_score += 5
-                
-                # Check all tags for matches
-                for tag in symbol.get('tags', []):
-                    if query_lower == tag.lower():
-                        match_score += 12
-                    elif query_lower in tag.lower():
-                        match_score += 3
-                
-                # Check filename tags if they exist
-                for tag in symbol.get('filename_tags', []):
-                    if query_lower == tag.lower():
-                        match_score += 8
-                    elif query_lower in tag.lower():
-                        match_score += 2
-                
-                # Check alt text
-                if query_lower in symbol.get('alt_text', '').lower():
-                    match_score += 2
-                
-                if match_score > 0:
-                    symbol['match_score'] = match_score
-                    symbols.append(symbol)
-            else:
+        next_cursor = None
+        if symbol_search_engine.ready:
+            # Scoring a broad query over the whole corpus takes long enough to stall the event loop.
+            result = await asyncio.to_thread(
+                symbol_search_engine.search, q, category, difficulty, age_group, limit=limit, cursor=cursor
+            )
+            hits = result["hits"]
+            docs = await asyncio.to_thread(_fetch_symbols_by_id, [doc_id for doc_id, _ in hits]) if hits else {}
+            symbols = []
+            for doc_id, score in hits:
+                symbol = docs.get(doc_id)
+                if symbol is None:
+                    continue
+                if q:
+                    symbol['match_score'] = round(score, 3)
                 symbols.append(symbol)
-        
-        # Sort by match score if query provided
-        if q:
-            symbols.sort(key=lambda x: x.get('match_score', 0), reverse=True)
-        
+            total_found = result["total"]
+            next_cursor = result["next_cursor"]
+        else:
+            symbols = await asyncio.to_thread(_search_symbols_firestore, q, category, difficulty, age_group, limit)
+            total_found = len(symbols)
+            symbols = symbols[:limit]
+
         return JSONResponse(content={
-            "symbols": symbols[:limit],
-            "total_found": len(symbols),
+            "symbols": symbols,
+            "total_found": total_found,
+            "next_cursor": next_cursor,
             "query": q,
             "filters": {
                 "category": category,
@@ -21084,61 +21655,66 @@ async def button_symbol_search(
                         seen.add(variation)
                         unique_variations.append(variation)
                 
-                # Try each variation until we find results (prioritize exact match first)
-                image_docs = []
-                for variation in unique_variations:
-                    try:
-                        variation_lower = variation.lower().strip()
-                        if not variation_lower:
-                            continue
+                # Collect candidate images keyed by document id (dedupes across variations)
+                deduped_images: Dict[str, Dict[str, Any]] = {}
+                if aac_image_index.is_ready:
+                    # Served from the in-memory symbol index — no per-request Firestore queries.
+                    index_fields = ["search_terms", "tags"]
+                    if locale_base and locale_base != "en":
+                        index_fields += [f"localized_tags.{locale_base}", f"localized_labels.{locale_base}"]
+                    for rec in aac_image_index.lookup(unique_variations, fields=index_fields, sources={"bravo_images"}):
+                        deduped_images[rec.id] = rec.to_image_dict()
+                else:
+                    # Try each variation until we find results (prioritize exact match first)
+                    image_docs = []
+                    for variation in unique_variations:
+                        try:
+                            variation_lower = variation.lower().strip()
+                            if not variation_lower:
+                                continue
 
-                        # Preferred path: language-friendly array field
-                        variation_query = images_ref.where("search_terms", "array_contains", variation_lower).limit(max(30, limit * 8))
-                        variation_docs = list(variation_query.stream())
-                        for d in variation_docs:
-                            data = d.to_dict() or {}
-                            if data.get("source") == "bravo_images":
-                                image_docs.append(d)
-
-                        # Locale-aware fallback path for migrated data where localized tags/labels exist
-                        # but search_terms may be incomplete/stale.
-                        if locale_base and locale_base != "en":
-                            localized_tags_field = f"localized_tags.{locale_base}"
-                            localized_labels_field = f"localized_labels.{locale_base}"
-
-                            localized_tag_query = images_ref.where("source", "==", "bravo_images").where(
-                                localized_tags_field, "array_contains", variation_lower
-                            ).limit(max(20, limit * 5))
-                            image_docs.extend(list(localized_tag_query.stream()))
-
-                            for label_candidate in [variation.strip(), variation_lower]:
-                                if not label_candidate:
-                                    continue
-                                localized_label_query = images_ref.where("source", "==", "bravo_images").where(
-                                    localized_labels_field, "==", label_candidate
-                                ).limit(max(10, limit * 3))
-                                image_docs.extend(list(localized_label_query.stream()))
-
-                        # Legacy fallback path
-                        if not variation_docs:
-                            legacy_query = images_ref.where("source", "==", "bravo_images").where("tags", "array_contains", variation).limit(max(20, limit * 5))
-                            legacy_docs = list(legacy_query.stream())
-                            image_docs.extend(legacy_docs)
+                            # Preferred path: language-friendly array field
+                            variation_query = images_ref.where("search_terms", "array_contains", variation_lower).limit(max(30, limit * 8))
+                            variation_docs = list(variation_query.stream())
+                            for d in variation_docs:
+                                data = d.to_dict() or {}
+                                if data.get("source") == "bravo_images":
+                                    image_docs.append(d)
+
+                            # Locale-aware fallback path for migrated data where localized tags/labels exist
+                            # but search_terms may be incomplete/stale.
+                            if locale_base and locale_base != "en":
+                                localized_tags_field = f"localized_tags.{locale_base}"
+                                localized_labels_field = f"localized_labels.{locale_base}"
+
+                                localized_tag_query = images_ref.where("source", "==", "bravo_images").where(
+                                    localized_tags_field, "array_contains", variation_lower
+                                ).limit(max(20, limit * 5))
+                                image_docs.extend(list(localized_tag_query.stream()))
+
+                                for label_candidate in [variation.strip(), variation_lower]:
+                                    if not label_candidate:
+                                        continue
+                                    localized_label_query = images_ref.where("source", "==", "bravo_images").where(
+                                        localized_labels_field, "==", label_candidate
+                                    ).limit(max(10, limit * 3))
+                                    image_docs.extend(list(localized_label_query.stream()))
+
+                            # Legacy fallback path
+                            if not variation_docs:
+                                legacy_query = images_ref.where("source", "==", "bravo_images").where("tags", "array_contains", variation).limit(max(20, limit * 5))
+                                legacy_docs = list(legacy_query.stream())
+                                image_docs.extend(legacy_docs)
                         
-                        # Don't stop at first match - collect from all variations for better scoring
-                    except Exception as e:
-                        logging.debug(f"Query failed for variation '{variation}': {e}")
-                        continue
-                # Process all collected docs (dedupe by document id first)
-                deduped_docs = {}
-                for d in image_docs:
-                    deduped_docs[d.id] = d
+                            # Don't stop at first match - collect from all variations for better scoring
+                        except Exception as e:
+                            logging.debug(f"Query failed for variation '{variation}': {e}")
+                            continue
+                    for d in image_docs:
+                        deduped_images[d.id] = d.to_dict() or {}
 
                 weight = 1.0 if i == 0 else 0.8
-                for doc in deduped_docs.values():
-                    image = doc.to_dict()
-                    image_id = doc.id
-                    
+                for image_id, image in deduped_images.items():
                     # Avoid duplicates
                     if not any(s['id'] == image_id for s in matched_symbols):
                         image['id'] = image_id
@@ -22045,58 +22621,68 @@ async def _lookup_images_for_labels(
     if not all_norm:
         return {}
 
-    images_ref = firestore_db.collection("aac_images")
+    # "global" source is included alongside bravo_images — mascot-specific assets (bobby/bonnie/buddy) live there.
+    _ACCEPTED_SOURCES = {"bravo_images", "global"}
+    candidate_docs: Dict[str, dict] = {}
+    indexed_candidates = None
+    if aac_image_index.is_ready:
+        # Resolve from the in-memory symbol index — no per-request Firestore queries.
+        indexed_candidates = aac_image_index.lookup(
+            all_norm,
+            fields=("subconcept", "concept", "search_terms", "tags"),
+            sources=_ACCEPTED_SOURCES,
+        )
+    else:
+        # Index still loading (e.g. right after startup): fall back to direct Firestore queries.
+        images_ref = firestore_db.collection("aac_images")
 
-    def _chunked(seq, n=10):
-        seq = list(seq)
-        for i in range(0, len(seq), n):
-            yield seq[i:i + n]
+        def _chunked(seq, n=10):
+            seq = list(seq)
+            for i in range(0, len(seq), n):
+                yield seq[i:i + n]
 
-    def _stream(q):
-        return list(q.stream())
+        def _stream(q):
+            return list(q.stream())
 
-    # Build parallel queries mirroring batch-search: subconcept/concept (exact), search_terms, tags.
-    # "global" source is queried separately — mascot-specific assets (bobby/bonnie/buddy) live there.
-    _ACCEPTED_SOURCES = {"bravo_images", "global"}
-    queries = []
-    for chunk in _chunked(all_norm, 10):
-        queries.append(("subconcept",        images_ref.where("source", "==", "bravo_images").where("subconcept", "in", chunk).limit(100)))
-        queries.append(("subconcept_global", images_ref.where("source", "==", "global").where("subconcept", "in", chunk).limit(100)))
-        queries.append(("concept",           images_ref.where("source", "==", "bravo_images").where("concept", "in", chunk).limit(100)))
-        queries.append(("concept_global",    images_ref.where("source", "==", "global").where("concept", "in", chunk).limit(100)))
-        queries.append(("search_terms",      images_ref.where("search_terms", "array_contains_any", chunk).limit(300)))
-        queries.append(("tags_legacy",       images_ref.where("source", "==", "bravo_images").where("tags", "array_contains_any", chunk).limit(250)))
-        queries.append(("tags_global",       images_ref.where("source", "==", "global").where("tags", "array_contains_any", chunk).limit(250)))
-
-    # Run in small batches to avoid saturating the shared ThreadPoolExecutor and
-    # blocking unrelated Firestore operations on other in-flight requests.
-    _BATCH = 5
-    streams: List[Any] = []
-    try:
-        asyncio.get_running_loop()
-        for _i in range(0, len(queries), _BATCH):
-            _batch = queries[_i: _i + _BATCH]
-            _results = await asyncio.gather(
-                *[asyncio.to_thread(_stream, q) for _, q in _batch],
-                return_exceptions=True,
-            )
-            streams.extend(_results)
-    except RuntimeError:
-        streams = [_stream(q) for _, q in queries]
+        # Build parallel queries mirroring batch-search: subconcept/concept (exact), search_terms, tags.
+        queries = []
+        for chunk in _chunked(all_norm, 10):
+            queries.append(("subconcept",        images_ref.where("source", "==", "bravo_images").where("subconcept", "in", chunk).limit(100)))
+            queries.append(("subconcept_global", images_ref.where("source", "==", "global").where("subconcept", "in", chunk).limit(100)))
+            queries.append(("concept",           images_ref.where("source", "==", "bravo_images").where("concept", "in", chunk).limit(100)))
+            queries.append(("concept_global",    images_ref.where("source", "==", "global").where("concept", "in", chunk).limit(100)))
+            queries.append(("search_terms",      images_ref.where("search_terms", "array_contains_any", chunk).limit(300)))
+            queries.append(("tags_legacy",       images_ref.where("source", "==", "bravo_images").where("tags", "array_contains_any", chunk).limit(250)))
+            queries.append(("tags_global",       images_ref.where("source", "==", "global").where("tags", "array_contains_any", chunk).limit(250)))
+
+        # Run in small batches to avoid saturating the shared ThreadPoolExecutor and
+        # blocking unrelated Firestore operations on other in-flight requests.
+        _BATCH = 5
+        streams: List[Any] = []
+        try:
+            asyncio.get_running_loop()
+            for _i in range(0, len(queries), _BATCH):
+                _batch = queries[_i: _i + _BATCH]
+                _results = await asyncio.gather(
+                    *[asyncio.to_thread(_stream, q) for _, q in _batch],
+                    return_exceptions=True,
+                )
+                streams.extend(_results)
+        except RuntimeError:
+            streams = [_stream(q) for _, q in queries]
 
-    # Index candidates by doc id.
-    # search_terms query has no source filter — only keep accepted sources in code.
-    candidate_docs: Dict[str, dict] = {}
-    for (qtype, _), result in zip(queries, streams):
-        if isinstance(result, Exception):
-            continue
-        for doc in result:
-            data = doc.to_dict() or {}
-            if not data.get("image_url"):
-                continue
-            if qtype == "search_terms" and data.get("source") not in _ACCEPTED_SOURCES:
+        # Index candidates by doc id.
+        # search_terms query has no source filter — only keep accepted sources in code.
+        for (qtype, _), result in zip(queries, streams):
+            if isinstance(result, Exception):
                 continue
-            candidate_docs[doc.id] = data
+            for doc in result:
+                data = doc.to_dict() or {}
+                if not data.get("image_url"):
+                    continue
+                if qtype == "search_terms" and data.get("source") not in _ACCEPTED_SOURCES:
+                    continue
+                candidate_docs[doc.id] = data
 
     # Load custom images (mascot-specific assets live here)
     custom_candidates: List[dict] = []
@@ -22120,7 +22706,16 @@ async def _lookup_images_for_labels(
             logging.debug(f"_lookup_images_for_labels: custom image load failed: {_ce}")
 
     # Pre-normalize candidate data once so _score doesn't redo it per label.
+    # Indexed records are already normalized when they enter the index.
     processed: List[dict] = []
+    for rec in (indexed_candidates or []):
+        processed.append({
+            "url": rec.url,
+            "sub": rec.sub,
+            "con": rec.con,
+            "all_terms": rec.all_terms,
+            "mascot": rec.mascot,
+        })
     for doc_id, data in candidate_docs.items():
         url = data.get("image_url")
         if not url:
@@ -22568,16 +23163,115 @@ async def _assign_images_to_tap_config(
         return stats
 
 
-@app.post("/api/tap-interface/boards/assign-all-images")
-async def assign_all_board_images(
-    payload: Dict[str, Any],
+# ===================================
+# BACKGROUND BOARD JOBS
+# ===================================
+# Board-generation endpoints run inline by default. With ?async_job=1 or
+# "Prefer: respond-async" they return 202 with a job id instead; the work runs on
+# job_engine and progress (including partial boards) streams from
+# /api/jobs/{job_id}/events.
+
+def _wants_background_job(request: Request) -> bool:
+    if str(request.query_params.get("async_job", "")).strip().lower() in ("1", "true", "yes"):
+        return True
+    return "respond-async" in request.headers.get("prefer", "").lower()
+
+
+async def _submit_board_job(kind: str, payload: Dict[str, Any], current_ids: Dict[str, str]) -> JSONResponse:
+    try:
+        job = await job_engine.submit(kind, current_ids["account_id"], current_ids["aac_user_id"], payload)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    job_id = job["job_id"]
+    return JSONResponse(status_code=202, content={
+        "job_id": job_id,
+        "status": job["status"],
+        "status_url": f"/api/jobs/{job_id}",
+        "events_url": f"/api/jobs/{job_id}/events",
+    })
+
+
+def _board_job_handler(impl, model=None):
+    """Runs an endpoint body as a job; the JSON it would have returned becomes the job result."""
+    async def handler(ctx: JobContext) -> Any:
+        payload = model(**ctx.payload) if model else ctx.payload
+        response = await impl(payload, {"account_id": ctx.account_id, "aac_user_id": ctx.aac_user_id})
+        if isinstance(response, Response):
+            body = json.loads(response.body)
+            if response.status_code >= 400:
+                # An error response fails the job with the same status code and detail.
+                detail = body.get("detail") or body.get("error") if isinstance(body, dict) else None
+                raise HTTPException(status_code=response.status_code, detail=detail or body)
+            return body
+        return response
+    return handler
+
+
+@app.get("/api/jobs")
+async def list_background_jobs(
+    current_ids: Annotated[Dict[str, str], Depends(get_current_account_and_user_ids)],
+    limit: int = 20,
+):
+    """Recent background jobs for the current user (newest first)."""
+    jobs = await job_engine.list_jobs(current_ids["account_id"], current_ids["aac_user_id"], max(1, min(limit, 100)))
+    return JSONResponse(content={"jobs": [public_job(job) for job in jobs]})
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_background_job(
+    job_id: str,
     current_ids: Annotated[Dict[str, str], Depends(get_current_account_and_user_ids)]
+):
+    """Status of a background job; includes the result (or error) once it has finished."""
+    job = await job_engine.get_job(job_id, current_ids["account_id"], current_ids["aac_user_id"])
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JSONResponse(content=public_job(job))
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_background_job_events(
+    job_id: str,
+    request: Request,
+    current_ids: Annotated[Dict[str, str], Depends(get_current_account_and_user_ids)],
+    after: int = 0,
+    last_event_id: Optional[str] = Header(None),
 ):
     """
-    Assign (or re-assign) images to all static pool buttons across all boards.
-    Used by the board builder Reassign Images button.
-    Accepts optional 'mascot' override; falls back to the user's saved setting.
+    Server-sent events for a job: stored events after `after` (or the Last-Event-ID a
+    reconnecting EventSource sends), then live ones. Ends with a `result` event
+    holding the finished job.
     """
+    account_id = current_ids["account_id"]
+    aac_user_id = current_ids["aac_user_id"]
+    if not await job_engine.get_job(job_id, account_id, aac_user_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    if last_event_id and last_event_id.strip().isdigit():
+        after = max(after, int(last_event_id))
+
+    async def events():
+        async for event in job_engine.stream(job_id, after):
+            if await request.is_disconnected():
+                return
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+        job = await job_engine.get_job(job_id, account_id, aac_user_id)
+        if job:
+            yield f"event: result\ndata: {json.dumps(public_job(job), default=str)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+
+
+async def _assign_all_board_images_impl(
+    payload: Dict[str, Any],
+    current_ids: Dict[str, str]
+):
+    """POST /api/tap-interface/boards/assign-all-images; also runs as the "assign_all_images" background job."""
     aac_user_id = current_ids["aac_user_id"]
     account_id  = current_ids["account_id"]
 
@@ -22592,6 +23286,7 @@ async def assign_all_board_images(
             raise HTTPException(status_code=404, detail='Board config not found')
 
         # Run synchronously so the response confirms completion
+        await report_job_progress("assigning", "Assigning images to all boards")
         stats = await _assign_images_to_tap_config(config_data, mascot, account_id, aac_user_id)
 
         return JSONResponse(content={'success': True, 'mascot': mascot, 'debug': stats})
@@ -22602,6 +23297,25 @@ async def assign_all_board_images(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/tap-interface/boards/assign-all-images")
+async def assign_all_board_images(
+    payload: Dict[str, Any],
+    request: Request,
+    current_ids: Annotated[Dict[str, str], Depends(get_current_account_and_user_ids)]
+):
+    """
+    Assign (or re-assign) images to all static pool buttons across all boards.
+    Used by the board builder Reassign Images button.
+    Accepts optional 'mascot' override; falls back to the user's saved setting.
+    """
+    if _wants_background_job(request):
+        return await _submit_board_job("assign_all_images", payload, current_ids)
+    return await _assign_all_board_images_impl(payload, current_ids)
+
+
+job_engine.register("assign_all_images", _board_job_handler(_assign_all_board_images_impl))
+
+
 @app.post("/api/symbols/batch-search")
 async def batch_symbol_search(
     request: Request,
@@ -22818,67 +23532,76 @@ async def batch_symbol_search(
                 if tt:
                     all_exact_terms.add(tt)
 
-        images_ref = firestore_db.collection("aac_images")
         candidate_docs = {}
+        if aac_image_index.is_ready:
+            # Resolve candidates from the in-memory symbol index — no per-request Firestore queries.
+            index_fields = ["search_terms", "subconcept", "concept", "tags"]
+            if locale_base and locale_base != "en":
+                index_fields += [f"localized_labels.{locale_base}", f"localized_tags.{locale_base}"]
+            for rec in aac_image_index.lookup(all_search_terms | all_exact_terms, fields=index_fields, sources={"bravo_images"}):
+                candidate_docs[rec.id] = rec.data
+        else:
+            # Index still loading: fall back to direct Firestore queries.
+            images_ref = firestore_db.collection("aac_images")
 
-        # Build list of queries to run in parallel
-        queries = []
+            # Build list of queries to run in parallel
+            queries = []
         
-        # 1. Grouped query path 1: precomputed normalized search terms
-        for chunk in _chunked(all_search_terms, 10):
-            queries.append(("path1", images_ref.where("search_terms", "array_contains_any", chunk).limit(300)))
+            # 1. Grouped query path 1: precomputed normalized search terms
+            for chunk in _chunked(all_search_terms, 10):
+                queries.append(("path1", images_ref.where("search_terms", "array_contains_any", chunk).limit(300)))
             
-        # 2. Per-item exact term fetches using batch 'in' operator to query concept and subconcept in parallel
-        for chunk in _chunked(all_exact_terms, 10):
-            queries.append(("exact_subconcept", images_ref.where("source", "==", "bravo_images").where("subconcept", "in", chunk).limit(100)))
-            queries.append(("exact_concept", images_ref.where("source", "==", "bravo_images").where("concept", "in", chunk).limit(100)))
+            # 2. Per-item exact term fetches using batch 'in' operator to query concept and subconcept in parallel
+            for chunk in _chunked(all_exact_terms, 10):
+                queries.append(("exact_subconcept", images_ref.where("source", "==", "bravo_images").where("subconcept", "in", chunk).limit(100)))
+                queries.append(("exact_concept", images_ref.where("source", "==", "bravo_images").where("concept", "in", chunk).limit(100)))
+                if locale_base and locale_base != "en":
+                    localized_labels_field = f"localized_labels.{locale_base}"
+                    queries.append(("exact_localized_labels", images_ref.where("source", "==", "bravo_images").where(localized_labels_field, "in", chunk).limit(100)))
+
+            # 3. Grouped query path 2: localized tags fallback
             if locale_base and locale_base != "en":
-                localized_labels_field = f"localized_labels.{locale_base}"
-                queries.append(("exact_localized_labels", images_ref.where("source", "==", "bravo_images").where(localized_labels_field, "in", chunk).limit(100)))
+                localized_tags_field = f"localized_tags.{locale_base}"
+                for chunk in _chunked(all_search_terms, 10):
+                    queries.append(("localized_tags", images_ref.where("source", "==", "bravo_images").where(localized_tags_field, "array_contains_any", chunk).limit(250)))
 
-        # 3. Grouped query path 2: localized tags fallback
-        if locale_base and locale_base != "en":
-            localized_tags_field = f"localized_tags.{locale_base}"
+            # 4. Grouped query path 3: legacy tags fallback
             for chunk in _chunked(all_search_terms, 10):
-                queries.append(("localized_tags", images_ref.where("source", "==", "bravo_images").where(localized_tags_field, "array_contains_any", chunk).limit(250)))
-
-        # 4. Grouped query path 3: legacy tags fallback
-        for chunk in _chunked(all_search_terms, 10):
-            queries.append(("legacy_tags", images_ref.where("source", "==", "bravo_images").where("tags", "array_contains_any", chunk).limit(250)))
+                queries.append(("legacy_tags", images_ref.where("source", "==", "bravo_images").where("tags", "array_contains_any", chunk).limit(250)))
 
-        # Helper to execute query stream block in thread pool
-        def _execute_query_stream(query):
-            return list(query.stream())
+            # Helper to execute query stream block in thread pool
+            def _execute_query_stream(query):
+                return list(query.stream())
 
-        # Execute all queries in parallel
-        try:
-            loop = asyncio.get_running_loop()
-        except RuntimeError:
-            loop = None
+            # Execute all queries in parallel
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
 
-        if loop and loop.is_running():
-            tasks = [asyncio.to_thread(_execute_query_stream, q) for q_type, q in queries]
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-        else:
-            results = [_execute_query_stream(q) for q_type, q in queries]
+            if loop and loop.is_running():
+                tasks = [asyncio.to_thread(_execute_query_stream, q) for q_type, q in queries]
+                results = await asyncio.gather(*tasks, return_exceptions=True)
+            else:
+                results = [_execute_query_stream(q) for q_type, q in queries]
 
-        # Process results
-        for (q_type, q), result in zip(queries, results):
-            if isinstance(result, Exception):
-                logging.warning(f"🔍 BATCH: Query {q_type} failed with error: {result}")
-                continue
-            
-            for doc in result:
-                data = doc.to_dict() or {}
-                if not data.get("image_url"):
+            # Process results
+            for (q_type, q), result in zip(queries, results):
+                if isinstance(result, Exception):
+                    logging.warning(f"🔍 BATCH: Query {q_type} failed with error: {result}")
                     continue
+            
+                for doc in result:
+                    data = doc.to_dict() or {}
+                    if not data.get("image_url"):
+                        continue
                 
-                # Path 1 check: legacy code requires source == "bravo_images"
-                if q_type == "path1":
-                    if data.get("source") == "bravo_images":
+                    # Path 1 check: legacy code requires source == "bravo_images"
+                    if q_type == "path1":
+                        if data.get("source") == "bravo_images":
+                            candidate_docs[doc.id] = data
+                    else:
                         candidate_docs[doc.id] = data
-                else:
-                    candidate_docs[doc.id] = data
 
         def _extract_localized_terms_for_doc(doc_data):
             localized_terms = []
@@ -23093,83 +23816,231 @@ async def batch_symbol_search(
         )
 
 
+LIBRARY_DOWNLOAD_SOURCE = "bravo_images"
+LIBRARY_DOWNLOAD_CHUNK_RECORDS = 500  # records serialized per streamed chunk
+# NDJSON deltas list deleted ids in a header; past this size the full library is sent instead.
+LIBRARY_DELETED_IDS_HEADER_MAX_BYTES = 4096
+
+
+def _flatten_library_search_terms(value) -> List[str]:
+    if isinstance(value, (str, int, float)):
+        text = str(value).strip()
+        return [text] if text else []
+    if isinstance(value, list):
+        output = []
+        for item in value:
+            output.extend(_flatten_library_search_terms(item))
+        return output
+    if isinstance(value, dict):
+        output = []
+        for item in value.values():
+            output.extend(_flatten_library_search_terms(item))
+        return output
+    return []
+
+
+def _library_entry_from_image(image_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Builds the client-side library record (essential fields + flattened search_terms) for one image."""
+    localized_tags = data.get('localized_tags', {})
+    localized_labels = data.get('localized_labels', {})
+    aliases = data.get('aliases', [])
+
+    search_terms = []
+    search_terms.extend(_flatten_library_search_terms(data.get('concept')))
+    search_terms.extend(_flatten_library_search_terms(data.get('subconcept')))
+    search_terms.extend(_flatten_library_search_terms(data.get('tags', [])))
+    search_terms.extend(_flatten_library_search_terms(aliases))
+    search_terms.extend(_flatten_library_search_terms(localized_tags))
+    search_terms.extend(_flatten_library_search_terms(localized_labels))
+
+    search_terms = [str(term).strip().lower() for term in search_terms if str(term).strip()]
+    search_terms = list(dict.fromkeys(search_terms))
+
+    # Only include essential fields to minimize download size
+    return {
+        'id': image_id,
+        'image_url': data.get('image_url'),
+        'concept': data.get('concept'),
+        'subconcept': data.get('subconcept'),
+        'tags': data.get('tags', []),
+        'aliases': aliases,
+        'localized_tags': localized_tags,
+        'localized_labels': localized_labels,
+        'search_terms': search_terms,
+        'source': data.get('source'),
+        'mascot': data.get('mascot'),
+        # Include any other metadata that might be useful for search
+        'category': data.get('category'),
+        'subcategory': data.get('subcategory')
+    }
+
+
+def _negotiate_library_encoding(accept_encoding: str) -> Optional[str]:
+    """Picks br (when the optional brotli package is installed) or gzip from Accept-Encoding."""
+    accepted = {part.split(';')[0].strip().lower() for part in (accept_encoding or '').split(',')}
+    if 'br' in accepted:
+        try:
+            import brotli  # noqa: F401
+            return 'br'
+        except ImportError:
+            pass
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def _encode_library_stream(chunks, encoding: Optional[str]):
+    """Wraps a text-chunk iterator with incremental gzip/brotli compression."""
+    if encoding == 'gzip':
+        import zlib
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+        for chunk in chunks:
+            data = compressor.compress(chunk.encode('utf-8'))
+            if data:
+                yield data
+        yield compressor.flush()
+    elif encoding == 'br':
+        import brotli
+        compressor = brotli.Compressor(quality=5)
+        for chunk in chunks:
+            data = compressor.process(chunk.encode('utf-8'))
+            if data:
+                yield data
+        yield compressor.finish()
+    else:
+        for chunk in chunks:
+            yield chunk.encode('utf-8')
+
+
+def _iter_library_entries(since_version: int):
+    """
+    Yields library records. Served from the in-memory aac_images index when it is
+    ready; otherwise streams Firestore directly (this generator runs in a worker thread).
+    """
+    if aac_image_index.is_ready:
+        for rec in aac_image_index.records(sources={LIBRARY_DOWNLOAD_SOURCE}, since_version=since_version):
+            yield _library_entry_from_image(rec.id, rec.data)
+        return
+    query = firestore_db.collection('aac_images').where('source', '==', LIBRARY_DOWNLOAD_SOURCE)
+    for doc in query.stream():
+        yield _library_entry_from_image(doc.id, doc.to_dict() or {})
+
+
+def _library_body_chunks(output_format: str, since_version: int, version: int, deleted_ids: Optional[List[str]]):
+    """Serializes the library incrementally, LIBRARY_DOWNLOAD_CHUNK_RECORDS records at a time."""
+    count = 0
+    buffer: List[str] = []
+    if output_format == 'ndjson':
+        for entry in _iter_library_entries(since_version):
+            buffer.append(json.dumps(entry, ensure_ascii=False, separators=(',', ':')))
+            count += 1
+            if len(buffer) >= LIBRARY_DOWNLOAD_CHUNK_RECORDS:
+                yield '\n'.join(buffer) + '\n'
+                buffer = []
+        if buffer:
+            yield '\n'.join(buffer) + '\n'
+    else:
+        # Chunked JSON keeps the original {"images": [...], "count": N, ...} response shape.
+        yield '{"images":['
+        for entry in _iter_library_entries(since_version):
+            buffer.append(json.dumps(entry, ensure_ascii=False, separators=(',', ':')))
+            count += 1
+            if len(buffer) >= LIBRARY_DOWNLOAD_CHUNK_RECORDS:
+                yield ('' if count == len(buffer) else ',') + ','.join(buffer)
+                buffer = []
+        if buffer:
+            yield ('' if count == len(buffer) else ',') + ','.join(buffer)
+        trailer = {
+            "count": count,
+            "timestamp": dt.now().isoformat(),
+            "version": str(version) if version else None,
+            "delta": bool(since_version),
+        }
+        if since_version:
+            trailer["deleted_ids"] = deleted_ids or []
+        yield '],' + json.dumps(trailer, separators=(',', ':'))[1:]
+    logging.info(f"📚 LIBRARY DOWNLOAD: Streamed {count} images (format={output_format}, since={since_version or 'full'})")
+
+
 @app.get("/api/symbols/library-download")
 async def download_image_library(
-    current_ids: Annotated[Dict[str, str], Depends(get_current_account_and_user_ids)]
+    request: Request,
+    current_ids: Annotated[Dict[str, str], Depends(get_current_account_and_user_ids)],
+    format: str = "json",
+    since: Optional[str] = None,
 ):
     """
     Download entire AAC image library for local caching.
     Returns all aac_images with source="bravo_images" for client-side search.
-    This enables instant local tag-based search without network calls.
-    """
-    try:
-        logging.info("📚 LIBRARY DOWNLOAD: Starting full library download")
-        
-        # Query all bravo images
-        images_ref = firestore_db.collection('aac_images')
-        query = images_ref.where('source', '==', 'bravo_images')
-        docs = query.stream()
-
-        def _flatten_search_terms(value):
-            if isinstance(value, (str, int, float)):
-                text = str(value).strip()
-                return [text] if text else []
-            if isinstance(value, list):
-                output = []
-                for item in value:
-                    output.extend(_flatten_search_terms(item))
-                return output
-            if isinstance(value, dict):
-                output = []
-                for item in value.values():
-                    output.extend(_flatten_search_terms(item))
-                return output
-            return []
-        
-        library = []
-        for doc in docs:
-            data = doc.to_dict()
-            localized_tags = data.get('localized_tags', {})
-            localized_labels = data.get('localized_labels', {})
-            aliases = data.get('aliases', [])
-
-            search_terms = []
-            search_terms.extend(_flatten_search_terms(data.get('concept')))
-            search_terms.extend(_flatten_search_terms(data.get('subconcept')))
-            search_terms.extend(_flatten_search_terms(data.get('tags', [])))
-            search_terms.extend(_flatten_search_terms(aliases))
-            search_terms.extend(_flatten_search_terms(localized_tags))
-            search_terms.extend(_flatten_search_terms(localized_labels))
-
-            search_terms = [str(term).strip().lower() for term in search_terms if str(term).strip()]
-            search_terms = list(dict.fromkeys(search_terms))
-
-            # Only include essential fields to minimize download size
-            library.append({
-                'id': doc.id,
-                'image_url': data.get('image_url'),
-                'concept': data.get('concept'),
-                'subconcept': data.get('subconcept'),
-                'tags': data.get('tags', []),
-                'aliases': aliases,
-                'localized_tags': localized_tags,
-                'localized_labels': localized_labels,
-                'search_terms': search_terms,
-                'source': data.get('source'),
-                'mascot': data.get('mascot'),
-                # Include any other metadata that might be useful for search
-                'category': data.get('category'),
-                'subcategory': data.get('subcategory')
-            })
-        
-        logging.info(f"📚 LIBRARY DOWNLOAD: Sending {len(library)} images to client")
-        
-        return JSONResponse(content={
-            "images": library,
-            "count": len(library),
-            "timestamp": datetime.now().isoformat()
-        })
-        
+    This enables instant local tag-based search without network calls.
+
+    The body is streamed (chunked JSON by default, or NDJSON with format=ndjson) and
+    compressed with br/gzip when the client accepts it. Responses carry an ETag built
+    from the library version and the content encoding, so clients can revalidate with
+    If-None-Match (304), and since=<version> returns only records changed after that
+    version plus deleted ids. NDJSON responses say whether they are a delta in
+    X-Library-Delta; a delta whose deleted ids would not fit in X-Library-Deleted-Ids
+    is answered with the full library (X-Library-Delta: 0) for the client to resync.
+    """
+    try:
+        output_format = 'ndjson' if str(format).lower() == 'ndjson' else 'json'
+        try:
+            since_version = int(since) if since else 0
+        except ValueError:
+            raise HTTPException(status_code=400, detail="since must be a library version returned by a previous download")
+
+        version = 0
+        deleted_ids: Optional[List[str]] = None
+        if aac_image_index.is_ready:
+            version = aac_image_index.library_version(sources={LIBRARY_DOWNLOAD_SOURCE})
+            if since_version:
+                deleted_ids = aac_image_index.deleted_since(since_version)
+                if deleted_ids is None:
+                    # Version predates what this instance can diff against: send the full library.
+                    since_version = 0
+                else:
+                    # Images that moved out of the library since the client's version count as deletions.
+                    deleted_ids += [
+                        rec.id for rec in aac_image_index.records(since_version=since_version)
+                        if rec.source != LIBRARY_DOWNLOAD_SOURCE
+                    ]
+        else:
+            # No version information without the index; always serve the full library.
+            since_version = 0
+
+        deleted_ids_header = None
+        if output_format == 'ndjson' and since_version:
+            deleted_ids_header = ','.join(deleted_ids or [])
+            if len(deleted_ids_header) > LIBRARY_DELETED_IDS_HEADER_MAX_BYTES:
+                logging.info(f"📚 LIBRARY DOWNLOAD: {len(deleted_ids)} deletions since {since_version}; sending the full library")
+                since_version, deleted_ids, deleted_ids_header = 0, None, None
+
+        # Each encoding is a different body, so it is part of the ETag.
+        encoding = _negotiate_library_encoding(request.headers.get('accept-encoding', ''))
+        etag = f'"lib-{version}-{output_format}-{since_version}-{encoding or "identity"}"' if version else None
+        headers = {"Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"}
+        if etag and etag in [t.strip() for t in request.headers.get('if-none-match', '').split(',')]:
+            return Response(status_code=304, headers={**headers, "ETag": etag})
+
+        if etag:
+            headers["ETag"] = etag
+            headers["X-Library-Version"] = str(version)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        if output_format == 'ndjson':
+            headers["X-Library-Delta"] = "1" if since_version else "0"
+        if deleted_ids_header is not None:
+            headers["X-Library-Deleted-Ids"] = deleted_ids_header
+
+        logging.info(f"📚 LIBRARY DOWNLOAD: Starting library stream (version={version or 'unknown'}, encoding={encoding or 'identity'})")
+        # StreamingResponse iterates a sync generator in Starlette's threadpool, so Firestore
+        # reads, serialization and compression all stay off the event loop.
+        body = _encode_library_stream(_library_body_chunks(output_format, since_version, version, deleted_ids), encoding)
+        media_type = "application/x-ndjson" if output_format == 'ndjson' else "application/json"
+        return StreamingResponse(body, media_type=media_type, headers=headers)
+
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error downloading image library: {e}")
         return JSONResponse(
@@ -23608,11 +24479,16 @@ async def scan_missing_images(
         scanned = []
         missing_count = 0
 
+        # Terms already cached are read in one round trip (a cached miss was logged when it was searched)
+        sorted_terms = sorted(list(terms))
+        params_by_term = {term: image_search_cache.params(term, "", "", limit_per_term) for term in sorted_terms}
+        cached_results = await image_search_cache.get_many(params_by_term.values())
+
         # Call the public image search for each term to let server-side logger run
-        for term in sorted(list(terms)):
+        for term in sorted_terms:
             try:
                 # Call the existing public search function which includes logging when 0 results
-                result = await public_bravo_images_search(tag=term, limit=limit_per_term)
+                result = cached_results.get(params_by_term[term]) or await public_bravo_images_search(tag=term, limit=limit_per_term)
                 total_found = result.get("total_found", 0)
                 scanned.append({"term": term, "found": total_found})
                 if total_found == 0:
@@ -24821,7 +25697,6 @@ def compose_legacy_buttons_from_boards_menu(config_data: Dict[str, Any]) -> List
 
 # --- Helper Functions ---
 TAP_CONFIG_DOC_SOFT_LIMIT_BYTES = 900_000
-TAP_CONFIG_BOARDS_CHUNK_TARGET_BYTES = 300_000
 
 
 def _tap_config_doc_ref(account_id: str, aac_user_id: str):
@@ -24849,31 +25724,8 @@ def _estimate_json_size_bytes(value: Any) -> int:
         return len(str(value).encode("utf-8"))
 
 
-def _split_boards_into_chunks(boards: List[Dict[str, Any]], target_bytes: int = TAP_CONFIG_BOARDS_CHUNK_TARGET_BYTES) -> List[List[Dict[str, Any]]]:
-    if not boards:
-        return []
-
-    chunks: List[List[Dict[str, Any]]] = []
-    current_chunk: List[Dict[str, Any]] = []
-    current_size = 2  # []
-
-    for board in boards:
-        board_size = _estimate_json_size_bytes(board) + 1
-        if current_chunk and (current_size + board_size) > target_bytes:
-            chunks.append(current_chunk)
-            current_chunk = [board]
-            current_size = 2 + board_size
-        else:
-            current_chunk.append(board)
-            current_size += board_size
-
-    if current_chunk:
-        chunks.append(current_chunk)
-
-    return chunks
-
-
 async def _load_chunked_tap_boards(doc_ref) -> List[Dict[str, Any]]:
+    """Read boards from the pre-per-board chunked layout (boards_chunks subcollection)."""
     try:
         chunks_collection = doc_ref.collection("boards_chunks")
         chunk_docs = await asyncio.to_thread(lambda: list(chunks_collection.stream()))
@@ -24896,56 +25748,47 @@ async def _load_chunked_tap_boards(doc_ref) -> List[Dict[str, Any]]:
 
 async def _clear_chunked_tap_boards(doc_ref) -> None:
     try:
-        chunks_collection = doc_ref.collection("boards_chunks")
-        chunk_docs = await asyncio.to_thread(lambda: list(chunks_collection.stream()))
-        for chunk_doc in chunk_docs:
-            await asyncio.to_thread(chunk_doc.reference.delete)
+        await delete_collection(firestore_db, doc_ref.collection("boards_chunks"), label="boards_chunks")
     except Exception as e:
         logging.warning(f"Could not clear chunked tap boards: {e}")
 
 
-async def _save_chunked_tap_boards(doc_ref, boards: List[Dict[str, Any]]) -> int:
-    chunks = _split_boards_into_chunks(boards)
-    for idx, chunk in enumerate(chunks):
-        chunk_ref = doc_ref.collection("boards_chunks").document(f"chunk_{idx:04d}")
-        await asyncio.to_thread(
-            chunk_ref.set,
-            {
-                "index": idx,
-                "boards": chunk,
-                "updated_at": dt.now().isoformat(),
-            },
-        )
-
-    # Remove stale chunk documents from previous larger saves.
-    existing_docs = await asyncio.to_thread(lambda: list(doc_ref.collection("boards_chunks").stream()))
-    valid_ids = {f"chunk_{i:04d}" for i in range(len(chunks))}
-    for existing in existing_docs:
-        if existing.id not in valid_ids:
-            await asyncio.to_thread(existing.reference.delete)
-
-    return len(chunks)
+async def _get_tap_config_snapshots(account_id: str, aac_user_id: str) -> Tuple[Any, Any, Any]:
+    """Fetch the combined config, boards manifest and menu docs in one batched read."""
+    refs = [
+        _tap_config_doc_ref(account_id, aac_user_id),
+        _tap_boards_doc_ref(account_id, aac_user_id),
+        _tap_menu_doc_ref(account_id, aac_user_id),
+    ]
+    snapshots = await asyncio.to_thread(lambda: list(firestore_db.get_all(refs)))
+    by_path = {snap.reference.path: snap for snap in snapshots}
+    return tuple(by_path.get(ref.path) for ref in refs)
 
 
-async def _load_split_tap_docs(account_id: str, aac_user_id: str) -> Optional[Dict[str, Any]]:
+async def _load_split_tap_docs(account_id: str, aac_user_id: str, boards_doc=None, menu_doc=None) -> Optional[Dict[str, Any]]:
     """Load split tap config documents (boards/menu) and return merged sections."""
     try:
         boards_ref = _tap_boards_doc_ref(account_id, aac_user_id)
-        menu_ref = _tap_menu_doc_ref(account_id, aac_user_id)
-
-        boards_doc = await asyncio.to_thread(boards_ref.get)
-        menu_doc = await asyncio.to_thread(menu_ref.get)
-        if not boards_doc.exists and not menu_doc.exists:
+        if boards_doc is None or menu_doc is None:
+            _, boards_doc, menu_doc = await _get_tap_config_snapshots(account_id, aac_user_id)
+        boards_exists = boards_doc is not None and boards_doc.exists
+        menu_exists = menu_doc is not None and menu_doc.exists
+        if not boards_exists and not menu_exists:
             return None
 
         merged: Dict[str, Any] = {}
 
-        if boards_doc.exists:
+        if boards_exists:
             boards_data = boards_doc.to_dict() or {}
-            if str(boards_data.get('boards_storage') or '').lower() == 'chunked':
-                merged['boards'] = await _load_chunked_tap_boards(boards_ref)
-            elif isinstance(boards_data.get('boards'), list):
-                merged['boards'] = [b for b in boards_data.get('boards', []) if isinstance(b, dict)]
+            storage = str(boards_data.get('boards_storage') or '').lower()
+            if tap_board_store.is_per_item_manifest(boards_data):
+                merged['boards'] = await tap_board_store.load_boards(firestore_db, boards_ref, boards_data, (account_id, aac_user_id))
+            else:
+                tap_board_store.mark_layout((account_id, aac_user_id), per_item=False)
+                if storage == 'chunked':
+                    merged['boards'] = await _load_chunked_tap_boards(boards_ref)
+                elif isinstance(boards_data.get('boards'), list):
+                    merged['boards'] = [b for b in boards_data.get('boards', []) if isinstance(b, dict)]
 
             if isinstance(boards_data.get('board_settings'), dict):
                 merged['board_settings'] = dict(boards_data['board_settings'])
@@ -24958,7 +25801,7 @@ async def _load_split_tap_docs(account_id: str, aac_user_id: str) -> Optional[Di
             if boards_data.get('created_at'):
                 merged['created_at'] = boards_data.get('created_at')
 
-        if menu_doc.exists:
+        if menu_exists:
             menu_data = menu_doc.to_dict() or {}
             if isinstance(menu_data.get('boards_menu'), list):
                 merged['boards_menu'] = dedupe_boards_menu_tree(menu_data.get('boards_menu'))
@@ -24977,7 +25820,7 @@ async def _load_split_tap_docs(account_id: str, aac_user_id: str) -> Optional[Di
 
 
 async def _save_split_tap_docs(account_id: str, aac_user_id: str, config_data: Dict[str, Any]) -> bool:
-    """Dual-write tap boards/menu into separate docs for phase-1 migration."""
+    """Write boards (one document each, unchanged boards skipped) and the menu doc."""
     try:
         now_iso = dt.now().isoformat()
 
@@ -24989,27 +25832,8 @@ async def _save_split_tap_docs(account_id: str, aac_user_id: str, config_data: D
         boards_schema_version = int(config_data.get('boards_schema_version') or 1)
         created_at = config_data.get('created_at') or now_iso
 
-        boards_payload = {
-            'board_settings': board_settings,
-            'boards_schema_version': boards_schema_version,
-            'updated_at': now_iso,
-            'created_at': created_at,
-        }
-
-        estimated_boards_size = _estimate_json_size_bytes({'boards': boards})
-        if estimated_boards_size <= TAP_CONFIG_DOC_SOFT_LIMIT_BYTES:
-            boards_payload['boards'] = boards
-            boards_payload.pop('boards_storage', None)
-            boards_payload.pop('boards_chunk_count', None)
-            boards_payload.pop('boards_count', None)
-            await asyncio.to_thread(boards_ref.set, boards_payload)
-            await _clear_chunked_tap_boards(boards_ref)
-        else:
-            chunk_count = await _save_chunked_tap_boards(boards_ref, boards)
-            boards_payload['boards_storage'] = 'chunked'
-            boards_payload['boards_chunk_count'] = chunk_count
-            boards_payload['boards_count'] = len(boards)
-            await asyncio.to_thread(boards_ref.set, boards_payload)
+        previous_manifest_doc = await asyncio.to_thread(boards_ref.get)
+        previous_manifest = (previous_manifest_doc.to_dict() or {}) if previous_manifest_doc.exists else None
 
         boards_menu = config_data.get('boards_menu') if isinstance(config_data.get('boards_menu'), list) else []
         menu_payload = {
@@ -25019,11 +25843,31 @@ async def _save_split_tap_docs(account_id: str, aac_user_id: str, config_data: D
             'updated_at': now_iso,
             'created_at': created_at,
         }
-        await asyncio.to_thread(menu_ref.set, menu_payload)
+        save_result, _ = await asyncio.gather(
+            tap_board_store.save_all(
+                firestore_db,
+                boards_ref,
+                [b for b in boards if isinstance(b, dict)],
+                {
+                    'board_settings': board_settings,
+                    'boards_schema_version': boards_schema_version,
+                    'updated_at': now_iso,
+                    'created_at': created_at,
+                },
+                previous_manifest,
+                (account_id, aac_user_id),
+            ),
+            asyncio.to_thread(menu_ref.set, menu_payload),
+        )
+        logging.debug(
+            f"Tap boards saved for {account_id}/{aac_user_id}: {save_result['written']} written, "
+            f"{save_result['deleted']} deleted, {save_result['unchanged']} unchanged"
+        )
 
         return True
     except Exception as e:
         logging.error(f"Error saving split tap config docs: {e}")
+        tap_board_store.invalidate((account_id, aac_user_id))
         return False
 
 
@@ -25036,16 +25880,20 @@ async def load_tap_nav_config(account_id: str, aac_user_id: str) -> Optional[Dic
     try:
         # Always load the single user configuration
         doc_ref = _tap_config_doc_ref(account_id, aac_user_id)
-        doc = await asyncio.to_thread(doc_ref.get)
+        doc, boards_doc, menu_doc = await _get_tap_config_snapshots(account_id, aac_user_id)
 
-        split_data = await _load_split_tap_docs(account_id, aac_user_id)
+        split_data = await _load_split_tap_docs(account_id, aac_user_id, boards_doc=boards_doc, menu_doc=menu_doc)
 
-        if doc.exists:
+        if doc is not None and doc.exists:
             config_data = doc.to_dict() or {}
-            if str(config_data.get('boards_storage') or '').lower() == 'chunked':
+            storage = str(config_data.get('boards_storage') or '').lower()
+            if storage == 'chunked' and not (isinstance(split_data, dict) and isinstance(split_data.get('boards'), list)):
                 config_data['boards'] = await _load_chunked_tap_boards(doc_ref)
             elif not isinstance(config_data.get('boards'), list):
                 config_data['boards'] = []
+            config_data.pop('boards_storage', None)
+            config_data.pop('boards_chunk_count', None)
+            config_data.pop('boards_count', None)
 
             # Phase 1: prefer split docs for boards/menu/settings when present.
             if isinstance(split_data, dict):
@@ -25088,17 +25936,15 @@ async def save_tap_nav_config(account_id: str, aac_user_id: str, config_data: Di
         return False
     
     try:
-        # Phase 1 migration strategy:
-        # - Split docs (boards_config + menu_config) are primary.
-        # - Legacy combined config doc is only mirrored if it already exists,
-        #   so deleting it does not cause recreation.
+        # Split docs (boards_config manifest + per-board docs + menu_config) are primary.
+        # The legacy combined config doc is only mirrored if it already exists, so
+        # deleting it does not cause recreation; it no longer carries boards.
         working_config = copy.deepcopy(config_data) if isinstance(config_data, dict) else {}
         working_config['updated_at'] = dt.now().isoformat()
         if 'created_at' not in working_config:
             working_config['created_at'] = working_config['updated_at']
 
         doc_ref = _tap_config_doc_ref(account_id, aac_user_id)
-        boards = working_config.get('boards') if isinstance(working_config.get('boards'), list) else []
 
         split_saved = await _save_split_tap_docs(account_id, aac_user_id, working_config)
         if not split_saved:
@@ -25108,32 +25954,72 @@ async def save_tap_nav_config(account_id: str, aac_user_id: str, config_data: Di
         if not legacy_doc.exists:
             return True
 
-        estimated_size = _estimate_json_size_bytes(working_config)
-        combined_saved = False
-        if estimated_size <= TAP_CONFIG_DOC_SOFT_LIMIT_BYTES:
-            working_config.pop('boards_storage', None)
-            working_config.pop('boards_chunk_count', None)
-            working_config.pop('boards_count', None)
-            await asyncio.to_thread(doc_ref.set, working_config)
+        legacy_storage = str((legacy_doc.to_dict() or {}).get('boards_storage') or '').lower()
+        base_config = {k: v for k, v in working_config.items() if k not in ('boards', 'boards_chunk_count', 'boards_count')}
+        base_config['boards_storage'] = PER_BOARD_STORAGE
+        await asyncio.to_thread(doc_ref.set, base_config)
+        if legacy_storage == 'chunked':
             await _clear_chunked_tap_boards(doc_ref)
-            combined_saved = True
-        else:
-            # Firestore has a strict per-document limit; store large boards list in chunked sub-documents.
-            base_config = copy.deepcopy(working_config)
-            base_config.pop('boards', None)
-            chunk_count = await _save_chunked_tap_boards(doc_ref, boards)
-            base_config['boards_storage'] = 'chunked'
-            base_config['boards_chunk_count'] = chunk_count
-            base_config['boards_count'] = len(boards)
-            await asyncio.to_thread(doc_ref.set, base_config)
-            combined_saved = True
-
-        return combined_saved
+        return True
     except Exception as e:
         logging.error(f"Error saving tap navigation config: {e}")
         return False
 
 
+async def save_tap_board_change(
+    account_id: str,
+    aac_user_id: str,
+    config_data: Dict[str, Any],
+    board_id: str,
+    deleted: bool = False,
+    settings_changed: bool = False,
+    menu_changed: bool = False,
+    full_save: bool = False,
+) -> bool:
+    """
+    Persist a change to a single board: only that board's document, its manifest entry
+    and (when flagged) board_settings / the menu doc are written. Falls back to a full
+    save_tap_nav_config when the user's boards are not in per-board storage yet or the
+    caller also changed other boards (full_save).
+    """
+    if not firestore_db:
+        return False
+    user_key = (account_id, aac_user_id)
+    if full_save or not tap_board_store.has_per_board_layout(user_key):
+        return await save_tap_nav_config(account_id, aac_user_id, config_data)
+
+    try:
+        boards_ref = _tap_boards_doc_ref(account_id, aac_user_id)
+        board_settings = config_data.get('board_settings') if isinstance(config_data.get('board_settings'), dict) else {}
+        manifest_updates = {'board_settings': board_settings} if settings_changed else None
+
+        writes = []
+        if deleted:
+            writes.append(tap_board_store.delete_board(firestore_db, boards_ref, board_id, user_key, manifest_updates=manifest_updates))
+        else:
+            boards = config_data.get('boards') if isinstance(config_data.get('boards'), list) else []
+            board = next((b for b in boards if isinstance(b, dict) and str(b.get('id') or '') == board_id), None)
+            if board is None:
+                raise ValueError(f"Board {board_id} not found in config")
+            writes.append(tap_board_store.save_board(firestore_db, boards_ref, board, user_key, manifest_updates=manifest_updates))
+
+        if menu_changed or settings_changed:
+            boards_menu = config_data.get('boards_menu') if isinstance(config_data.get('boards_menu'), list) else []
+            menu_updates: Dict[str, Any] = {'updated_at': dt.now().isoformat()}
+            if menu_changed:
+                menu_updates['boards_menu'] = dedupe_boards_menu_tree(boards_menu)
+            if settings_changed:
+                menu_updates['board_settings'] = board_settings
+            writes.append(asyncio.to_thread(_tap_menu_doc_ref(account_id, aac_user_id).set, menu_updates, merge=True))
+
+        await asyncio.gather(*writes)
+        return True
+    except Exception as e:
+        logging.error(f"Error saving tap board {board_id} for {account_id}/{aac_user_id}: {e}")
+        tap_board_store.invalidate(user_key)
+        return False
+
+
 def normalize_compose_tap_config(config_data: Optional[Dict]) -> Tuple[Optional[Dict], bool]:
     if not isinstance(config_data, dict):
         return config_data, False
@@ -27222,8 +28108,8 @@ async def create_tap_board(
         if not config_data:
             config_data = create_default_tap_config(account_id, aac_user_id, use_hybrid_pages=use_hybrid_pages)
 
-        config_data, _ = normalize_compose_tap_config(config_data)
-        config_data, _ = ensure_tap_boards_structure(config_data, use_hybrid_pages=use_hybrid_pages)
+        config_data, was_normalized = normalize_compose_tap_config(config_data)
+        config_data, boards_changed = ensure_tap_boards_structure(config_data, use_hybrid_pages=use_hybrid_pages)
 
         boards = config_data.get('boards') if isinstance(config_data.get('boards'), list) else []
         existing_ids = {
@@ -27254,7 +28140,11 @@ async def create_tap_board(
         config_data['board_settings'] = board_settings
         config_data['updated_at'] = dt.now().isoformat()
 
-        success = await save_tap_nav_config(account_id, aac_user_id, config_data)
+        success = await save_tap_board_change(
+            account_id, aac_user_id, config_data, board_id,
+            settings_changed=bool(payload.set_as_home),
+            full_save=was_normalized or boards_changed,
+        )
         if not success:
             raise HTTPException(status_code=500, detail='Failed to create board')
 
@@ -27283,8 +28173,8 @@ async def update_tap_board(
         if not config_data:
             raise HTTPException(status_code=404, detail='Board config not found')
 
-        config_data, _ = normalize_compose_tap_config(config_data)
-        config_data, _ = ensure_tap_boards_structure(config_data, use_hybrid_pages=use_hybrid_pages)
+        config_data, was_normalized = normalize_compose_tap_config(config_data)
+        config_data, boards_changed = ensure_tap_boards_structure(config_data, use_hybrid_pages=use_hybrid_pages)
 
         boards = config_data.get('boards') if isinstance(config_data.get('boards'), list) else []
         board_index = next(
@@ -27316,7 +28206,11 @@ async def update_tap_board(
         config_data['board_settings'] = board_settings
         config_data['updated_at'] = dt.now().isoformat()
 
-        success = await save_tap_nav_config(account_id, aac_user_id, config_data)
+        success = await save_tap_board_change(
+            account_id, aac_user_id, config_data, board_id,
+            settings_changed=bool(payload.set_as_home),
+            full_save=was_normalized or boards_changed,
+        )
         if not success:
             raise HTTPException(status_code=500, detail='Failed to update board')
 
@@ -27367,7 +28261,7 @@ async def assign_board_button_images(
         board['buttons'] = list(btn_by_id.values())
         config_data['updated_at'] = dt.now().isoformat()
 
-        success = await save_tap_nav_config(account_id, aac_user_id, config_data)
+        success = await save_tap_board_change(account_id, aac_user_id, config_data, board_id)
         if not success:
             raise HTTPException(status_code=500, detail='Failed to save image assignments')
 
@@ -27396,8 +28290,8 @@ async def delete_tap_board(
         if not config_data:
             raise HTTPException(status_code=404, detail='Board config not found')
 
-        config_data, _ = normalize_compose_tap_config(config_data)
-        config_data, _ = ensure_tap_boards_structure(config_data, use_hybrid_pages=use_hybrid_pages)
+        config_data, was_normalized = normalize_compose_tap_config(config_data)
+        config_data, boards_changed = ensure_tap_boards_structure(config_data, use_hybrid_pages=use_hybrid_pages)
 
         boards = config_data.get('boards') if isinstance(config_data.get('boards'), list) else []
         board_index = next(
@@ -27419,11 +28313,18 @@ async def delete_tap_board(
         config_data['boards'] = boards
 
         existing_menu = config_data.get('boards_menu')
+        menu_changed = False
         if isinstance(existing_menu, list):
             config_data['boards_menu'] = _clear_board_references_in_menu(existing_menu, board_id)
+            menu_changed = config_data['boards_menu'] != existing_menu
 
         config_data['updated_at'] = dt.now().isoformat()
-        success = await save_tap_nav_config(account_id, aac_user_id, config_data)
+        success = await save_tap_board_change(
+            account_id, aac_user_id, config_data, board_id,
+            deleted=True,
+            menu_changed=menu_changed,
+            full_save=was_normalized or boards_changed,
+        )
         if not success:
             raise HTTPException(status_code=500, detail='Failed to delete board')
 
@@ -27437,16 +28338,11 @@ async def delete_tap_board(
 # Note: Single configuration per user - no need for list, activate, or delete endpoints
 
 
-@app.post("/api/tap-interface/boards-convert-ai-to-static")
-async def convert_ai_boards_to_static(
+async def _convert_ai_boards_to_static_impl(
     payload: ConvertAIBoardsToStaticRequest,
-    current_ids: Annotated[Dict[str, str], Depends(get_current_account_and_user_ids)]
+    current_ids: Dict[str, str]
 ):
-    """
-    Convert AI boards to static boards by generating options with the LLM and auto-fetching images.
-    The original AI board is preserved unchanged; a new static board is created with a derived ID.
-    Menu items that referenced the original AI board are updated to point to the new static board.
-    """
+    """POST /api/tap-interface/boards-convert-ai-to-static; also runs as the "convert_ai_boards_to_static" background job."""
     aac_user_id = current_ids["aac_user_id"]
     account_id = current_ids["account_id"]
 
@@ -27643,6 +28539,7 @@ async def convert_ai_boards_to_static(
                 original_to_new_board_id[board_id] = new_board_id
                 converted_label_to_new_id[board_label.strip().lower()] = new_board_id
                 results.append({"board_id": board_id, "new_board_id": new_board_id, "board_label": board_label, "success": True, "options_count": len(buttons), "error": None})
+                await report_job_progress("board", f"Converted {board_label}", board=new_static_board)
 
             except HTTPException:
                 raise
@@ -27685,6 +28582,7 @@ async def convert_ai_boards_to_static(
 
         config_data['updated_at'] = dt.now().isoformat()
 
+        await report_job_progress("saving", "Saving boards")
         success = await save_tap_nav_config(account_id, aac_user_id, config_data)
         if not success:
             raise HTTPException(status_code=500, detail="Failed to save updated config")
@@ -27698,15 +28596,30 @@ async def convert_ai_boards_to_static(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/tap-interface/create-ai-target-board")
-async def create_ai_target_board(
-    payload: CreateAITargetBoardRequest,
+@app.post("/api/tap-interface/boards-convert-ai-to-static")
+async def convert_ai_boards_to_static(
+    payload: ConvertAIBoardsToStaticRequest,
+    request: Request,
     current_ids: Annotated[Dict[str, str], Depends(get_current_account_and_user_ids)]
 ):
     """
-    Generate AI options for a button label and create a new static board.
-    Returns the new board's ID and label for use as a Target Board.
+    Convert AI boards to static boards by generating options with the LLM and auto-fetching images.
+    The original AI board is preserved unchanged; a new static board is created with a derived ID.
+    Menu items that referenced the original AI board are updated to point to the new static board.
     """
+    if _wants_background_job(request):
+        return await _submit_board_job("convert_ai_boards_to_static", payload.model_dump(), current_ids)
+    return await _convert_ai_boards_to_static_impl(payload, current_ids)
+
+
+job_engine.register("convert_ai_boards_to_static", _board_job_handler(_convert_ai_boards_to_static_impl, ConvertAIBoardsToStaticRequest))
+
+
+async def _create_ai_target_board_impl(
+    payload: CreateAITargetBoardRequest,
+    current_ids: Dict[str, str]
+):
+    """POST /api/tap-interface/create-ai-target-board; also runs as the "create_ai_target_board" background job."""
     aac_user_id = current_ids["aac_user_id"]
     account_id = current_ids["account_id"]
 
@@ -27855,6 +28768,7 @@ async def create_ai_target_board(
                 "button_type": "static",
             })
 
+        await report_job_progress("options", f"Generated {len(buttons)} options")
         config_data = await load_tap_nav_config(account_id, aac_user_id)
         if not config_data:
             raise HTTPException(status_code=404, detail="Board config not found")
@@ -27885,6 +28799,7 @@ async def create_ai_target_board(
         config_data['boards'] = boards
         config_data['updated_at'] = dt.now().isoformat()
 
+        await report_job_progress("board", f"Built {label}", board=new_board)
         success = await save_tap_nav_config(account_id, aac_user_id, config_data)
         if not success:
             raise HTTPException(status_code=500, detail="Failed to save updated config")
@@ -27903,14 +28818,29 @@ async def create_ai_target_board(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/tap-interface/bravo-build")
-async def bravo_build(
-    payload: BravoBuildRequest,
+@app.post("/api/tap-interface/create-ai-target-board")
+async def create_ai_target_board(
+    payload: CreateAITargetBoardRequest,
+    request: Request,
     current_ids: Annotated[Dict[str, str], Depends(get_current_account_and_user_ids)]
 ):
     """
-    Dynamically build a new static board based on a clicked button's label and context.
+    Generate AI options for a button label and create a new static board.
+    Returns the new board's ID and label for use as a Target Board.
     """
+    if _wants_background_job(request):
+        return await _submit_board_job("create_ai_target_board", payload.model_dump(), current_ids)
+    return await _create_ai_target_board_impl(payload, current_ids)
+
+
+job_engine.register("create_ai_target_board", _board_job_handler(_create_ai_target_board_impl, CreateAITargetBoardRequest))
+
+
+async def _bravo_build_impl(
+    payload: BravoBuildRequest,
+    current_ids: Dict[str, str]
+):
+    """POST /api/tap-interface/bravo-build; also runs as the "bravo_build" background job."""
     aac_user_id = current_ids["aac_user_id"]
     account_id = current_ids["account_id"]
     source_board_id = payload.source_board_id
@@ -28088,6 +29018,7 @@ async def bravo_build(
         # Batch-resolve images for all options using the shared scored lookup
         # (handles key-term stripping, negation guard, and mascot priority in one pass).
         selected_mascot = str(settings.get("mascot") or "").strip().lower()
+        await report_job_progress("options", f"Generated {len(generated_options)} options", options=generated_options)
         label_to_url = await _lookup_images_for_labels(generated_options, selected_mascot, account_id, aac_user_id, source="bravo_build")
 
         # Batch-generate past_tense and plural for all options in a single LLM call
@@ -28204,6 +29135,7 @@ async def bravo_build(
 
         config_data['updated_at'] = dt.now().isoformat()
 
+        await report_job_progress("board", f"Built {label}", board=new_board)
         success = await save_tap_nav_config(account_id, aac_user_id, config_data)
         if not success:
             raise HTTPException(status_code=500, detail="Failed to save updated config")
@@ -28222,6 +29154,23 @@ async def bravo_build(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/tap-interface/bravo-build")
+async def bravo_build(
+    payload: BravoBuildRequest,
+    request: Request,
+    current_ids: Annotated[Dict[str, str], Depends(get_current_account_and_user_ids)]
+):
+    """
+    Dynamically build a new static board based on a clicked button's label and context.
+    """
+    if _wants_background_job(request):
+        return await _submit_board_job("bravo_build", payload.model_dump(), current_ids)
+    return await _bravo_build_impl(payload, current_ids)
+
+
+job_engine.register("bravo_build", _board_job_handler(_bravo_build_impl, BravoBuildRequest))
+
+
 @app.get("/api/tap-interface/boards/{board_id}/next-boards-status")
 async def get_next_boards_status(
     board_id: str,
@@ -28291,15 +29240,11 @@ class CreateNextBoardsRequest(BaseModel):
     new_board_after_selection: str = "use_ai"
 
 
-@app.post("/api/tap-interface/boards/create-next-boards")
-async def create_next_boards(
+async def _create_next_boards_impl(
     payload: CreateNextBoardsRequest,
-    current_ids: Annotated[Dict[str, str], Depends(get_current_account_and_user_ids)]
+    current_ids: Dict[str, str]
 ):
-    """
-    For each static button on a board: link to an existing board, replace it, or generate a new one.
-    All option generation runs in parallel; image and variant lookups are batched across all boards.
-    """
+    """POST /api/tap-interface/boards/create-next-boards; also runs as the "create_next_boards" background job."""
     account_id = current_ids["account_id"]
     aac_user_id = current_ids["aac_user_id"]
 
@@ -28402,6 +29347,7 @@ async def create_next_boards(
         opt for opts in option_lists for opt in opts
     ))
 
+    await report_job_progress("options", f"Generated options for {len(option_lists)} board(s)")
     label_to_url: Dict[str, Any] = {}
     if all_unique:
         label_to_url = await _lookup_images_for_labels(all_unique, selected_mascot, account_id, aac_user_id, source="create_next_boards")
@@ -28517,10 +29463,12 @@ async def create_next_boards(
             btn['after_selection'] = 'navigate'
             btn['target_board_id'] = new_id
             boards_created += 1
+        await report_job_progress("board", f"Built {dec.label}", board_id=btn['target_board_id'], label=dec.label, buttons=new_buttons)
 
     config_data['boards'] = boards
     config_data['updated_at'] = dt.now().isoformat()
 
+    await report_job_progress("saving", "Saving boards")
     success = await save_tap_nav_config(account_id, aac_user_id, config_data)
     if not success:
         raise HTTPException(status_code=500, detail="Failed to save config")
@@ -28533,6 +29481,24 @@ async def create_next_boards(
     })
 
 
+@app.post("/api/tap-interface/boards/create-next-boards")
+async def create_next_boards(
+    payload: CreateNextBoardsRequest,
+    request: Request,
+    current_ids: Annotated[Dict[str, str], Depends(get_current_account_and_user_ids)]
+):
+    """
+    For each static button on a board: link to an existing board, replace it, or generate a new one.
+    All option generation runs in parallel; image and variant lookups are batched across all boards.
+    """
+    if _wants_background_job(request):
+        return await _submit_board_job("create_next_boards", payload.model_dump(), current_ids)
+    return await _create_next_boards_impl(payload, current_ids)
+
+
+job_engine.register("create_next_boards", _board_job_handler(_create_next_boards_impl, CreateNextBoardsRequest))
+
+
 class BravoSuggestRequest(BaseModel):
     """Payload for regenerating bravo-build-style options without saving a board."""
     label: str = Field(..., description="The button label that was tapped (e.g. 'like')")
@@ -28629,14 +29595,11 @@ async def bravo_suggest(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/tap-interface/regenerate-board")
-async def regenerate_board(
+async def _regenerate_board_impl(
     payload: RegenerateBoardRequest,
-    current_ids: Annotated[Dict[str, str], Depends(get_current_account_and_user_ids)]
+    current_ids: Dict[str, str]
 ):
-    """
-    Dynamically regenerate options on an AI board based on context.
-    """
+    """POST /api/tap-interface/regenerate-board; also runs as the "regenerate_board" background job."""
     aac_user_id = current_ids["aac_user_id"]
     account_id = current_ids["account_id"]
     board_id = payload.board_id
@@ -28789,9 +29752,11 @@ async def regenerate_board(
                 "button_type": btn_type,
             })
 
+        await report_job_progress("board", f"Regenerated {len(buttons)} options", board_id=payload.board_id, buttons=buttons)
         board_obj['buttons'] = buttons
         config_data['updated_at'] = dt.now().isoformat()
 
+        await report_job_progress("saving", "Saving board")
         success = await save_tap_nav_config(account_id, aac_user_id, config_data)
         if not success:
             raise HTTPException(status_code=500, detail="Failed to save updated config")
@@ -28808,6 +29773,23 @@ async def regenerate_board(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/tap-interface/regenerate-board")
+async def regenerate_board(
+    payload: RegenerateBoardRequest,
+    request: Request,
+    current_ids: Annotated[Dict[str, str], Depends(get_current_account_and_user_ids)]
+):
+    """
+    Dynamically regenerate options on an AI board based on context.
+    """
+    if _wants_background_job(request):
+        return await _submit_board_job("regenerate_board", payload.model_dump(), current_ids)
+    return await _regenerate_board_impl(payload, current_ids)
+
+
+job_engine.register("regenerate_board", _board_job_handler(_regenerate_board_impl, RegenerateBoardRequest))
+
+
 @app.post("/api/generate-options")
 async def generate_options(
     request: dict,
@@ -28937,17 +29919,66 @@ except ImportError as e:
     logging.warning(f"Migration utilities not available: {e}")
     MIGRATION_AVAILABLE = False
 
-# Store parsed MTI data temporarily (in production, use Redis or database)
-migration_sessions = {}  # Format: {session_id: {parsed_data, mapper, timestamp}}
+MTI_PARSE_WORKERS = int(os.getenv("MTI_PARSE_WORKERS", "1"))
+
+# Parsed uploads live in migration_session_store (on disk, optionally GCS), so any worker
+# or instance can serve the follow-up requests. Pages are decoded only when used.
+ACCENT_SESSION_INDEX_FIELDS = ("inferred_name",)
+
+
+def _accent_page_names(session) -> Dict[str, str]:
+    """Accent page ID -> display name, from the session index (no pages decoded)."""
+    return {
+        page_id: (fields.get("inferred_name") or f"Page_{page_id}")
+        for page_id, fields in session.index.items()
+    }
+
+
+_RANDOM_CHOICE_PATTERN = re.compile(r'RANDOM-CHOICE\(([^)]+)\)')
+
+
+async def _create_migration_mapper(session, accent_buttons: List[Dict[str, Any]]):
+    """
+    Mapper for a session's pages (Accent page ID -> inferred Bravo page name).
+    Only the pages the buttons' RANDOM-CHOICE functions refer to are decoded, up front
+    and off the event loop, so map_button never reads the session file.
+    """
+    page_name_map = {
+        page_id: name.lower().replace(' ', '')
+        for page_id, name in _accent_page_names(session).items()
+    }
+    # Override: Home page (0400 in Accent) should map to "home"
+    if '0400' in page_name_map:
+        page_name_map['0400'] = 'home'
+
+    # Same matching as AccentToBravoMapper._extract_random_options ("ref" or "0 ref")
+    random_refs = set()
+    for button in accent_buttons:
+        for func in button.get("functions") or []:
+            match = _RANDOM_CHOICE_PATTERN.search(func) if func.startswith("RANDOM-CHOICE(") else None
+            if match:
+                ref = match.group(1).lower().strip()
+                random_refs.update((ref, f"0 {ref}"))
+    random_pages = {}
+    for page_id, fields in session.index.items():
+        if str(fields.get("inferred_name") or "").lower().strip() in random_refs:
+            page = await session.get_item(page_id)
+            if page is not None:
+                random_pages[page_id] = page
+    return create_mapper(page_name_map, random_pages)
 
 try:
-    from touchchat_ce_parser import parse_touchchat_ce_upload
+    from touchchat_ce_parser import load_symbol_pngs, parse_touchchat_ce_archive
     TOUCHCHAT_MIGRATION_AVAILABLE = True
 except ImportError as e:
     logging.warning(f"TouchChat migration utilities not available: {e}")
     TOUCHCHAT_MIGRATION_AVAILABLE = False
 
-touchchat_migration_sessions = {}  # Format: {session_id: {parsed_data, temp_dir, c4s_path, timestamp, account_id, aac_user_id}}
+TOUCHCHAT_SESSION_INDEX_FIELDS = ("name", "page_id", "page_rid")
+# The TouchChat symbol database (.c4s) is kept with the session under this name.
+TOUCHCHAT_SYMBOLS_ATTACHMENT = "symbols.c4s"
+TOUCHCHAT_PARSE_WORKERS = int(os.getenv("TOUCHCHAT_PARSE_WORKERS", "1"))
+TOUCHCHAT_SYMBOL_UPLOAD_CONCURRENCY = int(os.getenv("TOUCHCHAT_SYMBOL_UPLOAD_CONCURRENCY", "8"))
 
 
 def _normalize_board_label(value: Any) -> str:
@@ -29003,22 +30034,64 @@ def _touchchat_source_board_is_speech_only(source_board: Dict[str, Any]) -> bool
     return False
 
 
-def _touchchat_cleanup_old_sessions() -> None:
-    cleanup_time = dt.now(timezone.utc) - timedelta(hours=1)
-    stale_sessions = [
-        sid for sid, data in touchchat_migration_sessions.items()
-        if data.get("timestamp") and data["timestamp"] < cleanup_time
-    ]
+def _read_touchchat_symbol_pngs(c4s_path: str, symbol_rids: Set[str]) -> Tuple[Dict[str, str], Dict[str, bytes]]:
+    """Bulk-read symbol PNGs: symbol RID -> content hash, and each distinct PNG once by hash."""
+    digest_by_rid: Dict[str, str] = {}
+    png_by_digest: Dict[str, bytes] = {}
+    for rid, png in load_symbol_pngs(c4s_path, symbol_rids).items():
+        digest = hashlib.sha256(png).hexdigest()
+        digest_by_rid[rid] = digest
+        png_by_digest.setdefault(digest, png)
+    return digest_by_rid, png_by_digest
 
-    import shutil
 
-    for sid in stale_sessions:
-        session = touchchat_migration_sessions.pop(sid, None)
-        if not session:
-            continue
-        temp_dir = session.get("temp_dir")
-        if temp_dir:
-            shutil.rmtree(temp_dir, ignore_errors=True)
+async def _apply_touchchat_symbol_images(session, account_id: str, symbol_buttons: List[Tuple[Dict[str, Any], str]]) -> None:
+    """
+    Set image_url on imported buttons from their TouchChat symbols. All symbols of the
+    import are read in one pass over the session's .c4s; identical images (the same
+    symbol reused across pages) are uploaded once, under a content-hash name, with at
+    most TOUCHCHAT_SYMBOL_UPLOAD_CONCURRENCY uploads in flight. A missing symbol
+    database or a failed upload leaves those buttons without an image.
+    """
+    if not symbol_buttons or storage_client is None:
+        return
+    c4s_path = await migration_session_store.attachment_path(session, TOUCHCHAT_SYMBOLS_ATTACHMENT)
+    if not c4s_path:
+        return
+    try:
+        digest_by_rid, png_by_digest = await asyncio.to_thread(
+            _read_touchchat_symbol_pngs, c4s_path, {rid for _, rid in symbol_buttons}
+        )
+    except Exception as e:
+        logging.warning(f"Could not read TouchChat symbols for session {session.session_id}: {e}")
+        return
+
+    bucket = storage_client.bucket(AAC_IMAGES_BUCKET_NAME)
+    semaphore = asyncio.Semaphore(max(1, TOUCHCHAT_SYMBOL_UPLOAD_CONCURRENCY))
+
+    async def upload(digest: str, png: bytes) -> str:
+        blob = bucket.blob(f"touchchat_symbols/{account_id}/{digest}.png")
+        async with semaphore:
+            await asyncio.to_thread(blob.upload_from_string, png, content_type="image/png")
+        return f"https://storage.googleapis.com/{bucket.name}/{blob.name}"
+
+    digests = list(png_by_digest)
+    results = await asyncio.gather(*(upload(d, png_by_digest[d]) for d in digests), return_exceptions=True)
+    url_by_digest: Dict[str, str] = {}
+    for digest, result in zip(digests, results):
+        if isinstance(result, Exception):
+            logging.warning(f"TouchChat symbol upload failed ({digest[:12]}): {result}")
+        else:
+            url_by_digest[digest] = result
+
+    for button, rid in symbol_buttons:
+        url = url_by_digest.get(digest_by_rid.get(rid, ""))
+        if url:
+            button["image_url"] = url
+    logging.info(
+        f"🖼️ TouchChat symbols: {len(symbol_buttons)} buttons, {len(digest_by_rid)} symbols found, "
+        f"{len(url_by_digest)}/{len(digests)} distinct images uploaded"
+    )
 
 
 def load_existing_json(json_data: Dict) -> Dict:
@@ -29178,10 +30251,10 @@ async def upload_mti_file(
         
         try:
             # Parse the MTI file using the validated extraction logic
-            # (directly load extract_mti_to_json.py to avoid subprocess/path issues)
-            import importlib.util
+            # (extract_mti_to_json.py is loaded by path, in a worker process: parsing a
+            # large file is CPU-bound and must not block the event loop)
             import os
-            import sys
+            from accent_mti_parser import parse_mti_path
 
             script_dir = os.path.dirname(os.path.abspath(__file__))
             extractor_candidates = [
@@ -29197,18 +30270,11 @@ async def upload_mti_file(
             if extractor_path:
                 # Match dev behavior: when extractor exists, use it directly and fail if it errors.
                 # Silent fallback can change page naming/navigation semantics.
-                module_name = "extract_mti_to_json_runtime"
-                if module_name in sys.modules:
-                    del sys.modules[module_name]
-
-                spec = importlib.util.spec_from_file_location(module_name, extractor_path)
-                if spec is None or spec.loader is None:
+                try:
+                    parsed_data = await run_in_process("mti", parse_mti_path, tmp_path, extractor_path, max_workers=MTI_PARSE_WORKERS)
+                except ImportError as e:
+                    logging.error(f"Failed to load MTI extractor: {e}")
                     raise HTTPException(status_code=500, detail="Failed to load MTI extractor")
-
-                extractor = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(extractor)
-
-                parsed_data = extractor.extract_mti_file(tmp_path)
                 if not parsed_data:
                     raise HTTPException(status_code=500, detail="Failed to parse MTI file: extractor returned no data")
             else:
@@ -29217,10 +30283,7 @@ async def upload_mti_file(
                     "MTI extractor script not found. Checked: %s. Falling back to AccentMTIParser.",
                     ", ".join(extractor_candidates)
                 )
-                from accent_mti_parser import AccentMTIParser
-
-                parser = AccentMTIParser()
-                parsed_data = parser.parse_file(tmp_path)
+                parsed_data = await run_in_process("mti", parse_mti_path, tmp_path, None, max_workers=MTI_PARSE_WORKERS)
                 if not parsed_data:
                     raise HTTPException(status_code=500, detail="Failed to parse MTI file: parser returned no data")
 
@@ -29249,40 +30312,15 @@ async def upload_mti_file(
             # Create session ID
             session_id = str(uuid.uuid4())
             
-            # Build page name mapping: Accent page ID -> inferred name
-            page_name_map = {
-                page_id: page_data.get("inferred_name", f"Page_{page_id}").lower().replace(' ', '')
-                for page_id, page_data in parsed_data["pages"].items()
-            }
-            # Override: Home page (0400 in Accent) should map to "home"
-            if '0400' in page_name_map:
-                page_name_map['0400'] = 'home'
-            
-            # Override: Home page (0400 in Accent) should map to "home"
-            if '0400' in page_name_map:
-                page_name_map['0400'] = 'home'
-            
-            # Store in session (with timestamp for cleanup)
-            migration_sessions[session_id] = {
-                "parsed_data": parsed_data,
-                "mapper": create_mapper(page_name_map, parsed_data["pages"]),
-                "timestamp": dt.now(timezone.utc),
-                "account_id": account_id,
-                "aac_user_id": aac_user_id
-            }
+            # Store in session (expires after MIGRATION_SESSION_TTL_SECONDS)
+            await migration_session_store.create(
+                session_id, "accent", account_id, aac_user_id, parsed_data,
+                collection="pages", index_fields=ACCENT_SESSION_INDEX_FIELDS,
+            )
             
             logging.info(f"Created migration session {session_id} for account {account_id}, user {aac_user_id}")
             logging.info(f"Session contains {len(parsed_data['pages'])} pages, {parsed_data['total_buttons']} buttons")
             
-            # Clean up old sessions (older than 1 hour)
-            cleanup_time = dt.now(timezone.utc) - timedelta(hours=1)
-            sessions_to_remove = [
-                sid for sid, data in migration_sessions.items()
-                if data["timestamp"] < cleanup_time
-            ]
-            for sid in sessions_to_remove:
-                del migration_sessions[sid]
-            
             return JSONResponse(content={
                 "session_id": session_id,
                 "summary": {
@@ -29335,23 +30373,11 @@ async def upload_json_data(
         # Create session ID
         session_id = str(uuid.uuid4())
         
-        # Build page name mapping: Accent page ID -> inferred name
-        page_name_map = {
-            page_id: page_data.get("inferred_name", f"Page_{page_id}").lower().replace(' ', '')
-            for page_id, page_data in parsed_data["pages"].items()
-        }
-        # Override: Home page (0400 in Accent) should map to "home"
-        if '0400' in page_name_map:
-            page_name_map['0400'] = 'home'
-        
         # Store in session
-        migration_sessions[session_id] = {
-            "parsed_data": parsed_data,
-            "mapper": create_mapper(page_name_map, parsed_data["pages"]),
-            "timestamp": dt.now(timezone.utc),
-            "account_id": account_id,
-            "aac_user_id": aac_user_id
-        }
+        await migration_session_store.create(
+            session_id, "accent", account_id, aac_user_id, parsed_data,
+            collection="pages", index_fields=ACCENT_SESSION_INDEX_FIELDS,
+        )
         
         return JSONResponse(content={
             "session_id": session_id,
@@ -29402,23 +30428,11 @@ async def upload_json_data_test(
         # Create session ID
         session_id = str(uuid.uuid4())
         
-        # Build page name mapping: Accent page ID -> inferred name
-        page_name_map = {
-            page_id: page_data.get("inferred_name", f"Page_{page_id}").lower().replace(' ', '')
-            for page_id, page_data in parsed_data["pages"].items()
-        }
-        # Override: Home page (0400 in Accent) should map to "home"
-        if '0400' in page_name_map:
-            page_name_map['0400'] = 'home'
-        
         # Store in session
-        migration_sessions[session_id] = {
-            "parsed_data": parsed_data,
-            "mapper": create_mapper(page_name_map, parsed_data["pages"]),
-            "timestamp": dt.now(timezone.utc),
-            "account_id": account_id,
-            "aac_user_id": aac_user_id
-        }
+        await migration_session_store.create(
+            session_id, "accent", account_id, aac_user_id, parsed_data,
+            collection="pages", index_fields=ACCENT_SESSION_INDEX_FIELDS,
+        )
         
         logging.info(f"[TEST] Created migration session {session_id} for test account")
         logging.info(f"[TEST] Session contains {len(parsed_data['pages'])} pages, {parsed_data['total_buttons']} buttons")
@@ -29454,27 +30468,26 @@ async def get_migration_pages(
         raise HTTPException(status_code=501, detail="Migration functionality not available")
     
     logging.info(f"Fetching migration session {session_id}")
-    logging.info(f"Available sessions: {list(migration_sessions.keys())}")
     
     # Verify session exists
-    if session_id not in migration_sessions:
-        logging.error(f"Migration session {session_id} not found. Available: {list(migration_sessions.keys())}")
+    session = await migration_session_store.get(session_id)
+    if session is None or session.kind != "accent":
+        logging.error(f"Migration session {session_id} not found")
         raise HTTPException(status_code=404, detail="Migration session not found or expired")
     
-    session = migration_sessions[session_id]
-    
     # Verify ownership
-    if session["account_id"] != current_ids["account_id"] or session["aac_user_id"] != current_ids["aac_user_id"]:
+    if not session.owned_by(current_ids["account_id"], current_ids["aac_user_id"]):
         raise HTTPException(status_code=403, detail="Not authorized to access this migration session")
     
-    logging.info(f"Returning session data with {len(session['parsed_data']['pages'])} pages")
+    parsed_data = await session.parsed_data()
+    logging.info(f"Returning session data with {len(parsed_data['pages'])} pages")
 
     # Sanitize button text for display (strip control chars)
-    for page_data in session["parsed_data"]["pages"].values():
+    for page_data in parsed_data["pages"].values():
         for btn in page_data.get("buttons", []):
             _sanitize_migration_button(btn)
     
-    return JSONResponse(content=session["parsed_data"])
+    return JSONResponse(content=parsed_data)
 
 
 @app.post("/api/migration/import-buttons")
@@ -29519,25 +30532,20 @@ async def import_buttons(
     if not session_id or not accent_page_id or not destination_page_name:
         raise HTTPException(status_code=400, detail="Missing required parameters")
     
-    if session_id not in migration_sessions:
+    session = await migration_session_store.get(session_id)
+    if session is None or session.kind != "accent":
         raise HTTPException(status_code=404, detail="Migration session not found or expired")
     
-    session = migration_sessions[session_id]
-    
     # Verify ownership
-    if session["account_id"] != account_id or session["aac_user_id"] != aac_user_id:
+    if not session.owned_by(account_id, aac_user_id):
         raise HTTPException(status_code=403, detail="Not authorized to access this migration session")
     
     try:
-        parsed_data = session["parsed_data"]
-        mapper = session["mapper"]
-        
         # Get the Accent page
-        if accent_page_id not in parsed_data["pages"]:
+        accent_page = await session.get_item(accent_page_id)
+        if accent_page is None:
             raise HTTPException(status_code=404, detail=f"Page {accent_page_id} not found in parsed data")
         
-        accent_page = parsed_data["pages"][accent_page_id]
-        
         # Sort buttons by row/col (same as POC)
         sorted_buttons = sorted(accent_page["buttons"], key=lambda b: (b["row"], b["col"]))
         
@@ -29552,6 +30560,8 @@ async def import_buttons(
         if not selected_buttons:
             raise HTTPException(status_code=400, detail="No valid buttons selected")
         
+        mapper = await _create_migration_mapper(session, selected_buttons)
+        
         # Load existing user pages
         existing_pages = await load_pages_from_file(account_id, aac_user_id)
         
@@ -29585,10 +30595,7 @@ async def import_buttons(
             page_names = {p["name"].lower() for p in existing_pages}
             
             # Build a map of Accent page IDs to their display names from parsed data
-            accent_page_names = {
-                page_id: page_data.get("inferred_name", f"Page_{page_id}")
-                for page_id, page_data in parsed_data["pages"].items()
-            }
+            accent_page_names = _accent_page_names(session)
             
             for accent_button in selected_buttons:
                 # Skip navigation conflict check if button has GOTO-HOME function
@@ -29617,12 +30624,12 @@ async def import_buttons(
             # If there are conflicts and no resolutions, return them for user decision
             if conflicts or nav_conflicts:
                 # Store conflict context in session for resolution
-                session["pending_import"] = {
+                await migration_session_store.update_meta(session, pending_import={
                     "accent_page_id": accent_page_id,
                     "selected_button_indices": selected_indices,
                     "destination_type": destination_type,
                     "destination_page_name": destination_page_name
-                }
+                })
                 
                 return JSONResponse(content={
                     "session_id": session_id,
@@ -29785,12 +30792,11 @@ async def delete_migration_session(
     current_ids: Annotated[Dict[str, str], Depends(get_current_account_and_user_ids)] = None
 ):
     """Delete a migration session"""
-    if session_id in migration_sessions:
-        session = migration_sessions[session_id]
-        
+    session = await migration_session_store.get(session_id)
+    if session is not None and session.kind == "accent":
         # Verify ownership
-        if session["account_id"] == current_ids["account_id"] and session["aac_user_id"] == current_ids["aac_user_id"]:
-            del migration_sessions[session_id]
+        if session.owned_by(current_ids["account_id"], current_ids["aac_user_id"]):
+            await migration_session_store.delete(session_id)
             return JSONResponse(content={"success": True})
         else:
             raise HTTPException(status_code=403, detail="Not authorized")
@@ -29820,19 +30826,29 @@ async def upload_touchchat_ce_file(
 
     try:
         content = await file.read()
-        extracted = parse_touchchat_ce_upload(content, filename)
+        import shutil
+        import tempfile
+        with tempfile.NamedTemporaryFile(prefix="touchchat_upload_", suffix=".zip", delete=False) as tmp_file:
+            await asyncio.to_thread(tmp_file.write, content)
+            archive_path = tmp_file.name
+        try:
+            # Unzipping and the SQLite passes are CPU-bound: parse in a worker process
+            extracted = await run_in_process(
+                "touchchat", parse_touchchat_ce_archive, archive_path, filename, max_workers=TOUCHCHAT_PARSE_WORKERS
+            )
+        finally:
+            os.remove(archive_path)
 
         session_id = str(uuid.uuid4())
-        touchchat_migration_sessions[session_id] = {
-            "parsed_data": extracted.parsed_data,
-            "temp_dir": extracted.temp_dir,
-            "c4s_path": extracted.c4s_path,
-            "timestamp": dt.now(timezone.utc),
-            "account_id": account_id,
-            "aac_user_id": aac_user_id,
-        }
-
-        _touchchat_cleanup_old_sessions()
+        try:
+            await migration_session_store.create(
+                session_id, "touchchat", account_id, aac_user_id, extracted.parsed_data,
+                collection="boards", index_fields=TOUCHCHAT_SESSION_INDEX_FIELDS,
+                attachments={TOUCHCHAT_SYMBOLS_ATTACHMENT: extracted.c4s_path} if extracted.c4s_path else None,
+            )
+        finally:
+            # Everything needed later is in the session now
+            shutil.rmtree(extracted.temp_dir, ignore_errors=True)
 
         return JSONResponse(content={
             "session_id": session_id,
@@ -29854,14 +30870,14 @@ async def get_touchchat_migration_boards(
     session_id: str,
     current_ids: Annotated[Dict[str, str], Depends(get_current_account_and_user_ids)] = None,
 ):
-    if session_id not in touchchat_migration_sessions:
+    session = await migration_session_store.get(session_id)
+    if session is None or session.kind != "touchchat":
         raise HTTPException(status_code=404, detail="TouchChat migration session not found or expired")
 
-    session = touchchat_migration_sessions[session_id]
-    if session["account_id"] != current_ids["account_id"] or session["aac_user_id"] != current_ids["aac_user_id"]:
+    if not session.owned_by(current_ids["account_id"], current_ids["aac_user_id"]):
         raise HTTPException(status_code=403, detail="Not authorized to access this TouchChat migration session")
 
-    return JSONResponse(content=session["parsed_data"])
+    return JSONResponse(content=await session.parsed_data())
 
 
 @app.post("/api/touchchat-migration/import-board")
@@ -29904,15 +30920,15 @@ async def import_touchchat_board(
 
     if not session_id or not source_board_id:
         raise HTTPException(status_code=400, detail="Missing required parameters")
-    if session_id not in touchchat_migration_sessions:
+    session = await migration_session_store.get(session_id)
+    if session is None or session.kind != "touchchat":
         raise HTTPException(status_code=404, detail="TouchChat migration session not found or expired")
 
-    session = touchchat_migration_sessions[session_id]
-    if session["account_id"] != account_id or session["aac_user_id"] != aac_user_id:
+    if not session.owned_by(account_id, aac_user_id):
         raise HTTPException(status_code=403, detail="Not authorized to access this TouchChat migration session")
 
-    parsed_data = session.get("parsed_data") or {}
-    boards_from_file = parsed_data.get("boards") if isinstance(parsed_data.get("boards"), dict) else {}
+    # Navigation and cascade lookups walk every board, so decode them all (off the event loop)
+    boards_from_file = await session.load_items()
     source_board = boards_from_file.get(source_board_id)
     if not source_board:
         raise HTTPException(status_code=404, detail="Source board not found in parsed TouchChat data")
@@ -30101,6 +31117,8 @@ async def import_touchchat_board(
         processed: Set[str] = set()
         total_imported_buttons = 0
         imported_board_summaries: List[Dict[str, Any]] = []
+        # Imported buttons with a TouchChat symbol; their images are resolved in one batch at the end
+        symbol_buttons: List[Tuple[Dict[str, Any], str]] = []
 
         while queue:
             current_source_id = queue.pop(0)
@@ -30243,6 +31261,9 @@ async def import_touchchat_board(
                     "text_color": src_btn.get("text_color") or "#000000",
                     "hidden": False,
                 })
+                symbol_rid = str(src_btn.get("symbol_rid") or "").strip()
+                if symbol_rid:
+                    symbol_buttons.append((imported_buttons[-1], symbol_rid))
 
             board_merge_mode = merge_mode if current_source_id == source_board_id else "update"
             if board_merge_mode == "replace":
@@ -30272,6 +31293,7 @@ async def import_touchchat_board(
             })
             processed.add(current_source_id)
 
+        await _apply_touchchat_symbol_images(session, account_id, symbol_buttons)
         config_data["boards"] = boards
         config_data["updated_at"] = dt.now().isoformat()
 
@@ -30386,6 +31408,7 @@ async def import_touchchat_board(
     }
 
     imported_buttons: List[Dict[str, Any]] = []
+    symbol_buttons: List[Tuple[Dict[str, Any], str]] = []
     for idx, src_btn in enumerate(selected_buttons):
         label = str(src_btn.get("label") or "").strip()
         row = int(src_btn.get("row") or 0)
@@ -30443,6 +31466,9 @@ async def import_touchchat_board(
             "text_color": src_btn.get("text_color") or "#000000",
             "hidden": False,
         })
+        symbol_rid = str(src_btn.get("symbol_rid") or "").strip()
+        if symbol_rid:
+            symbol_buttons.append((imported_buttons[-1], symbol_rid))
 
     if merge_mode == "replace":
         target_board["buttons"] = imported_buttons
@@ -30461,6 +31487,7 @@ async def import_touchchat_board(
 
     target_board["board_type"] = "static"
     target_board["label"] = str(target_board.get("label") or destination_board_name or "Imported Board")
+    await _apply_touchchat_symbol_images(session, account_id, symbol_buttons)
     config_data["boards"] = boards
     config_data["updated_at"] = dt.now().isoformat()
 
@@ -30506,15 +31533,14 @@ async def check_touchchat_cascade_conflicts(
 
     if not session_id or not source_board_id:
         raise HTTPException(status_code=400, detail="Missing required parameters")
-    if session_id not in touchchat_migration_sessions:
+    session = await migration_session_store.get(session_id)
+    if session is None or session.kind != "touchchat":
         raise HTTPException(status_code=404, detail="TouchChat migration session not found or expired")
 
-    session = touchchat_migration_sessions[session_id]
-    if session["account_id"] != account_id or session["aac_user_id"] != aac_user_id:
+    if not session.owned_by(account_id, aac_user_id):
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    parsed_data = session.get("parsed_data") or {}
-    boards_from_file = parsed_data.get("boards") if isinstance(parsed_data.get("boards"), dict) else {}
+    boards_from_file = await session.load_items()
     source_board = boards_from_file.get(source_board_id)
     if not source_board:
         raise HTTPException(status_code=404, detail="Source board not found")
@@ -30598,19 +31624,14 @@ async def delete_touchchat_migration_session(
     session_id: str,
     current_ids: Annotated[Dict[str, str], Depends(get_current_account_and_user_ids)] = None,
 ):
-    session = touchchat_migration_sessions.get(session_id)
-    if not session:
+    session = await migration_session_store.get(session_id)
+    if not session or session.kind != "touchchat":
         raise HTTPException(status_code=404, detail="TouchChat migration session not found")
 
-    if session["account_id"] != current_ids["account_id"] or session["aac_user_id"] != current_ids["aac_user_id"]:
+    if not session.owned_by(current_ids["account_id"], current_ids["aac_user_id"]):
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    import shutil
-
-    touchchat_migration_sessions.pop(session_id, None)
-    temp_dir = session.get("temp_dir")
-    if temp_dir:
-        shutil.rmtree(temp_dir, ignore_errors=True)
+    await migration_session_store.delete(session_id)
 
     return JSONResponse(content={"success": True})
 
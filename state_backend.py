@@ -0,0 +1,403 @@
+"""
+Shared state for per-process globals that have to agree across server workers
+(mood-update timestamps, the Firestore document cache, validated Gemini cache
+references, the quick-response value tier, migration-session tombstones).
+
+Run with several workers (gunicorn.conf.py, WEB_CONCURRENCY > 1) and a dict in
+one worker is invisible to the others: a settings write on worker A leaves
+worker B serving the old document, and a Gemini cache A deleted still looks valid to B.
+Everything here is an async, namespaced key/value store with per-key TTLs:
+
+- LocalStateBackend: dicts in this process. The single-worker default;
+- SQLiteStateBackend: one WAL-mode SQLite file (in /dev/shm when available)
+  shared by all workers on the same host;
+- RedisStateBackend: shared across hosts/instances.
+
+STATE_BACKEND picks one (local | sqlite | redis). The default ("auto") is local
+with a single worker, where a round trip and a pickle per cache read would buy
+nothing. With more than one worker it is redis when REDIS_HOST is set, otherwise
+sqlite. STATE_SHARED_ACROSS_INSTANCES=true makes "auto" use redis even with one
+worker, for deployments that need instances to agree.
+
+claim_host_singleton() elects one worker per host for background loops that
+should not run once per worker.
+Values are pickled for the sqlite and redis backends, so callers must write a
+value back after changing it; the local backend returns the stored object.
+"""
+
+import asyncio
+import logging
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; every worker then runs the host singletons
+    fcntl = None
+
+STATE_BACKEND = os.getenv("STATE_BACKEND", "auto").strip().lower()
+STATE_SQLITE_PATH = os.getenv("STATE_SQLITE_PATH", "")
+STATE_REDIS_PREFIX = os.getenv("STATE_REDIS_PREFIX", "bravo_state")
+STATE_PURGE_INTERVAL_SECONDS = int(os.getenv("STATE_PURGE_INTERVAL_SECONDS", "300"))
+STATE_SHARED_ACROSS_INSTANCES = os.getenv("STATE_SHARED_ACROSS_INSTANCES", "false").strip().lower() == "true"
+
+
+def _expiry(ttl: Optional[float]) -> Optional[float]:
+    return time.time() + ttl if ttl else None
+
+
+def worker_count() -> int:
+    try:
+        return max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+    except ValueError:
+        return 1
+
+
+def _default_state_dir() -> str:
+    return "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else tempfile.gettempdir()
+
+
+# name -> open lock file descriptor, held for the life of the process
+_host_singleton_locks: Dict[str, int] = {}
+
+
+def claim_host_singleton(name: str) -> bool:
+    """
+    True in one worker per host for `name`: the first to take an exclusive flock on
+    a lock file next to the SQLite state. The kernel drops the lock when that worker
+    exits, so the replacement gunicorn starts claims it. Always True with one worker.
+    """
+    if name in _host_singleton_locks:
+        return True
+    if worker_count() <= 1 or fcntl is None:
+        return True
+    path = os.path.join(os.path.dirname(STATE_SQLITE_PATH) or _default_state_dir(), f"bravo_{name}.lock")
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return False
+    _host_singleton_locks[name] = fd
+    return True
+
+
+class LocalStateBackend:
+    name = "local"
+
+    def __init__(self):
+        self._data: Dict[str, "OrderedDict[str, Tuple[Any, Optional[float]]]"] = {}
+
+    def _live(self, namespace: str, key: str) -> Optional[Tuple[Any, Optional[float]]]:
+        entries = self._data.get(namespace)
+        entry = entries.get(key) if entries else None
+        if entry is not None and entry[1] is not None and entry[1] <= time.time():
+            del entries[key]
+            return None
+        return entry
+
+    async def get(self, namespace: str, key: str) -> Optional[Any]:
+        entry = self._live(namespace, key)
+        return entry[0] if entry is not None else None
+
+    async def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None, max_entries: Optional[int] = None) -> None:
+        entries = self._data.setdefault(namespace, OrderedDict())
+        entries.pop(key, None)
+        entries[key] = (value, _expiry(ttl))
+        if max_entries and len(entries) > max_entries:
+            self._purge_namespace(namespace)
+            while len(entries) > max_entries:
+                entries.popitem(last=False)
+
+    async def delete(self, namespace: str, key: str) -> None:
+        entries = self._data.get(namespace)
+        if entries:
+            entries.pop(key, None)
+
+    async def items(self, namespace: str) -> List[Tuple[str, Any]]:
+        self._purge_namespace(namespace)
+        return [(key, entry[0]) for key, entry in self._data.get(namespace, {}).items()]
+
+    def _purge_namespace(self, namespace: str) -> int:
+        entries = self._data.get(namespace) or {}
+        now = time.time()
+        expired = [key for key, (_, expires_at) in entries.items() if expires_at is not None and expires_at <= now]
+        for key in expired:
+            del entries[key]
+        return len(expired)
+
+    async def purge_expired(self) -> int:
+        return sum(self._purge_namespace(namespace) for namespace in list(self._data))
+
+    async def close(self) -> None:
+        pass
+
+    def describe(self) -> Dict[str, Any]:
+        return {"entries": {namespace: len(entries) for namespace, entries in self._data.items()}}
+
+
+class SQLiteStateBackend:
+    """One SQLite file shared by every worker on this host. Calls run in threads."""
+
+    name = "sqlite"
+
+    def __init__(self, path: Optional[str] = None):
+        if not path:
+            path = os.path.join(_default_state_dir(), "bravo_state.sqlite3")
+        self.path = path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS state ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, expires_at REAL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS state_expires_at ON state (expires_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _get(self, namespace: str, key: str) -> Optional[Any]:
+        row = self._connect().execute(
+            "SELECT value FROM state WHERE namespace = ? AND key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (namespace, key, time.time()),
+        ).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def _set(self, namespace: str, key: str, blob: bytes, expires_at: Optional[float]) -> None:
+        self._connect().execute(
+            "INSERT OR REPLACE INTO state (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, blob, expires_at),
+        )
+
+    def _delete(self, namespace: str, key: str) -> None:
+        self._connect().execute("DELETE FROM state WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def _items(self, namespace: str) -> List[Tuple[str, Any]]:
+        rows = self._connect().execute(
+            "SELECT key, value FROM state WHERE namespace = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (namespace, time.time()),
+        ).fetchall()
+        return [(key, pickle.loads(blob)) for key, blob in rows]
+
+    def _purge(self) -> int:
+        return self._connect().execute("DELETE FROM state WHERE expires_at <= ?", (time.time(),)).rowcount
+
+    async def get(self, namespace: str, key: str) -> Optional[Any]:
+        return await asyncio.to_thread(self._get, namespace, key)
+
+    async def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None, max_entries: Optional[int] = None) -> None:
+        # Pickle on the event loop so a caller mutating the value afterwards can't race the write.
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        await asyncio.to_thread(self._set, namespace, key, blob, _expiry(ttl))
+
+    async def delete(self, namespace: str, key: str) -> None:
+        await asyncio.to_thread(self._delete, namespace, key)
+
+    async def items(self, namespace: str) -> List[Tuple[str, Any]]:
+        return await asyncio.to_thread(self._items, namespace)
+
+    async def purge_expired(self) -> int:
+        return await asyncio.to_thread(self._purge)
+
+    async def close(self) -> None:
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+    def describe(self) -> Dict[str, Any]:
+        return {"path": self.path}
+
+
+class RedisStateBackend:
+    """Keys are "<prefix>:<namespace>:<key>"; expiry is Redis' own."""
+
+    name = "redis"
+
+    def __init__(self, client, prefix: str = STATE_REDIS_PREFIX):
+        self._redis = client  # redis.asyncio client with decode_responses=False
+        self.prefix = prefix
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}:{namespace}:{key}"
+
+    async def get(self, namespace: str, key: str) -> Optional[Any]:
+        blob = await self._redis.get(self._key(namespace, key))
+        return pickle.loads(blob) if blob is not None else None
+
+    async def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None, max_entries: Optional[int] = None) -> None:
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        await self._redis.set(self._key(namespace, key), blob, px=max(1, int(ttl * 1000)) if ttl else None)
+
+    async def delete(self, namespace: str, key: str) -> None:
+        await self._redis.delete(self._key(namespace, key))
+
+    async def items(self, namespace: str) -> List[Tuple[str, Any]]:
+        prefix = self._key(namespace, "")
+        keys = [key async for key in self._redis.scan_iter(match=f"{prefix}*", count=500)]
+        if not keys:
+            return []
+        blobs = await self._redis.mget(keys)
+        items = []
+        for key, blob in zip(keys, blobs):
+            if blob is not None:  # expired between SCAN and MGET
+                key = key.decode() if isinstance(key, bytes) else key
+                items.append((key[len(prefix):], pickle.loads(blob)))
+        return items
+
+    async def purge_expired(self) -> int:
+        return 0
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+    def describe(self) -> Dict[str, Any]:
+        return {"prefix": self.prefix}
+
+
+class StateNamespace:
+    """One namespace of the current backend, with a default TTL for its keys."""
+
+    def __init__(self, store: "StateStore", namespace: str, ttl: Optional[float] = None, max_entries: Optional[int] = None):
+        self.store = store
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries  # bounds the local backend; the others expire by TTL
+
+    async def get(self, key: str) -> Optional[Any]:
+        return await self.store.get(self.namespace, key)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        await self.store.set(self.namespace, key, value, ttl=ttl or self.ttl, max_entries=self.max_entries)
+
+    async def delete(self, key: str) -> None:
+        await self.store.delete(self.namespace, key)
+
+    async def items(self) -> List[Tuple[str, Any]]:
+        return await self.store.items(self.namespace)
+
+
+class StateStore:
+    """
+    The process-wide entry point. Starts on LocalStateBackend; the server swaps
+    in the configured backend at startup with use_backend(). Backend errors
+    are logged and counted, and reads fall back to a miss, so a Redis outage
+    degrades to recomputing rather than failing requests.
+    """
+
+    def __init__(self):
+        self.backend = LocalStateBackend()
+        self._purge_task: Optional[asyncio.Task] = None
+        self.counters: Dict[str, int] = {"hits": 0, "misses": 0, "writes": 0, "deletes": 0, "errors": 0, "purged": 0}
+
+    def namespace(self, namespace: str, ttl: Optional[float] = None, max_entries: Optional[int] = None) -> StateNamespace:
+        return StateNamespace(self, namespace, ttl=ttl, max_entries=max_entries)
+
+    def use_backend(self, backend) -> None:
+        self.backend = backend
+        logging.info(f"🗄️ Shared state backend: {backend.name} {backend.describe()}")
+
+    def _failed(self, action: str, namespace: str, error: Exception) -> None:
+        self.counters["errors"] += 1
+        logging.warning(f"⚠️ State backend {self.backend.name} {action} failed for '{namespace}': {error}")
+
+    async def get(self, namespace: str, key: str) -> Optional[Any]:
+        try:
+            value = await self.backend.get(namespace, key)
+        except Exception as e:
+            self._failed("get", namespace, e)
+            return None
+        self.counters["hits" if value is not None else "misses"] += 1
+        return value
+
+    async def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None, max_entries: Optional[int] = None) -> None:
+        try:
+            await self.backend.set(namespace, key, value, ttl=ttl, max_entries=max_entries)
+            self.counters["writes"] += 1
+        except Exception as e:
+            self._failed("set", namespace, e)
+
+    async def delete(self, namespace: str, key: str) -> None:
+        try:
+            await self.backend.delete(namespace, key)
+            self.counters["deletes"] += 1
+        except Exception as e:
+            self._failed("delete", namespace, e)
+
+    async def items(self, namespace: str) -> List[Tuple[str, Any]]:
+        try:
+            return await self.backend.items(namespace)
+        except Exception as e:
+            self._failed("items", namespace, e)
+            return []
+
+    def start(self, interval_seconds: float = STATE_PURGE_INTERVAL_SECONDS) -> None:
+        if self._purge_task is None or self._purge_task.done():
+            self._purge_task = asyncio.create_task(self._purge_loop(interval_seconds))
+
+    async def _purge_loop(self, interval_seconds: float) -> None:
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                self.counters["purged"] += await self.backend.purge_expired()
+            except Exception as e:
+                self._failed("purge", "*", e)
+
+    async def stop(self) -> None:
+        if self._purge_task is not None:
+            self._purge_task.cancel()
+            try:
+                await self._purge_task
+            except asyncio.CancelledError:
+                pass
+            self._purge_task = None
+        try:
+            await self.backend.close()
+        except Exception as e:
+            self._failed("close", "*", e)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"backend": self.backend.name, "workers": worker_count(), **self.backend.describe(), **self.counters}
+
+
+def create_state_backend(kind: str = STATE_BACKEND):
+    """Backend for STATE_BACKEND; "auto" is local for one worker, else redis (with REDIS_HOST) or sqlite."""
+    redis_host = os.getenv("REDIS_HOST")
+    if kind == "auto":
+        if redis_host and (worker_count() > 1 or STATE_SHARED_ACROSS_INSTANCES):
+            kind = "redis"
+        else:
+            kind = "sqlite" if worker_count() > 1 else "local"
+    if kind == "redis":
+        if not redis_host:
+            raise ValueError("STATE_BACKEND=redis requires REDIS_HOST")
+        import redis.asyncio as redis_async
+        client = redis_async.Redis(host=redis_host, port=int(os.getenv("REDIS_PORT", "6379")), db=0)
+        return RedisStateBackend(client)
+    if kind == "sqlite":
+        return SQLiteStateBackend(STATE_SQLITE_PATH or None)
+    if kind == "local":
+        return LocalStateBackend()
+    raise ValueError(f"Unknown STATE_BACKEND '{kind}' (expected local, sqlite, redis or auto)")
+
+
+# Global singleton instance
+state_store = StateStore()
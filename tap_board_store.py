@@ -0,0 +1,98 @@
+"""
+Per-board Firestore storage for the tap interface.
+
+Layout under tap_interface_config/boards_config:
+
+    boards_config                 manifest: board_order, board_versions {id: version},
+                                  board_settings, boards_storage="per_board"
+    boards_config/boards/{doc}    one document per board: board, board_id, version
+
+Editing one board writes that board's document plus one manifest field in a single
+batch, instead of re-chunking and rewriting every board. The versioning and caching
+are versioned_item_store.py's; this module configures it for boards and migrates the
+older inline/chunked layouts.
+"""
+
+import copy
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from firestore_write_pipeline import delete_collection
+from versioned_item_store import VersionedItemStore
+
+PER_BOARD_STORAGE = "per_board"
+BOARDS_SUBCOLLECTION = "boards"
+DEFAULT_MAX_CACHED_USERS = 256
+# Board documents can approach the 1 MiB document limit; keep one commit well under 10 MiB.
+BOARD_DOCS_PER_BATCH = 8
+
+
+class TapBoardStore(VersionedItemStore):
+    noun = "board"
+    subcollection = BOARDS_SUBCOLLECTION
+    order_field = "board_order"
+    versions_field = "board_versions"
+    count_field = "boards_count"
+    storage_field = "boards_storage"
+    storage_value = PER_BOARD_STORAGE
+    timestamp_field = "updated_at"
+    docs_per_batch = BOARD_DOCS_PER_BATCH
+
+    def __init__(self, max_cached_users: int = DEFAULT_MAX_CACHED_USERS):
+        super().__init__(max_cached_users)
+
+    def item_key(self, item: Any) -> str:
+        return str(item.get("id") or "").strip() if isinstance(item, dict) else ""
+
+    def cache_form(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        return copy.deepcopy(item)
+
+    def from_cache(self, cached: Dict[str, Any]) -> Dict[str, Any]:
+        return copy.deepcopy(cached)
+
+    def item_payload(self, key: str, cached: Dict[str, Any], version: int, timestamp: Any) -> Dict[str, Any]:
+        return {"board_id": key, "board": cached, "version": version, "updated_at": timestamp}
+
+    def read_payload(self, data: Dict[str, Any]) -> Optional[Tuple[str, Dict[str, Any]]]:
+        board = data.get("board")
+        board_id = str(data.get("board_id") or "")
+        return (board_id, board) if isinstance(board, dict) and board_id else None
+
+    def timestamp(self) -> str:
+        return datetime.now().isoformat()
+
+    def has_per_board_layout(self, user_key: Tuple[str, str]) -> bool:
+        return self.has_per_item_layout(user_key)
+
+    async def load_boards(self, db, manifest_ref, manifest: Dict[str, Any], user_key: Tuple[str, str]) -> List[Dict[str, Any]]:
+        return await self.load_items(db, manifest_ref, manifest, user_key)
+
+    async def save_board(
+        self, db, manifest_ref, board: Dict[str, Any], user_key: Tuple[str, str],
+        previous_version: Any = None, manifest_updates: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        """Write one board and its manifest entry atomically. Returns the new version."""
+        return await self.save_item(
+            db, manifest_ref, board, user_key, previous_version=previous_version, manifest_updates=manifest_updates
+        )
+
+    async def delete_board(
+        self, db, manifest_ref, board_id: str, user_key: Tuple[str, str],
+        manifest_updates: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        await self.delete_item(db, manifest_ref, board_id, user_key, manifest_updates=manifest_updates)
+
+    async def save_all(
+        self, db, manifest_ref, boards: List[Dict[str, Any]], manifest_fields: Dict[str, Any],
+        previous_manifest: Optional[Dict[str, Any]], user_key: Tuple[str, str],
+    ) -> Dict[str, int]:
+        """Make storage match `boards`. Migrates older layouts."""
+        result = await self.save_all_items(db, manifest_ref, boards, user_key, previous_manifest, manifest_fields)
+        # Boards used to live inline or in boards_chunks; the chunks are no longer read.
+        if previous_manifest is not None and str(previous_manifest.get("boards_storage") or "").lower() == "chunked":
+            await delete_collection(db, manifest_ref.collection("boards_chunks"), label="boards_chunks")
+        return result
+
+
+# Global singleton instance
+tap_board_store = TapBoardStore()
@@ -3,13 +3,17 @@
 from __future__ import annotations
 
 import os
+import pathlib
+import shutil
 import sqlite3
 import tempfile
 import zipfile
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Older SQLite builds allow at most 999 bound parameters per statement.
+SYMBOL_FETCH_BATCH_SIZE = 500
 
 
 @dataclass
@@ -46,20 +50,28 @@ def _normalize_filename(filename: str) -> str:
     return base if base else "touchchat_export.ce.zip"
 
 
-def _find_first_file_with_suffix(root: str, suffix: str) -> Optional[str]:
-    for current_root, _dirs, files in os.walk(root):
-        for name in files:
-            if name.lower().endswith(suffix.lower()):
-                return os.path.join(current_root, name)
+def _extract_first_member_with_suffix(zf: zipfile.ZipFile, temp_dir: str, suffix: str) -> Optional[str]:
+    for info in zf.infolist():
+        if not info.is_dir() and info.filename.lower().endswith(suffix.lower()):
+            return zf.extract(info, temp_dir)
     return None
 
 
+def _connect_readonly(path: str) -> sqlite3.Connection:
+    """Open an exported TouchChat database read-only (no journal, no write locks)."""
+    uri = pathlib.Path(os.path.abspath(path)).as_uri() + "?mode=ro"
+    conn = sqlite3.connect(uri, uri=True)
+    # The parse makes several passes over the same tables; map the file instead of re-reading pages.
+    conn.execute("PRAGMA mmap_size = 268435456")
+    return conn
+
+
 def _load_embedded_symbol_rids(c4s_path: Optional[str]) -> set[str]:
     """Load all symbol RIDs physically embedded in Images.c4s."""
     if not c4s_path:
         return set()
 
-    conn = sqlite3.connect(c4s_path)
+    conn = _connect_readonly(c4s_path)
     try:
         cur = conn.execute("SELECT rid FROM symbols")
         return {str(rid).strip() for (rid,) in cur.fetchall() if rid}
@@ -421,23 +433,35 @@ def _load_board_cells(conn: sqlite3.Connection) -> List[Dict[str, Any]]:
 
 def parse_touchchat_ce_upload(file_bytes: bytes, filename: str) -> TouchChatExtraction:
     """Extract and parse a TouchChat CE archive into normalized board/button data."""
-    temp_dir = tempfile.mkdtemp(prefix="touchchat_migration_")
-    archive_name = _normalize_filename(filename)
-    archive_path = os.path.join(temp_dir, archive_name)
-
-    with open(archive_path, "wb") as f:
+    with tempfile.NamedTemporaryFile(prefix="touchchat_upload_", suffix=".zip", delete=False) as f:
         f.write(file_bytes)
+        archive_path = f.name
+    try:
+        return parse_touchchat_ce_archive(archive_path, filename)
+    finally:
+        os.remove(archive_path)
 
-    with zipfile.ZipFile(archive_path, "r") as zf:
-        zf.extractall(temp_dir)
 
-    c4v_path = _find_first_file_with_suffix(temp_dir, ".c4v")
-    if not c4v_path:
-        raise ValueError("TouchChat export does not include a .c4v vocabulary database")
+def parse_touchchat_ce_archive(archive_path: str, filename: str) -> TouchChatExtraction:
+    """
+    Parse a TouchChat CE archive already on disk (a module-level function taking a
+    path, so it can run in a worker process without shipping the upload over a pipe).
+    Only the .c4v vocabulary and .c4s symbol databases are extracted.
+    """
+    temp_dir = tempfile.mkdtemp(prefix="touchchat_migration_")
+    archive_name = _normalize_filename(filename)
 
-    c4s_path = _find_first_file_with_suffix(temp_dir, ".c4s")
+    try:
+        with zipfile.ZipFile(archive_path, "r") as zf:
+            c4v_path = _extract_first_member_with_suffix(zf, temp_dir, ".c4v")
+            if not c4v_path:
+                raise ValueError("TouchChat export does not include a .c4v vocabulary database")
+            c4s_path = _extract_first_member_with_suffix(zf, temp_dir, ".c4s")
+        conn = _connect_readonly(c4v_path)
+    except Exception:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
 
-    conn = sqlite3.connect(c4v_path)
     try:
         embedded_symbol_rids = _load_embedded_symbol_rids(c4s_path)
 
@@ -593,34 +617,43 @@ def parse_touchchat_ce_upload(file_bytes: bytes, filename: str) -> TouchChatExtr
         )
     except Exception:
         # Caller owns temp cleanup on success; on parse failure clean here.
-        try:
-            import shutil
-            shutil.rmtree(temp_dir, ignore_errors=True)
-        except Exception:
-            pass
+        shutil.rmtree(temp_dir, ignore_errors=True)
         raise
     finally:
         conn.close()
 
 
-def load_symbol_png_bytes(c4s_path: Optional[str], symbol_rid: Optional[str]) -> Optional[bytes]:
-    """Return raw PNG bytes for a symbol RID if available and directly PNG-encoded."""
-    if not c4s_path or not symbol_rid:
-        return None
+def load_symbol_pngs(c4s_path: Optional[str], symbol_rids: Iterable[Optional[str]]) -> Dict[str, bytes]:
+    """
+    Return raw PNG bytes by symbol RID for every requested symbol that is embedded and
+    directly PNG-encoded. One read-only connection and a batched `rid IN (...)` query,
+    however many symbols a board set uses.
+    """
+    rids = sorted({str(rid).strip() for rid in symbol_rids if rid and str(rid).strip()})
+    if not c4s_path or not rids:
+        return {}
 
-    conn = sqlite3.connect(c4s_path)
+    pngs: Dict[str, bytes] = {}
+    conn = _connect_readonly(c4s_path)
     try:
-        cur = conn.execute(
-            "SELECT data FROM symbols WHERE rid = ? LIMIT 1",
-            (str(symbol_rid).strip(),),
-        )
-        row = cur.fetchone()
-        if not row or row[0] is None:
-            return None
-
-        blob = bytes(row[0])
-        if blob.startswith(PNG_SIGNATURE):
-            return blob
-        return None
+        for start in range(0, len(rids), SYMBOL_FETCH_BATCH_SIZE):
+            batch = rids[start:start + SYMBOL_FETCH_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            cur = conn.execute(f"SELECT rid, data FROM symbols WHERE rid IN ({placeholders})", batch)
+            for rid, data in cur:
+                key = str(rid).strip()
+                if data is None or key in pngs:
+                    continue
+                blob = bytes(data)
+                if blob.startswith(PNG_SIGNATURE):
+                    pngs[key] = blob
+        return pngs
     finally:
         conn.close()
+
+
+def load_symbol_png_bytes(c4s_path: Optional[str], symbol_rid: Optional[str]) -> Optional[bytes]:
+    """Return raw PNG bytes for a symbol RID if available and directly PNG-encoded."""
+    if not c4s_path or not symbol_rid:
+        return None
+    return load_symbol_pngs(c4s_path, [symbol_rid]).get(str(symbol_rid).strip())
@@ -0,0 +1,234 @@
+"""
+Shared translation memory for AAC page/board/UI strings.
+
+Most strings sent for translation are the same default boards and UI labels for
+every user, so each (source_locale, target_locale, normalized text) translation
+is stored once in Firestore (TRANSLATION_MEMORY_COLLECTION) behind an
+in-process LRU:
+
+- lookup() answers from the LRU, then fetches the rest with one get_all per chunk;
+- translate() sends only the misses to the model, in fixed-size batches run
+  concurrently under a semaphore, and writes the new translations back;
+- store() is also used by AacGeminiTranslator (backfill scripts), so the server
+  and the scripts share one memory.
+
+A translation equal to its source is not stored: the model keeps text that is
+already in the target language, and the per-line fallback returns the source on
+failure, so such an entry can't be trusted.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+TRANSLATION_MEMORY_COLLECTION = "system/translation_memory/entries"
+TRANSLATION_MEMORY_VERSION = 1  # bump when the translation prompt changes meaningfully
+DEFAULT_LRU_SIZE = int(os.getenv("TRANSLATION_MEMORY_LRU_SIZE", "20000"))
+DEFAULT_BATCH_SIZE = 60
+DEFAULT_BATCH_CONCURRENCY = int(os.getenv("TRANSLATION_BATCH_CONCURRENCY", "4"))
+LOOKUP_CHUNK_SIZE = 100
+WRITE_CHUNK_SIZE = 400
+
+MemoryKey = Tuple[str, str, str]
+
+
+def normalize_text(text: Any) -> str:
+    """Whitespace-collapsed, NFC-normalized text. Case and punctuation are kept: they change the translation."""
+    return unicodedata.normalize("NFC", " ".join(str(text or "").split()))
+
+
+def _locale_key(locale: Optional[str]) -> str:
+    return str(locale or "").strip().lower() or "auto"
+
+
+def _doc_id(key: MemoryKey) -> str:
+    raw = f"v{TRANSLATION_MEMORY_VERSION}\x1f{key[0]}\x1f{key[1]}\x1f{key[2]}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class TranslationMemory:
+    def __init__(self, max_entries: int = DEFAULT_LRU_SIZE):
+        self.max_entries = max_entries
+        self._lru: "OrderedDict[MemoryKey, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {
+            "lookups": 0,
+            "lru_hits": 0,
+            "firestore_hits": 0,
+            "misses": 0,
+            "stored": 0,
+            "batches_dispatched": 0,
+            "batch_errors": 0,
+            "firestore_errors": 0,
+        }
+
+    # --- LRU -----------------------------------------------------------
+
+    def _get_local(self, key: MemoryKey) -> Optional[str]:
+        with self._lock:
+            value = self._lru.get(key)
+            if value is not None:
+                self._lru.move_to_end(key)
+            return value
+
+    def _put_local(self, key: MemoryKey, value: str) -> None:
+        with self._lock:
+            self._lru[key] = value
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    # --- Firestore-backed lookups and writes (blocking) ----------------
+
+    def lookup(self, db, source_locale: Optional[str], target_locale: str, texts: Iterable[str]) -> Dict[str, str]:
+        """Known translations for `texts` (already normalized), keyed by text."""
+        src, tgt = _locale_key(source_locale), _locale_key(target_locale)
+        found: Dict[str, str] = {}
+        pending: Dict[str, str] = {}  # doc id -> text
+        for text in texts:
+            if not text:
+                continue
+            self.counters["lookups"] += 1
+            cached = self._get_local((src, tgt, text))
+            if cached is not None:
+                found[text] = cached
+                self.counters["lru_hits"] += 1
+            else:
+                pending[_doc_id((src, tgt, text))] = text
+
+        if pending and db is not None:
+            collection = db.collection(TRANSLATION_MEMORY_COLLECTION)
+            doc_ids = list(pending)
+            try:
+                for start in range(0, len(doc_ids), LOOKUP_CHUNK_SIZE):
+                    refs = [collection.document(doc_id) for doc_id in doc_ids[start:start + LOOKUP_CHUNK_SIZE]]
+                    for snap in db.get_all(refs):
+                        if not snap.exists:
+                            continue
+                        text = pending.get(snap.id)
+                        translation = (snap.to_dict() or {}).get("translation")
+                        if text is not None and isinstance(translation, str) and translation:
+                            found[text] = translation
+                            self._put_local((src, tgt, text), translation)
+                            self.counters["firestore_hits"] += 1
+            except Exception as e:
+                # The memory is an optimization; a lookup failure just means more model calls.
+                self.counters["firestore_errors"] += 1
+                logging.warning(f"Translation memory lookup failed ({src}->{tgt}): {e}")
+
+        self.counters["misses"] += sum(1 for text in pending.values() if text not in found)
+        return found
+
+    def store(
+        self, db, source_locale: Optional[str], target_locale: str, translations: Dict[str, str], model: Optional[str] = None
+    ) -> int:
+        """Remember new translations (source text -> translation). Returns how many were written to Firestore."""
+        src, tgt = _locale_key(source_locale), _locale_key(target_locale)
+        entries = []
+        for text, translation in translations.items():
+            text, translation = normalize_text(text), str(translation or "").strip()
+            if not text or not translation or normalize_text(translation) == text:
+                continue
+            self._put_local((src, tgt, text), translation)
+            entries.append((_doc_id((src, tgt, text)), {
+                "source_locale": src,
+                "target_locale": tgt,
+                "source_text": text,
+                "translation": translation,
+                "model": model,
+                "version": TRANSLATION_MEMORY_VERSION,
+            }))
+        if not entries or db is None:
+            return 0
+
+        collection = db.collection(TRANSLATION_MEMORY_COLLECTION)
+        stored = 0
+        try:
+            for start in range(0, len(entries), WRITE_CHUNK_SIZE):
+                batch = db.batch()
+                chunk = entries[start:start + WRITE_CHUNK_SIZE]
+                for doc_id, payload in chunk:
+                    batch.set(collection.document(doc_id), payload)
+                batch.commit()
+                stored += len(chunk)
+        except Exception as e:
+            self.counters["firestore_errors"] += 1
+            logging.warning(f"Translation memory write failed ({src}->{tgt}): {e}")
+        self.counters["stored"] += stored
+        return stored
+
+    # --- memory-first translation --------------------------------------
+
+    async def translate(
+        self,
+        db,
+        lines: List[str],
+        source_locale: Optional[str],
+        target_locale: str,
+        translate_batch: Callable[[List[str]], Awaitable[List[str]]],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+        model: Optional[str] = None,
+    ) -> List[str]:
+        """
+        Translate `lines` (same length and order in the result), calling `translate_batch`
+        only for strings the memory doesn't know. Batches that succeed are stored even
+        if another batch fails; the first failure is then re-raised.
+        """
+        keys = [normalize_text(line) for line in lines]
+        # The model gets the first original spelling of each string (line breaks in prompts matter).
+        originals: Dict[str, str] = {}
+        for key, line in zip(keys, lines):
+            if key and key not in originals:
+                originals[key] = str(line).strip()
+        unique = list(originals)
+        known = await asyncio.to_thread(self.lookup, db, source_locale, target_locale, unique) if unique else {}
+        misses = [text for text in unique if text not in known]
+
+        if misses:
+            semaphore = asyncio.Semaphore(max(1, max_concurrency))
+            batches = [misses[i:i + batch_size] for i in range(0, len(misses), batch_size)]
+
+            async def run_batch(batch: List[str]) -> List[str]:
+                async with semaphore:
+                    self.counters["batches_dispatched"] += 1
+                    translated = await translate_batch([originals[text] for text in batch])
+                    if len(translated) != len(batch):
+                        raise ValueError("Translation batch returned unexpected line count")
+                    return translated
+
+            results = await asyncio.gather(*(run_batch(batch) for batch in batches), return_exceptions=True)
+            fresh: Dict[str, str] = {}
+            first_error: Optional[BaseException] = None
+            for batch, result in zip(batches, results):
+                if isinstance(result, BaseException):
+                    self.counters["batch_errors"] += 1
+                    first_error = first_error or result
+                    continue
+                for text, translated in zip(batch, result):
+                    fresh[text] = str(translated or "").strip()
+            if fresh:
+                await asyncio.to_thread(self.store, db, source_locale, target_locale, fresh, model)
+                known.update({text: value for text, value in fresh.items() if value})
+            if first_error is not None:
+                raise first_error
+            logging.info(
+                f"🌐 Translation memory {source_locale or 'auto'}->{target_locale}: "
+                f"{len(unique) - len(misses)}/{len(unique)} strings reused, {len(batches)} batch(es) sent"
+            )
+
+        return [(known.get(key) or originals[key]) if key else "" for key in keys]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = len(self._lru)
+        return {"lru_entries": entries, "lru_max_entries": self.max_entries, **self.counters}
+
+
+# Global singleton instance
+translation_memory = TranslationMemory()
@@ -0,0 +1,309 @@
+"""
+Content-addressed cache for synthesized speech (WAV).
+
+AAC users repeat the same phrases constantly ("yes", "I want", greetings), so
+/play-audio keys every synthesis by HMAC-SHA256(text, voice, rate, language,
+provider) and serves repeats from:
+
+1. memory: byte-bounded LRU of recent WAVs
+2. disk: TTS_CACHE_DIR (defaults to a temp dir), size-bounded with LRU eviction
+3. GCS (optional): a bucket shared by all instances, configured at startup
+
+Concurrent requests for the same key share a single synthesis.
+
+Keys appear in public /tts-audio/<key>.wav URLs, so they are keyed with a
+server-side secret: without it, anyone could hash a guessed phrase and voice to
+learn whether it was spoken and fetch the audio. Set TTS_CACHE_KEY_SECRET (the
+same value on every instance) when the GCS tier is shared; otherwise a random
+secret is kept next to the disk tier, shared by this host's workers.
+"""
+
+import asyncio
+import functools
+import hashlib
+import hmac
+import io
+import logging
+import os
+import tempfile
+import threading
+import wave
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+DEFAULT_MEMORY_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_DISK_MAX_BYTES = 512 * 1024 * 1024
+# Entries keyed by the old unsalted sha256 lived directly under tts-cache/ and in
+# the top level of the disk dir; they are never served.
+GCS_PREFIX = "tts-cache/hmac/"
+DISK_SUBDIR = "hmac"
+_SECRET_FILENAME = ".key_secret"
+
+
+def _default_disk_dir() -> str:
+    return os.getenv("TTS_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "tts_audio_cache")
+
+
+@functools.lru_cache(maxsize=1)
+def _key_secret() -> bytes:
+    secret = os.getenv("TTS_CACHE_KEY_SECRET", "").strip()
+    if secret:
+        return secret.encode("utf-8")
+    disk_dir = _default_disk_dir()
+    os.makedirs(disk_dir, exist_ok=True)
+    path = os.path.join(disk_dir, _SECRET_FILENAME)
+    try:
+        # O_EXCL: the first worker on the host creates it, the others read it
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(os.urandom(32).hex())
+    except FileExistsError:
+        pass
+    with open(path) as f:
+        secret = f.read().strip()
+    if not secret:
+        raise RuntimeError(f"TTS cache key secret file {path} is empty")
+    logging.warning("⚠️ TTS_CACHE_KEY_SECRET not set: TTS cache keys are specific to this host")
+    return secret.encode("utf-8")
+
+
+def tts_cache_key(text: str, voice_name: str, rate: Any, language_code: Optional[str], provider: str) -> str:
+    raw = "\x1f".join([text or "", voice_name or "", str(rate or ""), language_code or "", provider or ""])
+    return hmac.new(_key_secret(), raw.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def wav_sample_rate(wav_bytes: bytes, default: int = 24000) -> int:
+    try:
+        with wave.open(io.BytesIO(wav_bytes), "rb") as wf:
+            return wf.getframerate()
+    except Exception:
+        return default
+
+
+class TtsAudioCache:
+    def __init__(
+        self,
+        disk_dir: Optional[str] = None,
+        memory_max_bytes: int = DEFAULT_MEMORY_MAX_BYTES,
+        disk_max_bytes: int = DEFAULT_DISK_MAX_BYTES,
+    ):
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self.disk_dir = disk_dir or _default_disk_dir()
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        # key -> size; order is least-recently-used first
+        self._disk_index: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._disk_ready = False
+        self._lock = threading.Lock()
+        self._bucket = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.counters: Dict[str, int] = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "gcs_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "disk_evictions": 0,
+            "errors": 0,
+        }
+
+    def configure_bucket(self, bucket) -> None:
+        """Attach a google.cloud.storage Bucket as the shared tier (None to detach)."""
+        self._bucket = bucket
+
+    # --- disk tier -----------------------------------------------------
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, DISK_SUBDIR, f"{key}.wav")
+
+    def _ensure_disk_index(self) -> None:
+        if self._disk_ready:
+            return
+        os.makedirs(os.path.join(self.disk_dir, DISK_SUBDIR), exist_ok=True)
+        # Drop entries stored under the old guessable keys
+        for entry in os.scandir(self.disk_dir):
+            if entry.is_file() and entry.name.endswith(".wav"):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+        entries = []
+        for entry in os.scandir(os.path.join(self.disk_dir, DISK_SUBDIR)):
+            if entry.is_file() and entry.name.endswith(".wav"):
+                stat = entry.stat()
+                entries.append((stat.st_atime, entry.name[:-4], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk_index[key] = size
+            self._disk_bytes += size
+        self._disk_ready = True
+
+    def disk_path_if_cached(self, key: str) -> Optional[str]:
+        with self._lock:
+            self._ensure_disk_index()
+            if key not in self._disk_index:
+                return None
+            self._disk_index.move_to_end(key)
+        path = self._disk_path(key)
+        return path if os.path.exists(path) else None
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        path = self.disk_path_if_cached(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            with self._lock:
+                self._disk_bytes -= self._disk_index.pop(key, 0)
+            return None
+
+    def _write_disk(self, key: str, wav_bytes: bytes) -> None:
+        with self._lock:
+            self._ensure_disk_index()
+            if key in self._disk_index:
+                self._disk_index.move_to_end(key)
+                return
+        tmp_path = f"{self._disk_path(key)}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(wav_bytes)
+        os.replace(tmp_path, self._disk_path(key))
+        evict = []
+        with self._lock:
+            self._disk_index[key] = len(wav_bytes)
+            self._disk_bytes += len(wav_bytes)
+            while self._disk_bytes > self.disk_max_bytes and len(self._disk_index) > 1:
+                old_key, old_size = self._disk_index.popitem(last=False)
+                self._disk_bytes -= old_size
+                evict.append(old_key)
+        for old_key in evict:
+            try:
+                os.remove(self._disk_path(old_key))
+                self.counters["disk_evictions"] += 1
+            except OSError:
+                pass
+
+    # --- memory tier ---------------------------------------------------
+
+    def _memory_get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            wav_bytes = self._memory.get(key)
+            if wav_bytes is not None:
+                self._memory.move_to_end(key)
+            return wav_bytes
+
+    def _memory_put(self, key: str, wav_bytes: bytes) -> None:
+        if len(wav_bytes) > self.memory_max_bytes // 4:
+            return  # one long announcement should not flush the whole tier
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return
+            self._memory[key] = wav_bytes
+            self._memory_bytes += len(wav_bytes)
+            while self._memory_bytes > self.memory_max_bytes and self._memory:
+                _, old = self._memory.popitem(last=False)
+                self._memory_bytes -= len(old)
+
+    # --- public API ----------------------------------------------------
+
+    async def get(self, key: str) -> Optional[bytes]:
+        wav_bytes = self._memory_get(key)
+        if wav_bytes is not None:
+            self.counters["memory_hits"] += 1
+            return wav_bytes
+        try:
+            wav_bytes = await asyncio.to_thread(self._read_disk, key)
+        except Exception as e:
+            self.counters["errors"] += 1
+            logging.warning(f"TTS cache disk read failed for {key[:12]}: {e}")
+            wav_bytes = None
+        if wav_bytes is not None:
+            self.counters["disk_hits"] += 1
+            self._memory_put(key, wav_bytes)
+            return wav_bytes
+        if self._bucket is not None:
+            try:
+                blob = self._bucket.blob(f"{GCS_PREFIX}{key}.wav")
+                wav_bytes = await asyncio.to_thread(_download_if_exists, blob)
+            except Exception as e:
+                self.counters["errors"] += 1
+                logging.warning(f"TTS cache GCS read failed for {key[:12]}: {e}")
+                wav_bytes = None
+            if wav_bytes is not None:
+                self.counters["gcs_hits"] += 1
+                self._memory_put(key, wav_bytes)
+                await self._store_disk(key, wav_bytes)
+                return wav_bytes
+        return None
+
+    async def _store_disk(self, key: str, wav_bytes: bytes) -> None:
+        try:
+            await asyncio.to_thread(self._write_disk, key, wav_bytes)
+        except Exception as e:
+            self.counters["errors"] += 1
+            logging.warning(f"TTS cache disk write failed for {key[:12]}: {e}")
+
+    async def put(self, key: str, wav_bytes: bytes) -> None:
+        self._memory_put(key, wav_bytes)
+        await self._store_disk(key, wav_bytes)
+        if self._bucket is not None:
+            try:
+                blob = self._bucket.blob(f"{GCS_PREFIX}{key}.wav")
+                await asyncio.to_thread(blob.upload_from_string, wav_bytes, content_type="audio/wav")
+            except Exception as e:
+                self.counters["errors"] += 1
+                logging.warning(f"TTS cache GCS write failed for {key[:12]}: {e}")
+
+    async def get_or_synthesize(self, key: str, synthesize: Callable[[], Awaitable[bytes]]) -> Tuple[bytes, str]:
+        """
+        Returns (wav_bytes, status) where status is "hit", "coalesced" or "miss".
+        `synthesize` must return complete WAV bytes; it runs at most once per key at a time.
+        """
+        wav_bytes = await self.get(key)
+        if wav_bytes is not None:
+            return wav_bytes, "hit"
+
+        existing = self._inflight.get(key)
+        if existing is not None:
+            self.counters["coalesced"] += 1
+            return await asyncio.shield(existing), "coalesced"
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            self.counters["misses"] += 1
+            wav_bytes = await synthesize()
+            await self.put(key, wav_bytes)
+            future.set_result(wav_bytes)
+            return wav_bytes, "miss"
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # waiters re-raise it; avoid "never retrieved" noise
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_entries": len(self._disk_index),
+                "disk_bytes": self._disk_bytes,
+                "gcs_enabled": self._bucket is not None,
+                "inflight": len(self._inflight),
+                **self.counters,
+            }
+
+
+def _download_if_exists(blob) -> Optional[bytes]:
+    if not blob.exists():
+        return None
+    return blob.download_as_bytes()
+
+
+# Global singleton instance
+tts_audio_cache = TtsAudioCache()
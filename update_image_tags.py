@@ -25,13 +25,17 @@ Filter to a specific mascot:
 
 Filter to a specific concept (category):
     python3 update_image_tags.py --project bravo-test-465400 --concept feelings --write
+
+Writes resume from the last checkpointed page if interrupted (--restart to start over).
 """
 
 import argparse
+import asyncio
 import re
-import sys
 from typing import Optional
 
+from migration_runner import MigrationHandler, MigrationRunner, add_runner_arguments
+
 # ── verb conjugation table ─────────────────────────────────────────────────────
 # Maps base (infinitive) → set of common inflected forms.
 # Used to enrich tags so "telling" / "told" both find the "tell" image.
@@ -552,15 +556,45 @@ def get_db(project_id: str):
     return firestore.client()
 
 
-def stream_documents(db, mascot: Optional[str], concept: Optional[str], source: str):
-    """Stream aac_images documents, optionally filtered."""
-    col = db.collection("aac_images")
-    query = col.where("source", "==", source)
-    if mascot:
-        query = query.where("mascot", "==", mascot)
-    if concept:
-        query = query.where("concept", "==", concept)
-    return query.stream()
+class TagRefresh(MigrationHandler):
+    def __init__(self, show_unchanged: bool = False):
+        self.show_unchanged = show_unchanged
+
+    async def process(self, doc) -> Optional[dict]:
+        data = doc.to_dict() or {}
+        concept   = str(data.get("concept",   "") or "")
+        subconcept = str(data.get("subconcept", "") or "")
+
+        if not concept or not subconcept:
+            # Nothing a rerun could fix; failing here would pin the checkpoint on this doc.
+            print(f"  [SKIP] {doc.id} — missing concept or subconcept")
+            return None
+
+        old_tags = sorted(set(data.get("tags", []) or []))
+        new_tags = compute_tags(concept, subconcept)
+
+        # Merge computed tags into existing ones — never remove manually-added tags
+        # (e.g. "bye I'll call you" added via add_bye_tags.py).
+        merged_tags = sorted(set(old_tags) | set(new_tags))
+
+        if merged_tags == old_tags:
+            if self.show_unchanged:
+                print(f"  [OK]   {doc.id}  {self._label(data)}")
+            return None
+
+        return {
+            "tags":         merged_tags,
+            "search_terms": merged_tags,
+        }
+
+    @staticmethod
+    def _label(data: dict) -> str:
+        return f"concept={data.get('concept')!r}  sub={data.get('subconcept')!r}  mascot={data.get('mascot') or '(none)'!r}"
+
+    def describe(self, doc, update: dict) -> str:
+        data = doc.to_dict() or {}
+        added = sorted(set(update["tags"]) - set(data.get("tags", []) or []))
+        return f"{self._label(data)}\n         + {added}"
 
 
 # ── main ───────────────────────────────────────────────────────────────────────
@@ -581,6 +615,7 @@ def main() -> None:
                         help="Document source filter (default: bravo_images)")
     parser.add_argument("--show-unchanged", action="store_true",
                         help="Also print docs whose tags are already correct")
+    add_runner_arguments(parser)
     args = parser.parse_args()
 
     mode = "WRITE" if args.write else "DRY RUN"
@@ -591,58 +626,23 @@ def main() -> None:
     print(f"Concept : {args.concept or '(all)'}")
     print()
 
-    db = get_db(args.project)
-    docs = list(stream_documents(db, args.mascot, args.concept, args.source))
-    print(f"Found {len(docs)} document(s) to evaluate.\n")
-
-    changed = 0
-    unchanged = 0
-    errors = 0
-
-    for doc in docs:
-        data = doc.to_dict()
-        concept   = str(data.get("concept",   "") or "")
-        subconcept = str(data.get("subconcept", "") or "")
-
-        if not concept or not subconcept:
-            print(f"  [SKIP] {doc.id} — missing concept or subconcept")
-            errors += 1
-            continue
-
-        old_tags = sorted(set(data.get("tags", []) or []))
-        new_tags = compute_tags(concept, subconcept)
-
-        # Merge computed tags into existing ones — never remove manually-added tags
-        # (e.g. "bye I'll call you" added via add_bye_tags.py).
-        merged_tags = sorted(set(old_tags) | set(new_tags))
-        added = sorted(set(new_tags) - set(old_tags))
-
-        label = f"concept={concept!r}  sub={subconcept!r}  mascot={data.get('mascot') or '(none)'!r}"
-
-        if not added:
-            unchanged += 1
-            if args.show_unchanged:
-                print(f"  [OK]   {doc.id}  {label}")
-            continue
-
-        changed += 1
-        print(f"  [DIFF] {doc.id}  {label}")
-        print(f"         + {added}")
-
-        if args.write:
-            try:
-                doc.reference.update({
-                    "tags":         merged_tags,
-                    "search_terms": merged_tags,
-                })
-                print(f"         ✓ updated")
-            except Exception as exc:
-                print(f"         ✗ ERROR: {exc}", file=sys.stderr)
-                errors += 1
+    filters = [("source", "==", args.source)]
+    if args.mascot:
+        filters.append(("mascot", "==", args.mascot))
+    if args.concept:
+        filters.append(("concept", "==", args.concept))
+
+    runner = MigrationRunner.from_args(
+        get_db(args.project),
+        "update_image_tags",
+        TagRefresh(show_unchanged=args.show_unchanged),
+        args,
+        filters=filters,
+        dry_run=not args.write,
+    )
+    stats = asyncio.run(runner.run())
 
-    print()
-    print(f"Summary: {changed} tags added, {unchanged} unchanged, {errors} errors")
-    if not args.write and changed:
+    if not args.write and stats.updated:
         print("Run with --write to apply changes.")
     print("Note: existing manually-added tags are always preserved (never removed).")
 
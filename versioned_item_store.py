@@ -0,0 +1,348 @@
+"""
+Versioned one-document-per-item Firestore storage, shared by page_store.py (the
+/pages editor) and tap_board_store.py (tap interface boards).
+
+Layout under a parent ("manifest") document:
+
+    parent                        manifest: <order_field> [keys], <versions_field>
+                                  {key: version}, <count_field>,
+                                  <storage_field>=<storage_value>
+    parent/<subcollection>/{doc}  one document per item, holding its version
+
+Saving one item writes its document plus its manifest entry in a single batch.
+Loads read the manifest, then fetch only the items whose version differs from this
+instance's cached copy (parallel get_all chunks), so the cache stays correct when
+another instance wrote in between. save_all_items() rewrites only items that
+changed and deletes removed ones, item documents first.
+
+Subclasses set the field names as class attributes and say how an item is keyed,
+cached and stored.
+"""
+
+import asyncio
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.cloud import firestore
+
+from firestore_write_pipeline import FirestoreWritePipeline
+
+GET_ALL_CHUNK_SIZE = 100
+
+_SAFE_DOC_ID_RE = re.compile(r"^[A-Za-z0-9_\-]{1,200}$")
+
+
+def item_doc_id(key: str) -> str:
+    """Firestore document id for an item key (keys with spaces, '/' etc. are hashed)."""
+    if _SAFE_DOC_ID_RE.match(key) and not key.startswith("__"):
+        return key
+    return "h_" + hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def next_item_version(previous: Any = None) -> int:
+    # Microsecond clock, bumped past the previous value so versions only move forward.
+    try:
+        previous = int(previous or 0)
+    except (TypeError, ValueError):
+        previous = 0
+    return max(previous + 1, time.time_ns() // 1000)
+
+
+class _UserItems:
+    __slots__ = ("versions", "items", "per_item")
+
+    def __init__(self):
+        self.per_item = False
+        self.versions: Dict[str, Any] = {}
+        self.items: Dict[str, Any] = {}  # key -> cached form (see VersionedItemStore.cache_form)
+
+
+class VersionedItemStore:
+    """Override item_key(), cache_form(), from_cache(), item_payload() and read_payload()."""
+
+    noun = "item"
+    subcollection = "items"
+    order_field = "item_order"
+    versions_field = "item_versions"
+    count_field = "items_count"
+    storage_field = "items_storage"
+    storage_value = "per_item"
+    timestamp_field = "updated_at"
+    docs_per_batch = 50
+
+    def __init__(self, max_cached_users: int):
+        self.max_cached_users = max_cached_users
+        self._users: "OrderedDict[Tuple[str, str], _UserItems]" = OrderedDict()
+        self._lock = threading.Lock()
+        noun = self.noun
+        self.counters: Dict[str, int] = {
+            "loads": 0,
+            f"{noun}_cache_hits": 0,
+            f"{noun}_fetches": 0,
+            f"{noun}_writes": 0,
+            f"{noun}_deletes": 0,
+            f"unchanged_{noun}s_skipped": 0,
+        }
+
+    # --- item codec ----------------------------------------------------
+
+    def item_key(self, item: Any) -> str:
+        raise NotImplementedError
+
+    def cache_form(self, item: Dict[str, Any]) -> Any:
+        """What the cache keeps for an item; compared for equality to skip unchanged writes."""
+        raise NotImplementedError
+
+    def from_cache(self, cached: Any) -> Dict[str, Any]:
+        """A fresh copy of the item for the caller to mutate."""
+        raise NotImplementedError
+
+    def item_payload(self, key: str, cached: Any, version: int, timestamp: Any) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def read_payload(self, data: Dict[str, Any]) -> Optional[Tuple[str, Any]]:
+        """(key, cached form) from an item document, or None if it is unusable."""
+        raise NotImplementedError
+
+    def timestamp(self) -> Any:
+        return firestore.SERVER_TIMESTAMP
+
+    # --- manifest ------------------------------------------------------
+
+    def is_per_item_manifest(self, manifest: Optional[Dict[str, Any]]) -> bool:
+        return isinstance(manifest, dict) and str(manifest.get(self.storage_field) or "").lower() == self.storage_value
+
+    def _version_path(self, key: str) -> str:
+        return firestore.FieldPath(self.versions_field, key).to_api_repr()
+
+    def _item_ref(self, parent_ref, key: str):
+        return parent_ref.collection(self.subcollection).document(item_doc_id(key))
+
+    # --- cache ---------------------------------------------------------
+
+    def _user(self, user_key: Tuple[str, str]) -> _UserItems:
+        with self._lock:
+            entry = self._users.get(user_key)
+            if entry is None:
+                entry = self._users[user_key] = _UserItems()
+                while len(self._users) > self.max_cached_users:
+                    self._users.popitem(last=False)
+            else:
+                self._users.move_to_end(user_key)
+            return entry
+
+    def _remember(self, user_key: Tuple[str, str], key: str, version: Any, cached: Any) -> None:
+        entry = self._user(user_key)
+        with self._lock:
+            entry.versions[key] = version
+            entry.items[key] = cached
+
+    def _forget(self, user_key: Tuple[str, str], key: str) -> None:
+        entry = self._user(user_key)
+        with self._lock:
+            entry.versions.pop(key, None)
+            entry.items.pop(key, None)
+
+    def mark_layout(self, user_key: Tuple[str, str], per_item: bool) -> None:
+        self._user(user_key).per_item = per_item
+
+    def has_per_item_layout(self, user_key: Tuple[str, str]) -> bool:
+        """True if this instance last saw the user's items in per-item storage."""
+        with self._lock:
+            entry = self._users.get(user_key)
+            return entry is not None and entry.per_item
+
+    def invalidate(self, user_key: Tuple[str, str]) -> None:
+        with self._lock:
+            self._users.pop(user_key, None)
+
+    # --- reads ---------------------------------------------------------
+
+    async def load_items(self, db, parent_ref, manifest: Dict[str, Any], user_key: Tuple[str, str]) -> List[Dict[str, Any]]:
+        """Items in manifest order. Only items whose version changed are read from Firestore."""
+        self.counters["loads"] += 1
+        versions = manifest.get(self.versions_field) if isinstance(manifest.get(self.versions_field), dict) else {}
+        order = list(dict.fromkeys(str(k) for k in (manifest.get(self.order_field) or []) if str(k) in versions))
+        listed = set(order)
+        order.extend(sorted(k for k in versions if k not in listed))
+
+        entry = self._user(user_key)
+        entry.per_item = True
+        with self._lock:
+            stale = [k for k in order if entry.versions.get(k) != versions[k] or k not in entry.items]
+            # Drop items deleted elsewhere so the cache does not grow without bound.
+            for gone in [k for k in entry.versions if k not in versions]:
+                entry.versions.pop(gone, None)
+                entry.items.pop(gone, None)
+        self.counters[f"{self.noun}_cache_hits"] += len(order) - len(stale)
+
+        if stale:
+            refs = [self._item_ref(parent_ref, k) for k in stale]
+            chunks = [refs[i:i + GET_ALL_CHUNK_SIZE] for i in range(0, len(refs), GET_ALL_CHUNK_SIZE)]
+            results = await asyncio.gather(
+                *(asyncio.to_thread(lambda c=chunk: list(db.get_all(c))) for chunk in chunks)
+            )
+            self.counters[f"{self.noun}_fetches"] += len(refs)
+            for snapshots in results:
+                for snap in snapshots:
+                    if not snap.exists:
+                        continue
+                    data = snap.to_dict() or {}
+                    parsed = self.read_payload(data)
+                    if parsed is not None:
+                        with self._lock:
+                            entry.versions[parsed[0]] = data.get("version")
+                            entry.items[parsed[0]] = parsed[1]
+
+        with self._lock:
+            cached = [(key, entry.items.get(key)) for key in order]
+        items: List[Dict[str, Any]] = []
+        for key, value in cached:
+            if value is None:
+                logging.warning(f"{self.noun.capitalize()} '{key}' is listed in the manifest but its document is missing")
+                continue
+            items.append(self.from_cache(value))
+        return items
+
+    # --- writes --------------------------------------------------------
+
+    def _order_updates(self, key: str, order: Optional[List[str]], removing: bool = False) -> Dict[str, Any]:
+        if order is not None:
+            return {self.order_field: list(order), self.count_field: len(order)}
+        return {self.order_field: (firestore.ArrayRemove if removing else firestore.ArrayUnion)([key])}
+
+    async def save_item(
+        self, db, parent_ref, item: Dict[str, Any], user_key: Tuple[str, str],
+        previous_key: Optional[str] = None, order: Optional[List[str]] = None,
+        previous_version: Any = None, manifest_updates: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        """
+        Write one item and its manifest entry atomically. A rename (previous_key differs)
+        deletes the old item document in the same batch; pass order to keep the item's
+        position, otherwise a new key is appended. Returns the new version.
+        """
+        key = self.item_key(item)
+        if not key:
+            raise ValueError(f"{self.noun.capitalize()} key is required")
+        renamed = bool(previous_key) and previous_key != key
+        if renamed and order is None:
+            raise ValueError(f"The {self.noun} order is required when renaming a {self.noun}")
+        if previous_version is None:
+            entry = self._user(user_key)
+            with self._lock:
+                previous_version = entry.versions.get(key)
+        version = next_item_version(previous_version)
+        cached = self.cache_form(item)
+        timestamp = self.timestamp()
+
+        manifest_changes: Dict[str, Any] = {
+            self._version_path(key): version,
+            self.timestamp_field: timestamp,
+            **self._order_updates(key, order),
+        }
+        pipeline = FirestoreWritePipeline(db, label=self.noun)
+        pipeline.set(self._item_ref(parent_ref, key), self.item_payload(key, cached, version, timestamp))
+        if renamed:
+            pipeline.delete(self._item_ref(parent_ref, previous_key))
+            manifest_changes[self._version_path(previous_key)] = firestore.DELETE_FIELD
+        pipeline.update(parent_ref, {**manifest_changes, **(manifest_updates or {})})
+        await pipeline.commit()
+
+        self.counters[f"{self.noun}_writes"] += 1
+        if renamed:
+            self._forget(user_key, previous_key)
+        self._remember(user_key, key, version, cached)
+        return version
+
+    async def delete_item(
+        self, db, parent_ref, key: str, user_key: Tuple[str, str],
+        order: Optional[List[str]] = None, manifest_updates: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        pipeline = FirestoreWritePipeline(db, label=f"{self.noun} delete")
+        pipeline.delete(self._item_ref(parent_ref, key))
+        pipeline.update(parent_ref, {
+            self._version_path(key): firestore.DELETE_FIELD,
+            self.timestamp_field: self.timestamp(),
+            **self._order_updates(key, order, removing=True),
+            **(manifest_updates or {}),
+        })
+        await pipeline.commit()
+        self.counters[f"{self.noun}_deletes"] += 1
+        self._forget(user_key, key)
+
+    async def save_all_items(
+        self, db, parent_ref, items: List[Dict[str, Any]], user_key: Tuple[str, str],
+        previous_manifest: Optional[Dict[str, Any]], manifest_fields: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, int]:
+        """
+        Make storage match `items`. Items identical to the cached copy of the stored
+        version are skipped; removed items are deleted. The manifest is replaced by
+        manifest_fields plus the storage fields.
+        """
+        manifest_fields = manifest_fields or {}
+        timestamp = manifest_fields.get(self.timestamp_field) or self.timestamp()
+        stored_versions = (previous_manifest or {}).get(self.versions_field) if self.is_per_item_manifest(previous_manifest) else None
+        stored_versions = stored_versions if isinstance(stored_versions, dict) else {}
+
+        entry = self._user(user_key)
+        pipeline = FirestoreWritePipeline(db, label=f"{self.noun}s", max_batch_ops=self.docs_per_batch)
+        versions: Dict[str, Any] = {}
+        order: List[str] = []
+        written: List[Tuple[str, int, Any]] = []
+        skipped = 0
+        for item in items:
+            key = self.item_key(item)
+            if not key:
+                logging.warning(f"Skipping a {self.noun} without a key while saving {self.noun}s")
+                continue
+            if key in versions:
+                continue
+            order.append(key)
+            cached = self.cache_form(item)
+            stored = stored_versions.get(key)
+            with self._lock:
+                unchanged = stored is not None and entry.versions.get(key) == stored and entry.items.get(key) == cached
+            if unchanged:
+                versions[key] = stored
+                skipped += 1
+                continue
+            version = next_item_version(stored)
+            versions[key] = version
+            pipeline.set(self._item_ref(parent_ref, key), self.item_payload(key, cached, version, timestamp))
+            written.append((key, version, cached))
+
+        removed = [k for k in stored_versions if k not in versions]
+        for key in removed:
+            pipeline.delete(self._item_ref(parent_ref, key))
+
+        # Item documents first, so the manifest never points at a version that is not stored yet.
+        await pipeline.commit()
+        # set() without merge also drops fields of older layouts.
+        await asyncio.to_thread(parent_ref.set, {
+            **manifest_fields,
+            self.storage_field: self.storage_value,
+            self.order_field: order,
+            self.versions_field: versions,
+            self.count_field: len(order),
+            self.timestamp_field: timestamp,
+        })
+
+        entry.per_item = True
+        for key, version, cached in written:
+            self._remember(user_key, key, version, cached)
+        for key in removed:
+            self._forget(user_key, key)
+        self.counters[f"{self.noun}_writes"] += len(written)
+        self.counters[f"{self.noun}_deletes"] += len(removed)
+        self.counters[f"unchanged_{self.noun}s_skipped"] += skipped
+        return {"written": len(written), "deleted": len(removed), "unchanged": skipped}
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            cached_items = sum(len(e.items) for e in self._users.values())
+            return {"cached_users": len(self._users), f"cached_{self.noun}s": cached_items, **self.counters}
@@ -0,0 +1,72 @@
+"""
+Minimal WAV helpers for stitching synthesized speech segments.
+
+Google LINEAR16 and Azure riff-*-pcm responses are complete RIFF files. Joining
+them byte-for-byte leaves stray headers in the middle of the audio (audible clicks,
+and players trust the first header's data size, so later segments get truncated).
+extract_pcm() returns a zero-copy view of each segment's samples and
+assemble_wav() writes one header and joins everything in a single pass.
+"""
+
+import struct
+from functools import lru_cache
+from typing import Iterable, Tuple, Union
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+_WAVE_FORMAT_PCM = 1
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def extract_pcm(
+    audio: BytesLike, default_sample_rate: int = 24000, default_channels: int = 1, default_sampwidth: int = 2
+) -> Tuple[memoryview, int, int, int]:
+    """
+    Returns (pcm, sample_rate, channels, sample_width_bytes). RIFF/WAVE input is parsed
+    chunk by chunk; anything else is treated as raw PCM in the given default format.
+    """
+    view = memoryview(audio).cast("B")
+    if len(view) < 12 or view[0:4] != b"RIFF" or view[8:12] != b"WAVE":
+        return view, default_sample_rate, default_channels, default_sampwidth
+
+    sample_rate, channels, sampwidth = default_sample_rate, default_channels, default_sampwidth
+    offset = 12
+    while offset + 8 <= len(view):
+        chunk_id = view[offset:offset + 4].tobytes()
+        chunk_size = struct.unpack_from("<I", view, offset + 4)[0]
+        body = offset + 8
+        if chunk_id == b"fmt ":
+            fmt_tag, channels, sample_rate = struct.unpack_from("<HHI", view, body)
+            bits = struct.unpack_from("<H", view, body + 14)[0]
+            if fmt_tag not in (_WAVE_FORMAT_PCM, _WAVE_FORMAT_EXTENSIBLE):
+                raise ValueError(f"Unsupported WAV encoding (format tag {fmt_tag})")
+            sampwidth = bits // 8
+        elif chunk_id == b"data":
+            # Streaming encoders sometimes write 0 or 0xFFFFFFFF; trust the buffer length then.
+            end = len(view) if chunk_size in (0, 0xFFFFFFFF) else min(len(view), body + chunk_size)
+            return view[body:end], sample_rate, channels, sampwidth
+        offset = body + chunk_size + (chunk_size & 1)
+    raise ValueError("WAV data chunk not found")
+
+
+@lru_cache(maxsize=32)
+def silence_pcm(sample_rate: int, seconds: float, channels: int = 1, sampwidth: int = 2) -> bytes:
+    """Zeroed PCM for a pause. Cached: the same few (rate, duration) pairs repeat constantly."""
+    return bytes(int(sample_rate * seconds) * channels * sampwidth)
+
+
+def wav_header(data_size: int, sample_rate: int, channels: int = 1, sampwidth: int = 2) -> bytes:
+    block_align = channels * sampwidth
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_size, b"WAVE",
+        b"fmt ", 16, _WAVE_FORMAT_PCM, channels, sample_rate, sample_rate * block_align, block_align, sampwidth * 8,
+        b"data", data_size,
+    )
+
+
+def assemble_wav(segments: Iterable[BytesLike], sample_rate: int, channels: int = 1, sampwidth: int = 2) -> bytes:
+    """Builds one WAV file from PCM segments with a single allocation for the output."""
+    segments = list(segments)
+    data_size = sum(memoryview(s).nbytes for s in segments)
+    return b"".join([wav_header(data_size, sample_rate, channels, sampwidth), *segments])
@@ -0,0 +1,344 @@
+"""
+Local word completion for /api/freestyle/word-prediction.
+
+Spelling on an AAC device is keystroke-by-keystroke, so predictions must come back
+in a few milliseconds. WordPredictor answers from memory:
+
+- a radix (path-compressed) trie over a base lexicon seeded from WORD_VARIANTS and
+  CATEGORY_STATIC_POOLS. Every node keeps the top completions of its subtree, so a
+  prefix lookup is one walk down the trie and no subtree scan.
+- a per-user model with unigram and bigram counts learned from chat_history and
+  button_activity_log. It is built in the background on first use, refreshed after
+  USER_MODEL_TTL_SECONDS, and updated incrementally as the user speaks.
+
+The LLM path is only a supplement: words it returns are added to the user's model
+(at low weight) so that later keystrokes can use them.
+"""
+
+import asyncio
+import bisect
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+NODE_TOP_K = 48
+DEFAULT_MAX_USERS = 512
+USER_MODEL_TTL_SECONDS = 30 * 60
+MAX_BIGRAM_FOLLOWERS = 200
+
+# Score weights. Base lexicon weight is log(1 + number of pools the word appears in).
+USER_UNIGRAM_WEIGHT = 1.5
+USER_BIGRAM_WEIGHT = 3.0
+SUPPLEMENT_WEIGHT = 0.5
+EXACT_MATCH_BONUS = 100.0
+
+_TOKEN_RE = re.compile(r"[^\W\d_]+(?:['’][^\W\d_]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text or "")
+
+
+class _Node:
+    __slots__ = ("label", "edges", "word", "weight", "top")
+
+    def __init__(self, label: str = ""):
+        self.label = label  # edge label leading into this node
+        self.edges: Dict[str, "_Node"] = {}  # first character of child label -> child
+        self.word: Optional[str] = None  # lowercase word ending here
+        self.weight = 0.0
+        self.top: Tuple[Tuple[float, str], ...] = ()
+
+
+class RadixTrie:
+    """Path-compressed trie with per-node top-K completions. Read-only after build()."""
+
+    def __init__(self, top_k: int = NODE_TOP_K):
+        self.top_k = top_k
+        self._root = _Node()
+        self.size = 0
+
+    def build(self, weights: Dict[str, float]) -> "RadixTrie":
+        root = _Node()
+        for word, weight in weights.items():
+            node = root
+            for ch in word:
+                child = node.edges.get(ch)
+                if child is None:
+                    child = node.edges[ch] = _Node(ch)
+                node = child
+            node.word = word
+            node.weight = weight
+        nodes = self._compress(root)
+        # Children always come after their parent in `nodes`, so reverse order is post-order.
+        for node in reversed(nodes):
+            candidates = [(node.weight, node.word)] if node.word is not None else []
+            for child in node.edges.values():
+                candidates.extend(child.top)
+            candidates.sort(key=lambda item: (-item[0], item[1]))
+            node.top = tuple(candidates[: self.top_k])
+        self._root = root
+        self.size = len(weights)
+        return self
+
+    @staticmethod
+    def _compress(root: _Node) -> List[_Node]:
+        nodes, stack = [], [root]
+        while stack:
+            node = stack.pop()
+            nodes.append(node)
+            for ch, child in list(node.edges.items()):
+                # Merge chains of single-child, non-terminal nodes into one edge.
+                label = child.label
+                while child.word is None and len(child.edges) == 1:
+                    child = next(iter(child.edges.values()))
+                    label += child.label
+                child.label = label
+                node.edges[ch] = child
+                stack.append(child)
+        return nodes
+
+    def _walk(self, prefix: str) -> Optional[_Node]:
+        """Node whose subtree holds exactly the words starting with prefix."""
+        node, i = self._root, 0
+        while i < len(prefix):
+            child = node.edges.get(prefix[i])
+            if child is None:
+                return None
+            remaining = prefix[i:]
+            if remaining.startswith(child.label):
+                i += len(child.label)
+                node = child
+            elif child.label.startswith(remaining):
+                return child
+            else:
+                return None
+        return node
+
+    def completions(self, prefix: str) -> Tuple[Tuple[float, str], ...]:
+        """Top-K (weight, word) pairs for words starting with prefix (lowercase)."""
+        node = self._walk(prefix)
+        return node.top if node is not None else ()
+
+    def weight(self, word: str) -> float:
+        node = self._walk(word)
+        return node.weight if node is not None and node.word == word else 0.0
+
+
+class UserModel:
+    __slots__ = ("unigrams", "bigrams", "supplement", "sorted_words", "display", "max_predictions", "built_at")
+
+    def __init__(self, max_predictions: int = 20):
+        self.unigrams: Counter = Counter()
+        self.bigrams: Dict[str, Counter] = {}
+        self.supplement: Dict[str, float] = {}  # words learned from the LLM fallback
+        self.sorted_words: List[str] = []
+        self.display: Dict[str, str] = {}
+        self.max_predictions = max_predictions
+        self.built_at = time.monotonic()
+
+    def _add_word(self, key: str, surface: str) -> None:
+        if key not in self.display:
+            self.display[key] = surface
+            bisect.insort(self.sorted_words, key)
+
+    def observe(self, text: str) -> None:
+        previous = None
+        for surface in tokenize(text):
+            key = surface.lower()
+            self._add_word(key, surface)
+            self.unigrams[key] += 1
+            if previous is not None:
+                followers = self.bigrams.setdefault(previous, Counter())
+                followers[key] += 1
+                if len(followers) > MAX_BIGRAM_FOLLOWERS:
+                    # Keep the most frequent followers only; the long tail never ranks anyway.
+                    self.bigrams[previous] = Counter(dict(followers.most_common(MAX_BIGRAM_FOLLOWERS // 2)))
+            previous = key
+
+    def add_supplement(self, words: Iterable[str]) -> None:
+        for surface in words:
+            key = surface.lower()
+            if key and key not in self.supplement:
+                self._add_word(key, surface)
+                self.supplement[key] = SUPPLEMENT_WEIGHT
+
+    def words_with_prefix(self, prefix: str, limit: int = 256) -> List[str]:
+        start = bisect.bisect_left(self.sorted_words, prefix)
+        matches = []
+        for word in self.sorted_words[start:start + limit]:
+            if not word.startswith(prefix):
+                break
+            matches.append(word)
+        return matches
+
+
+class WordPredictor:
+    def __init__(self, max_users: int = DEFAULT_MAX_USERS, user_ttl_seconds: float = USER_MODEL_TTL_SECONDS):
+        self.max_users = max_users
+        self.user_ttl_seconds = user_ttl_seconds
+        self._trie = RadixTrie()
+        self._display: Dict[str, str] = {}
+        self._users: "OrderedDict[Tuple[str, str], UserModel]" = OrderedDict()
+        self._building: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {
+            "predictions": 0,
+            "personalized_predictions": 0,
+            "user_model_builds": 0,
+            "user_model_build_errors": 0,
+            "llm_supplements": 0,
+        }
+
+    # --- base lexicon --------------------------------------------------
+
+    def load_lexicon(self, category_pools: Dict[str, List[str]], word_variants: Dict[str, Dict[str, Any]]) -> None:
+        pool_counts: Counter = Counter()
+        display: Dict[str, str] = {}
+        for pool in (category_pools or {}).values():
+            seen_in_pool = set()
+            for phrase in pool or []:
+                for surface in tokenize(str(phrase)):
+                    key = surface.lower()
+                    display.setdefault(key, surface)
+                    seen_in_pool.add(key)
+            pool_counts.update(seen_in_pool)
+        for base, variants in (word_variants or {}).items():
+            for surface in [base, *((variants or {}).values())]:
+                if isinstance(surface, str):
+                    for token in tokenize(surface):
+                        key = token.lower()
+                        display.setdefault(key, token)
+                        pool_counts[key] += 0  # present with the minimum weight
+        weights = {word: math.log1p(count) + 0.1 for word, count in pool_counts.items()}
+        self._trie = RadixTrie().build(weights)
+        self._display = display
+        logging.info(f"📝 Word predictor lexicon loaded: {len(weights)} words")
+
+    # --- per-user models -----------------------------------------------
+
+    def get_user_model(self, user_key: Tuple[str, str]) -> Optional[UserModel]:
+        with self._lock:
+            model = self._users.get(user_key)
+            if model is not None:
+                self._users.move_to_end(user_key)
+            return model
+
+    def needs_build(self, user_key: Tuple[str, str]) -> bool:
+        model = self.get_user_model(user_key)
+        if user_key in self._building:
+            return False
+        return model is None or (time.monotonic() - model.built_at) > self.user_ttl_seconds
+
+    def ensure_user_model(
+        self, user_key: Tuple[str, str], loader: Callable[[], Awaitable[Tuple[List[str], int]]]
+    ) -> Optional[asyncio.Task]:
+        """
+        Start a background (re)build if the user has no model or it is stale. `loader`
+        returns (texts, max_predictions). The current model keeps serving meanwhile.
+        Returns the build task, or None when no build was needed.
+        """
+        if not self.needs_build(user_key):
+            return None
+        task = self._building[user_key] = asyncio.create_task(self._build_user_model(user_key, loader))
+        return task
+
+    async def _build_user_model(self, user_key, loader) -> None:
+        try:
+            texts, max_predictions = await loader()
+            model = UserModel(max_predictions=max_predictions)
+            for text in texts:
+                model.observe(text)
+            previous = self.get_user_model(user_key)
+            if previous is not None:
+                model.add_supplement(previous.display[w] for w in previous.supplement)
+            with self._lock:
+                self._users[user_key] = model
+                self._users.move_to_end(user_key)
+                while len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+            self.counters["user_model_builds"] += 1
+            logging.info(f"📝 Word predictor model built for {user_key[0]}/{user_key[1]}: {len(model.unigrams)} words")
+        except Exception as e:
+            self.counters["user_model_build_errors"] += 1
+            logging.error(f"Word predictor model build failed for {user_key[0]}/{user_key[1]}: {e}", exc_info=True)
+        finally:
+            self._building.pop(user_key, None)
+
+    def observe(self, user_key: Tuple[str, str], text: str) -> None:
+        """Learn from something the user just said; a no-op until their model exists."""
+        model = self.get_user_model(user_key)
+        if model is not None and text:
+            model.observe(text)
+
+    def add_supplement(self, user_key: Tuple[str, str], words: Iterable[str]) -> None:
+        model = self.get_user_model(user_key)
+        if model is not None:
+            model.add_supplement(words)
+            self.counters["llm_supplements"] += 1
+
+    def invalidate(self, user_key: Tuple[str, str]) -> None:
+        with self._lock:
+            self._users.pop(user_key, None)
+
+    # --- prediction ----------------------------------------------------
+
+    def predict(
+        self, partial: str, context: str = "", user_key: Optional[Tuple[str, str]] = None, limit: int = 20
+    ) -> List[str]:
+        """Ranked complete words starting with `partial` (case-insensitive)."""
+        self.counters["predictions"] += 1
+        prefix = (partial or "").strip().lower()
+        if not prefix:
+            return []
+        context_tokens = tokenize(context)
+        previous = context_tokens[-1].lower() if context_tokens else None
+        model = self.get_user_model(user_key) if user_key is not None else None
+
+        scores: Dict[str, float] = {}
+        for weight, word in self._trie.completions(prefix):
+            scores[word] = weight
+        if model is not None:
+            self.counters["personalized_predictions"] += 1
+            followers = model.bigrams.get(previous) if previous else None
+            candidates = set(model.words_with_prefix(prefix))
+            if followers:
+                candidates.update(w for w in followers if w.startswith(prefix))
+            for word in candidates:
+                if word not in scores:
+                    scores[word] = self._trie.weight(word)
+            for word in scores:
+                score = scores[word]
+                count = model.unigrams.get(word)
+                if count:
+                    score += USER_UNIGRAM_WEIGHT * math.log1p(count)
+                if followers:
+                    follow = followers.get(word)
+                    if follow:
+                        score += USER_BIGRAM_WEIGHT * math.log1p(follow)
+                score += model.supplement.get(word, 0.0)
+                scores[word] = score
+        if prefix in scores:
+            scores[prefix] += EXACT_MATCH_BONUS
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], len(item[0]), item[0]))[:limit]
+        display = model.display if model is not None else {}
+        return [display.get(word) or self._display.get(word) or word for word, _ in ranked]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            users = len(self._users)
+        return {
+            "lexicon_words": self._trie.size,
+            "user_models": users,
+            "building": len(self._building),
+            **self.counters,
+        }
+
+
+# Global singleton instance
+word_predictor = WordPredictor()